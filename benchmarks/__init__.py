@@ -0,0 +1,3 @@
+"""
+效能測試套件
+"""
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+MarkdownConverter 效能測試
+
+量測 convert_to_markdown、iter_markdown、_reorganize_paragraphs_with_figures
+與 format_text_blocks 在 10 至 2000 頁合成語料上的吞吐量、峰值記憶體與
+規模擴展性，並可儲存基準值、在退步超過門檻時以非零狀態結束。
+
+用法:
+    python -m benchmarks.bench_converter                  # 執行並與基準值比較
+    python -m benchmarks.bench_converter --save           # 執行並儲存為新基準值
+    python -m benchmarks.bench_converter --pages 10,100   # 只測指定頁數
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# 添加專案根目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import CorpusGenerator
+from src.utils.markdown_converter import MarkdownConverter
+
+DEFAULT_PAGES = [10, 100, 500, 2000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'converter.json')
+# 小於此秒數的時間差視為量測雜訊
+NOISE_FLOOR_SECONDS = 0.005
+# 擴展指數允許增加的量（例如由線性變為超線性）
+MAX_EXPONENT_INCREASE = 0.2
+
+
+def build_cases(converter: MarkdownConverter, generator: CorpusGenerator,
+                num_pages: int) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """
+    建立各項測試案例
+
+    Returns:
+        {案例名稱: (待測函式, 輸入字元數)}
+    """
+    ocr_result = generator.ocr_result(num_pages)
+    ocr_text = ocr_result['data']['ocr_text']
+    blocks = generator.text_blocks(num_pages)
+    blocks_chars = sum(len(block.get('text', '')) for block in blocks)
+
+    def consume_stream():
+        for _ in converter.iter_markdown(ocr_result):
+            pass
+
+    return {
+        'convert_to_markdown': (lambda: converter.convert_to_markdown(ocr_result), len(ocr_text)),
+        'iter_markdown': (consume_stream, len(ocr_text)),
+        'reorganize_paragraphs': (
+            lambda: converter._reorganize_paragraphs_with_figures(ocr_text), len(ocr_text)
+        ),
+        'format_text_blocks': (lambda: converter.format_text_blocks(blocks), blocks_chars),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[float, int]:
+    """
+    量測執行時間與峰值記憶體
+
+    時間取多次執行的最小值；峰值記憶體另外以 tracemalloc 執行一次量測，
+    避免追蹤開銷影響計時。
+
+    Returns:
+        (秒數, 峰值記憶體位元組)
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def scaling_exponent(points: List[Tuple[int, float]]) -> float:
+    """以最小平方法計算 log(時間) 對 log(頁數) 的斜率（1.0 表示線性）"""
+    points = [(pages, seconds) for pages, seconds in points if seconds > 0]
+    if len(points) < 2:
+        return 0.0
+    xs = [math.log(pages) for pages, _ in points]
+    ys = [math.log(seconds) for _, seconds in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def run(pages_list: List[int], repeat: int, seed: int) -> Dict[str, Any]:
+    """執行所有案例並回傳結果"""
+    converter = MarkdownConverter()
+    generator = CorpusGenerator(seed=seed)
+    cases: Dict[str, Dict[str, Any]] = {}
+
+    for num_pages in pages_list:
+        for name, (func, chars) in build_cases(converter, generator, num_pages).items():
+            seconds, peak = measure(func, repeat)
+            cases.setdefault(name, {})[str(num_pages)] = {
+                'seconds': seconds,
+                'peak_bytes': peak,
+                'input_chars': chars,
+                'chars_per_second': chars / seconds if seconds else 0.0,
+                'pages_per_second': num_pages / seconds if seconds else 0.0,
+            }
+            print(
+                f"{name:<24} {num_pages:>5} 頁  {seconds * 1000:>9.2f} ms  "
+                f"{chars / seconds / 1e6 if seconds else 0:>7.2f} M字元/秒  "
+                f"峰值 {peak / 1024 / 1024:>8.2f} MB"
+            )
+
+    for name, sizes in cases.items():
+        exponent = scaling_exponent(
+            [(int(pages), entry['seconds']) for pages, entry in sizes.items()]
+        )
+        sizes['scaling_exponent'] = exponent
+        print(f"{name:<24} 擴展指數 {exponent:.2f}")
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'cases': cases,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """
+    與基準值比較
+
+    Args:
+        current: 本次結果
+        baseline: 基準結果
+        threshold: 允許的退步比例（0.25 表示 25%）
+
+    Returns:
+        退步項目的說明列表
+    """
+    regressions = []
+    for name, sizes in current['cases'].items():
+        base_sizes = baseline.get('cases', {}).get(name, {})
+
+        # 只有頁數組合相同時擴展指數才可比較
+        exponent = sizes.get('scaling_exponent')
+        base_exponent = base_sizes.get('scaling_exponent')
+        if set(sizes) == set(base_sizes) and exponent is not None \
+                and exponent > base_exponent + MAX_EXPONENT_INCREASE:
+            regressions.append(
+                f"{name} 擴展指數: {base_exponent:.2f} -> {exponent:.2f}"
+            )
+
+        for pages, entry in sizes.items():
+            base = base_sizes.get(pages)
+            if not isinstance(entry, dict) or not isinstance(base, dict):
+                continue
+            if entry['seconds'] - base['seconds'] < NOISE_FLOOR_SECONDS:
+                entry = dict(entry, seconds=base['seconds'])
+            for metric in ('seconds', 'peak_bytes'):
+                if base[metric] and entry[metric] > base[metric] * (1 + threshold):
+                    change = entry[metric] / base[metric] - 1
+                    regressions.append(
+                        f"{name} ({pages} 頁) {metric}: "
+                        f"{base[metric]:.6g} -> {entry[metric]:.6g} (+{change:.0%})"
+                    )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='MarkdownConverter 效能測試')
+    parser.add_argument('--pages', default=','.join(str(p) for p in DEFAULT_PAGES),
+                        help='以逗號分隔的頁數，預設 10,100,500,2000')
+    parser.add_argument('--repeat', type=int, default=5, help='每個案例的計時次數')
+    parser.add_argument('--seed', type=int, default=0, help='語料亂數種子')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基準值檔案路徑')
+    parser.add_argument('--save', action='store_true', help='將結果儲存為基準值')
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.getenv('BENCH_REGRESSION_THRESHOLD', 0.25)),
+                        help='允許的退步比例，預設 0.25')
+    parser.add_argument('--output', help='另外將結果寫入此 JSON 檔')
+    args = parser.parse_args(argv)
+
+    pages_list = [int(p) for p in args.pages.split(',') if p.strip()]
+    result = run(pages_list, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n基準值已儲存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n找不到基準值 {args.baseline}，請先以 --save 建立")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = compare(result, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ 效能退步超過 {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print(f"\n✅ 與基準值相比沒有超過 {args.threshold:.0%} 的退步")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+文件模型記憶體比較
+
+比較結構化文件模型（共用文字緩衝區 + 平行陣列）與 format_text_blocks
+使用的字典列表在相同語料上的記憶體用量。
+
+用法:
+    python -m benchmarks.bench_document --pages 10,100,500,2000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+# 添加專案根目錄與 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from benchmarks.corpus import CorpusGenerator
+from models.document import Document
+
+
+def traced(func):
+    """回傳 (結果, 存活的配置位元組)，不含輸入資料"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='文件模型記憶體比較')
+    parser.add_argument('--pages', default='10,100,500,2000', help='以逗號分隔的頁數')
+    parser.add_argument('--seed', type=int, default=0, help='語料亂數種子')
+    args = parser.parse_args(argv)
+
+    generator = CorpusGenerator(seed=args.seed)
+    print(f"{'頁數':>6} {'區塊數':>8} {'文件模型':>12} {'字典列表':>12} {'比例':>8}")
+    for num_pages in [int(p) for p in args.pages.split(',') if p.strip()]:
+        ocr_result = generator.ocr_result(num_pages)
+        document, document_bytes = traced(lambda: Document.from_ocr_result(ocr_result))
+        # 字典列表包含複製出來的子字串，與目前 format_text_blocks 的輸入相同
+        blocks, blocks_bytes = traced(document.to_text_blocks)
+        print(
+            f"{num_pages:>6} {len(document):>8} "
+            f"{document_bytes / 1024:>10.1f}KB {blocks_bytes / 1024:>10.1f}KB "
+            f"{blocks_bytes / max(document_bytes, 1):>7.1f}x"
+        )
+        del document, blocks
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
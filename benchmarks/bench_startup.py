@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+啟動時間效能測試
+
+在全新的 Python 程序中量測匯入 app、create_app()、第一個請求與建立
+所有服務（相當於 gunicorn worker 啟動到可接收 OCR 請求）的耗時，
+可儲存基準值並在退步超過門檻時以非零狀態結束，讓冷啟動與自動擴展時
+的 worker 啟動延遲維持在低點。
+
+用法:
+    python -m benchmarks.bench_startup              # 執行並與基準值比較
+    python -m benchmarks.bench_startup --save       # 執行並儲存為新基準值
+    python -m benchmarks.bench_startup --top 15     # 另外列出匯入最慢的模組
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'startup.json')
+# 小於此秒數的時間差視為量測雜訊
+NOISE_FLOOR_SECONDS = 0.01
+
+STAGES = ('import_app', 'create_app', 'first_request', 'warm_up', 'worker_ready')
+
+# 在子程序中執行，輸出各階段耗時的 JSON
+_PROBE = '''
+import json, logging, sys, tempfile, time
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+directory = tempfile.mkdtemp()
+application = app.create_app({
+    'UPLOAD_FOLDER': directory, 'OUTPUT_FOLDER': directory,
+    'SEARCH_INDEX_PATH': directory + '/index.db', 'RESULT_CACHE_DIR': None,
+})
+created = time.perf_counter()
+application.test_client().get('/health/live')
+requested = time.perf_counter()
+application.extensions['ocr_services'].warm_up()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import_app': imported - started,
+    'create_app': created - imported,
+    'first_request': requested - created,
+    'warm_up': warmed - requested,
+    'worker_ready': warmed - started,
+}))
+'''
+
+
+def probe() -> Dict[str, float]:
+    """在全新程序中量測一次各階段耗時"""
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE], cwd=SRC_DIR, check=True,
+        capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> List[Tuple[str, float]]:
+    """以 -X importtime 列出累計匯入時間最長的模組"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=SRC_DIR, check=True, capture_output=True, text=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:top]
+
+
+def run(repeat: int) -> Dict[str, Any]:
+    """執行多次量測並回傳結果（各階段取最小值與中位數）"""
+    # 第一次執行會編譯 .pyc，不列入計算
+    probe()
+    samples = [probe() for _ in range(repeat)]
+
+    stages = {}
+    for stage in STAGES:
+        values = [sample[stage] for sample in samples]
+        stages[stage] = {'seconds': min(values), 'median_seconds': statistics.median(values)}
+        print(f"{stage:<14} 最小 {min(values) * 1000:>8.1f} ms  "
+              f"中位數 {statistics.median(values) * 1000:>8.1f} ms")
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """
+    與基準值比較
+
+    Args:
+        current: 本次結果
+        baseline: 基準結果
+        threshold: 允許的退步比例（0.25 表示 25%）
+
+    Returns:
+        退步項目的說明列表
+    """
+    regressions = []
+    for stage, entry in current['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if not base or not base['seconds']:
+            continue
+        seconds, base_seconds = entry['seconds'], base['seconds']
+        if seconds - base_seconds < NOISE_FLOOR_SECONDS:
+            continue
+        if seconds > base_seconds * (1 + threshold):
+            regressions.append(
+                f"{stage}: {base_seconds * 1000:.1f} ms -> {seconds * 1000:.1f} ms "
+                f"(+{seconds / base_seconds - 1:.0%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='啟動時間效能測試')
+    parser.add_argument('--repeat', type=int, default=5, help='量測次數')
+    parser.add_argument('--top', type=int, default=0, help='列出匯入最慢的模組數')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基準值檔案路徑')
+    parser.add_argument('--save', action='store_true', help='將結果儲存為基準值')
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.getenv('BENCH_REGRESSION_THRESHOLD', 0.25)),
+                        help='允許的退步比例，預設 0.25')
+    parser.add_argument('--output', help='另外將結果寫入此 JSON 檔')
+    args = parser.parse_args(argv)
+
+    result = run(args.repeat)
+
+    if args.top:
+        print("\n匯入最慢的模組（累計）:")
+        for name, seconds in slowest_imports(args.top):
+            print(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n基準值已儲存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n找不到基準值 {args.baseline}，請先以 --save 建立")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = compare(result, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ 啟動時間退步超過 {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print(f"\n✅ 與基準值相比沒有超過 {args.threshold:.0%} 的退步")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
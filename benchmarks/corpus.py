@@ -0,0 +1,220 @@
+"""
+合成 OCR 語料產生器
+以固定亂數種子產生類似 AlphaXiv 回應的 OCR 結果，供效能測試使用
+"""
+
+import random
+from typing import Any, Dict, List
+
+# AlphaXiv 在 ocr_text 中使用的分頁標記
+PAGE_SPLIT = '\n\n<--- Page Split --->\n\n'
+
+LATIN_WORDS = [
+    'the', 'adrenal', 'cortex', 'produces', 'steroid', 'hormones', 'and',
+    'regulates', 'cortisol', 'secretion', 'through', 'feedback', 'of',
+    'pituitary', 'signals', 'which', 'control', 'glucose', 'metabolism',
+    'patients', 'with', 'deficiency', 'present', 'fatigue', 'or', 'weight',
+    'loss', 'in', 'clinical', 'studies', 'measured', 'plasma', 'levels',
+    'however', 'results', 'varied', 'across', 'cohorts', 'that', 'were'
+]
+CONNECTORS = ['and', 'which', 'however', 'prompting', 'leading', 'that']
+CJK_CHARS = (
+    '腎上腺皮質分泌類固醇激素並透過下視丘垂體軸調節皮質醇濃度病人常見疲倦'
+    '體重減輕等症狀臨床研究測量血漿濃度結果在不同族群間有所差異'
+)
+CJK_PUNCTUATION = ['，', '、', '。']
+
+
+class CorpusGenerator:
+    """以固定種子產生合成 OCR 結果"""
+
+    def __init__(self, seed: int = 0, cjk_ratio: float = 0.3,
+                 figures_per_page: float = 0.6, words_per_page: int = 450):
+        """
+        初始化語料產生器
+
+        Args:
+            seed: 亂數種子，相同種子產生相同語料
+            cjk_ratio: 中文段落比例
+            figures_per_page: 每頁平均圖片說明數量
+            words_per_page: 每頁平均字數
+        """
+        self.seed = seed
+        self.cjk_ratio = cjk_ratio
+        self.figures_per_page = figures_per_page
+        self.words_per_page = words_per_page
+
+    def _latin_sentence(self, rng: random.Random) -> str:
+        words = [rng.choice(LATIN_WORDS) for _ in range(rng.randint(8, 24))]
+        words[0] = words[0].capitalize()
+        return ' '.join(words) + rng.choice(['.', '.', '.', '?', ':'])
+
+    def _cjk_sentence(self, rng: random.Random) -> str:
+        parts = []
+        for _ in range(rng.randint(2, 4)):
+            start = rng.randrange(len(CJK_CHARS) - 12)
+            parts.append(CJK_CHARS[start:start + rng.randint(6, 12)])
+            parts.append(rng.choice(CJK_PUNCTUATION[:2]))
+        parts[-1] = '。'
+        return ''.join(parts)
+
+    def _figure(self, rng: random.Random, number: int) -> str:
+        caption = ' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(5, 15)))
+        return f"<center>FIGURE {number} {caption.capitalize()}. {caption}</center>"
+
+    def _page(self, rng: random.Random, page_num: int, figure_counter: List[int]) -> str:
+        blocks = []
+        if rng.random() < 0.15:
+            blocks.append(f"## {rng.randint(1, 9)}.{rng.randint(1, 9)} Section {page_num}\n\n")
+
+        words = 0
+        target = int(self.words_per_page * rng.uniform(0.6, 1.4))
+        while words < target:
+            if rng.random() < self.cjk_ratio:
+                paragraph = ''.join(self._cjk_sentence(rng) for _ in range(rng.randint(2, 5)))
+                words += len(paragraph) // 2
+            else:
+                sentences = [self._latin_sentence(rng) for _ in range(rng.randint(2, 6))]
+                paragraph = ' '.join(sentences)
+                words += paragraph.count(' ') + 1
+
+            if rng.random() < self.figures_per_page / 3:
+                figure_counter[0] += 1
+                figure = self._figure(rng, figure_counter[0])
+                if rng.random() < 0.6:
+                    # 圖片說明打斷句子，後文以小寫或連接詞開頭
+                    cut = paragraph.rfind(' ', 0, len(paragraph) // 2)
+                    if cut > 0:
+                        tail = paragraph[cut + 1:]
+                        if rng.random() < 0.5:
+                            tail = rng.choice(CONNECTORS) + ' ' + tail
+                        paragraph = paragraph[:cut] + figure + tail
+                    else:
+                        paragraph += figure
+                else:
+                    paragraph += figure
+
+            blocks.append(paragraph + '\n\n')
+
+        if rng.random() < 0.1:
+            blocks.append('| Marker | Value |\n| --- | --- |\n| ACTH | 12 |\n\n')
+        if rng.random() < 0.05:
+            blocks.append('<center>Table 1 Summary</center>\n\n')
+
+        return ''.join(blocks).rstrip('\n') + '\n'
+
+    def pages(self, num_pages: int) -> List[str]:
+        """
+        產生指定頁數的頁面文字
+
+        Args:
+            num_pages: 頁數（10 至 2000 頁皆可）
+
+        Returns:
+            頁面文字列表
+        """
+        rng = random.Random(f"{self.seed}:{num_pages}")
+        figure_counter = [0]
+        return [self._page(rng, page_num, figure_counter) for page_num in range(1, num_pages + 1)]
+
+    def ocr_result(self, num_pages: int) -> Dict[str, Any]:
+        """
+        產生 AlphaXiv 格式的 OCR 結果
+
+        Args:
+            num_pages: 頁數
+
+        Returns:
+            {"data": {"ocr_text", "pages", "num_pages", "num_successful"}}
+        """
+        pages = self.pages(num_pages)
+        return {
+            'data': {
+                'ocr_text': PAGE_SPLIT.join(pages),
+                'pages': pages,
+                'num_pages': num_pages,
+                'num_successful': num_pages
+            }
+        }
+
+    def text_blocks(self, num_pages: int) -> List[Dict[str, Any]]:
+        """
+        產生 format_text_blocks 使用的文字區塊
+
+        Args:
+            num_pages: 頁數
+
+        Returns:
+            文字區塊列表
+        """
+        rng = random.Random(f"{self.seed}:blocks:{num_pages}")
+        blocks = []
+        for page_num in range(1, num_pages + 1):
+            blocks.append({'type': 'heading', 'level': 2, 'text': f'第 {page_num} 頁'})
+            for _ in range(rng.randint(3, 8)):
+                kind = rng.random()
+                if kind < 0.7:
+                    blocks.append({'type': 'paragraph', 'text': self._latin_sentence(rng)})
+                elif kind < 0.85:
+                    blocks.append({'type': 'list', 'items': [self._cjk_sentence(rng) for _ in range(3)]})
+                else:
+                    blocks.append({
+                        'type': 'table',
+                        'headers': ['Marker', 'Value'],
+                        'rows': [[rng.choice(LATIN_WORDS), rng.randint(1, 99)] for _ in range(4)]
+                    })
+        return blocks
+
+
+def make_pdf(num_pages: int, target_bytes: int = 0, seed: int = 0) -> bytes:
+    """
+    產生指定頁數的最小合法 PDF
+
+    每頁有一行文字；target_bytes 大於產生的大小時，加入一個未被引用的
+    隨機資料串流補足檔案大小，模擬掃描文件的圖片內容（無法被壓縮）。
+
+    Args:
+        num_pages: 頁數
+        target_bytes: 目標檔案大小（位元組），0 表示不補足
+        seed: 補足資料的亂數種子
+
+    Returns:
+        PDF 位元組資料
+    """
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [' + b' '.join(
+            b'%d 0 R' % (3 + 2 * i) for i in range(num_pages)
+        ) + b'] /Count %d >>' % num_pages,
+    ]
+    for index in range(num_pages):
+        content = b'BT /F1 12 Tf 72 720 Td (Page %d) Tj ET' % (index + 1)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 << /Type /Font /Subtype /Type1 '
+            b'/BaseFont /Helvetica >> >> >> >>' % (4 + 2 * index)
+        )
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+
+    def build(extra: bytes) -> bytes:
+        items = objects + ([b'<< /Length %d >>\nstream\n%s\nendstream' % (len(extra), extra)]
+                           if extra else [])
+        out = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(items, 1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(items) + 1)
+        out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(items) + 1, xref
+        )
+        return bytes(out)
+
+    pdf = build(b'')
+    missing = target_bytes - len(pdf) - 64
+    if missing > 0:
+        rng = random.Random(f"pdf:{seed}:{num_pages}:{target_bytes}")
+        pdf = build(rng.randbytes(missing))
+    return pdf
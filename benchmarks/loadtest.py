@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+端對端負載測試
+
+以可設定的 PDF 大小組合與並行數對 /upload（或其他端點）送出請求，
+支援封閉迴圈（固定並行數，完成一個才送下一個）與開放迴圈（依到達率
+送出，不等待前一個完成）。可自動啟動模擬 AlphaXiv 伺服器與應用程式，
+回報吞吐量、p50/p95/p99 延遲、錯誤率與伺服器 RSS 變化，並將結果存成
+可在版本間比較的 JSON。
+
+用法:
+    # 自動啟動模擬上游與應用程式，封閉迴圈 8 個並行、60 秒
+    python -m benchmarks.loadtest --start-mock --start-server --concurrency 8 --duration 60
+
+    # 開放迴圈，每秒 5 個請求，PDF 組合為 1 頁 50%、20 頁 40%、200 頁 10%
+    python -m benchmarks.loadtest --start-mock --start-server --rate 5 \\
+        --mix 1:0.5,20:0.4,200:0.1 --mock-latency lognormal:1.5,0.4 --mock-per-page 0.05
+
+    # 與先前的結果比較
+    python -m benchmarks.loadtest --url http://localhost:5001 --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+# 添加專案根目錄到路徑
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.corpus import make_pdf
+
+# 比較結果時視為退步的變化比例
+DEFAULT_THRESHOLD = 0.2
+
+
+def parse_mix(spec: str) -> List[Tuple[int, float]]:
+    """
+    解析 PDF 大小組合
+
+    Args:
+        spec: 例如 '1:0.5,20:0.4,200:0.1'（頁數:權重）
+
+    Returns:
+        [(頁數, 權重)]
+    """
+    mix = []
+    for item in spec.split(','):
+        pages, _, weight = item.partition(':')
+        mix.append((int(pages), float(weight or 1)))
+    return mix
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """以線性內插計算百分位數"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def read_rss(pid: int) -> Optional[int]:
+    """讀取行程及其子行程的 RSS（位元組，僅支援 Linux /proc）"""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    for current in pids:
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            if current == pid:
+                return None
+    return total
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30.0) -> None:
+    """等待伺服器可以連線"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"伺服器未在 {timeout} 秒內啟動: {url}")
+
+
+class LoadTest:
+    """負載測試執行器"""
+
+    def __init__(self, url: str, endpoint: str, mix: List[Tuple[int, float]],
+                 bytes_per_page: int, concurrency: int, rate: float,
+                 duration: float, requests_limit: int, seed: int,
+                 server_pid: Optional[int] = None, timeout: float = 600.0):
+        self.url = url.rstrip('/') + endpoint
+        self.mix = mix
+        self.bytes_per_page = bytes_per_page
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests_limit = requests_limit
+        self.server_pid = server_pid
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.records: List[Dict[str, Any]] = []
+        self.rss: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._pdfs: Dict[int, bytes] = {}
+
+    def _pdf(self, pages: int) -> bytes:
+        if pages not in self._pdfs:
+            self._pdfs[pages] = make_pdf(pages, pages * self.bytes_per_page)
+        return self._pdfs[pages]
+
+    def _next_pages(self) -> Optional[int]:
+        """取得下一個請求的頁數；達到時間或數量上限時返回 None"""
+        with self._lock:
+            if self._stop.is_set():
+                return None
+            if self.requests_limit and self._issued >= self.requests_limit:
+                return None
+            if self.duration and time.perf_counter() - self._started >= self.duration:
+                return None
+            self._issued += 1
+            return self.rng.choices(
+                [pages for pages, _ in self.mix], [weight for _, weight in self.mix]
+            )[0]
+
+    def _send(self, pages: int, session: requests.Session) -> None:
+        pdf = self._pdf(pages)
+        # 每個請求的內容都不同，避免伺服器端結果快取影響量測
+        body = pdf + b'\n%% %d %f\n' % (self.rng.getrandbits(64), time.time())
+        sent_at = time.perf_counter()
+        record = {'pages': pages, 'bytes': len(body),
+                  'start': round(sent_at - self._started, 4)}
+        try:
+            response = session.post(
+                self.url,
+                files={'file': (f'load_{pages}p.pdf', body, 'application/pdf')},
+                timeout=self.timeout
+            )
+            record['status'] = response.status_code
+            record['ok'] = response.ok
+        except requests.RequestException as e:
+            record['status'] = type(e).__name__
+            record['ok'] = False
+        record['latency'] = time.perf_counter() - sent_at
+        with self._lock:
+            self.records.append(record)
+
+    def _closed_loop(self) -> None:
+        def worker():
+            session = requests.Session()
+            while True:
+                pages = self._next_pages()
+                if pages is None:
+                    return
+                self._send(pages, session)
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _open_loop(self) -> None:
+        # 以指數分布的間隔送出（Poisson 到達），並行上限只用來保護產生端
+        local = threading.local()
+
+        def send(pages):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            self._send(pages, local.session)
+
+        with ThreadPoolExecutor(max_workers=max(self.concurrency, 1)) as executor:
+            next_at = time.perf_counter()
+            while True:
+                pages = self._next_pages()
+                if pages is None:
+                    break
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, pages)
+                next_at += self.rng.expovariate(self.rate)
+
+    def _sample_rss(self) -> None:
+        while not self._stop.wait(1.0):
+            rss = read_rss(self.server_pid)
+            if rss is not None:
+                self.rss.append((round(time.perf_counter() - self._started, 2), rss))
+
+    def run(self) -> Dict[str, Any]:
+        """執行負載測試並回傳結果"""
+        for pages, _ in self.mix:
+            self._pdf(pages)
+
+        self._started = time.perf_counter()
+        sampler = None
+        if self.server_pid:
+            sampler = threading.Thread(target=self._sample_rss, daemon=True)
+            sampler.start()
+
+        try:
+            if self.rate:
+                self._open_loop()
+            else:
+                self._closed_loop()
+        finally:
+            elapsed = time.perf_counter() - self._started
+            self._stop.set()
+            if sampler is not None:
+                sampler.join()
+
+        return self.summarize(elapsed)
+
+    def summarize(self, elapsed: float) -> Dict[str, Any]:
+        """彙整結果"""
+        records = sorted(self.records, key=lambda record: record['start'])
+
+        def stats(subset: List[Dict[str, Any]]) -> Dict[str, Any]:
+            ok = [record['latency'] for record in subset if record['ok']]
+            errors = len(subset) - len(ok)
+            return {
+                'requests': len(subset),
+                'errors': errors,
+                'error_rate': errors / len(subset) if subset else 0.0,
+                'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+                'pages_per_second': sum(r['pages'] for r in subset if r['ok']) / elapsed
+                if elapsed else 0.0,
+                'latency': {
+                    'mean': sum(ok) / len(ok) if ok else 0.0,
+                    'p50': percentile(ok, 0.50),
+                    'p95': percentile(ok, 0.95),
+                    'p99': percentile(ok, 0.99),
+                    'max': max(ok) if ok else 0.0,
+                },
+            }
+
+        statuses: Dict[str, int] = {}
+        for record in records:
+            statuses[str(record['status'])] = statuses.get(str(record['status']), 0) + 1
+
+        return {
+            'summary': dict(stats(records), elapsed_seconds=elapsed, statuses=statuses),
+            'by_pages': {
+                str(pages): stats([r for r in records if r['pages'] == pages])
+                for pages, _ in self.mix
+            },
+            'rss': {
+                'samples': self.rss,
+                'max_bytes': max((rss for _, rss in self.rss), default=None),
+            },
+            'requests': records,
+        }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """
+    與先前的結果比較
+
+    Returns:
+        退步項目的說明列表
+    """
+    regressions = []
+    now, base = current['summary'], baseline['summary']
+    for key in ('p50', 'p95', 'p99'):
+        if base['latency'][key] and now['latency'][key] > base['latency'][key] * (1 + threshold):
+            regressions.append(
+                f"{key} 延遲: {base['latency'][key]:.3f}s -> {now['latency'][key]:.3f}s"
+            )
+    if base['throughput_rps'] and now['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+        regressions.append(
+            f"吞吐量: {base['throughput_rps']:.2f} -> {now['throughput_rps']:.2f} req/s"
+        )
+    if now['error_rate'] > base['error_rate'] + 0.01:
+        regressions.append(f"錯誤率: {base['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    base_rss = baseline.get('rss', {}).get('max_bytes')
+    now_rss = current.get('rss', {}).get('max_bytes')
+    if base_rss and now_rss and now_rss > base_rss * (1 + threshold):
+        regressions.append(f"最大 RSS: {base_rss / 2**20:.0f} MB -> {now_rss / 2**20:.0f} MB")
+    return regressions
+
+
+def start_mock(args) -> Tuple[subprocess.Popen, str]:
+    """啟動模擬 AlphaXiv 伺服器"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_alphaxiv', '--port', str(port),
+         '--latency', args.mock_latency, '--per-page', str(args.mock_per_page),
+         '--error-rate', str(args.mock_error_rate), '--seed', str(args.seed)],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f'http://127.0.0.1:{port}'
+    wait_for(base + '/__mock__/stats')
+    return process, base + '/models/v1/deepseek/deepseek-ocr/inference'
+
+
+def start_server(args, api_url: Optional[str]) -> Tuple[subprocess.Popen, str]:
+    """啟動受測的應用程式"""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), FLASK_ENV='production',
+               RESULT_CACHE_ENABLED='false')
+    if api_url:
+        env['ALPHAXIV_API_URL'] = api_url
+    command = args.server_command.split() if args.server_command else [sys.executable, 'run.py']
+    process = subprocess.Popen(
+        command, cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f'http://127.0.0.1:{port}'
+    wait_for(base + '/health')
+    return process, base
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='端對端負載測試')
+    parser.add_argument('--url', default='http://localhost:5001', help='受測伺服器')
+    parser.add_argument('--endpoint', default='/upload', help='送出請求的端點')
+    parser.add_argument('--mix', default='1:0.5,10:0.3,50:0.2',
+                        help='PDF 頁數組合（頁數:權重），預設 1:0.5,10:0.3,50:0.2')
+    parser.add_argument('--bytes-per-page', type=int, default=50 * 1024,
+                        help='每頁的檔案大小（模擬掃描內容），預設 50KB')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='封閉迴圈的並行數；開放迴圈的最大同時請求數')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='開放迴圈的每秒請求數（0 表示封閉迴圈）')
+    parser.add_argument('--duration', type=float, default=30.0, help='測試秒數')
+    parser.add_argument('--requests', type=int, default=0, help='請求數上限（0 表示不限）')
+    parser.add_argument('--timeout', type=float, default=600.0, help='單一請求逾時秒數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-pid', type=int, help='記錄此行程的 RSS')
+    parser.add_argument('--start-server', action='store_true', help='自動啟動應用程式')
+    parser.add_argument('--server-command', help='啟動應用程式的指令，預設 python run.py')
+    parser.add_argument('--start-mock', action='store_true', help='自動啟動模擬 AlphaXiv 伺服器')
+    parser.add_argument('--mock-latency', default='lognormal:1.0,0.3', help='模擬上游的延遲分布')
+    parser.add_argument('--mock-per-page', type=float, default=0.05, help='模擬上游的每頁延遲')
+    parser.add_argument('--mock-error-rate', type=float, default=0.0, help='模擬上游的錯誤率')
+    parser.add_argument('--output', help='將結果寫入 JSON 檔')
+    parser.add_argument('--compare', help='與此 JSON 結果比較')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='比較時視為退步的變化比例，預設 0.2')
+    args = parser.parse_args(argv)
+
+    processes = []
+    try:
+        api_url = None
+        if args.start_mock:
+            mock, api_url = start_mock(args)
+            processes.append(mock)
+        url = args.url
+        server_pid = args.server_pid
+        if args.start_server:
+            server, url = start_server(args, api_url)
+            processes.append(server)
+            server_pid = server.pid
+
+        test = LoadTest(
+            url=url, endpoint=args.endpoint, mix=parse_mix(args.mix),
+            bytes_per_page=args.bytes_per_page, concurrency=args.concurrency,
+            rate=args.rate, duration=args.duration, requests_limit=args.requests,
+            seed=args.seed, server_pid=server_pid, timeout=args.timeout
+        )
+        result = test.run()
+    finally:
+        for process in processes:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    result['config'] = {key: value for key, value in vars(args).items()
+                        if key not in ('output', 'compare')}
+    result['created_at'] = datetime.now().isoformat()
+    result['python'] = platform.python_version()
+    result['platform'] = platform.platform()
+
+    summary = result['summary']
+    latency = summary['latency']
+    print(f"請求數 {summary['requests']}  錯誤 {summary['errors']} ({summary['error_rate']:.2%})")
+    print(f"吞吐量 {summary['throughput_rps']:.2f} req/s  {summary['pages_per_second']:.1f} 頁/秒")
+    print(f"延遲 p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  "
+          f"p99 {latency['p99']:.3f}s  max {latency['max']:.3f}s")
+    if result['rss']['max_bytes']:
+        print(f"伺服器最大 RSS {result['rss']['max_bytes'] / 2**20:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ 與 {args.compare} 相比退步超過 {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n✅ 與 {args.compare} 相比沒有超過 {args.threshold:.0%} 的退步")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+模擬 AlphaXiv DeepSeek OCR 伺服器
+
+接受與 AlphaXiv 相同的 multipart 請求（file 欄位），回傳
+{"data": {"ocr_text", "pages", "num_pages", "num_successful"}}。
+延遲分布、錯誤率與頁數皆可設定；另有錄製模式（轉送到真正的 API 並
+儲存回應）與重播模式（依檔案內容雜湊回傳已錄製的回應），方便離線且
+可重現地進行效能測試。
+
+用法:
+    python -m benchmarks.mock_alphaxiv --port 5002 --latency lognormal:1.5,0.4 --per-page 0.2
+    python -m benchmarks.mock_alphaxiv --record recordings/   # 錄製真正的回應
+    python -m benchmarks.mock_alphaxiv --replay recordings/   # 離線重播
+
+接著將應用程式指向模擬伺服器:
+    ALPHAXIV_API_URL=http://127.0.0.1:5002/models/v1/deepseek/deepseek-ocr/inference
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# 添加專案根目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, Response, jsonify, request
+
+from benchmarks.corpus import PAGE_SPLIT, CorpusGenerator
+
+INFERENCE_PATH = '/models/v1/deepseek/deepseek-ocr/inference'
+DEFAULT_UPSTREAM = 'https://api.alphaxiv.org' + INFERENCE_PATH
+
+_PDF_PAGE_RE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    """
+    解析延遲分布設定
+
+    支援 fixed:秒、uniform:最小,最大、normal:平均,標準差、
+    lognormal:中位數,sigma
+
+    Returns:
+        (分布名稱, 參數)
+    """
+    name, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(',') if value]
+    expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+    if name not in expected or len(values) != expected[name]:
+        raise ValueError(f"無效的延遲設定: {spec}")
+    return name, values
+
+
+def count_pdf_pages(pdf_bytes: bytes) -> int:
+    """以 /Type /Page 物件數粗略估計 PDF 頁數"""
+    return len(_PDF_PAGE_RE.findall(pdf_bytes))
+
+
+class MockAlphaXivServer:
+    """模擬 AlphaXiv 推論伺服器"""
+
+    def __init__(self, latency: str = 'fixed:0', per_page: float = 0.0,
+                 error_rate: float = 0.0, error_statuses: Tuple[int, ...] = (500, 502, 503),
+                 page_failure_rate: float = 0.0, pages: str = 'auto', seed: int = 0,
+                 record_dir: Optional[str] = None, replay_dir: Optional[str] = None,
+                 upstream_url: str = DEFAULT_UPSTREAM, replay_fallback: bool = True):
+        """
+        初始化模擬伺服器
+
+        Args:
+            latency: 固定延遲分布（見 parse_latency）
+            per_page: 每頁額外延遲（秒）
+            error_rate: 整個請求失敗的比例
+            error_statuses: 失敗時隨機使用的 HTTP 狀態碼
+            page_failure_rate: 單頁辨識失敗（回傳空白頁）的比例
+            pages: 'auto' 依 PDF 內容計算頁數；整數或 '最小-最大' 範圍
+            seed: 亂數種子
+            record_dir: 錄製模式的輸出目錄
+            replay_dir: 重播模式的錄製目錄
+            upstream_url: 錄製模式轉送的 API URL
+            replay_fallback: 重播時找不到錄製資料是否改用合成結果
+        """
+        self.latency = parse_latency(latency)
+        self.per_page = per_page
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.page_failure_rate = page_failure_rate
+        self.pages = pages
+        self.seed = seed
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.upstream_url = upstream_url
+        self.replay_fallback = replay_fallback
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'pages': 0, 'in_flight': 0,
+                      'replayed': 0, 'recorded': 0}
+        self.app = self._create_app()
+
+    # ---- Flask ----
+
+    def _create_app(self) -> Flask:
+        app = Flask(__name__)
+
+        @app.route(INFERENCE_PATH, methods=['POST'])
+        @app.route('/', methods=['POST'])
+        def inference():
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({'error': 'missing file field'}), 400
+            pdf_bytes = upload.read()
+            self._update('requests', 1)
+            self._update('in_flight', 1)
+            try:
+                return self.handle(pdf_bytes, upload.filename or 'document.pdf')
+            finally:
+                self._update('in_flight', -1)
+
+        @app.route('/__mock__/stats')
+        def stats():
+            with self._lock:
+                return jsonify(dict(self.stats))
+
+        return app
+
+    def _update(self, key: str, amount: int) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    # ---- 請求處理 ----
+
+    def handle(self, pdf_bytes: bytes, filename: str) -> Response:
+        """處理一個推論請求"""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+
+        if self.replay_dir:
+            recorded = self._load_recording(digest)
+            if recorded is not None:
+                self._update('replayed', 1)
+                status, body = recorded
+                return Response(body, status=status, mimetype='application/json')
+            if not self.replay_fallback:
+                return jsonify({'error': f'no recording for {digest}'}), 404
+
+        if self.record_dir:
+            return self._forward_and_record(pdf_bytes, filename, digest)
+
+        num_pages = self._page_count(pdf_bytes)
+        time.sleep(self._sample_latency() + self.per_page * num_pages)
+
+        if self.error_rate and self._random() < self.error_rate:
+            self._update('errors', 1)
+            with self._lock:
+                status = self._rng.choice(self.error_statuses)
+            return jsonify({'error': 'simulated upstream error'}), status
+
+        self._update('pages', num_pages)
+        return jsonify(self.synthetic_result(num_pages))
+
+    def _sample_latency(self) -> float:
+        name, params = self.latency
+        with self._lock:
+            if name == 'fixed':
+                value = params[0]
+            elif name == 'uniform':
+                value = self._rng.uniform(*params)
+            elif name == 'normal':
+                value = self._rng.gauss(*params)
+            else:
+                value = self._rng.lognormvariate(math.log(params[0]), params[1])
+        return max(value, 0.0)
+
+    def _page_count(self, pdf_bytes: bytes) -> int:
+        if self.pages == 'auto':
+            counted = count_pdf_pages(pdf_bytes)
+            if counted:
+                return counted
+            return 1
+        low, _, high = str(self.pages).partition('-')
+        if not high:
+            return int(low)
+        with self._lock:
+            return self._rng.randint(int(low), int(high))
+
+    def synthetic_result(self, num_pages: int) -> Dict[str, Any]:
+        """產生 AlphaXiv 格式的合成結果"""
+        pages = list(_corpus_pages(self.seed, num_pages))
+        successful = num_pages
+        if self.page_failure_rate:
+            for index in range(num_pages):
+                if self._random() < self.page_failure_rate:
+                    pages[index] = ''
+                    successful -= 1
+        return {
+            'data': {
+                'ocr_text': PAGE_SPLIT.join(pages),
+                'pages': pages,
+                'num_pages': num_pages,
+                'num_successful': successful
+            }
+        }
+
+    # ---- 錄製與重播 ----
+
+    def _recording_path(self, directory: str, digest: str) -> str:
+        return os.path.join(directory, f"{digest}.json")
+
+    def _load_recording(self, digest: str) -> Optional[Tuple[int, str]]:
+        path = self._recording_path(self.replay_dir, digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            recording = json.load(f)
+        return recording['status'], recording['body']
+
+    def _forward_and_record(self, pdf_bytes: bytes, filename: str, digest: str) -> Response:
+        import requests
+
+        started = time.perf_counter()
+        response = requests.post(
+            self.upstream_url,
+            files={'file': (filename, pdf_bytes, 'application/pdf')},
+            timeout=300
+        )
+        recording = {
+            'status': response.status_code,
+            'body': response.text,
+            'filename': filename,
+            'sha256': digest,
+            'bytes': len(pdf_bytes),
+            'elapsed_seconds': time.perf_counter() - started,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = self._recording_path(self.record_dir, digest)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(recording, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._update('recorded', 1)
+        return Response(response.text, status=response.status_code,
+                        mimetype='application/json')
+
+
+@lru_cache(maxsize=64)
+def _corpus_pages(seed: int, num_pages: int) -> Tuple[str, ...]:
+    return tuple(CorpusGenerator(seed=seed).pages(num_pages))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='模擬 AlphaXiv DeepSeek OCR 伺服器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--latency', default='fixed:0',
+                        help='延遲分布：fixed:秒、uniform:a,b、normal:平均,標準差、'
+                             'lognormal:中位數,sigma')
+    parser.add_argument('--per-page', type=float, default=0.0, help='每頁額外延遲（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='請求失敗比例')
+    parser.add_argument('--error-statuses', default='500,502,503',
+                        help='失敗時使用的狀態碼，以逗號分隔')
+    parser.add_argument('--page-failure-rate', type=float, default=0.0,
+                        help='單頁辨識失敗比例')
+    parser.add_argument('--pages', default='auto',
+                        help="頁數：auto（依 PDF 計算）、整數或 '最小-最大'")
+    parser.add_argument('--seed', type=int, default=0, help='亂數種子')
+    parser.add_argument('--record', metavar='DIR', help='錄製模式：轉送到真正的 API 並儲存回應')
+    parser.add_argument('--replay', metavar='DIR', help='重播模式：回傳已錄製的回應')
+    parser.add_argument('--replay-strict', action='store_true',
+                        help='重播時找不到錄製資料回傳 404，而不是合成結果')
+    parser.add_argument('--upstream', default=os.getenv('MOCK_UPSTREAM_URL', DEFAULT_UPSTREAM),
+                        help='錄製模式轉送的 API URL')
+    args = parser.parse_args(argv)
+
+    server = MockAlphaXivServer(
+        latency=args.latency,
+        per_page=args.per_page,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(',') if s),
+        page_failure_rate=args.page_failure_rate,
+        pages=args.pages,
+        seed=args.seed,
+        record_dir=args.record,
+        replay_dir=args.replay,
+        upstream_url=args.upstream,
+        replay_fallback=not args.replay_strict
+    )
+    print(f"ALPHAXIV_API_URL=http://{args.host}:{args.port}{INFERENCE_PATH}")
+    server.app.run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+gunicorn 設定（正式環境）
+
+用法:
+    gunicorn -c gunicorn.conf.py
+
+每個 worker 是獨立的程序，使用 gthread 執行緒池處理並行請求。
+- 平滑重新載入：kill -HUP <master pid>，新 worker 就緒後才結束舊 worker
+- 平滑關閉：SIGTERM 後停止接受新連線，等待進行中的 OCR 工作完成
+  （最多 GRACEFUL_TIMEOUT 秒）
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+# 各 worker 將指標快照寫入同一目錄，/metrics 合併所有 worker 的數值
+# （須在匯入 utils.metrics 前設定，worker 由 master fork 後沿用）
+if not os.getenv('METRICS_MULTIPROC_DIR'):
+    os.environ['METRICS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='deepseek-ocr-metrics-')
+
+from utils import metrics  # noqa: E402
+from utils.serving import default_threads, default_workers  # noqa: E402
+
+pythonpath = 'src'
+wsgi_app = 'app:create_app()'
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+worker_class = 'gthread'
+
+# SERVER_MODE=asgi：每個 worker 一個事件迴圈（uvicorn），上傳與下載以非同步方式處理，
+# 等待 AlphaXiv 時不佔用執行緒
+if os.getenv('SERVER_MODE', 'wsgi').lower() == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'asgi:create_asgi_app()'
+
+workers = int(os.getenv('GUNICORN_WORKERS') or os.getenv('WEB_CONCURRENCY') or default_workers())
+threads = int(os.getenv('GUNICORN_THREADS') or default_threads())
+
+# OCR 請求最長可能先排隊 OCR_QUEUE_TIMEOUT 秒，再等待 AlphaXiv 最多 UPSTREAM_MAX_TIMEOUT 秒
+# （延遲模型依頁數設定的逾時上限），關閉時需等待進行中的工作完成
+_request_seconds = (float(os.getenv('OCR_QUEUE_TIMEOUT') or 300)
+                    + float(os.getenv('UPSTREAM_MAX_TIMEOUT') or 600))
+timeout = int(os.getenv('GUNICORN_TIMEOUT') or _request_seconds + 60)
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT') or _request_seconds + 30)
+keepalive = 5
+
+# 定期重啟 worker 以回收記憶體（0 表示不重啟）
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# 各 worker 自行建立服務（SQLite 連線、背景執行緒不能跨 fork 共用）；
+# 結果快取、預覽快取與全文檢索皆存放在磁碟上，以原子寫入與 SQLite 鎖在 worker 間共用
+preload_app = False
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def on_starting(server):
+    # 清除上次執行留下的指標快照
+    metrics.clear_multiprocess_dir(os.environ['METRICS_MULTIPROC_DIR'])
+
+
+def when_ready(server):
+    server.log.info(f"gunicorn 已就緒：{workers} 個 worker，每個 {threads} 個執行緒")
+
+
+def post_worker_init(worker):
+    # 在接收請求前建立服務，避免第一個請求承擔初始化時間（WARM_UP_SERVICES=false 可停用）
+    # （ASGI 模式在 lifespan startup 時建立）
+    extensions = getattr(worker.wsgi, 'extensions', None)
+    if extensions and os.getenv('WARM_UP_SERVICES', 'true').lower() != 'false':
+        extensions['ocr_services'].warm_up()
+    metrics.REGISTRY.start_writer()
+
+
+def worker_exit(server, worker):
+    # 平滑關閉時等待預覽模式的背景工作完成，避免工作停在執行中
+    # （ASGI 模式在 lifespan shutdown 時處理）
+    extensions = getattr(worker.wsgi, 'extensions', None)
+    if extensions:
+        extensions['ocr_services'].shutdown()
+    # 結束前寫入最後的數值，由 child_exit 併入累計
+    metrics.REGISTRY.write_snapshot()
+
+
+def child_exit(server, worker):
+    # 已結束 worker 的計數器與直方圖併入累計檔案，量表不再計入
+    metrics.mark_process_dead(worker.pid, os.environ['METRICS_MULTIPROC_DIR'])
+
+
+def worker_int(worker):
+    worker.log.info(f"worker {worker.pid} 收到中斷訊號，停止處理")
@@ -2,7 +2,12 @@
 """
 DeepSeek OCR Application Entry Point
 快速啟動腳本
+
+FLASK_ENV=production 時以 gunicorn 多 worker 模式啟動（設定見 gunicorn.conf.py），
+否則使用 Flask 開發伺服器。
 """
+import logging
+import os
 import sys
 from pathlib import Path
 
@@ -11,7 +16,22 @@ project_root = Path(__file__).parent
 src_path = project_root / "src"
 sys.path.insert(0, str(src_path))
 
+
+def serve_production():
+    """以 gunicorn 取代目前程序，gunicorn 無法使用時返回 False"""
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        logging.warning("未安裝 gunicorn，改用 Flask 開發伺服器")
+        return False
+    config = str(project_root / "gunicorn.conf.py")
+    os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", config])
+
+
 if __name__ == "__main__":
+    if os.getenv("FLASK_ENV") == "production" and "--dev" not in sys.argv:
+        serve_production()
+
     # 導入並執行主應用程式
-    from app import app, main
+    from app import main
     main()
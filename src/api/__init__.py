@@ -3,5 +3,9 @@ AlphaXiv API 整合模組
 """
 
 from .alphaxiv_client import AlphaXivClient
+from .endpoint_pool import EndpointPool
+from .latency_model import LatencyModel
+from .upstream_health import CircuitBreaker, CircuitOpenError, UpstreamStats
 
-__all__ = ['AlphaXivClient']
+__all__ = ['AlphaXivClient', 'CircuitBreaker', 'CircuitOpenError', 'EndpointPool',
+           'LatencyModel', 'UpstreamStats']
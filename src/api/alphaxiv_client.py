@@ -5,9 +5,17 @@ AlphaXiv API 客戶端
 
 import requests
 import os
+import time
 from typing import Optional, Dict, Any
 import logging
 
+from utils import tracing
+from utils.metrics import UPSTREAM_BYTES, UPSTREAM_RESPONSES
+
+from .endpoint_pool import Endpoint, EndpointPool
+from .latency_model import LatencyModel
+from .upstream_health import CircuitBreaker, UpstreamStats
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,20 +27,33 @@ class AlphaXivClient:
         初始化 AlphaXiv 客戶端
 
         Args:
-            api_url: API 端點 URL，如果未提供則從環境變數讀取
+            api_url: API 端點 URL，如果未提供則從環境變數讀取；ALPHAXIV_API_URLS
+                以逗號分隔多個端點時，請求在端點之間負載平衡
         """
-        self.api_url = api_url or os.getenv(
-            'ALPHAXIV_API_URL',
-            'https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference'
-        )
-        logger.info(f"AlphaXiv 客戶端已初始化，API URL: {self.api_url}")
-
-    def process_pdf(self, file_path: str) -> Dict[str, Any]:
+        if api_url:
+            urls = [api_url]
+        else:
+            urls = [url.strip() for url in (os.getenv('ALPHAXIV_API_URLS') or '').split(',')
+                    if url.strip()]
+        if not urls:
+            urls = [os.getenv(
+                'ALPHAXIV_API_URL',
+                'https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference'
+            )]
+        self.endpoints = EndpointPool(urls)
+        self.api_url = self.endpoints.urls[0]
+        self.breaker = CircuitBreaker()
+        self.upstream = UpstreamStats()
+        self.latency = LatencyModel()
+        logger.info(f"AlphaXiv 客戶端已初始化，API URL: {', '.join(self.endpoints.urls)}")
+
+    def process_pdf(self, file_path: str, num_pages: Optional[int] = None) -> Dict[str, Any]:
         """
         處理 PDF 檔案並執行 OCR
 
         Args:
             file_path: PDF 檔案路徑
+            num_pages: 頁數（已知時依延遲模型設定逾時）
 
         Returns:
             包含 OCR 結果的字典
@@ -50,16 +71,13 @@ class AlphaXivClient:
             with open(file_path, 'rb') as f:
                 files = {'file': (os.path.basename(file_path), f, 'application/pdf')}
 
-                logger.debug(f"發送 POST 請求到: {self.api_url}")
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    timeout=300  # 5 分鐘超時
-                )
+                started = time.perf_counter()
+                response = self._post(files, os.path.getsize(file_path), num_pages)
 
                 response.raise_for_status()
 
-                result = response.json()
+                result = self._decode(response)
+                self.latency.observe_result(result, num_pages, time.perf_counter() - started)
                 logger.info(f"PDF 處理成功: {file_path}")
 
                 return result
@@ -72,13 +90,15 @@ class AlphaXivClient:
             logger.error(f"API 請求失敗: {str(e)}")
             raise Exception(f"OCR 處理失敗: {str(e)}")
 
-    def process_pdf_from_bytes(self, file_bytes: bytes, filename: str) -> Dict[str, Any]:
+    def process_pdf_from_bytes(self, file_bytes: bytes, filename: str,
+                               num_pages: Optional[int] = None) -> Dict[str, Any]:
         """
         從位元組資料處理 PDF
 
         Args:
             file_bytes: PDF 檔案的位元組資料
             filename: 檔案名稱
+            num_pages: 頁數（已知時依延遲模型設定逾時）
 
         Returns:
             包含 OCR 結果的字典
@@ -88,16 +108,13 @@ class AlphaXivClient:
         try:
             files = {'file': (filename, file_bytes, 'application/pdf')}
 
-            logger.debug(f"發送 POST 請求到: {self.api_url}")
-            response = requests.post(
-                self.api_url,
-                files=files,
-                timeout=300
-            )
+            started = time.perf_counter()
+            response = self._post(files, len(file_bytes), num_pages)
 
             response.raise_for_status()
 
-            result = response.json()
+            result = self._decode(response)
+            self.latency.observe_result(result, num_pages, time.perf_counter() - started)
             logger.info(f"PDF 處理成功: {filename}")
 
             return result
@@ -109,3 +126,112 @@ class AlphaXivClient:
         except requests.RequestException as e:
             logger.error(f"API 請求失敗: {str(e)}")
             raise Exception(f"OCR 處理失敗: {str(e)}")
+
+    def _post(self, files: Dict[str, Any], sent_bytes: int,
+              num_pages: Optional[int] = None) -> requests.Response:
+        """
+        發送 OCR 請求並記錄耗時、狀態碼與傳輸量
+
+        連線失敗或回應 5xx 時改由另一個端點重試一次；斷路器只記錄重試後
+        的結果，單一端點故障不會讓整個端點集合的斷路器開啟。
+
+        Args:
+            files: multipart 檔案欄位
+            sent_bytes: 上傳的檔案大小
+            num_pages: 頁數，用於計算逾時；未知時使用 UPSTREAM_MAX_TIMEOUT
+
+        Returns:
+            API 回應
+        """
+        self.breaker.before_call()
+        try:
+            response = self._post_with_retry(files, sent_bytes, num_pages)
+        except requests.RequestException:
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            self.breaker.cancel()
+            raise
+        self.breaker.record(not _failed_status(response.status_code))
+        return response
+
+    def _post_with_retry(self, files: Dict[str, Any], sent_bytes: int,
+                         num_pages: Optional[int]) -> requests.Response:
+        """送出請求；連線失敗或 5xx 時改由另一個端點重試一次"""
+        timeout = self.latency.timeout(num_pages)
+        tracing.annotate('upstream_timeout', round(timeout, 1))
+        endpoint = self.endpoints.acquire()
+        try:
+            response = self._attempt(endpoint, files, sent_bytes, num_pages, timeout)
+        except requests.ConnectionError as e:
+            other = self.endpoints.acquire_other(endpoint)
+            if other is None:
+                raise
+            logger.warning(f"端點 {endpoint.url} 連線失敗（{e}），改由 {other.url} 重試")
+        else:
+            if response.status_code < 500:
+                return response
+            other = self.endpoints.acquire_other(endpoint)
+            if other is None:
+                return response
+            logger.warning(
+                f"端點 {endpoint.url} 回應 {response.status_code}，改由 {other.url} 重試"
+            )
+        _rewind(files)
+        return self._attempt(other, files, sent_bytes, num_pages, timeout)
+
+    def _attempt(self, endpoint: Endpoint, files: Dict[str, Any], sent_bytes: int,
+                 num_pages: Optional[int], timeout: float) -> requests.Response:
+        """對一個端點送出請求並記錄統計"""
+        tracing.annotate('upstream_endpoint', endpoint.url)
+        logger.debug(f"發送 POST 請求到: {endpoint.url}")
+        UPSTREAM_BYTES.inc('sent', amount=sent_bytes)
+        tracing.increment('upstream_attempts')
+        tracing.increment('bytes_sent', sent_bytes)
+        started = time.perf_counter()
+        try:
+            with tracing.stage('upstream_call'):
+                response = requests.post(
+                    endpoint.url,
+                    files=files,
+                    timeout=(10, timeout)
+                )
+        except requests.RequestException as e:
+            UPSTREAM_RESPONSES.inc('timeout' if isinstance(e, requests.Timeout) else 'error')
+            self._record_health(started, True, endpoint, num_pages)
+            raise
+        except BaseException:
+            self.endpoints.cancel(endpoint)
+            raise
+
+        self._record_health(started, _failed_status(response.status_code), endpoint, num_pages)
+        UPSTREAM_RESPONSES.inc(response.status_code)
+        UPSTREAM_BYTES.inc('received', amount=len(response.content))
+        tracing.increment('bytes_received', len(response.content))
+        tracing.annotate('upstream_status', response.status_code)
+        return response
+
+    def _record_health(self, started: float, failed: bool, endpoint: Endpoint,
+                       num_pages: Optional[int] = None) -> None:
+        """更新延遲與錯誤率統計，並釋放端點"""
+        seconds = time.perf_counter() - started
+        expected = self.latency.predict(num_pages) if num_pages else None
+        self.upstream.record(seconds, failed, expected)
+        self.endpoints.release(endpoint, seconds, failed, expected)
+
+    def _decode(self, response: requests.Response) -> Dict[str, Any]:
+        """解析 JSON 回應"""
+        with tracing.stage('json_decode'):
+            return response.json()
+
+
+def _failed_status(status_code: int) -> bool:
+    """429 與 5xx 代表上游過載或故障；其他 4xx 是請求本身的問題"""
+    return status_code >= 500 or status_code == 429
+
+
+def _rewind(files: Dict[str, Any]) -> None:
+    """重試前將檔案物件移回開頭"""
+    for value in files.values():
+        if hasattr(value[1], 'seek'):
+            value[1].seek(0)
@@ -0,0 +1,181 @@
+"""
+AlphaXiv API 非同步客戶端
+供 ASGI 路徑使用，等待 OCR 回應時不佔用執行緒
+"""
+
+import logging
+import os
+import time
+from typing import Any, BinaryIO, Dict, Optional
+
+from utils import tracing
+from utils.aio import run_sync
+from utils.metrics import UPSTREAM_BYTES, UPSTREAM_RESPONSES
+
+from .alphaxiv_client import AlphaXivClient, _failed_status, _rewind
+from .endpoint_pool import Endpoint
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAlphaXivClient:
+    """
+    AlphaXiv DeepSeek OCR API 非同步客戶端
+
+    每個 worker 的事件迴圈共用一個 httpx.AsyncClient 連線池；斷路器與
+    延遲、錯誤率統計沿用同步客戶端的物件，讓就緒檢查看到所有上游呼叫。
+    """
+
+    def __init__(self, client: AlphaXivClient, max_connections: Optional[int] = None):
+        """
+        初始化客戶端
+
+        Args:
+            client: 同步客戶端（提供端點、斷路器與上游統計）
+            max_connections: 連線池大小；未提供時讀取 MAX_CONCURRENT_OCR，預設 8
+        """
+        self.api_url = client.api_url
+        self.endpoints = client.endpoints
+        self.breaker = client.breaker
+        self.upstream = client.upstream
+        self.latency = client.latency
+        self.max_connections = max_connections or int(os.getenv('MAX_CONCURRENT_OCR', 8))
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.latency.max_timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=self.max_connections)
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """關閉連線池"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def process_pdf(self, upload: BinaryIO, filename: str,
+                          num_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        上傳 PDF 並等待 OCR 結果
+
+        Args:
+            upload: PDF 檔案物件
+            filename: 檔案名稱
+            num_pages: 頁數（已知時依延遲模型設定逾時）
+
+        Returns:
+            包含 OCR 結果的字典
+        """
+        import httpx
+
+        logger.info(f"開始處理 PDF (非同步): {filename}")
+        upload.seek(0, os.SEEK_END)
+        sent_bytes = upload.tell()
+        upload.seek(0)
+
+        try:
+            started = time.perf_counter()
+            response = await self._post(
+                {'file': (filename, upload, 'application/pdf')}, sent_bytes, num_pages
+            )
+            response.raise_for_status()
+
+            with tracing.stage('json_decode'):
+                result = await run_sync(response.json)
+            self.latency.observe_result(result, num_pages, time.perf_counter() - started)
+            logger.info(f"PDF 處理成功: {filename}")
+            return result
+
+        except httpx.TimeoutException:
+            logger.error(f"請求超時: {filename}")
+            raise Exception("API 請求超時，請稍後再試")
+
+        except httpx.HTTPError as e:
+            logger.error(f"API 請求失敗: {str(e)}")
+            raise Exception(f"OCR 處理失敗: {str(e)}")
+
+    async def _post(self, files: Dict[str, Any], sent_bytes: int,
+                    num_pages: Optional[int] = None):
+        """發送 OCR 請求並記錄耗時、狀態碼與傳輸量（重試與斷路器同同步客戶端）"""
+        import httpx
+
+        self.breaker.before_call()
+        try:
+            response = await self._post_with_retry(files, sent_bytes, num_pages)
+        except httpx.HTTPError:
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            self.breaker.cancel()
+            raise
+        self.breaker.record(not _failed_status(response.status_code))
+        return response
+
+    async def _post_with_retry(self, files: Dict[str, Any], sent_bytes: int,
+                               num_pages: Optional[int]):
+        """送出請求；連線失敗或 5xx 時改由另一個端點重試一次"""
+        import httpx
+
+        timeout = self.latency.timeout(num_pages)
+        tracing.annotate('upstream_timeout', round(timeout, 1))
+        endpoint = self.endpoints.acquire()
+        try:
+            response = await self._attempt(endpoint, files, sent_bytes, num_pages, timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            other = self.endpoints.acquire_other(endpoint)
+            if other is None:
+                raise
+            logger.warning(f"端點 {endpoint.url} 連線失敗（{e}），改由 {other.url} 重試")
+        else:
+            if response.status_code < 500:
+                return response
+            other = self.endpoints.acquire_other(endpoint)
+            if other is None:
+                return response
+            logger.warning(
+                f"端點 {endpoint.url} 回應 {response.status_code}，改由 {other.url} 重試"
+            )
+        _rewind(files)
+        return await self._attempt(other, files, sent_bytes, num_pages, timeout)
+
+    async def _attempt(self, endpoint: Endpoint, files: Dict[str, Any], sent_bytes: int,
+                       num_pages: Optional[int], timeout: float):
+        """對一個端點送出請求並記錄統計"""
+        import httpx
+
+        tracing.annotate('upstream_endpoint', endpoint.url)
+        UPSTREAM_BYTES.inc('sent', amount=sent_bytes)
+        tracing.increment('upstream_attempts')
+        tracing.increment('bytes_sent', sent_bytes)
+        started = time.perf_counter()
+        try:
+            with tracing.stage('upstream_call'):
+                response = await self._client().post(
+                    endpoint.url, files=files, timeout=httpx.Timeout(timeout, connect=10.0)
+                )
+        except httpx.HTTPError as e:
+            UPSTREAM_RESPONSES.inc('timeout' if isinstance(e, httpx.TimeoutException) else 'error')
+            self._record_health(started, True, endpoint, num_pages)
+            raise
+        except BaseException:
+            self.endpoints.cancel(endpoint)
+            raise
+
+        self._record_health(started, _failed_status(response.status_code), endpoint, num_pages)
+        UPSTREAM_RESPONSES.inc(response.status_code)
+        UPSTREAM_BYTES.inc('received', amount=len(response.content))
+        tracing.increment('bytes_received', len(response.content))
+        tracing.annotate('upstream_status', response.status_code)
+        return response
+
+    def _record_health(self, started: float, failed: bool, endpoint: Endpoint,
+                       num_pages: Optional[int] = None) -> None:
+        seconds = time.perf_counter() - started
+        expected = self.latency.predict(num_pages) if num_pages else None
+        self.upstream.record(seconds, failed, expected)
+        self.endpoints.release(endpoint, seconds, failed, expected)
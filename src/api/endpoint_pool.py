@@ -0,0 +1,226 @@
+"""
+多個 OCR 端點的負載平衡
+依進行中的請求數或 EWMA 延遲選擇端點，連續失敗的端點暫時移出並以
+實際請求探測是否恢復
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_OUTSTANDING = REGISTRY.gauge(
+    'ocr_upstream_endpoint_outstanding', '各端點進行中的請求數', ('endpoint',)
+)
+ENDPOINT_EWMA_LATENCY = REGISTRY.gauge(
+    'ocr_upstream_endpoint_ewma_latency_seconds', '各端點回應時間的指數移動平均', ('endpoint',),
+    multiprocess_mode='all'
+)
+ENDPOINT_EJECTED = REGISTRY.gauge(
+    'ocr_upstream_endpoint_ejected', '端點是否已暫時移出（1 移出、0 正常）', ('endpoint',),
+    multiprocess_mode='all'
+)
+ENDPOINT_REQUESTS = REGISTRY.counter(
+    'ocr_upstream_endpoint_requests_total', '各端點的請求數（success 或 failure）',
+    ('endpoint', 'result')
+)
+
+P2C = 'p2c'
+LEAST_OUTSTANDING = 'least_outstanding'
+
+# 連續移出時冷卻時間的倍數上限
+MAX_EJECT_MULTIPLIER = 8
+
+
+class Endpoint:
+    """單一端點的狀態（由 EndpointPool 的鎖保護）"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        # 實際延遲與延遲模型預測值的比值（EWMA），不受請求頁數影響
+        self.slowness = 1.0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'outstanding': self.outstanding,
+            'ewma_latency_seconds': self.latency,
+            'slowness': self.slowness,
+            'consecutive_failures': self.failures,
+            'ejected': self.ejected_until is not None,
+        }
+
+
+class EndpointPool:
+    """
+    端點集合與選擇策略
+
+    UPSTREAM_BALANCER=p2c（預設）時隨機取兩個端點，選擇「延遲比值 ×
+    (進行中請求數 + 1)」較小者；least_outstanding 時選擇進行中請求數最少者。
+    連續失敗 ENDPOINT_EJECT_FAILURES 次的端點移出 ENDPOINT_EJECT_SECONDS 秒
+    （連續移出時加倍），到期後放行一個實際請求作為探測，成功則恢復。
+    至少保留一個端點不移出；單一端點的故障由移出與重試處理，客戶端的
+    斷路器只在重試後仍失敗時才計為失敗。
+    """
+
+    def __init__(self, urls: Sequence[str], strategy: Optional[str] = None,
+                 eject_failures: Optional[int] = None, eject_seconds: Optional[float] = None,
+                 alpha: Optional[float] = None):
+        """
+        初始化端點集合
+
+        Args:
+            urls: 端點 URL
+            strategy: p2c 或 least_outstanding；未提供時讀取 UPSTREAM_BALANCER
+            eject_failures: 移出前允許的連續失敗次數；未提供時讀取
+                ENDPOINT_EJECT_FAILURES，預設 3
+            eject_seconds: 移出的時間；未提供時讀取 ENDPOINT_EJECT_SECONDS，預設 30
+            alpha: EWMA 新樣本的權重；未提供時讀取 UPSTREAM_EWMA_ALPHA，預設 0.2
+        """
+        if not urls:
+            raise ValueError("至少需要一個 OCR 端點")
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(urls)]
+        self.strategy = strategy or os.getenv('UPSTREAM_BALANCER') or P2C
+        if self.strategy not in (P2C, LEAST_OUTSTANDING):
+            raise ValueError(f"未知的負載平衡策略: {self.strategy}")
+        self.eject_failures = eject_failures or int(os.getenv('ENDPOINT_EJECT_FAILURES') or 3)
+        self.eject_seconds = eject_seconds if eject_seconds is not None else float(
+            os.getenv('ENDPOINT_EJECT_SECONDS') or 30
+        )
+        self.alpha = alpha if alpha is not None else float(os.getenv('UPSTREAM_EWMA_ALPHA', 0.2))
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+        ENDPOINT_OUTSTANDING.set_function(
+            lambda: {(e.url,): e.outstanding for e in self.endpoints}
+        )
+        ENDPOINT_EWMA_LATENCY.set_function(
+            lambda: {(e.url,): e.latency for e in self.endpoints}
+        )
+        ENDPOINT_EJECTED.set_function(
+            lambda: {(e.url,): 1 if e.ejected_until is not None else 0 for e in self.endpoints}
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def acquire(self) -> Endpoint:
+        """
+        選擇這次請求的端點並計入進行中的請求
+
+        移出時間已到、尚未探測的端點優先作為探測；其餘依策略從未移出的
+        端點中選擇。每次 acquire() 都必須對應一次 release()。
+        """
+        with self._lock:
+            now = time.monotonic()
+            endpoint = self._probe_candidate(now) or self._choose()
+            endpoint.outstanding += 1
+            return endpoint
+
+    def acquire_other(self, tried: Endpoint) -> Optional[Endpoint]:
+        """
+        為重試選擇另一個未移出的端點並計入進行中的請求
+
+        Args:
+            tried: 已失敗的端點
+
+        Returns:
+            另一個端點；沒有其他可用端點時為 None
+        """
+        with self._lock:
+            others = [e for e in self.endpoints if e.ejected_until is None and e is not tried]
+            if not others:
+                return None
+            endpoint = min(others, key=lambda e: e.slowness * (e.outstanding + 1))
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _probe_candidate(self, now: float) -> Optional[Endpoint]:
+        for endpoint in self.endpoints:
+            if (endpoint.ejected_until is not None and not endpoint.probing
+                    and now >= endpoint.ejected_until):
+                endpoint.probing = True
+                logger.info(f"探測已移出的端點: {endpoint.url}")
+                return endpoint
+        return None
+
+    def _choose(self) -> Endpoint:
+        available = [e for e in self.endpoints if e.ejected_until is None]
+        if len(available) == 1:
+            return available[0]
+        if self.strategy == LEAST_OUTSTANDING:
+            fewest = min(e.outstanding for e in available)
+            return self._random.choice([e for e in available if e.outstanding == fewest])
+        first, second = self._random.sample(available, 2)
+        return min((first, second), key=lambda e: e.slowness * (e.outstanding + 1))
+
+    def release(self, endpoint: Endpoint, seconds: float, failed: bool,
+                expected: Optional[float] = None) -> None:
+        """
+        記錄請求結果
+
+        Args:
+            endpoint: acquire() 選擇的端點
+            seconds: 回應時間
+            failed: 是否失敗（連線錯誤、逾時、429 或 5xx）
+            expected: 延遲模型預測的回應時間，用於更新延遲比值
+        """
+        ENDPOINT_REQUESTS.inc(endpoint.url, 'failure' if failed else 'success')
+        with self._lock:
+            endpoint.outstanding -= 1
+            probing, endpoint.probing = endpoint.probing, False
+            if endpoint.latency is None:
+                endpoint.latency = seconds
+            else:
+                endpoint.latency += self.alpha * (seconds - endpoint.latency)
+            if expected and expected > 0 and not failed:
+                endpoint.slowness += self.alpha * (seconds / expected - endpoint.slowness)
+
+            if not failed:
+                if endpoint.ejected_until is not None:
+                    logger.info(f"端點已恢復: {endpoint.url}")
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                endpoint.ejected_until = None
+                return
+
+            endpoint.failures += 1
+            if probing or (endpoint.ejected_until is None
+                           and endpoint.failures >= self.eject_failures
+                           and self._can_eject()):
+                self._eject(endpoint)
+
+    def cancel(self, endpoint: Endpoint) -> None:
+        """請求在取得結果前被中斷（例如取消）時釋放端點，不計入成功或失敗"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.probing = False
+
+    def _can_eject(self) -> bool:
+        """至少保留一個端點在輪替中（呼叫時須持有鎖）"""
+        return sum(1 for e in self.endpoints if e.ejected_until is None) > 1
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        endpoint.ejections += 1
+        seconds = self.eject_seconds * min(2 ** (endpoint.ejections - 1), MAX_EJECT_MULTIPLIER)
+        endpoint.ejected_until = time.monotonic() + seconds
+        logger.warning(
+            f"端點連續失敗 {endpoint.failures} 次，移出 {seconds:.0f} 秒: {endpoint.url}"
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
@@ -0,0 +1,229 @@
+"""
+上游延遲模型
+以最近的呼叫線上擬合「每次請求固定成本 + 每頁成本」，據此設定逾時、
+選擇分段大小並估計完成時間
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LATENCY_OVERHEAD = REGISTRY.gauge(
+    'ocr_upstream_latency_overhead_seconds', '延遲模型：每次 AlphaXiv 請求的固定成本',
+    multiprocess_mode='all'
+)
+LATENCY_PER_PAGE = REGISTRY.gauge(
+    'ocr_upstream_latency_per_page_seconds', '延遲模型：每頁的處理成本', multiprocess_mode='all'
+)
+LATENCY_RESIDUAL = REGISTRY.gauge(
+    'ocr_upstream_latency_residual_seconds', '延遲模型：實際延遲與預測的標準差',
+    multiprocess_mode='all'
+)
+LATENCY_OBSERVATIONS = REGISTRY.gauge(
+    'ocr_upstream_latency_observations', '延遲模型：擬合使用的呼叫數', multiprocess_mode='all'
+)
+
+# 先驗斜率的強度（相當於頁數平方的加權和），觀測值的頁數差異大時影響很小
+PRIOR_STRENGTH = 10.0
+
+
+class LatencyModel:
+    """
+    AlphaXiv 延遲模型：延遲 ≈ overhead + per_page × 頁數
+
+    以指數遺忘的加權最小平方法擬合最近的成功呼叫，越舊的呼叫權重越低，
+    上游變慢或變快時模型會跟著調整。尚無觀測時使用先驗參數；斜率向先驗
+    收斂，資料不足（例如所有呼叫頁數相同）時仍有合理的斜率。
+    """
+
+    def __init__(self, overhead: Optional[float] = None, per_page: Optional[float] = None,
+                 decay: Optional[float] = None):
+        """
+        初始化模型
+
+        其餘設定讀取環境變數：UPSTREAM_TIMEOUT_FACTOR（預測值的倍數，預設 3）、
+        UPSTREAM_MIN_TIMEOUT（預設 30 秒）與 UPSTREAM_MAX_TIMEOUT（預設 600 秒，
+        也是頁數未知時的逾時）。
+
+        Args:
+            overhead: 先驗的每次請求固定成本（秒）；未提供時讀取
+                LATENCY_PRIOR_OVERHEAD，預設 10
+            per_page: 先驗的每頁成本（秒）；未提供時讀取 LATENCY_PRIOR_PER_PAGE，預設 3
+            decay: 每次新觀測時舊觀測的權重衰減；未提供時讀取 LATENCY_DECAY，預設 0.95
+        """
+        self.prior_overhead = overhead if overhead is not None else float(
+            os.getenv('LATENCY_PRIOR_OVERHEAD', 10)
+        )
+        self.prior_per_page = per_page if per_page is not None else float(
+            os.getenv('LATENCY_PRIOR_PER_PAGE', 3)
+        )
+        self.decay = decay if decay is not None else float(os.getenv('LATENCY_DECAY', 0.95))
+        self.timeout_factor = float(os.getenv('UPSTREAM_TIMEOUT_FACTOR', 3))
+        self.min_timeout = float(os.getenv('UPSTREAM_MIN_TIMEOUT', 30))
+        self.max_timeout = float(os.getenv('UPSTREAM_MAX_TIMEOUT', 600))
+        self.observations = 0
+        # 觀測值的加權和：權重、x、y、x²、xy、y²
+        self._sums = [0.0] * 6
+        self._lock = threading.Lock()
+        self._fit = (self.prior_overhead, self.prior_per_page, 0.0)
+        LATENCY_OVERHEAD.set_function(lambda: self._fit[0])
+        LATENCY_PER_PAGE.set_function(lambda: self._fit[1])
+        LATENCY_RESIDUAL.set_function(lambda: self._fit[2])
+        LATENCY_OBSERVATIONS.set_function(lambda: self.observations)
+
+    def observe(self, pages: int, seconds: float) -> None:
+        """
+        記錄一次成功呼叫
+
+        Args:
+            pages: 送出的頁數
+            seconds: 上游回應時間
+        """
+        if pages <= 0 or seconds < 0:
+            return
+        with self._lock:
+            sums = [value * self.decay for value in self._sums]
+            for index, value in enumerate((1.0, pages, seconds, pages * pages,
+                                           pages * seconds, seconds * seconds)):
+                sums[index] += value
+            self._sums = sums
+            self.observations += 1
+            self._fit = self._solve(sums)
+
+    def observe_result(self, result: Dict[str, Any], num_pages: Optional[int],
+                       seconds: float) -> None:
+        """
+        以成功的 OCR 回應更新模型
+
+        Args:
+            result: AlphaXiv 回應
+            num_pages: 送出的頁數；未知時使用回應中的 data.num_pages
+            seconds: 上游回應時間
+        """
+        if not num_pages:
+            data = result.get('data') if isinstance(result, dict) else None
+            num_pages = data.get('num_pages') if isinstance(data, dict) else None
+        if isinstance(num_pages, int):
+            self.observe(num_pages, seconds)
+
+    def _solve(self, sums):
+        """求解 overhead、per_page 與殘差標準差"""
+        w, x, y, xx, xy, yy = sums
+        if w <= 0:
+            return self.prior_overhead, self.prior_per_page, 0.0
+
+        # 斜率向先驗收斂（ridge），呼叫的頁數都相同時使用先驗斜率
+        sxx = xx - x * x / w
+        sxy = xy - x * y / w
+        per_page = (sxy + PRIOR_STRENGTH * self.prior_per_page) / (sxx + PRIOR_STRENGTH)
+        overhead = (y - per_page * x) / w
+        if overhead < 0:
+            overhead, per_page = 0.0, xy / xx
+        if per_page < 0:
+            overhead, per_page = y / w, 0.0
+
+        # 加權殘差平方和 Σ(y - a - bx)²，由各項加權和展開計算
+        squared = (yy + overhead * overhead * w + per_page * per_page * xx
+                   - 2 * overhead * y - 2 * per_page * xy + 2 * overhead * per_page * x)
+        return overhead, per_page, math.sqrt(max(squared, 0.0) / w)
+
+    @property
+    def overhead(self) -> float:
+        return self._fit[0]
+
+    @property
+    def per_page(self) -> float:
+        return self._fit[1]
+
+    def predict(self, pages: int) -> float:
+        """預測一次請求的延遲（秒）"""
+        overhead, per_page, _ = self._fit
+        return overhead + per_page * pages
+
+    def timeout(self, pages: Optional[int]) -> float:
+        """
+        依頁數計算單次請求的逾時
+
+        預測延遲的 UPSTREAM_TIMEOUT_FACTOR 倍再加上 3 個殘差標準差，限制在
+        UPSTREAM_MIN_TIMEOUT 與 UPSTREAM_MAX_TIMEOUT 之間；頁數未知時使用上限。
+
+        Args:
+            pages: 送出的頁數
+
+        Returns:
+            逾時秒數
+        """
+        if not pages:
+            return self.max_timeout
+        timeout = self.predict(pages) * self.timeout_factor + 3 * self._fit[2]
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def makespan(self, num_pages: int, chunk_pages: int, parallelism: int) -> float:
+        """
+        預估以固定分段大小處理整份文件的總時間
+
+        Args:
+            num_pages: 總頁數
+            chunk_pages: 每段頁數
+            parallelism: 同時送出的請求數
+
+        Returns:
+            預估秒數
+        """
+        if num_pages <= 0:
+            return 0.0
+        chunk_pages = max(1, min(chunk_pages, num_pages))
+        chunks = math.ceil(num_pages / chunk_pages)
+        waves = math.ceil(chunks / max(parallelism, 1))
+        return waves * self.predict(chunk_pages)
+
+    def chunk_size(self, num_pages: int, parallelism: int) -> int:
+        """
+        選擇預估總時間最短的分段大小
+
+        分段越小越能平行處理，但每段都要付一次固定成本；預估時間相同時
+        選擇較大的分段（較少請求）。
+
+        Args:
+            num_pages: 總頁數
+            parallelism: 同時送出的請求數
+
+        Returns:
+            每段頁數
+        """
+        if parallelism <= 1 or num_pages <= 1:
+            return max(num_pages, 1)
+        best_size = previous = num_pages
+        best_time = self.makespan(num_pages, num_pages, parallelism)
+        for chunks in range(2, num_pages + 1):
+            size = math.ceil(num_pages / chunks)
+            if size == previous:
+                continue
+            previous = size
+            estimate = self.makespan(num_pages, size, parallelism)
+            if estimate < best_time * (1 - 1e-9):
+                best_size, best_time = size, estimate
+            if size == 1:
+                break
+        return best_size
+
+    def eta(self, num_pages: int, parallelism: int = 1) -> float:
+        """預估以最佳分段處理指定頁數所需的秒數"""
+        if num_pages <= 0:
+            return 0.0
+        return self.makespan(num_pages, self.chunk_size(num_pages, parallelism), parallelism)
+
+    def snapshot(self) -> Dict[str, Any]:
+        overhead, per_page, residual = self._fit
+        return {
+            'overhead_seconds': overhead,
+            'per_page_seconds': per_page,
+            'residual_seconds': residual,
+            'observations': self.observations,
+        }
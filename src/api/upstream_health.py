@@ -0,0 +1,198 @@
+"""
+上游健康狀態
+追蹤 AlphaXiv API 的延遲與錯誤率，並以斷路器在上游故障時快速失敗
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    'ocr_upstream_circuit_state', 'AlphaXiv 斷路器狀態（0 關閉、1 半開、2 開啟）',
+    multiprocess_mode='all'
+)
+UPSTREAM_EWMA_LATENCY = REGISTRY.gauge(
+    'ocr_upstream_ewma_latency_seconds', 'AlphaXiv 回應時間的指數移動平均',
+    multiprocess_mode='all'
+)
+UPSTREAM_EWMA_ERRORS = REGISTRY.gauge(
+    'ocr_upstream_ewma_error_rate', 'AlphaXiv 錯誤率的指數移動平均', multiprocess_mode='all'
+)
+UPSTREAM_EWMA_SLOWNESS = REGISTRY.gauge(
+    'ocr_upstream_ewma_slowness', 'AlphaXiv 回應時間與延遲模型預測值之比的指數移動平均',
+    multiprocess_mode='all'
+)
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟時不呼叫上游，直接失敗"""
+
+
+class UpstreamStats:
+    """
+    以指數移動平均（EWMA）追蹤上游延遲與錯誤率
+
+    原始延遲隨文件頁數變化；slowness 為回應時間與延遲模型依頁數預測值之比，
+    不受請求大小影響，適合判斷上游是否變慢。
+    """
+
+    def __init__(self, alpha: Optional[float] = None):
+        """
+        初始化統計
+
+        Args:
+            alpha: 新樣本的權重；未提供時讀取 UPSTREAM_EWMA_ALPHA，預設 0.2
+        """
+        self.alpha = alpha if alpha is not None else float(os.getenv('UPSTREAM_EWMA_ALPHA', 0.2))
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.slowness: Optional[float] = None
+        self.samples = 0
+        self.last_success: Optional[float] = None
+        self._lock = threading.Lock()
+        UPSTREAM_EWMA_LATENCY.set_function(lambda: self.latency)
+        UPSTREAM_EWMA_ERRORS.set_function(lambda: self.error_rate)
+        UPSTREAM_EWMA_SLOWNESS.set_function(lambda: self.slowness)
+
+    def record(self, seconds: float, failed: bool, expected: Optional[float] = None) -> None:
+        """
+        記錄一次呼叫
+
+        Args:
+            seconds: 回應時間
+            failed: 是否失敗
+            expected: 延遲模型預測的回應時間（頁數未知時為 None，不更新 slowness）
+        """
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.alpha * (seconds - self.latency)
+            if expected:
+                ratio = seconds / expected
+                if self.slowness is None:
+                    self.slowness = ratio
+                else:
+                    self.slowness += self.alpha * (ratio - self.slowness)
+            self.error_rate += self.alpha * ((1.0 if failed else 0.0) - self.error_rate)
+            self.samples += 1
+            if not failed:
+                self.last_success = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ewma_latency_seconds': self.latency,
+                'ewma_error_rate': self.error_rate,
+                'ewma_slowness': self.slowness,
+                'samples': self.samples,
+                'last_success': self.last_success,
+            }
+
+
+class CircuitBreaker:
+    """
+    斷路器
+
+    連續失敗達到門檻時開啟，開啟期間的呼叫直接失敗；經過冷卻時間後
+    進入半開狀態，只放行一個探測請求，成功則關閉、失敗則再次開啟。
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None,
+                 reset_seconds: Optional[float] = None):
+        """
+        初始化斷路器
+
+        Args:
+            failure_threshold: 開啟前允許的連續失敗次數；未提供時讀取
+                CIRCUIT_FAILURE_THRESHOLD，預設 5
+            reset_seconds: 開啟後多久進入半開；未提供時讀取
+                CIRCUIT_RESET_SECONDS，預設 30
+        """
+        self.failure_threshold = failure_threshold or int(
+            os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)
+        )
+        self.reset_seconds = reset_seconds if reset_seconds is not None else float(
+            os.getenv('CIRCUIT_RESET_SECONDS', 30)
+        )
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set_function(lambda: _STATE_VALUES[self.state])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def before_call(self) -> None:
+        """
+        呼叫上游前檢查
+
+        Raises:
+            CircuitOpenError: 斷路器開啟，或半開時已有探測請求進行中
+        """
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError("AlphaXiv API 暫時無法使用，請稍後再試")
+
+    def record(self, success: bool) -> None:
+        """記錄呼叫結果"""
+        with self._lock:
+            self._probing = False
+            if success:
+                if self.opened_at is not None:
+                    logger.info("AlphaXiv 斷路器已關閉")
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.opened_at is not None or self.failures >= self.failure_threshold:
+                    if self.opened_at is None:
+                        logger.warning(
+                            f"AlphaXiv 連續失敗 {self.failures} 次，斷路器開啟 "
+                            f"{self.reset_seconds:.0f} 秒"
+                        )
+                    self.opened_at = time.monotonic()
+
+    def cancel(self) -> None:
+        """呼叫在取得結果前被中斷時釋放半開的探測名額，不計入成功或失敗"""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state()
+            retry_in = None
+            if state == OPEN:
+                retry_in = self.reset_seconds - (time.monotonic() - self.opened_at)
+            return {
+                'state': state,
+                'consecutive_failures': self.failures,
+                'retry_in_seconds': retry_in,
+            }
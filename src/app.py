@@ -1,129 +1,234 @@
 """
 DeepSeek OCR Flask 應用程式
 使用 AlphaXiv API 進行 PDF OCR 處理
+
+以 create_app() 建立應用程式；各項服務在第一次使用時才建立，
+匯入本模組不會讀取 .env、建立目錄或初始化 OCR 服務。
 """
 
 import os
+import re
 import sys
+import gzip
+import time
+import shutil
+import tempfile
 import logging
-from flask import Flask, render_template, request, jsonify, send_file
+import threading
+from typing import Any, Dict, List, Mapping, Optional
+from flask import (Blueprint, Flask, current_app, render_template, request, jsonify,
+                   send_file, make_response, g)
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
 
 # 將 src 目錄加入 Python 路徑
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from services.ocr_service import OCRService
+from services.container import ServiceContainer
 from utils.file_validator import FileValidator
+from utils.upload_request import upload_response, validate_image_batch, validate_upload_request
+from utils import metrics, tracing
 
-# 載入環境變數
-load_dotenv()
-
-# 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# 初始化 Flask 應用
-app = Flask(__name__,
-            template_folder='../templates',
-            static_folder='../static')
-
-# 設定
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-
 # 取得專案根目錄（src 的父目錄）
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# 設定上傳和輸出目錄為專案根目錄下的子目錄
-app.config['UPLOAD_FOLDER'] = os.path.join(project_root, os.getenv('UPLOAD_FOLDER', 'uploads'))
-app.config['OUTPUT_FOLDER'] = os.path.join(project_root, 'outputs')
+bp = Blueprint('ocr', __name__)
+
+# 用戶端計算的檔案內容雜湊（SHA-256，十六進位小寫）
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# 輸出檔案的 MIME 類型
+DOWNLOAD_MIMETYPES = {
+    '.md': 'text/markdown',
+    '.txt': 'text/plain',
+    '.json': 'application/json',
+}
+
+
+def load_config() -> Dict[str, Any]:
+    """從環境變數讀取應用程式設定"""
+    # 設定上傳和輸出目錄為專案根目錄下的子目錄
+    upload_folder = os.path.join(project_root, os.getenv('UPLOAD_FOLDER', 'uploads'))
+    output_folder = os.path.join(project_root, 'outputs')
+
+    # 檔案大小限制 (0 表示無限制)
+    max_file_size = int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024))  # 預設 100MB
+
+    # OCR 結果快取（RESULT_CACHE_ENABLED=false 可停用）
+    result_cache_dir = None
+    if os.getenv('RESULT_CACHE_ENABLED', 'true').lower() != 'false':
+        result_cache_dir = os.getenv('RESULT_CACHE_DIR') or os.path.join(output_folder, '.cache')
+
+    return {
+        'SECRET_KEY': os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production'),
+        'UPLOAD_FOLDER': upload_folder,
+        'OUTPUT_FOLDER': output_folder,
+        'MAX_CONTENT_LENGTH': max_file_size if max_file_size > 0 else None,
+        'SEARCH_INDEX_PATH': os.getenv('SEARCH_INDEX_PATH')
+        or os.path.join(output_folder, '.search_index.db'),
+        'RESULT_CACHE_DIR': result_cache_dir,
+        'JOB_FOLDER': os.getenv('JOB_FOLDER') or os.path.join(output_folder, '.jobs'),
+    }
+
+
+def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
+    """
+    建立 Flask 應用程式
+
+    Args:
+        config: 覆寫的設定（例如測試用的 UPLOAD_FOLDER、OUTPUT_FOLDER）；
+            未指定的項目從環境變數與 .env 讀取
+
+    Returns:
+        Flask 應用程式
+    """
+    from dotenv import load_dotenv
+
+    # 載入環境變數
+    load_dotenv()
+
+    # 設定日誌（已有設定時不變更，例如 gunicorn 或測試）
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    app = Flask(__name__,
+                template_folder='../templates',
+                static_folder='../static')
+    app.config.update(load_config())
+    if config:
+        app.config.update(config)
 
-# 檔案大小限制 (0 表示無限制)
-max_file_size = int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024))  # 預設 100MB
-app.config['MAX_CONTENT_LENGTH'] = max_file_size if max_file_size > 0 else None
+    # 建立必要目錄
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
-# 建立必要目錄
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+    app.extensions['ocr_services'] = ServiceContainer(app.config)
+    app.register_blueprint(bp)
+    return app
 
-# 初始化服務
-ocr_service = OCRService()
 
+def services() -> ServiceContainer:
+    """取得目前應用程式的服務"""
+    return current_app.extensions['ocr_services']
 
-@app.route('/')
+
+@bp.before_app_request
+def start_request_metrics():
+    """記錄請求開始時間與處理中的請求數"""
+    g.request_started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+    if request.content_length:
+        metrics.HTTP_BYTES.inc('received', amount=request.content_length)
+
+
+@bp.after_app_request
+def record_request_metrics(response):
+    """記錄請求數、處理時間與回應大小"""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUESTS.inc(endpoint, request.method, response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+    if response.content_length:
+        metrics.HTTP_BYTES.inc('sent', amount=response.content_length)
+    return response
+
+
+@bp.teardown_app_request
+def finish_request_metrics(error=None):
+    if g.pop('request_started', None) is not None:
+        metrics.HTTP_IN_FLIGHT.dec()
+
+
+@bp.route('/')
 def index():
     """首頁"""
     return render_template('index.html')
 
 
-@app.route('/upload', methods=['POST'])
+@bp.route('/upload', methods=['POST'])
 def upload_file():
     """
     處理檔案上傳和 OCR 處理
     """
+    # 上傳、存檔與 OCR 處理共用同一個追蹤
+    trace = tracing.begin('upload')
     try:
-        # 檢查是否有檔案
-        if 'file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': '未選擇檔案'
-            }), 400
-
-        file = request.files['file']
+        # 依 PROFILE_ENABLED 取樣，或由管理員以 X-Profile 標頭指定剖析
+        with services().profiler.profile('upload', request.headers.get('X-Profile'),
+                                         request.headers.get('X-Profile-Mode')):
+            return _handle_upload()
+    finally:
+        tracing.finish(trace)
 
-        # 檢查檔案名稱
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'error': '未選擇檔案'
-            }), 400
 
-        # 驗證檔案
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+def _handle_upload():
+    from services.health import QueueFullError
 
-        is_valid, error_msg = FileValidator.validate_upload(file.filename, file_size)
-        if not is_valid:
+    try:
+        # 接收上傳內容（第一次存取 request.files 時才解析）
+        with tracing.stage('upload_receive'):
+            files = request.files
+
+        # 多個檔案：圖片打包成一份 PDF，以一次 API 呼叫處理
+        uploads = files.getlist('file')
+        if len(uploads) > 1:
+            return _handle_image_batch(uploads)
+
+        # 驗證檔案、頁面範圍與預覽頁數
+        file = files.get('file')
+        file_size = 0
+        if file is not None:
+            file.seek(0, os.SEEK_END)
+            file_size = file.tell()
+            file.seek(0)
+        plan = validate_upload_request(file.filename if file else None, file_size, request.form)
+        if isinstance(plan, tuple):
+            error_msg, status = plan
             return jsonify({
                 'success': False,
                 'error': error_msg
-            }), 400
+            }), status
 
-        # 儲存上傳的檔案
-        filename = secure_filename(file.filename)
-        upload_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(upload_path)
+        # 儲存上傳的檔案（每個請求使用獨立的暫存目錄，避免同名檔案互相覆蓋）
+        upload_dir = tempfile.mkdtemp(dir=current_app.config['UPLOAD_FOLDER'])
+        upload_path = os.path.join(upload_dir, plan.filename)
+        with tracing.stage('disk_save'):
+            file.save(upload_path)
 
         logger.info(f"檔案已上傳: {upload_path}")
 
-        # 處理 OCR
-        result = ocr_service.process_document(
-            upload_path,
-            output_dir=app.config['OUTPUT_FOLDER']
-        )
+        if plan.preview_pages:
+            return _start_preview_job(upload_path, upload_dir, plan.pages, plan.preview_pages)
 
-        # 清理上傳的檔案
+        # 處理 OCR（超過同時處理上限時排隊，佇列已滿則回傳 503）
         try:
-            os.remove(upload_path)
-        except Exception as e:
-            logger.warning(f"無法刪除暫存檔案: {e}")
-
-        if result['success']:
-            return jsonify({
-                'success': True,
-                'markdown_content': result['markdown_content'],
-                'output_file': os.path.basename(result['output_file']),
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify({
+            with services().work_limiter.slot():
+                result = services().ocr_service.process_document(
+                    upload_path,
+                    output_dir=current_app.config['OUTPUT_FOLDER'],
+                    pages=plan.pages
+                )
+        except QueueFullError as e:
+            response = jsonify({
                 'success': False,
-                'error': result.get('error', '處理失敗')
-            }), 500
+                'error': str(e)
+            })
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        finally:
+            # 清理上傳的檔案
+            try:
+                shutil.rmtree(upload_dir)
+            except Exception as e:
+                logger.warning(f"無法刪除暫存檔案: {e}")
+
+        body, status = upload_response(result)
+        return jsonify(body), status
 
     except Exception as e:
         logger.error(f"上傳處理錯誤: {str(e)}")
@@ -133,13 +238,234 @@ def upload_file():
         }), 500
 
 
-@app.route('/download/<filename>')
+def _handle_image_batch(uploads: List[FileStorage]):
+    """
+    處理一次上傳的多張圖片
+
+    所有圖片打包成一份 PDF 以一次 AlphaXiv 呼叫辨識，結果依圖片拆分，
+    各自寫入輸出檔案；回應的 results 依上傳順序列出每張圖片的結果。
+
+    Args:
+        uploads: 上傳的圖片
+    """
+    from services.health import QueueFullError
+
+    sizes = []
+    for file in uploads:
+        file.seek(0, os.SEEK_END)
+        sizes.append(file.tell())
+        file.seek(0)
+    error = validate_image_batch([(file.filename, size) for file, size in zip(uploads, sizes)])
+    if error is not None:
+        error_msg, status = error
+        return jsonify({
+            'success': False,
+            'error': error_msg
+        }), status
+
+    # 同名圖片各自存檔，輸出檔名仍使用原始檔名
+    upload_dir = tempfile.mkdtemp(dir=current_app.config['UPLOAD_FOLDER'])
+    images = []
+    with tracing.stage('disk_save'):
+        for index, file in enumerate(uploads):
+            filename = secure_filename(file.filename)
+            upload_path = os.path.join(upload_dir, f'{index}_{filename}')
+            file.save(upload_path)
+            images.append((filename, upload_path))
+    logger.info(f"已上傳 {len(images)} 張圖片: {upload_dir}")
+
+    try:
+        with services().work_limiter.slot():
+            results = services().ocr_service.process_images(
+                images, output_dir=current_app.config['OUTPUT_FOLDER']
+            )
+    except QueueFullError as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    finally:
+        try:
+            shutil.rmtree(upload_dir)
+        except Exception as e:
+            logger.warning(f"無法刪除暫存檔案: {e}")
+
+    bodies = [upload_response(result)[0] for result in results]
+    errors = [body['error'] for body in bodies if not body['success']]
+    if errors:
+        return jsonify({
+            'success': False,
+            'error': errors[0],
+            'results': bodies
+        }), 500
+    return jsonify({
+        'success': True,
+        'results': bodies
+    })
+
+
+@bp.route('/upload/cached', methods=['POST'])
+def upload_cached():
+    """
+    以檔案內容的 SHA-256 查詢是否已有 OCR 結果
+
+    瀏覽器先在本機計算雜湊並送出 JSON（sha256、filename、size）；伺服器已有
+    整份文件的結果時直接回傳與 /upload 相同的內容，不需要上傳檔案；沒有
+    結果時回傳 404，由瀏覽器改為上傳。只支援 PDF 且未指定頁面範圍的處理。
+    """
+    body = request.get_json(silent=True) or {}
+    sha256 = str(body.get('sha256') or '').lower()
+    filename = secure_filename(str(body.get('filename') or ''))
+    size = body.get('size')
+
+    if not SHA256_RE.match(sha256):
+        return jsonify({
+            'success': False,
+            'error': '無效的 SHA-256'
+        }), 400
+    if not isinstance(size, int) or isinstance(size, bool):
+        return jsonify({
+            'success': False,
+            'error': '缺少檔案大小'
+        }), 400
+    is_valid, error_msg = FileValidator.validate_upload(filename, size)
+    if not is_valid:
+        return jsonify({
+            'success': False,
+            'error': error_msg
+        }), 400
+    if FileValidator.is_image(filename):
+        return jsonify({
+            'success': False,
+            'error': '僅支援 PDF'
+        }), 400
+
+    result = services().ocr_service.process_cached(
+        sha256, filename, output_dir=current_app.config['OUTPUT_FOLDER']
+    )
+    if result is None:
+        return jsonify({
+            'success': False,
+            'cached': False
+        }), 404
+
+    body, status = upload_response(result)
+    return jsonify(body), status
+
+
+def _start_preview_job(upload_path: str, upload_dir: str, pages: Optional[str],
+                       preview_pages: int):
+    """以背景工作處理預覽模式的上傳（見 run_preview_job）"""
+    body, status = run_preview_job(services(), current_app.config['OUTPUT_FOLDER'],
+                                   upload_path, upload_dir, pages, preview_pages)
+    response = jsonify(body)
+    if status == 503:
+        response.headers['Retry-After'] = '30'
+    return response, status
+
+
+def run_preview_job(container: ServiceContainer, output_dir: str, upload_path: str,
+                    upload_dir: str, pages: Optional[str], preview_pages: int,
+                    limiter=None):
+    """
+    以背景工作處理預覽模式的上傳
+
+    等到預覽頁面完成（或整個工作結束）才回應：有預覽時回傳 202、預覽的
+    Markdown 與 job_id，用戶端再以 /jobs/<job_id> 取得完整結果；不需要
+    預覽時（整份文件已有快取或頁數不足）直接回傳完整結果。最多等待排隊
+    逾時加上預覽頁數的上游逾時，超過時回傳 202 與 job_id（不含預覽）。
+
+    Args:
+        container: 服務容器
+        output_dir: 輸出目錄
+        upload_path: 已儲存的上傳檔案
+        upload_dir: 上傳暫存目錄，工作結束後刪除
+        pages: 頁面範圍
+        preview_pages: 預覽的頁數
+        limiter: OCR 工作數限制；未提供時使用 container.work_limiter
+
+    Returns:
+        (回應內容, 狀態碼)；503 時用戶端應稍後重試
+    """
+    from services.health import QueueFullError
+    from services.jobs import DONE, FAILED
+
+    from utils import profiling
+
+    jobs = container.jobs
+    limiter = limiter or container.work_limiter
+    # 請求正在剖析時，背景工作以相同模式另外剖析（請求回應後工作仍在執行）
+    profile_mode = profiling.active_mode()
+    job_id = jobs.create(input_file=os.path.basename(upload_path))
+    responded = threading.Event()
+    outcome: Dict[str, Any] = {}
+
+    def respond(body: Dict[str, Any], status: int) -> None:
+        # 以最先完成的預覽或結果回應，之後的結果由用戶端查詢工作取得
+        outcome.setdefault('response', (body, status))
+        responded.set()
+
+    def on_preview(preview: Dict[str, Any]) -> None:
+        jobs.update(job_id, preview=preview)
+        respond({'success': True, 'complete': False, 'job_id': job_id, **preview}, 202)
+
+    def run() -> None:
+        try:
+            with container.profiler.profile_mode('preview_job', profile_mode):
+                result = container.ocr_service.process_document_preview(
+                    upload_path, output_dir=output_dir, pages=pages,
+                    preview_pages=preview_pages, on_preview=on_preview,
+                    limiter=limiter
+                )
+            body, status = upload_response(result)
+            jobs.update(job_id, status=DONE if result['success'] else FAILED, result=body)
+            respond({**body, 'job_id': job_id}, status)
+        except QueueFullError as e:
+            jobs.update(job_id, status=FAILED, error=str(e))
+            respond({'success': False, 'error': str(e)}, 503)
+        except Exception as e:
+            logger.error(f"背景工作失敗: {str(e)}")
+            jobs.update(job_id, status=FAILED, error=str(e))
+            respond({'success': False, 'error': f'伺服器錯誤: {str(e)}', 'job_id': job_id}, 500)
+        finally:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            responded.set()
+
+    jobs.submit(run)
+    wait_seconds = (limiter.queue_timeout
+                    + container.ocr_service.client.latency.timeout(preview_pages))
+    if not responded.wait(wait_seconds):
+        logger.warning(f"預覽在 {wait_seconds:.0f} 秒內未完成，改由用戶端查詢工作 {job_id}")
+        return {'success': True, 'complete': False, 'job_id': job_id}, 202
+    return outcome['response']
+
+
+@bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    查詢背景工作
+
+    status 為 running、done 或 failed；完成時 result 與 /upload 的回應相同，
+    執行中時 preview 為已完成的預覽。
+    """
+    job = services().jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '工作不存在'
+        }), 404
+    return jsonify({'success': True, **job})
+
+
+@bp.route('/download/<filename>')
 def download_file(filename):
     """
     下載處理後的 Markdown 檔案
     """
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], secure_filename(filename))
+        file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], secure_filename(filename))
 
         if not os.path.exists(file_path):
             return jsonify({
@@ -151,7 +477,9 @@ def download_file(filename):
             file_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='text/markdown'
+            mimetype=DOWNLOAD_MIMETYPES.get(
+                os.path.splitext(file_path)[1], 'text/markdown'
+            )
         )
 
     except Exception as e:
@@ -162,19 +490,131 @@ def download_file(filename):
         }), 500
 
 
-@app.route('/health')
+@bp.route('/preview/<filename>')
+def preview_file(filename):
+    """
+    取得 Markdown 輸出的 HTML 預覽
+
+    第一次請求時才在伺服器端轉換並快取，回應為分段 HTML 的 JSON，
+    用戶端支援時直接送出快取中的 gzip 內容。
+    """
+    try:
+        file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], secure_filename(filename))
+
+        if not file_path.endswith('.md') or not os.path.exists(file_path):
+            return jsonify({
+                'success': False,
+                'error': '檔案不存在'
+            }), 404
+
+        body, etag = services().html_renderer.get_preview(file_path)
+
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        elif 'gzip' in request.accept_encodings:
+            response = make_response(body)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = make_response(gzip.decompress(body))
+
+        response.mimetype = 'application/json'
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+        return response
+
+    except Exception as e:
+        logger.error(f"預覽錯誤: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'預覽失敗: {str(e)}'
+        }), 500
+
+
+@bp.route('/search')
+def search():
+    """
+    全文檢索已處理的文件
+
+    查詢參數：q（查詢字串）、limit（預設 20，最多 100）、offset
+    """
+    search_index = services().search_index
+    if search_index is None:
+        return jsonify({
+            'success': False,
+            'error': '全文檢索未啟用'
+        }), 503
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': '請提供查詢字串'
+        }), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit 與 offset 必須是整數'
+        }), 400
+
+    try:
+        result = search_index.search(query, limit=limit, offset=offset)
+        return jsonify({
+            'success': True,
+            'query': query,
+            **result
+        })
+
+    except Exception as e:
+        logger.error(f"搜尋錯誤: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'搜尋失敗: {str(e)}'
+        }), 500
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 格式的執行指標"""
+    response = make_response(metrics.REGISTRY.expose())
+    response.headers['Content-Type'] = metrics.CONTENT_TYPE
+    return response
+
+
+@bp.route('/health')
+@bp.route('/health/live')
 def health_check():
-    """健康檢查端點"""
+    """存活檢查端點（程序能回應請求即為存活）"""
     return jsonify({
         'status': 'healthy',
         'service': 'DeepSeek OCR'
     })
 
 
-@app.errorhandler(413)
+@bp.route('/health/ready')
+def readiness_check():
+    """
+    就緒檢查端點
+
+    工作已飽和、上游延遲或錯誤率過高、斷路器開啟或磁碟空間不足時回傳 503，
+    讓負載平衡器暫停導入流量。
+    """
+    ready, details = services().readiness.check()
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'service': 'DeepSeek OCR',
+        **details
+    }), 200 if ready else 503
+
+
+@bp.app_errorhandler(413)
 def request_entity_too_large(error):
     """檔案過大錯誤處理"""
-    max_size = app.config.get('MAX_CONTENT_LENGTH', 100 * 1024 * 1024)
+    max_size = current_app.config.get('MAX_CONTENT_LENGTH', 100 * 1024 * 1024)
     max_size_mb = max_size / (1024 * 1024) if max_size else 100
     return jsonify({
         'success': False,
@@ -182,7 +622,7 @@ def request_entity_too_large(error):
     }), 413
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_server_error(error):
     """內部伺服器錯誤處理"""
     logger.error(f"內部錯誤: {error}")
@@ -199,9 +639,23 @@ def main():
     port = int(os.getenv('PORT', 5001))
     debug = os.getenv('FLASK_ENV') == 'development'
 
+    app = create_app()
     logger.info(f"啟動 Flask 應用於 port {port}")
     app.run(host='0.0.0.0', port=port, debug=debug)
 
 
+_default_app: Optional[Flask] = None
+
+
+def __getattr__(name: str) -> Any:
+    """相容 `from app import app`：第一次存取時才以環境設定建立應用程式"""
+    global _default_app
+    if name == 'app':
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     main()
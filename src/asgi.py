@@ -0,0 +1,456 @@
+"""
+DeepSeek OCR ASGI 應用程式
+以事件迴圈處理上傳與下載，等待 AlphaXiv 回應時不佔用執行緒
+
+/upload 與 /download 由非同步程式碼處理：上傳內容邊接收邊寫入暫存檔並
+計算 SHA-256，OCR 呼叫以 httpx.AsyncClient 等待，Markdown 轉換與寫檔
+沿用 OCRService 的同步程式碼並交給執行緒池。其他端點轉交 Flask 應用程式。
+
+用法:
+    uvicorn --factory asgi:create_asgi_app --app-dir src --port 5001
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from flask import Flask
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+# 將 src 目錄加入 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import DOWNLOAD_MIMETYPES, create_app, run_preview_job
+from services.health import QueueFullError, ThreadSlots
+from utils import metrics, tracing
+from utils.aio import run_sync
+from utils.upload_request import upload_response, validate_image_batch, validate_upload_request
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 上傳內容超過此大小時由記憶體改寫入暫存檔
+SPOOL_BYTES = 1024 * 1024
+# 下載時每次讀取的大小
+DOWNLOAD_CHUNK = 64 * 1024
+# 一般表單欄位的大小上限
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class ClientDisconnected(Exception):
+    """用戶端在上傳完成前中斷連線"""
+
+
+class RequestTooLarge(Exception):
+    """上傳內容超過 MAX_CONTENT_LENGTH"""
+
+
+class UploadedFile:
+    """接收完成的上傳檔案"""
+
+    def __init__(self, filename: str, spool_dir: Optional[str] = None):
+        self.filename = filename
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, dir=spool_dir)
+        self.size = 0
+        self._digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def receive_multipart(receive: Receive, boundary: bytes,
+                            spool_dir: Optional[str] = None,
+                            max_size: Optional[int] = None
+                            ) -> Tuple[Dict[str, str], Dict[str, List[UploadedFile]]]:
+    """
+    串流接收 multipart/form-data 請求內容
+
+    每收到一段就交給 werkzeug 的 sans-IO 解析器，檔案內容直接寫入
+    暫存檔並同時計算 SHA-256，不需要把整個請求放進記憶體。
+
+    Args:
+        receive: ASGI receive
+        boundary: multipart 分界字串
+        spool_dir: 暫存檔目錄
+        max_size: 請求內容大小上限
+
+    Returns:
+        (表單欄位, {欄位名稱: 上傳檔案列表})；同名的檔案欄位依接收順序列出
+
+    Raises:
+        ClientDisconnected: 用戶端中斷連線
+        RequestTooLarge: 超過大小上限
+    """
+    decoder = MultipartDecoder(boundary, max_form_memory_size=MAX_FIELD_BYTES)
+    fields: Dict[str, str] = {}
+    files: Dict[str, List[UploadedFile]] = {}
+    received = 0
+    current_name: Optional[str] = None
+    current_file: Optional[UploadedFile] = None
+    field_parts: List[bytes] = []
+
+    try:
+        more_body = True
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                if not more_body:
+                    break
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    raise ClientDisconnected()
+                chunk = message.get('body', b'')
+                more_body = message.get('more_body', False)
+                received += len(chunk)
+                if max_size and received > max_size:
+                    raise RequestTooLarge()
+                if chunk:
+                    decoder.receive_data(chunk)
+                if not more_body:
+                    decoder.receive_data(None)
+            elif isinstance(event, File):
+                current_name, field_parts = event.name, []
+                current_file = UploadedFile(event.filename or '', spool_dir)
+                files.setdefault(event.name, []).append(current_file)
+            elif isinstance(event, Field):
+                current_name, current_file, field_parts = event.name, None, []
+            elif isinstance(event, Data):
+                if current_file is not None:
+                    current_file.write(event.data)
+                else:
+                    field_parts.append(event.data)
+                if not event.more_data and current_file is None and current_name is not None:
+                    fields[current_name] = b''.join(field_parts).decode('utf-8', 'replace')
+            elif isinstance(event, Epilogue):
+                break
+    except BaseException:
+        for uploads in files.values():
+            for upload in uploads:
+                upload.close()
+        raise
+
+    for uploads in files.values():
+        for upload in uploads:
+            upload.file.seek(0)
+    return fields, files
+
+
+class AsgiApp:
+    """ASGI 進入點：非同步處理上傳與下載，其他請求轉交 Flask"""
+
+    def __init__(self, flask_app: Flask):
+        self.flask_app = flask_app
+        self.config = flask_app.config
+        self.services = flask_app.extensions['ocr_services']
+        self._wsgi = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        path, method = scope.get('path', ''), scope.get('method', 'GET')
+        if scope['type'] == 'http' and path == '/upload' and method == 'POST':
+            await self._instrumented('/upload', self._upload, scope, receive, send)
+        elif scope['type'] == 'http' and path.startswith('/download/') and method in ('GET', 'HEAD'):
+            await self._instrumented('/download/<filename>', self._download, scope, receive, send)
+        else:
+            await self._flask(scope, receive, send)
+
+    async def _flask(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._wsgi is None:
+            from a2wsgi import WSGIMiddleware
+
+            self._wsgi = WSGIMiddleware(self.flask_app)
+        await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # 在接收請求前建立服務（WARM_UP_SERVICES=false 可停用）
+                if os.getenv('WARM_UP_SERVICES', 'true').lower() != 'false':
+                    await run_sync(self.services.warm_up)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await run_sync(self.services.shutdown)
+                if 'async_client' in self.services._instances:
+                    await self.services.async_client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _instrumented(self, endpoint: str, handler, scope: Scope,
+                            receive: Receive, send: Send) -> None:
+        """記錄與 Flask 路徑相同的 HTTP 指標"""
+        started = time.perf_counter()
+        metrics.HTTP_IN_FLIGHT.inc()
+        status = {}
+
+        async def send_recording(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            elif message['type'] == 'http.response.body':
+                metrics.HTTP_BYTES.inc('sent', amount=len(message.get('body', b'')))
+            await send(message)
+
+        try:
+            await handler(scope, receive, send_recording)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            metrics.HTTP_REQUESTS.inc(endpoint, scope['method'], status.get('code', 500))
+            metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+
+    # ---- 端點 ----
+
+    async def _upload(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trace = tracing.begin('upload')
+        headers = _headers(scope)
+        try:
+            # 與 Flask 路徑相同；堆疊取樣涵蓋事件迴圈與 run_sync 的執行緒
+            with self.services.profiler.profile('upload', headers.get('x-profile'),
+                                                headers.get('x-profile-mode')):
+                await self._handle_upload(scope, receive, send)
+        finally:
+            tracing.finish(trace)
+
+    async def _handle_upload(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = _headers(scope)
+        content_type, options = parse_options_header(headers.get('content-type', ''))
+        if content_type != 'multipart/form-data' or 'boundary' not in options:
+            await _send_json(send, {'success': False, 'error': '未選擇檔案'}, 400)
+            return
+
+        max_size = self.config.get('MAX_CONTENT_LENGTH')
+        content_length = int(headers.get('content-length') or 0)
+        if content_length:
+            metrics.HTTP_BYTES.inc('received', amount=content_length)
+        if max_size and content_length > max_size:
+            await _send_too_large(send, max_size)
+            return
+
+        try:
+            with tracing.stage('upload_receive'):
+                fields, files = await receive_multipart(
+                    receive, options['boundary'].encode('latin-1'),
+                    self.config['UPLOAD_FOLDER'], max_size
+                )
+        except RequestTooLarge:
+            await _send_too_large(send, max_size)
+            return
+        except ClientDisconnected:
+            logger.info("用戶端在上傳完成前中斷連線")
+            return
+
+        uploads = files.pop('file', [])
+        for others in files.values():
+            for other in others:
+                other.close()
+        try:
+            # 多個檔案：圖片打包成一份 PDF，以一次 API 呼叫處理
+            if len(uploads) > 1:
+                await self._handle_image_batch(send, uploads)
+                return
+
+            # 驗證檔案、頁面範圍與預覽頁數
+            upload = uploads[0] if uploads else None
+            plan = validate_upload_request(
+                upload.filename if upload else None, upload.size if upload else 0, fields
+            )
+            if isinstance(plan, tuple):
+                error_msg, status = plan
+                await _send_json(send, {'success': False, 'error': error_msg}, status)
+                return
+
+            filename = plan.filename
+            logger.info(f"檔案已上傳: {filename}（{upload.size} 位元組）")
+
+            if plan.preview_pages:
+                await self._start_preview_job(send, upload, filename, plan.pages,
+                                              plan.preview_pages)
+                return
+
+            # 處理 OCR（超過同時處理上限時排隊，佇列已滿則回傳 503）
+            try:
+                async with self.services.work_limiter.slot():
+                    if plan.is_image:
+                        # 圖片先打包成 PDF，整個流程在執行緒池中以同步客戶端處理
+                        results = await run_sync(
+                            self.services.ocr_service.process_images,
+                            [(filename, upload.file)], self.config['OUTPUT_FOLDER']
+                        )
+                        result = results[0]
+                    else:
+                        result = await self.services.ocr_service.process_upload_async(
+                            upload.file, filename, upload.sha256,
+                            self.services.async_client,
+                            output_dir=self.config['OUTPUT_FOLDER'],
+                            pages=plan.pages
+                        )
+            except QueueFullError as e:
+                await _send_json(send, {'success': False, 'error': str(e)}, 503,
+                                 [(b'retry-after', b'30')])
+                return
+
+            body, status = upload_response(result)
+            await _send_json(send, body, status)
+
+        except Exception as e:
+            logger.error(f"上傳處理錯誤: {str(e)}")
+            await _send_json(send, {'success': False, 'error': f'伺服器錯誤: {str(e)}'}, 500)
+        finally:
+            for upload in uploads:
+                upload.close()
+
+    async def _start_preview_job(self, send: Send, upload: UploadedFile, filename: str,
+                                 pages: Optional[str], preview_pages: int) -> None:
+        """
+        以背景工作處理預覽模式的上傳（與 Flask 的 /upload 相同）
+
+        背景工作以同步程式碼執行，透過 ThreadSlots 在事件迴圈上取得工作名額。
+        """
+        upload_dir = tempfile.mkdtemp(dir=self.config['UPLOAD_FOLDER'])
+        upload_path = os.path.join(upload_dir, filename)
+        try:
+            with tracing.stage('disk_save'):
+                await run_sync(_save_upload, upload, upload_path)
+        except BaseException:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
+
+        limiter = ThreadSlots(self.services.work_limiter, asyncio.get_running_loop())
+        body, status = await run_sync(
+            run_preview_job, self.services, self.config['OUTPUT_FOLDER'],
+            upload_path, upload_dir, pages, preview_pages, limiter
+        )
+        await _send_json(send, body, status,
+                         [(b'retry-after', b'30')] if status == 503 else None)
+
+    async def _handle_image_batch(self, send: Send, uploads: List[UploadedFile]) -> None:
+        """處理一次上傳的多張圖片（回應格式與 Flask 的 /upload 相同）"""
+        error = validate_image_batch([(upload.filename, upload.size) for upload in uploads])
+        if error is not None:
+            error_msg, status = error
+            await _send_json(send, {'success': False, 'error': error_msg}, status)
+            return
+
+        images = [(secure_filename(upload.filename), upload.file) for upload in uploads]
+        logger.info(f"已上傳 {len(images)} 張圖片")
+        try:
+            async with self.services.work_limiter.slot():
+                results = await run_sync(
+                    self.services.ocr_service.process_images,
+                    images, self.config['OUTPUT_FOLDER']
+                )
+        except QueueFullError as e:
+            await _send_json(send, {'success': False, 'error': str(e)}, 503,
+                             [(b'retry-after', b'30')])
+            return
+
+        bodies = [upload_response(result)[0] for result in results]
+        errors = [body['error'] for body in bodies if not body['success']]
+        if errors:
+            await _send_json(send, {'success': False, 'error': errors[0], 'results': bodies}, 500)
+            return
+        await _send_json(send, {'success': True, 'results': bodies})
+
+    async def _download(self, scope: Scope, receive: Receive, send: Send) -> None:
+        filename = unquote(scope['path'][len('/download/'):])
+        file_path = os.path.join(self.config['OUTPUT_FOLDER'], secure_filename(filename))
+        if not os.path.isfile(file_path):
+            await _send_json(send, {'success': False, 'error': '檔案不存在'}, 404)
+            return
+
+        mimetype = DOWNLOAD_MIMETYPES.get(os.path.splitext(file_path)[1], 'text/markdown')
+        if mimetype.startswith('text/'):
+            mimetype += '; charset=utf-8'
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', mimetype.encode('latin-1')),
+                    (b'content-length', str(size).encode('latin-1')),
+                    (b'content-disposition',
+                     f"attachment; filename*=UTF-8''{quote(filename)}".encode('latin-1')),
+                ],
+            })
+            if scope['method'] == 'HEAD':
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            while True:
+                chunk = await run_sync(f.read, DOWNLOAD_CHUNK)
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': bool(chunk)})
+                if not chunk:
+                    break
+
+
+def _save_upload(upload: UploadedFile, path: str) -> None:
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(upload.file, f)
+
+
+def _headers(scope: Scope) -> Dict[str, str]:
+    return {
+        name.decode('latin-1').lower(): value.decode('latin-1')
+        for name, value in scope.get('headers', [])
+    }
+
+
+async def _send_json(send: Send, payload: Dict[str, Any], status: int = 200,
+                     headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+        ] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_too_large(send: Send, max_size: int) -> None:
+    max_size_mb = max_size / (1024 * 1024) if max_size else 100
+    await _send_json(send, {
+        'success': False,
+        'error': f'檔案過大，請上傳小於 {max_size_mb:.0f} MB 的檔案'
+    }, 413)
+
+
+def create_asgi_app(config: Optional[Mapping[str, Any]] = None) -> AsgiApp:
+    """
+    建立 ASGI 應用程式
+
+    Args:
+        config: 覆寫的 Flask 設定（見 app.create_app）
+
+    Returns:
+        ASGI 應用程式
+    """
+    return AsgiApp(create_app(dict(config or {}, ASYNC_MODE=True)))
@@ -1,3 +1,7 @@
 """
 資料模型模組
 """
+
+from .document import Block, Document
+
+__all__ = ['Block', 'Document']
@@ -0,0 +1,421 @@
+"""
+結構化文件模型
+將 OCR 結果解析一次，作為 Markdown、純文字與 JSON 輸出的共同中間格式
+"""
+
+import json
+import re
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.markdown_converter import (
+    CENTER_RE, FIGURE_RE, PAGE_SPLIT_RE, MarkdownConverter
+)
+
+# 區塊類型
+PARAGRAPH = 0
+FIGURE = 1
+HEADING = 2
+TABLE = 3
+PAGE_BREAK = 4
+
+BLOCK_TYPES = ('paragraph', 'figure', 'heading', 'table', 'page_break')
+
+# 區塊旗標：此段落接續前一個段落（被圖片說明或分頁打斷）
+JOINED = 1
+
+# AlphaXiv 在 ocr_text 中使用的分頁標記
+PAGE_SPLIT = '\n\n<--- Page Split --->\n\n'
+
+# Markdown 處理統計使用的 data 欄位
+_STATISTICS_FIELDS = ('num_pages', 'num_successful', 'page_numbers', 'source_num_pages')
+
+_BLANK_LINE_RE = re.compile(r'\n[ \t]*\n')
+_HEADING_RE = re.compile(r'(#{1,6})[ \t]+(?=\S)')
+
+
+class Block:
+    """文件區塊的唯讀檢視，不複製文字"""
+
+    __slots__ = ('document', 'index')
+
+    def __init__(self, document: 'Document', index: int):
+        self.document = document
+        self.index = index
+
+    @property
+    def type(self) -> str:
+        return BLOCK_TYPES[self.document._kinds[self.index]]
+
+    @property
+    def start(self) -> int:
+        return self.document._starts[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.document._ends[self.index]
+
+    @property
+    def page(self) -> int:
+        return self.document._pages[self.index]
+
+    @property
+    def level(self) -> int:
+        return self.document._levels[self.index]
+
+    @property
+    def joined(self) -> bool:
+        return bool(self.document._flags[self.index] & JOINED)
+
+    @property
+    def text(self) -> str:
+        return self.document.text[self.start:self.end]
+
+    def __repr__(self):
+        return f"Block({self.type}, page={self.page}, {self.start}:{self.end})"
+
+
+class Document:
+    """
+    精簡的結構化文件
+
+    所有區塊以平行陣列儲存（類型、起訖位置、頁碼、標題層級、旗標），
+    位置指向同一個共用文字緩衝區，不另外複製子字串。區塊依閱讀順序
+    排列：被圖片說明打斷的段落已接回，圖片說明移到段落之後。
+
+    Markdown 依分頁記錄逐頁取出緩衝區交給 MarkdownConverter 串流轉換，
+    與 convert_to_markdown 處理原始 OCR 結果的輸出完全相同（格式正確的
+    輸入）；純文字與 JSON 由區塊記錄輸出。
+    """
+
+    __slots__ = (
+        'text', 'num_pages', 'num_successful', 'metadata',
+        '_kinds', '_starts', '_ends', '_pages', '_levels', '_flags',
+        '_statistics', '_fallback'
+    )
+
+    def __init__(self, text: str):
+        self.text = text
+        self.num_pages = 0
+        self.num_successful: Optional[int] = None
+        self.metadata: Dict[str, Any] = {}
+        self._kinds = array('B')
+        self._starts = array('q')
+        self._ends = array('q')
+        self._pages = array('I')
+        self._levels = array('B')
+        self._flags = array('B')
+        # data 中的處理統計欄位（Markdown 的處理統計區段）
+        self._statistics: Dict[str, Any] = {}
+        # 非 AlphaXiv 格式的原始結果，Markdown 直接交給 convert_to_markdown
+        self._fallback: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def __iter__(self) -> Iterator[Block]:
+        for index in range(len(self._kinds)):
+            yield Block(self, index)
+
+    def __getitem__(self, index: int) -> Block:
+        if index < 0:
+            index += len(self._kinds)
+        if not 0 <= index < len(self._kinds):
+            raise IndexError(index)
+        return Block(self, index)
+
+    def nbytes(self) -> int:
+        """區塊記錄佔用的位元組數（不含共用文字緩衝區）"""
+        return sum(
+            column.itemsize * len(column) for column in (
+                self._kinds, self._starts, self._ends,
+                self._pages, self._levels, self._flags
+            )
+        )
+
+    def _append(self, kind: int, start: int, end: int, page: int,
+                level: int = 0, flags: int = 0) -> None:
+        self._kinds.append(kind)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._pages.append(page)
+        self._levels.append(level)
+        self._flags.append(flags)
+
+    # ---- 解析 ----
+
+    @classmethod
+    def from_ocr_result(cls, ocr_result: Dict[str, Any],
+                        converter: Optional[MarkdownConverter] = None) -> 'Document':
+        """
+        將 OCR 結果解析為文件模型
+
+        AlphaXiv 格式直接以 data.ocr_text 作為共用緩衝區；只有逐頁資料時
+        以分頁標記串接一次。data.page_numbers（只處理部分頁面時）提供
+        各頁在原始文件中的頁碼。
+
+        Args:
+            ocr_result: AlphaXiv API 返回的 OCR 結果
+            converter: 提供段落合併規則的轉換器
+
+        Returns:
+            文件模型
+        """
+        ocr_result = ocr_result or {}
+        data = ocr_result.get('data')
+        source = data if isinstance(data, dict) else ocr_result
+
+        if isinstance(source.get('ocr_text'), str):
+            text = source['ocr_text']
+        elif isinstance(source.get('text'), str):
+            text = source['text']
+        elif isinstance(source.get('content'), str):
+            text = source['content']
+        elif isinstance(source.get('pages'), list):
+            text = PAGE_SPLIT.join(
+                page if isinstance(page, str) else str(page.get('text', ''))
+                for page in source['pages']
+            )
+        else:
+            text = ''
+
+        document = cls(text)
+        _Parser(document, converter or MarkdownConverter()).parse()
+        page_numbers = source.get('page_numbers')
+        if isinstance(page_numbers, list) and len(page_numbers) >= document.num_pages:
+            # 只處理部分頁面時，區塊頁碼對應回原始文件的頁碼
+            document._pages = array('I', (page_numbers[page - 1] for page in document._pages))
+        document.num_pages = source.get('num_pages', document.num_pages)
+        document.num_successful = source.get('num_successful')
+        if isinstance(ocr_result.get('metadata'), dict):
+            document.metadata = dict(ocr_result['metadata'])
+        if isinstance(data, dict) and 'ocr_text' in data:
+            document._statistics = {
+                field: data[field] for field in _STATISTICS_FIELDS if field in data
+            }
+        else:
+            document._fallback = ocr_result
+        return document
+
+    # ---- 輸出 ----
+
+    def iter_elements(self) -> Iterator[Tuple[str, int, int, str]]:
+        """
+        依閱讀順序產生邏輯區塊，接續的段落會合併為一段
+
+        Yields:
+            (類型, 頁碼, 標題層級, 文字)
+        """
+        text = self.text
+        kinds, starts, ends = self._kinds, self._starts, self._ends
+        count = len(kinds)
+        index = 0
+        while index < count:
+            kind = kinds[index]
+            content = text[starts[index]:ends[index]]
+            following = index + 1
+            if kind == PARAGRAPH:
+                spans = [content]
+                while following < count and self._flags[following] & JOINED:
+                    spans.append(text[starts[following]:ends[following]])
+                    following += 1
+                content = ' '.join(spans)
+            yield BLOCK_TYPES[kind], self._pages[index], self._levels[index], content
+            index = following
+
+    def iter_pages(self) -> Iterator[str]:
+        """依分頁記錄逐頁取出共用緩衝區中的文字（不含分頁標記）"""
+        breaks = sorted(
+            (self._starts[index], self._ends[index])
+            for index, kind in enumerate(self._kinds) if kind == PAGE_BREAK
+        )
+        start = 0
+        for break_start, break_end in breaks:
+            yield self.text[start:break_start]
+            start = break_end
+        yield self.text[start:]
+
+    def iter_markdown(self, converter: Optional[MarkdownConverter] = None) -> Iterator[str]:
+        """
+        逐頁串流輸出 Markdown
+
+        Args:
+            converter: 提供段落合併規則的轉換器（ParallelMarkdownConverter
+                會平行轉換大型文件）
+
+        Yields:
+            Markdown 片段，串接後與 convert_to_markdown 的結果相同
+        """
+        converter = converter or MarkdownConverter()
+        if self._fallback is not None:
+            yield converter.convert_to_markdown(self._fallback)
+            return
+
+        summary: Dict[str, Any] = {'data': self._statistics}
+        if self.metadata:
+            summary['metadata'] = self.metadata
+        yield from converter.render_pages(self.iter_pages(), summary)
+
+    def to_markdown(self, converter: Optional[MarkdownConverter] = None) -> str:
+        """輸出 Markdown（iter_markdown 的完整結果）"""
+        return ''.join(self.iter_markdown(converter))
+
+    def to_text(self) -> str:
+        """輸出純文字，頁面之間以換頁字元分隔"""
+        parts = []
+        for kind, _, _, content in self.iter_elements():
+            if kind == 'page_break':
+                parts.append('\f')
+            elif kind == 'paragraph':
+                parts.append(CENTER_RE.sub(r'\1', content))
+            else:
+                parts.append(content)
+        return '\n\n'.join(parts) + '\n'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """輸出結構化資料"""
+        blocks = []
+        for kind, page, level, content in self.iter_elements():
+            block = {'type': kind, 'page': page}
+            if kind == 'heading':
+                block['level'] = level
+            if kind != 'page_break':
+                block['text'] = content
+            blocks.append(block)
+        return {
+            'num_pages': self.num_pages,
+            'num_successful': self.num_successful,
+            'metadata': self.metadata,
+            'blocks': blocks
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """輸出 JSON 字串"""
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_text_blocks(self) -> List[Dict[str, Any]]:
+        """輸出 MarkdownConverter.format_text_blocks 使用的字典列表"""
+        blocks = []
+        for kind, page, level, content in self.iter_elements():
+            if kind == 'heading':
+                blocks.append({'type': 'heading', 'level': level, 'text': content, 'page': page})
+            elif kind != 'page_break':
+                blocks.append({'type': 'paragraph', 'text': content, 'page': page})
+        return blocks
+
+
+class _Parser:
+    """逐頁將共用緩衝區切分為區塊"""
+
+    def __init__(self, document: Document, converter: MarkdownConverter):
+        self.document = document
+        self.converter = converter
+        self.text = document.text
+        # 暫緩輸出的圖片說明與分頁（等待被打斷的段落接續完畢）
+        self.pending: List[Tuple[int, int, int, int]] = []
+        self.last_kind = -1
+        self.last_start = 0
+        self.last_end = 0
+
+    def parse(self) -> None:
+        text = self.text
+        page = 1
+        start = 0
+        for match in PAGE_SPLIT_RE.finditer(text):
+            self._parse_page(start, match.start(), page)
+            page += 1
+            self.pending.append((PAGE_BREAK, match.start(), match.end(), page))
+            start = match.end()
+        self._parse_page(start, len(text), page)
+        self._flush()
+        self.document.num_pages = page
+
+    def _parse_page(self, start: int, end: int, page: int) -> None:
+        position = start
+        for match in FIGURE_RE.finditer(self.text, start, end):
+            self._parse_text(position, match.start(), page)
+            # 只保留 <center> 與 </center> 之間的說明文字
+            self.pending.append((FIGURE, match.start() + 8, match.end() - 9, page))
+            position = match.end()
+        self._parse_text(position, end, page)
+
+    def _parse_text(self, start: int, end: int, page: int) -> None:
+        position = start
+        for match in _BLANK_LINE_RE.finditer(self.text, start, end):
+            self._parse_chunk(position, match.start(), page)
+            position = match.end()
+        self._parse_chunk(position, end, page)
+
+    def _parse_chunk(self, start: int, end: int, page: int) -> None:
+        """將一個以空行分隔的區段切為標題、表格與段落"""
+        text = self.text
+        run_kind = -1
+        run_start = run_end = start
+        position = start
+        while position < end:
+            newline = text.find('\n', position, end)
+            line_end = end if newline == -1 else newline
+
+            line_start = position
+            while line_start < line_end and text[line_start] in ' \t\r':
+                line_start += 1
+
+            if line_start < line_end:
+                heading = _HEADING_RE.match(text, line_start, line_end)
+                if heading:
+                    self._add_run(run_kind, run_start, run_end, page)
+                    run_kind = -1
+                    self._add_block(HEADING, heading.end(), line_end, page,
+                                    level=len(heading.group(1)))
+                else:
+                    kind = TABLE if text[line_start] == '|' or \
+                        text.startswith('<table', line_start) else PARAGRAPH
+                    if kind != run_kind:
+                        self._add_run(run_kind, run_start, run_end, page)
+                        run_kind = kind
+                        run_start = line_start
+                    run_end = line_end
+
+            position = line_end + 1
+        self._add_run(run_kind, run_start, run_end, page)
+
+    def _add_run(self, kind: int, start: int, end: int, page: int) -> None:
+        if kind != -1:
+            self._add_block(kind, start, end, page)
+
+    def _add_block(self, kind: int, start: int, end: int, page: int,
+                   level: int = 0) -> None:
+        text = self.text
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return
+
+        flags = 0
+        if kind == PARAGRAPH and self.last_kind == PARAGRAPH and self.pending:
+            # 段落被圖片說明或分頁打斷：沿用轉換器的合併規則判斷是否接續
+            if self.converter._should_merge_paragraphs(
+                text[max(self.last_start, self.last_end - 16):self.last_end],
+                text[start:min(end, start + 64)]
+            ):
+                flags = JOINED
+
+        if not flags:
+            self._flush()
+
+        self.document._append(kind, start, end, page, level, flags)
+        self.last_kind = kind
+        self.last_start = start
+        self.last_end = end
+
+    def _flush(self) -> None:
+        for kind, start, end, page in self.pending:
+            if kind == FIGURE:
+                self.document._append(FIGURE, start, end, page)
+                self.last_kind = FIGURE
+            else:
+                self.document._append(PAGE_BREAK, start, end, page)
+        self.pending = []
@@ -1,7 +1,27 @@
 """
 業務邏輯服務模組
+
+各服務在第一次存取時才匯入，匯入個別子模組（例如 services.container）
+不會連帶載入 requests 等較重的依賴。
 """
 
-from .ocr_service import OCRService
+import importlib
+
+_EXPORTS = {
+    'JobStore': '.jobs',
+    'MicroBatcher': '.batcher',
+    'OCRService': '.ocr_service',
+    'Pipeline': '.pipeline',
+    'ReadinessCheck': '.health',
+    'SearchIndex': '.search_index',
+    'ServiceContainer': '.container',
+    'WorkLimiter': '.health',
+}
+
+__all__ = sorted(_EXPORTS)
+
 
-__all__ = ['OCRService']
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,143 @@
+"""
+小文件的批次送出
+在短時間內到達的小文件合併成一次上游請求，分攤每次請求的固定成本
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BATCH_DOCUMENTS = REGISTRY.histogram(
+    'ocr_batch_documents', '每次批次請求合併的文件數',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+BATCH_WAIT_SECONDS = REGISTRY.histogram(
+    'ocr_batch_wait_seconds', '文件從加入批次到取得結果的時間',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# (PDF 內容, 頁數)
+BatchItem = Tuple[bytes, int]
+
+
+class _Batch:
+    """收集中的一批文件"""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.items: List[BatchItem] = []
+        self.futures: List[Future] = []
+        self.pages = 0
+        self.bytes = 0
+        self.ready = threading.Event()
+
+    def add(self, item: BatchItem, future: Future) -> None:
+        self.items.append(item)
+        self.futures.append(future)
+        self.bytes += len(item[0])
+        self.pages += item[1]
+
+
+class MicroBatcher:
+    """
+    小文件的批次收集器
+
+    第一份文件開啟新的一批並成為負責送出的呼叫者：等到時間窗
+    到期或頁數、位元組數達到上限後關閉這一批，以 send_batch 一次送出，
+    再把各文件的結果交給各自的呼叫者。加入後會超過上限的文件先讓目前這一批
+    提早送出，自己開啟下一批。每份文件最多等待一個時間窗加上送出的時間。
+    """
+
+    def __init__(self, send_batch: Callable[[List[BatchItem]], List[Dict[str, Any]]],
+                 window: float, max_pages: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        初始化批次收集器
+
+        Args:
+            send_batch: 送出一批文件並依序回傳各文件結果的函式
+            window: 第一份文件最長等待的秒數
+            max_pages: 每批的頁數上限；未提供時讀取 OCR_BATCH_MAX_PAGES，預設 30
+            max_bytes: 每批的位元組上限；未提供時讀取 OCR_BATCH_MAX_BYTES，預設 20 MB
+        """
+        self.send_batch = send_batch
+        self.window = window
+        self.max_pages = max_pages or int(os.getenv('OCR_BATCH_MAX_PAGES') or 30)
+        self.max_bytes = max_bytes or int(os.getenv('OCR_BATCH_MAX_BYTES') or 20 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+
+    def submit(self, pdf_bytes: bytes, num_pages: int) -> Tuple[Dict[str, Any], int]:
+        """
+        加入一份文件並等待所屬的批次完成
+
+        Args:
+            pdf_bytes: PDF 內容
+            num_pages: 頁數
+
+        Returns:
+            (這份文件的 OCR 結果, 同一批的文件數)
+
+        Raises:
+            Exception: 批次送出失敗時，同一批的所有文件都收到相同的例外
+        """
+        future: Future = Future()
+        started = time.monotonic()
+        with self._lock:
+            batch = self._open
+            if batch is not None and (batch.pages + num_pages > self.max_pages
+                                      or batch.bytes + len(pdf_bytes) > self.max_bytes):
+                self._close(batch)
+                batch = None
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch(started + self.window)
+            batch.add((pdf_bytes, num_pages), future)
+            if batch.pages >= self.max_pages or batch.bytes >= self.max_bytes:
+                self._close(batch)
+
+        if leader:
+            self._send(batch)
+        result = future.result()
+        BATCH_WAIT_SECONDS.observe(time.monotonic() - started)
+        return result, len(batch.items)
+
+    def _close(self, batch: _Batch) -> None:
+        """停止接受新文件（呼叫時須持有鎖）"""
+        if self._open is batch:
+            self._open = None
+        batch.ready.set()
+
+    def _send(self, batch: _Batch) -> None:
+        """等待批次關閉後送出，並將結果交給各呼叫者"""
+        try:
+            batch.ready.wait(max(batch.deadline - time.monotonic(), 0))
+            with self._lock:
+                self._close(batch)
+
+            BATCH_DOCUMENTS.observe(len(batch.items))
+            results = self.send_batch(batch.items)
+            if len(results) != len(batch.futures):
+                raise Exception(f"批次結果數量不符: 預期 {len(batch.futures)}，收到 {len(results)}")
+        except Exception as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        except BaseException:
+            # 負責送出的呼叫者被中斷（例如 KeyboardInterrupt）時，同一批的其他呼叫者
+            # 收到一般例外，不會一直等待
+            with self._lock:
+                self._close(batch)
+            error = Exception("批次送出中斷")
+            for future in batch.futures:
+                future.set_exception(error)
+            raise
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
@@ -0,0 +1,144 @@
+"""
+服務容器
+依應用程式設定延遲建立各項服務，每個 worker 程序各自擁有一組
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    延遲建立的服務單例
+
+    服務在第一次使用時才匯入模組並建立（例如 OCRService 會匯入 requests
+    並建立 AlphaXiv 客戶端），讓匯入 app、建立應用程式與 fork worker 都
+    保持輕量；健康檢查等不需要服務的請求也不會觸發建立。
+    """
+
+    def __init__(self, config: Mapping[str, Any]):
+        """
+        初始化容器
+
+        Args:
+            config: Flask 應用程式設定（UPLOAD_FOLDER、OUTPUT_FOLDER、
+                SEARCH_INDEX_PATH、RESULT_CACHE_DIR、RESULT_CACHE_MAX_BYTES、
+                JOB_FOLDER、ASYNC_MODE）
+        """
+        self.config = config
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name, self)
+        if instance is not self:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    @property
+    def search_index(self):
+        """全文檢索索引，無法建立時為 None"""
+        def build():
+            from services.search_index import SearchIndex
+
+            try:
+                return SearchIndex(self.config['SEARCH_INDEX_PATH'])
+            except Exception as e:
+                logger.warning(f"全文檢索停用: {str(e)}")
+                return None
+        return self._get('search_index', build)
+
+    @property
+    def result_cache(self):
+        """OCR 結果快取，停用時為 None"""
+        def build():
+            from services.result_cache import ResultCache
+
+            directory = self.config.get('RESULT_CACHE_DIR')
+            if not directory:
+                return None
+            return ResultCache(directory, max_bytes=self.config.get('RESULT_CACHE_MAX_BYTES'))
+        return self._get('result_cache', build)
+
+    @property
+    def ocr_service(self):
+        def build():
+            from services.ocr_service import OCRService
+
+            return OCRService(search_index=self.search_index, result_cache=self.result_cache)
+        return self._get('ocr_service', build)
+
+    @property
+    def html_renderer(self):
+        def build():
+            from utils.html_renderer import HtmlPreviewRenderer
+
+            return HtmlPreviewRenderer()
+        return self._get('html_renderer', build)
+
+    @property
+    def profiler(self):
+        def build():
+            from utils.profiling import RequestProfiler
+
+            return RequestProfiler()
+        return self._get('profiler', build)
+
+    @property
+    def work_limiter(self):
+        """OCR 工作數限制；ASYNC_MODE（ASGI 路徑）時為 asyncio 版本"""
+        def build():
+            from services.health import AsyncWorkLimiter, WorkLimiter
+
+            return AsyncWorkLimiter() if self.config.get('ASYNC_MODE') else WorkLimiter()
+        return self._get('work_limiter', build)
+
+    @property
+    def async_client(self):
+        """非同步 AlphaXiv 客戶端，與 OCR 服務的同步客戶端共用斷路器與上游統計"""
+        def build():
+            from api.async_client import AsyncAlphaXivClient
+
+            return AsyncAlphaXivClient(self.ocr_service.client)
+        return self._get('async_client', build)
+
+    @property
+    def jobs(self):
+        """背景工作（預覽模式上傳的其餘頁面）"""
+        def build():
+            from services.jobs import JobStore
+
+            return JobStore(self.config.get('JOB_FOLDER')
+                            or os.path.join(self.config['OUTPUT_FOLDER'], '.jobs'))
+        return self._get('jobs', build)
+
+    @property
+    def readiness(self):
+        def build():
+            from services.health import ReadinessCheck
+
+            return ReadinessCheck(
+                self.work_limiter, self.ocr_service.client,
+                [self.config['UPLOAD_FOLDER'], self.config['OUTPUT_FOLDER']]
+            )
+        return self._get('readiness', build)
+
+    def shutdown(self) -> None:
+        """等待進行中的背景工作完成（worker 結束前呼叫）"""
+        jobs = self._instances.get('jobs')
+        if jobs is not None:
+            logger.info(f"等待背景工作完成（pid {os.getpid()}）")
+            jobs.shutdown(wait=True)
+
+    def warm_up(self) -> None:
+        """預先建立所有服務（例如 gunicorn worker 啟動後、接收請求前）"""
+        for name in ('ocr_service', 'html_renderer', 'profiler', 'readiness'):
+            getattr(self, name)
+        logger.info(f"服務已建立（pid {os.getpid()}）")
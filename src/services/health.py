@@ -0,0 +1,300 @@
+"""
+健康檢查服務
+限制同時進行的 OCR 工作數，並彙整就緒狀態（readiness）判斷所需的飽和訊號
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from api.alphaxiv_client import AlphaXivClient
+from api.upstream_health import OPEN
+from utils import tracing
+from utils.metrics import CACHE_LOOKUPS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OCR_IN_FLIGHT = REGISTRY.gauge('ocr_jobs_in_flight', '進行中的 OCR 工作數')
+OCR_QUEUED = REGISTRY.gauge('ocr_jobs_queued', '等待中的 OCR 工作數')
+OCR_REJECTED = REGISTRY.counter('ocr_jobs_rejected_total', '因伺服器忙碌而拒絕的 OCR 工作數')
+
+
+class QueueFullError(Exception):
+    """等待佇列已滿或等待逾時"""
+
+
+class WorkLimiter:
+    """
+    OCR 工作數限制
+
+    同時最多 max_in_flight 個工作呼叫上游，其餘最多 max_queued 個排隊等待；
+    佇列已滿或等待超過 queue_timeout 秒時直接拒絕，避免請求無限堆積。
+    高優先順序的名額（例如預覽頁面）在排隊時優先於一般名額。
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queued: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        """
+        初始化限制
+
+        Args:
+            max_in_flight: 同時進行的工作數；未提供時讀取 MAX_CONCURRENT_OCR，預設 8
+            max_queued: 排隊等待的工作數；未提供時讀取 MAX_QUEUED_OCR，預設 32
+            queue_timeout: 最長等待秒數；未提供時讀取 OCR_QUEUE_TIMEOUT，預設 300
+        """
+        self.max_in_flight = max_in_flight or int(os.getenv('MAX_CONCURRENT_OCR', 8))
+        self.max_queued = max_queued if max_queued is not None else int(
+            os.getenv('MAX_QUEUED_OCR', 32)
+        )
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(
+            os.getenv('OCR_QUEUE_TIMEOUT', 300)
+        )
+        self.in_flight = 0
+        self.queued = 0
+        self.priority_queued = 0
+        self._condition = threading.Condition()
+        OCR_IN_FLIGHT.set_function(lambda: self.in_flight)
+        OCR_QUEUED.set_function(lambda: self.queued)
+
+    def _available(self, priority: bool) -> bool:
+        """有空閒名額，且一般名額前面沒有排隊中的高優先順序名額"""
+        return self.in_flight < self.max_in_flight and (priority or not self.priority_queued)
+
+    def _enqueue(self, priority: bool) -> None:
+        if self.queued >= self.max_queued:
+            OCR_REJECTED.inc()
+            raise QueueFullError("伺服器忙碌中，請稍後再試")
+        self.queued += 1
+        if priority:
+            self.priority_queued += 1
+
+    def _dequeue(self, priority: bool) -> None:
+        self.queued -= 1
+        if priority:
+            self.priority_queued -= 1
+
+    @contextmanager
+    def slot(self, priority: bool = False) -> Iterator[None]:
+        """
+        取得一個工作名額，必要時排隊等待
+
+        Args:
+            priority: 是否為高優先順序
+
+        Raises:
+            QueueFullError: 佇列已滿或等待逾時
+        """
+        started = time.perf_counter()
+        with self._condition:
+            if not self._available(priority):
+                self._enqueue(priority)
+                try:
+                    deadline = started + self.queue_timeout
+                    while not self._available(priority):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0 or not self._condition.wait(remaining):
+                            if not self._available(priority):
+                                OCR_REJECTED.inc()
+                                raise QueueFullError("等待處理逾時，請稍後再試")
+                finally:
+                    self._dequeue(priority)
+                    # 高優先順序名額離開佇列後，被擋住的一般名額可能可以繼續
+                    self._condition.notify_all()
+            self.in_flight += 1
+        tracing.record_stage('queue_wait', time.perf_counter() - started)
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    @property
+    def saturated(self) -> bool:
+        """所有名額都在使用中且佇列已滿"""
+        with self._condition:
+            return self.in_flight >= self.max_in_flight and self.queued >= self.max_queued
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'queued': self.queued,
+                'max_queued': self.max_queued,
+            }
+
+
+class AsyncWorkLimiter(WorkLimiter):
+    """
+    WorkLimiter 的 asyncio 版本（ASGI 路徑）
+
+    排隊中的請求只是等待中的協程，不佔用執行緒；名額、佇列上限、逾時
+    與指標都和 WorkLimiter 相同，可直接交給 ReadinessCheck。
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._released: Optional[asyncio.Condition] = None
+
+    @asynccontextmanager
+    async def slot(self, priority: bool = False) -> AsyncIterator[None]:
+        """
+        取得一個工作名額，必要時排隊等待
+
+        Args:
+            priority: 是否為高優先順序
+
+        Raises:
+            QueueFullError: 佇列已滿或等待逾時
+        """
+        if self._released is None:
+            self._released = asyncio.Condition()
+        started = time.perf_counter()
+        async with self._released:
+            if not self._available(priority):
+                self._enqueue(priority)
+                try:
+                    await asyncio.wait_for(
+                        self._released.wait_for(lambda: self._available(priority)),
+                        self.queue_timeout
+                    )
+                except asyncio.TimeoutError:
+                    OCR_REJECTED.inc()
+                    raise QueueFullError("等待處理逾時，請稍後再試")
+                finally:
+                    self._dequeue(priority)
+                    self._released.notify_all()
+            self.in_flight += 1
+        tracing.record_stage('queue_wait', time.perf_counter() - started)
+
+        try:
+            yield
+        finally:
+            async with self._released:
+                self.in_flight -= 1
+                self._released.notify_all()
+
+
+    @contextmanager
+    def blocking_slot(self, loop: asyncio.AbstractEventLoop,
+                      priority: bool = False) -> Iterator[None]:
+        """
+        在執行緒池的同步程式碼中取得名額（於事件迴圈上等待 slot()）
+
+        Args:
+            loop: 執行 slot() 的事件迴圈
+            priority: 是否為高優先順序
+
+        Raises:
+            QueueFullError: 佇列已滿或等待逾時
+        """
+        manager = self.slot(priority)
+        asyncio.run_coroutine_threadsafe(manager.__aenter__(), loop).result()
+        try:
+            yield
+        finally:
+            asyncio.run_coroutine_threadsafe(manager.__aexit__(None, None, None), loop).result()
+
+
+class ThreadSlots:
+    """以 WorkLimiter 的同步介面使用 AsyncWorkLimiter 的名額（ASGI 路徑的背景工作）"""
+
+    def __init__(self, limiter: AsyncWorkLimiter, loop: asyncio.AbstractEventLoop):
+        self.limiter = limiter
+        self.loop = loop
+        self.queue_timeout = limiter.queue_timeout
+
+    def slot(self, priority: bool = False):
+        return self.limiter.blocking_slot(self.loop, priority)
+
+
+def cache_hit_rate() -> Optional[float]:
+    """OCR 結果快取命中率，尚未查詢過時返回 None"""
+    lookups = CACHE_LOOKUPS.collect()
+    hits = lookups.get(('hit',), 0)
+    total = hits + lookups.get(('miss',), 0)
+    return hits / total if total else None
+
+
+class ReadinessCheck:
+    """
+    就緒狀態檢查
+
+    任何一項不符合時回報未就緒，讓負載平衡器在延遲惡化前把流量導向其他副本：
+    工作名額與佇列已滿、上游回應比延遲模型預測慢太多或錯誤率超過門檻、斷路器開啟、
+    上傳或輸出目錄的可用空間不足。快取命中率只供參考，不影響結果。
+    """
+
+    def __init__(self, limiter: WorkLimiter, client: AlphaXivClient,
+                 directories: Sequence[str]):
+        """
+        初始化檢查
+
+        門檻讀取 READY_MAX_UPSTREAM_SLOWNESS（回應時間與延遲模型依頁數預測值之比的
+        EWMA，預設 3，即 UPSTREAM_TIMEOUT_FACTOR 的預設值）、
+        READY_MAX_ERROR_RATE（預設 0.5）與 READY_MIN_FREE_DISK_MB（預設 500）。
+
+        Args:
+            limiter: OCR 工作數限制
+            client: AlphaXiv 客戶端（提供斷路器與上游統計）
+            directories: 需要檢查可用空間的目錄
+        """
+        self.limiter = limiter
+        self.client = client
+        self.directories = list(directories)
+        self.max_slowness = float(os.getenv('READY_MAX_UPSTREAM_SLOWNESS', 3))
+        self.max_error_rate = float(os.getenv('READY_MAX_ERROR_RATE', 0.5))
+        self.min_free_bytes = int(float(os.getenv('READY_MIN_FREE_DISK_MB', 500)) * 1024 * 1024)
+
+    def check(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        執行檢查
+
+        Returns:
+            (是否就緒, 各項檢查的明細)
+        """
+        reasons = []
+
+        work = self.limiter.snapshot()
+        if self.limiter.saturated:
+            reasons.append('工作名額與佇列已滿')
+
+        upstream = self.client.upstream.snapshot()
+        # 原始延遲取決於文件頁數，改與延遲模型對該請求大小的預測值比較
+        slowness = upstream['ewma_slowness']
+        if slowness is not None and slowness > self.max_slowness:
+            reasons.append(f'上游延遲過高（為預測值的 {slowness:.1f} 倍）')
+        if upstream['ewma_error_rate'] > self.max_error_rate:
+            reasons.append(f"上游錯誤率過高（{upstream['ewma_error_rate']:.0%}）")
+
+        circuit = self.client.breaker.snapshot()
+        if circuit['state'] == OPEN:
+            reasons.append('上游斷路器開啟')
+
+        disk = {}
+        for directory in self.directories:
+            try:
+                free = shutil.disk_usage(directory).free
+            except OSError as e:
+                reasons.append(f'無法讀取 {directory} 的磁碟空間: {e}')
+                continue
+            disk[directory] = free
+            if free < self.min_free_bytes:
+                reasons.append(f'{directory} 可用空間不足（{free // (1024 * 1024)} MB）')
+
+        return not reasons, {
+            'reasons': reasons,
+            'work': work,
+            'upstream': upstream,
+            'circuit': circuit,
+            'endpoints': self.client.endpoints.snapshot(),
+            'disk_free_bytes': disk,
+            'cache_hit_rate': cache_hit_rate(),
+        }
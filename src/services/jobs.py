@@ -0,0 +1,136 @@
+"""
+背景工作
+在背景執行 OCR 處理，並以磁碟上的狀態檔提供 /jobs/<id> 查詢
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobStore:
+    """
+    背景工作的狀態與執行緒池
+
+    每個工作的狀態是一個 JSON 檔案（暫存檔加 os.replace 原子寫入），
+    gunicorn 的任何 worker 都能回應查詢；工作本身在接收上傳的 worker
+    的執行緒池中執行。超過 JOB_RETENTION_SECONDS（預設 3600）的狀態檔
+    在建立新工作時清除。
+    """
+
+    def __init__(self, directory: str, max_workers: Optional[int] = None):
+        """
+        初始化工作儲存
+
+        Args:
+            directory: 狀態檔目錄
+            max_workers: 執行緒數；未提供時讀取 MAX_CONCURRENT_OCR 與
+                MAX_QUEUED_OCR 的總和（實際同時處理數仍由 WorkLimiter 限制）
+        """
+        self.directory = directory
+        self.max_workers = max_workers or (
+            int(os.getenv('MAX_CONCURRENT_OCR', 8)) + int(os.getenv('MAX_QUEUED_OCR', 32))
+        )
+        self.retention = float(os.getenv('JOB_RETENTION_SECONDS', 3600))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def create(self, **fields: Any) -> str:
+        """
+        建立執行中的工作
+
+        Args:
+            fields: 額外記錄的欄位（例如 input_file）
+
+        Returns:
+            工作 ID
+        """
+        self.prune()
+        job_id = uuid.uuid4().hex
+        self._write(job_id, {'job_id': job_id, 'status': RUNNING,
+                             'created_at': time.time(), **fields})
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """讀取工作狀態，不存在時返回 None"""
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """更新工作狀態（只有接收上傳的 worker 會寫入同一個工作）"""
+        state = self.get(job_id) or {'job_id': job_id}
+        state.update(fields)
+        state['updated_at'] = time.time()
+        self._write(job_id, state)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """在背景執行緒執行工作"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='ocr-job'
+                )
+        return self._executor.submit(func, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """等待進行中的工作完成並關閉執行緒池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def prune(self) -> int:
+        """
+        清除過期的狀態檔
+
+        Returns:
+            清除的檔案數
+        """
+        cutoff = time.time() - self.retention
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _write(self, job_id: str, state: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(job_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
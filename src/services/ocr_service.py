@@ -3,32 +3,192 @@ OCR 處理服務
 協調 API 呼叫和結果處理
 """
 
+import asyncio
+import functools
+import io
 import os
+import time
 import logging
-from typing import Dict, Any, Optional
+from contextlib import nullcontext
+from typing import (
+    Awaitable, BinaryIO, Callable, Dict, Any, List, Optional, Sequence, Tuple, Union
+)
 from datetime import datetime
 from api.alphaxiv_client import AlphaXivClient
-from utils.markdown_converter import MarkdownConverter
+from api.async_client import AsyncAlphaXivClient
+from models.document import PAGE_SPLIT, Document
+from utils import tracing
+from utils.aio import run_sync
+from utils.metrics import (
+    CACHE_LOOKUPS, PAGE_RETRIES, PAGES_PER_SECOND, PAGES_PROCESSED, STAGE_IN_FLIGHT,
+    UPLOAD_BYTES_SAVED
+)
+from utils.file_validator import FileValidator
+from utils.image_pack import ImageSource, pack_images
+from utils.markdown_converter import MARKDOWN_HEADER, MarkdownStream
+from utils.pdf_optimize import optimize_pdf
+from utils.parallel_converter import ParallelMarkdownConverter
+from utils.pdf_pages import (
+    PdfSource, concat_pdfs, count_pages, extract_pages, format_page_ranges, parse_page_spec,
+    select_pages
+)
+from services.batcher import BatchItem, MicroBatcher
+from services.health import QueueFullError, WorkLimiter
+from services.pipeline import Pipeline, Stage
+from services.result_cache import ResultCache, hash_bytes, hash_file
+from services.search_index import SearchIndex
 
 logger = logging.getLogger(__name__)
 
+# (選取的頁碼, 原始文件頁數)
+PageSelection = Tuple[List[int], int]
+# 檔案路徑或已讀入記憶體的 PDF
+PdfInput = Union[str, bytes]
+
+
+class _ChunkWork:
+    """分段管線中的一段"""
+
+    def __init__(self, selection: PageSelection):
+        self.selection = selection
+        self.key: Optional[str] = None
+        self.pdf_bytes: Optional[bytes] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.cached = False
+        self.pages: List[str] = []
+        self.markdown = ''
+
+
+class _MarkdownOutput:
+    """
+    分段管線的 Markdown 輸出
+
+    各段的頁面依順序餵入同一個 MarkdownStream，轉換結果立即附加到輸出檔案，
+    串接後與一次轉換整份結果相同，記憶體中不保留已寫入的片段。輸出檔案在
+    第一次寫入時才建立；全部分段完成後以合併的結果補上處理統計。
+    """
+
+    def __init__(self, converter: ParallelMarkdownConverter,
+                 create_file: Callable[[], str]):
+        """
+        Args:
+            converter: 提供段落合併規則與處理統計的轉換器
+            create_file: 建立並回傳輸出檔案路徑的函式
+        """
+        self.converter = converter
+        self.create_file = create_file
+        self.output_file: Optional[str] = None
+        self.convert_seconds = 0.0
+        self.write_seconds = 0.0
+        self._stream = MarkdownStream(converter)
+        self._file = None
+        self._converted = False
+
+    @property
+    def started(self) -> bool:
+        return self._file is not None
+
+    def convert(self, pages: List[str]) -> str:
+        """轉換下一段的頁面，回傳已可確定的 Markdown 片段"""
+        started = time.perf_counter()
+        fragments = [] if self._converted else [MARKDOWN_HEADER]
+        self._converted = True
+        fragments.extend(self._stream.feed(page) for page in pages)
+        self.convert_seconds += time.perf_counter() - started
+        return ''.join(fragments)
+
+    def write(self, fragment: str) -> None:
+        """將片段附加到輸出檔案"""
+        started = time.perf_counter()
+        if self._file is None:
+            self.output_file = self.create_file()
+            self._file = open(self.output_file, 'w', encoding='utf-8', newline='')
+        self._file.write(fragment)
+        # 每段寫入後即可從檔案讀到，不留在緩衝區等到最後
+        self._file.flush()
+        self.write_seconds += time.perf_counter() - started
+
+    def finish(self, ocr_result: Dict[str, Any]) -> None:
+        """
+        寫入剩餘內容與處理統計並關閉檔案
+
+        Args:
+            ocr_result: 合併後的 OCR 結果
+        """
+        started = time.perf_counter()
+        tail = self._stream.close() + self.converter.markdown_tail(
+            ocr_result, self._stream.figure_count
+        )
+        self.convert_seconds += time.perf_counter() - started
+        self.write(tail)
+        self._file.close()
+        tracing.record_stage('markdown_conversion', self.convert_seconds)
+        tracing.record_stage('output_write', self.write_seconds)
+
+    def abort(self) -> None:
+        """處理失敗時刪除寫到一半的輸出檔案"""
+        if self._file is None:
+            return
+        self._file.close()
+        try:
+            os.remove(self.output_file)
+        except OSError:
+            pass
+
 
 class OCRService:
     """OCR 處理服務類別"""
 
-    def __init__(self):
-        """初始化 OCR 服務"""
+    def __init__(self, search_index: Optional[SearchIndex] = None,
+                 result_cache: Optional[ResultCache] = None):
+        """
+        初始化 OCR 服務
+
+        Args:
+            search_index: 全文檢索索引，提供時每次轉換成功後更新
+            result_cache: OCR 結果快取，提供時相同內容的檔案不再呼叫 API
+        """
         self.client = AlphaXivClient()
-        self.converter = MarkdownConverter()
+        self.search_index = search_index
+        self.result_cache = result_cache
+        self.converter = ParallelMarkdownConverter()
+        # 除 Markdown 外額外輸出的格式（txt, json），以逗號分隔
+        self.extra_formats = [
+            fmt.strip() for fmt in os.getenv('OUTPUT_FORMATS', '').split(',')
+            if fmt.strip() in ('txt', 'json')
+        ]
+        # 每份文件同時送出的分段請求數，1 表示不分段
+        self.chunk_parallelism = max(int(os.getenv('OCR_CHUNK_PARALLELISM', 1)), 1)
+        # 部分頁面辨識失敗時，只重新送出失敗頁面的次數上限
+        self.page_retries = max(int(os.getenv('OCR_PAGE_RETRIES', 2)), 0)
+        # 上傳前的 PDF 瘦身；PDF_OPTIMIZE_DPI 為頁面圖片的解析度上限（未設定時不縮小）
+        self.optimize_uploads = os.getenv('PDF_OPTIMIZE', 'false').lower() == 'true'
+        self.optimize_dpi = int(os.getenv('PDF_OPTIMIZE_DPI') or 0) or None
+        # 估計瘦身節省的上傳時間所用的上行頻寬（Mbit/s）
+        self.upload_mbps = float(os.getenv('UPLOAD_BANDWIDTH_MBPS') or 20)
+        # 圖片打包成 PDF 時使用的 DPI（決定頁面的實體大小）
+        self.image_dpi = float(os.getenv('IMAGE_PACK_DPI') or 300)
+        # 小文件批次送出：OCR_BATCH_WINDOW_MS 大於 0 時，頁數不超過 OCR_BATCH_DOC_PAGES
+        # 的整份文件在時間窗內合併成一次請求
+        batch_window = float(os.getenv('OCR_BATCH_WINDOW_MS') or 0) / 1000
+        self.batch_doc_pages = int(os.getenv('OCR_BATCH_DOC_PAGES') or 3)
+        self.batcher = MicroBatcher(self._send_batch, batch_window) if batch_window > 0 else None
         logger.info("OCR 服務已初始化")
 
-    def process_document(self, file_path: str, output_dir: Optional[str] = None) -> Dict[str, Any]:
+    def estimate_seconds(self, num_pages: int) -> float:
+        """依延遲模型預估處理指定頁數所需的秒數（不含排隊）"""
+        return self.client.latency.eta(num_pages, self.chunk_parallelism)
+
+    def process_document(self, file_path: str, output_dir: Optional[str] = None,
+                         pages: Optional[str] = None) -> Dict[str, Any]:
         """
         處理文件並生成 Markdown 輸出
 
         Args:
-            file_path: 輸入 PDF 檔案路徑
+            file_path: 輸入 PDF 或圖片檔案路徑
             output_dir: 輸出目錄，如果未提供則使用 'outputs'
+            pages: 頁面範圍（例如 1-5,9,12-），只辨識這些頁面；未提供時處理整份文件。
+                圖片不支援頁面範圍
 
         Returns:
             包含處理結果的字典，包括：
@@ -37,30 +197,131 @@ class OCRService:
             - output_file: 輸出檔案路徑
             - metadata: 處理元資料
         """
+        if FileValidator.is_image(file_path):
+            return self.process_images([(os.path.basename(file_path), file_path)], output_dir)[0]
+
         logger.info(f"開始處理文件: {file_path}")
+        trace = tracing.begin('process_document', input_file=os.path.basename(file_path))
 
         try:
-            # 呼叫 AlphaXiv API
-            ocr_result = self.client.process_pdf(file_path)
+            started = time.perf_counter()
+            selection, num_pages = self._page_selection(file_path, pages)
+            output = self._markdown_output(output_dir, os.path.basename(file_path))
+            # 呼叫 AlphaXiv API（相同內容的檔案直接使用快取結果）
+            ocr_result = self._fetch_document(
+                file_path, os.path.basename(file_path),
+                functools.cache(lambda: hash_file(file_path)), selection, num_pages, output
+            )
+
+            output_file, markdown_content, extra_outputs = self._write_outputs(
+                ocr_result, output_dir, os.path.basename(file_path), started, output
+            )
+            logger.info(f"文件處理完成，輸出至: {output_file}")
+
+            return {
+                'success': True,
+                'markdown_content': markdown_content,
+                'output_file': output_file,
+                'metadata': {
+                    'input_file': file_path,
+                    'output_file': output_file,
+                    'pages': format_page_ranges(selection[0]) if selection else None,
+                    'processed_at': datetime.now().isoformat(),
+                    'content_length': len(markdown_content),
+                    'extra_outputs': extra_outputs,
+                    'timings': tracing.finish(trace)
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"文件處理失敗: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'metadata': {
+                    'input_file': file_path,
+                    'failed_at': datetime.now().isoformat(),
+                    'timings': tracing.finish(trace)
+                }
+            }
+
+    def process_document_preview(self, file_path: str, output_dir: Optional[str] = None,
+                                 pages: Optional[str] = None, preview_pages: int = 1,
+                                 on_preview: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                 limiter: Optional[WorkLimiter] = None) -> Dict[str, Any]:
+        """
+        先辨識前幾頁作為預覽，再處理其餘頁面並合併為完整輸出
+
+        前 preview_pages 頁擷取成獨立的 PDF 以高優先順序送出，完成後立即
+        交給 on_preview；其餘頁面再依一般順序處理。兩部分的 OCR 結果合併後
+        與一次處理相同頁面的結果相同，輸出的 Markdown 也相同。
+
+        各部分與合併結果都有快取：整份文件已有快取或頁數不超過
+        preview_pages 時不另外送出預覽請求，已辨識過的部分也不會重新送出。
 
-            # 轉換為 Markdown
-            markdown_content = self.converter.convert_to_markdown(ocr_result)
+        Args:
+            file_path: 輸入 PDF 檔案路徑
+            output_dir: 輸出目錄，如果未提供則使用 'outputs'
+            pages: 頁面範圍（例如 1-5,9,12-），未提供時處理整份文件
+            preview_pages: 預覽的頁數
+            on_preview: 預覽完成時呼叫，參數包含 markdown_content 與 metadata
+            limiter: OCR 工作數限制，提供時預覽與其餘頁面分別取得名額
 
-            # 準備輸出
-            if output_dir is None:
-                output_dir = 'outputs'
+        Returns:
+            與 process_document 相同的處理結果字典
 
-            os.makedirs(output_dir, exist_ok=True)
+        Raises:
+            QueueFullError: 等待工作名額時佇列已滿或逾時
+        """
+        logger.info(f"開始處理文件（預覽模式）: {file_path}")
+        filename = os.path.basename(file_path)
+        trace = tracing.begin('process_document', input_file=filename)
 
-            # 生成輸出檔案名稱
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_file = os.path.join(output_dir, f"{base_name}_{timestamp}.md")
+        try:
+            started = time.perf_counter()
+            with tracing.stage('cache_lookup'):
+                content_key = hash_file(file_path)
+            selection, num_pages = self._page_selection(file_path, pages)
+            full_key = self._selection_key(content_key, selection)
+            split = self._preview_split(selection, num_pages, preview_pages, full_key)
 
-            # 儲存 Markdown 檔案
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
+            if split is None:
+                with self._slot(limiter):
+                    ocr_result = self._fetch_document(
+                        file_path, filename, lambda: content_key, selection, num_pages
+                    )
+            else:
+                head, tail = split
+                tracing.annotate('preview_pages', format_page_ranges(head[0]))
+                with self._slot(limiter, priority=True):
+                    head_result = self._fetch_ocr_result(
+                        lambda: self._selection_key(content_key, head),
+                        self._pdf_call(file_path, filename, head, num_pages)
+                    )
+                if on_preview is not None:
+                    on_preview({
+                        'markdown_content': Document.from_ocr_result(
+                            head_result, self.converter
+                        ).to_markdown(self.converter),
+                        'metadata': {
+                            'input_file': filename,
+                            'pages': format_page_ranges(head[0]),
+                            'source_num_pages': head[1],
+                            'eta_seconds': round(self.estimate_seconds(len(tail[0])), 1),
+                        }
+                    })
 
+                with self._slot(limiter):
+                    tail_result = self._fetch_document(
+                        file_path, filename, lambda: content_key, tail, num_pages
+                    )
+                ocr_result = self._merge_results([head_result, tail_result], selection)
+                if self.result_cache is not None and self._cacheable(ocr_result):
+                    self._cache_store(full_key, ocr_result)
+
+            output_file, markdown_content, extra_outputs = self._write_outputs(
+                ocr_result, output_dir, filename, started
+            )
             logger.info(f"文件處理完成，輸出至: {output_file}")
 
             return {
@@ -68,26 +329,36 @@ class OCRService:
                 'markdown_content': markdown_content,
                 'output_file': output_file,
                 'metadata': {
-                    'input_file': file_path,
+                    'input_file': filename,
                     'output_file': output_file,
+                    'pages': format_page_ranges(selection[0]) if selection else None,
+                    'preview_pages': format_page_ranges(split[0][0]) if split else None,
                     'processed_at': datetime.now().isoformat(),
-                    'content_length': len(markdown_content)
+                    'content_length': len(markdown_content),
+                    'extra_outputs': extra_outputs,
+                    'timings': tracing.finish(trace)
                 }
             }
 
+        except QueueFullError:
+            tracing.finish(trace)
+            raise
+
         except Exception as e:
             logger.error(f"文件處理失敗: {str(e)}")
             return {
                 'success': False,
                 'error': str(e),
                 'metadata': {
-                    'input_file': file_path,
-                    'failed_at': datetime.now().isoformat()
+                    'input_file': filename,
+                    'failed_at': datetime.now().isoformat(),
+                    'timings': tracing.finish(trace)
                 }
             }
 
     def process_uploaded_file(self, file_bytes: bytes, filename: str,
-                            output_dir: Optional[str] = None) -> Dict[str, Any]:
+                            output_dir: Optional[str] = None,
+                            pages: Optional[str] = None) -> Dict[str, Any]:
         """
         處理上傳的檔案
 
@@ -95,34 +366,277 @@ class OCRService:
             file_bytes: 檔案位元組資料
             filename: 檔案名稱
             output_dir: 輸出目錄
+            pages: 頁面範圍（例如 1-5,9,12-），只辨識這些頁面；未提供時處理整份文件
 
         Returns:
             處理結果字典
         """
         logger.info(f"開始處理上傳檔案: {filename}")
+        trace = tracing.begin('process_uploaded_file', input_file=filename)
 
         try:
-            # 呼叫 AlphaXiv API
-            ocr_result = self.client.process_pdf_from_bytes(file_bytes, filename)
+            started = time.perf_counter()
+            selection, num_pages = self._page_selection(io.BytesIO(file_bytes), pages)
+            output = self._markdown_output(output_dir, filename)
+            # 呼叫 AlphaXiv API（相同內容的檔案直接使用快取結果）
+            ocr_result = self._fetch_document(
+                file_bytes, filename, functools.cache(lambda: hash_bytes(file_bytes)),
+                selection, num_pages, output
+            )
 
-            # 轉換為 Markdown
-            markdown_content = self.converter.convert_to_markdown(ocr_result)
+            output_file, markdown_content, extra_outputs = self._write_outputs(
+                ocr_result, output_dir, filename, started, output
+            )
+            logger.info(f"檔案處理完成，輸出至: {output_file}")
 
-            # 準備輸出
-            if output_dir is None:
-                output_dir = 'outputs'
+            return {
+                'success': True,
+                'markdown_content': markdown_content,
+                'output_file': output_file,
+                'metadata': {
+                    'input_file': filename,
+                    'output_file': output_file,
+                    'pages': format_page_ranges(selection[0]) if selection else None,
+                    'processed_at': datetime.now().isoformat(),
+                    'content_length': len(markdown_content),
+                    'extra_outputs': extra_outputs,
+                    'timings': tracing.finish(trace)
+                }
+            }
 
-            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            logger.error(f"檔案處理失敗: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'metadata': {
+                    'input_file': filename,
+                    'failed_at': datetime.now().isoformat(),
+                    'timings': tracing.finish(trace)
+                }
+            }
 
-            # 生成輸出檔案名稱
-            base_name = os.path.splitext(filename)[0]
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_file = os.path.join(output_dir, f"{base_name}_{timestamp}.md")
+    def process_cached(self, content_key: str, filename: str,
+                       output_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        以用戶端計算的內容雜湊直接使用快取結果，不需要上傳檔案
 
-            # 儲存 Markdown 檔案
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
+        只查詢整份文件的結果（與 process_document 未指定頁面範圍時的快取鍵相同）。
 
+        Args:
+            content_key: 檔案內容的 SHA-256（十六進位小寫）
+            filename: 原始檔案名稱（用於輸出檔名）
+            output_dir: 輸出目錄
+
+        Returns:
+            與 process_document 相同的處理結果字典；未啟用快取或沒有結果時為 None
+        """
+        if self.result_cache is None:
+            return None
+        content_key = self._selection_key(content_key, None)
+        if not self.result_cache.contains(content_key):
+            return None
+
+        trace = tracing.begin('process_cached', input_file=filename)
+        try:
+            started = time.perf_counter()
+            ocr_result = self._cache_lookup(content_key)
+            if ocr_result is None:
+                tracing.finish(trace)
+                return None
+            logger.info(f"使用快取的 OCR 結果（未上傳檔案）: {content_key[:16]}")
+            tracing.annotate('cache', 'hit')
+            tracing.annotate('upload_skipped', True)
+            CACHE_LOOKUPS.inc('hit')
+
+            output_file, markdown_content, extra_outputs = self._write_outputs(
+                ocr_result, output_dir, filename, started
+            )
+
+            return {
+                'success': True,
+                'markdown_content': markdown_content,
+                'output_file': output_file,
+                'metadata': {
+                    'input_file': filename,
+                    'output_file': output_file,
+                    'pages': None,
+                    'processed_at': datetime.now().isoformat(),
+                    'content_length': len(markdown_content),
+                    'extra_outputs': extra_outputs,
+                    'timings': tracing.finish(trace)
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"快取結果處理失敗: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'metadata': {
+                    'input_file': filename,
+                    'failed_at': datetime.now().isoformat(),
+                    'timings': tracing.finish(trace)
+                }
+            }
+
+    def process_images(self, images: Sequence[Tuple[str, ImageSource]],
+                       output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        將多張圖片打包成一份 PDF，以一次 API 呼叫辨識後依圖片拆分輸出
+
+        每張圖片（多頁 TIFF 的每個影格）佔一頁，依打包時記錄的頁數將結果
+        拆回各圖片，各自寫入輸出檔案；每個請求的固定成本由整批圖片分攤。
+        快取鍵由各圖片的內容雜湊組成。
+
+        Args:
+            images: (檔案名稱, 圖片檔案路徑或檔案物件) 的列表
+            output_dir: 輸出目錄，如果未提供則使用 'outputs'
+
+        Returns:
+            每張圖片的處理結果（格式與 process_document 相同，依 images 順序）
+        """
+        logger.info(f"開始處理 {len(images)} 張圖片")
+        trace = tracing.begin('process_images', input_files=len(images))
+
+        try:
+            started = time.perf_counter()
+            buffer = io.BytesIO()
+            with tracing.stage('image_pack'):
+                counts = pack_images([source for _, source in images], buffer, self.image_dpi)
+            tracing.annotate('images', len(images))
+            # 呼叫 AlphaXiv API（相同內容的圖片直接使用快取結果）
+            ocr_result = self._fetch_document(
+                buffer.getvalue(), 'images.pdf',
+                functools.cache(lambda: self._images_key(images)), None, sum(counts)
+            )
+
+            results = []
+            for (filename, _), part in zip(images, self._split_pages(ocr_result, counts)):
+                output_file, markdown_content, extra_outputs = self._write_outputs(
+                    part, output_dir, filename, started
+                )
+                results.append({
+                    'success': True,
+                    'markdown_content': markdown_content,
+                    'output_file': output_file,
+                    'metadata': {
+                        'input_file': filename,
+                        'output_file': output_file,
+                        'num_pages': part['data']['num_pages'],
+                        'batch_size': len(images),
+                        'processed_at': datetime.now().isoformat(),
+                        'content_length': len(markdown_content),
+                        'extra_outputs': extra_outputs,
+                    }
+                })
+            logger.info(f"圖片處理完成，共 {len(results)} 個輸出")
+
+            # 整批共用一次追蹤的耗時明細
+            timings = tracing.finish(trace)
+            for result in results:
+                result['metadata']['timings'] = timings
+            return results
+
+        except Exception as e:
+            logger.error(f"圖片處理失敗: {str(e)}")
+            timings = tracing.finish(trace)
+            return [
+                {
+                    'success': False,
+                    'error': str(e),
+                    'metadata': {
+                        'input_file': filename,
+                        'failed_at': datetime.now().isoformat(),
+                        'timings': timings
+                    }
+                }
+                for filename, _ in images
+            ]
+
+    @staticmethod
+    def _images_key(images: Sequence[Tuple[str, ImageSource]]) -> str:
+        """快取鍵：依序組合各圖片的內容雜湊"""
+        digests = []
+        for _, source in images:
+            if isinstance(source, str):
+                digests.append(hash_file(source))
+            else:
+                source.seek(0)
+                digests.append(hash_bytes(source.read()))
+        return hash_bytes(('images:' + ':'.join(digests)).encode())
+
+    def _split_pages(self, ocr_result: Dict[str, Any], counts: List[int]) -> List[Dict[str, Any]]:
+        """
+        依各輸入的頁數將 OCR 結果拆分
+
+        Args:
+            ocr_result: 打包後整份 PDF 的 OCR 結果
+            counts: 各輸入依序佔用的頁數
+
+        Returns:
+            各輸入的 OCR 結果
+        """
+        data = ocr_result.get('data') if isinstance(ocr_result, dict) else None
+        if not isinstance(data, dict) or not isinstance(data.get('ocr_text'), str):
+            raise Exception("無法拆分 OCR 結果: 非預期的回應格式")
+        pages = list(self.converter._iter_pages(data))
+        if len(pages) != sum(counts):
+            raise Exception(f"無法拆分 OCR 結果: 預期 {sum(counts)} 頁，收到 {len(pages)} 頁")
+        complete = self._cacheable(ocr_result)
+
+        parts = []
+        offset = 0
+        for count in counts:
+            part_pages = pages[offset:offset + count]
+            offset += count
+            part = {key: value for key, value in ocr_result.items() if key != 'data'}
+            part['data'] = {
+                'ocr_text': PAGE_SPLIT.join(part_pages),
+                'pages': part_pages,
+                'num_pages': count,
+                'num_successful': count if complete else sum(
+                    1 for page in part_pages if page.strip()
+                ),
+            }
+            parts.append(part)
+        return parts
+
+    async def process_upload_async(self, upload: BinaryIO, filename: str, content_key: str,
+                                   client: AsyncAlphaXivClient,
+                                   output_dir: Optional[str] = None,
+                                   pages: Optional[str] = None) -> Dict[str, Any]:
+        """
+        非同步處理已接收的上傳檔案（ASGI 路徑）
+
+        等待 AlphaXiv 回應時不佔用執行緒；快取讀寫、Markdown 轉換與寫檔
+        仍是同步程式碼，交給事件迴圈的執行緒池執行，結果與
+        process_uploaded_file 相同。
+
+        Args:
+            upload: 上傳內容（可讀取的檔案物件）
+            filename: 檔案名稱
+            content_key: 上傳內容的 SHA-256（接收時已計算）
+            client: 非同步 AlphaXiv 客戶端
+            output_dir: 輸出目錄
+            pages: 頁面範圍（例如 1-5,9,12-），只辨識這些頁面；未提供時處理整份文件
+
+        Returns:
+            處理結果字典
+        """
+        logger.info(f"開始處理上傳檔案: {filename}")
+        trace = tracing.begin('process_uploaded_file', input_file=filename)
+
+        try:
+            started = time.perf_counter()
+            selection, num_pages = await run_sync(self._page_selection, upload, pages)
+            ocr_result = await self._fetch_document_async(
+                upload, filename, content_key, selection, num_pages, client
+            )
+
+            output_file, markdown_content, extra_outputs = await run_sync(
+                self._write_outputs, ocr_result, output_dir, filename, started
+            )
             logger.info(f"檔案處理完成，輸出至: {output_file}")
 
             return {
@@ -132,8 +646,11 @@ class OCRService:
                 'metadata': {
                     'input_file': filename,
                     'output_file': output_file,
+                    'pages': format_page_ranges(selection[0]) if selection else None,
                     'processed_at': datetime.now().isoformat(),
-                    'content_length': len(markdown_content)
+                    'content_length': len(markdown_content),
+                    'extra_outputs': extra_outputs,
+                    'timings': tracing.finish(trace)
                 }
             }
 
@@ -144,6 +661,845 @@ class OCRService:
                 'error': str(e),
                 'metadata': {
                     'input_file': filename,
-                    'failed_at': datetime.now().isoformat()
+                    'failed_at': datetime.now().isoformat(),
+                    'timings': tracing.finish(trace)
                 }
             }
+
+    def _page_selection(self, source: PdfSource, pages: Optional[str]
+                        ) -> Tuple[Optional[PageSelection], Optional[int]]:
+        """
+        解析頁面範圍並對照文件頁數
+
+        Args:
+            source: PDF 檔案路徑或檔案物件
+            pages: 頁面範圍字串，未提供時處理整份文件
+
+        Returns:
+            (選取的頁碼與原始文件頁數，未指定或選取全部頁面時為 None, 文件頁數)；
+            未指定頁面範圍且無法讀取頁數時，文件頁數為 None
+
+        Raises:
+            ValueError: 頁面範圍格式錯誤或超出文件頁數
+        """
+        if not pages or not pages.strip():
+            return None, self._count_pages(source)
+        # 格式錯誤時不必讀取 PDF
+        parse_page_spec(pages)
+        with tracing.stage('page_extract'):
+            num_pages = count_pages(source)
+        selected = select_pages(pages, num_pages)
+        if len(selected) == num_pages:
+            return None, num_pages
+        tracing.annotate('pages', format_page_ranges(selected))
+        return (selected, num_pages), num_pages
+
+    @staticmethod
+    def _count_pages(source: PdfSource) -> Optional[int]:
+        """讀取 PDF 頁數供延遲模型使用；未安裝 pypdf 或無法解析時為 None"""
+        try:
+            with tracing.stage('page_count'):
+                return count_pages(source)
+        except Exception as e:
+            logger.debug(f"無法讀取頁數: {str(e)}")
+            return None
+
+    def _preview_split(self, selection: Optional[PageSelection], num_pages: Optional[int],
+                       preview_pages: int, full_key: str
+                       ) -> Optional[Tuple[PageSelection, PageSelection]]:
+        """
+        將要處理的頁面分為預覽與其餘兩部分
+
+        Returns:
+            (預覽頁面, 其餘頁面)；整份已有快取、頁數不足或無法讀取頁數時為 None
+        """
+        if self.result_cache is not None and self.result_cache.contains(full_key):
+            return None
+        if selection is not None:
+            selected, num_pages = selection
+        elif num_pages:
+            selected = list(range(1, num_pages + 1))
+        else:
+            logger.warning("無法讀取頁數，改為一次處理整份文件")
+            return None
+        if len(selected) <= preview_pages:
+            return None
+        return (selected[:preview_pages], num_pages), (selected[preview_pages:], num_pages)
+
+    def _plan_chunks(self, selection: Optional[PageSelection],
+                     num_pages: Optional[int]) -> List[PageSelection]:
+        """
+        依延遲模型將要處理的頁面分段
+
+        OCR_CHUNK_PARALLELISM 大於 1 且頁數已知時，選擇在該平行度下預估
+        總時間最短的分段大小；否則整份為一段。
+
+        Returns:
+            各段的頁面選擇；只有一段時為空列表
+        """
+        if selection is not None:
+            selected, num_pages = selection
+        elif num_pages:
+            selected = list(range(1, num_pages + 1))
+        else:
+            return []
+        if self.chunk_parallelism <= 1:
+            return []
+        size = self.client.latency.chunk_size(len(selected), self.chunk_parallelism)
+        if size >= len(selected):
+            return []
+        return [(selected[i:i + size], num_pages) for i in range(0, len(selected), size)]
+
+    def _fetch_document(self, source: PdfInput, filename: str, content_key: Callable[[], str],
+                        selection: Optional[PageSelection], num_pages: Optional[int],
+                        output: Optional[_MarkdownOutput] = None) -> Dict[str, Any]:
+        """
+        取得要處理頁面的 OCR 結果，必要時分段以管線處理
+
+        分段時每段與合併結果分別快取；整份已有快取時不分段。
+
+        Args:
+            source: PDF 檔案路徑或位元組資料
+            filename: 檔案名稱
+            content_key: 計算檔案內容雜湊的函式
+            selection: 頁面選擇，處理整份文件時為 None
+            num_pages: 文件頁數（未知時為 None）
+            output: 提供且分段處理時，各段完成後立即轉換並寫入 Markdown
+
+        Returns:
+            OCR 結果
+        """
+        full_key = lambda: self._selection_key(content_key(), selection)
+        selected_pages = len(selection[0]) if selection else num_pages
+        if selected_pages:
+            tracing.annotate('eta_seconds', round(self.estimate_seconds(selected_pages), 1))
+
+        chunks = self._plan_chunks(selection, num_pages)
+        if not chunks or (self.result_cache is not None
+                          and self.result_cache.contains(full_key())):
+            return self._fetch_ocr_result(
+                full_key, self._pdf_call(source, filename, selection, num_pages)
+            )
+
+        tracing.annotate('chunks', len(chunks))
+        base_key = content_key() if self.result_cache is not None else ''
+        try:
+            with tracing.stage('upstream_chunks'):
+                parts = self._run_chunks(source, filename, base_key, chunks, output)
+            ocr_result = self._merge_results(parts, selection)
+        except Exception:
+            if output is not None:
+                output.abort()
+            raise
+
+        if self.result_cache is not None and self._cacheable(ocr_result):
+            self._cache_store(full_key(), ocr_result)
+        return ocr_result
+
+    def _run_chunks(self, source: PdfInput, filename: str, base_key: str,
+                    chunks: List[PageSelection],
+                    output: Optional[_MarkdownOutput]) -> List[Dict[str, Any]]:
+        """
+        以管線處理各段：擷取 → 上傳辨識 → 解析 → 轉換 → 寫入
+
+        相鄰階段以有界佇列連接（OCR_PIPELINE_QUEUE_SIZE），上傳辨識階段同時
+        處理 OCR_CHUNK_PARALLELISM 段，其餘階段各一個執行緒。第 N 段在轉換與
+        寫入時，第 N+1 段仍可在上游辨識；轉換與寫入依頁面順序進行。沒有
+        output 時只執行到解析。各階段的使用率與最大佇列長度記錄在耗時明細的
+        pipeline。
+
+        Args:
+            source: PDF 檔案路徑或位元組資料
+            filename: 檔案名稱
+            base_key: 檔案內容雜湊（未啟用快取時為空字串）
+            chunks: 各段的頁面選擇
+            output: Markdown 輸出，未提供時不轉換
+
+        Returns:
+            各段的 OCR 結果（依頁面順序）
+        """
+        stages = [
+            Stage('split', functools.partial(self._split_chunk, source, base_key)),
+            Stage('upload', functools.partial(self._upload_chunk, source, filename),
+                  workers=min(self.chunk_parallelism, len(chunks))),
+            Stage('decode', self._decode_chunk),
+        ]
+        if output is not None:
+            stages.append(Stage('convert', functools.partial(self._convert_chunk, output),
+                                ordered=True))
+            stages.append(Stage('write', functools.partial(self._write_chunk, output),
+                                ordered=True))
+
+        pipeline = Pipeline(stages)
+        try:
+            works = pipeline.run(_ChunkWork(chunk) for chunk in chunks)
+        finally:
+            tracing.annotate('pipeline', pipeline.summary())
+        return [work.result for work in works]
+
+    def _split_chunk(self, source: PdfInput, base_key: str, work: _ChunkWork) -> _ChunkWork:
+        """管線的擷取階段：查詢快取，沒有快取時擷取該段頁面並瘦身"""
+        if self.result_cache is not None:
+            work.key = self._selection_key(base_key, work.selection)
+            work.result = self.result_cache.get(work.key)
+            work.cached = work.result is not None
+            CACHE_LOOKUPS.inc('hit' if work.cached else 'miss')
+        if not work.cached:
+            work.pdf_bytes = self._shrink(self._extract_selection(source, work.selection))
+        return work
+
+    def _upload_chunk(self, source: PdfInput, filename: str, work: _ChunkWork) -> _ChunkWork:
+        """管線的上傳辨識階段：送出該段並重試失敗的頁面"""
+        if work.cached:
+            return work
+        pdf_bytes, work.pdf_bytes = work.pdf_bytes, None
+        ocr_result = self._label_pages(self.client.process_pdf_from_bytes(
+            pdf_bytes, filename, len(work.selection[0])
+        ), work.selection)
+        work.result = self._retry_failed_pages(ocr_result, source, filename, work.selection)
+        return work
+
+    def _decode_chunk(self, work: _ChunkWork) -> _ChunkWork:
+        """管線的解析階段：檢查回應格式、取出各頁文字並快取該段結果"""
+        data = work.result.get('data') if isinstance(work.result, dict) else None
+        if not isinstance(data, dict) or not isinstance(data.get('ocr_text'), str):
+            raise Exception("無法合併 OCR 結果: 非預期的回應格式")
+        work.pages = list(self.converter._iter_pages(data))
+        if work.key is not None and not work.cached and self._cacheable(work.result):
+            self.result_cache.put(work.key, work.result)
+        return work
+
+    @staticmethod
+    def _convert_chunk(output: _MarkdownOutput, work: _ChunkWork) -> _ChunkWork:
+        work.markdown = output.convert(work.pages)
+        return work
+
+    @staticmethod
+    def _write_chunk(output: _MarkdownOutput, work: _ChunkWork) -> _ChunkWork:
+        markdown, work.markdown = work.markdown, ''
+        output.write(markdown)
+        return work
+
+    async def _fetch_document_async(self, upload: BinaryIO, filename: str, content_key: str,
+                                    selection: Optional[PageSelection],
+                                    num_pages: Optional[int],
+                                    client: AsyncAlphaXivClient) -> Dict[str, Any]:
+        """_fetch_document 的非同步版本，分段以 asyncio.gather 同時送出"""
+        full_key = self._selection_key(content_key, selection)
+        selected_pages = len(selection[0]) if selection else num_pages
+        if selected_pages:
+            tracing.annotate('eta_seconds', round(self.estimate_seconds(selected_pages), 1))
+        # 各段共用同一個上傳檔案物件，擷取時依序進行
+        extract_lock = asyncio.Lock()
+
+        async def extract(part: PageSelection) -> bytes:
+            async with extract_lock:
+                sub_pdf = await run_sync(self._extract_selection, upload, part)
+            return await run_sync(self._shrink, sub_pdf)
+
+        async def call_api(part: Optional[PageSelection]) -> Dict[str, Any]:
+            if part is None and self.optimize_uploads:
+                async with extract_lock:
+                    upload.seek(0)
+                    original = await run_sync(upload.read)
+                ocr_result = await client.process_pdf(
+                    io.BytesIO(await run_sync(self._shrink, original)), filename, num_pages
+                )
+            elif part is None:
+                ocr_result = await client.process_pdf(upload, filename, num_pages)
+            else:
+                ocr_result = self._label_pages(await client.process_pdf(
+                    io.BytesIO(await extract(part)), filename, len(part[0])
+                ), part)
+            return await self._retry_failed_pages_async(
+                ocr_result, extract, filename, part, client
+            )
+
+        chunks = self._plan_chunks(selection, num_pages)
+        if not chunks or (self.result_cache is not None
+                          and await run_sync(self.result_cache.contains, full_key)):
+            return await self._fetch_ocr_result_async(full_key, lambda: call_api(selection))
+
+        tracing.annotate('chunks', len(chunks))
+        parts = await asyncio.gather(*(
+            self._fetch_ocr_result_async(
+                self._selection_key(content_key, chunk), functools.partial(call_api, chunk)
+            )
+            for chunk in chunks
+        ))
+        ocr_result = self._merge_results(list(parts), selection)
+        if self.result_cache is not None and self._cacheable(ocr_result):
+            await run_sync(self._cache_store, full_key, ocr_result)
+        return ocr_result
+
+    def _merge_results(self, parts: List[Dict[str, Any]],
+                       selection: Optional[PageSelection]) -> Dict[str, Any]:
+        """
+        依頁面順序合併分段處理的 OCR 結果
+
+        合併後的 data 與一次處理相同頁面的回應相同：pages 依序串接，
+        ocr_text 以分頁標記串接，num_pages 與 num_successful 為各部分總和。
+
+        Args:
+            parts: 各部分的 OCR 結果（依頁面順序）
+            selection: 整體的頁面選擇，處理整份文件時為 None
+
+        Returns:
+            合併後的 OCR 結果
+        """
+        pages: List[str] = []
+        num_pages = num_successful = 0
+        for part in parts:
+            data = part.get('data') if isinstance(part, dict) else None
+            if not isinstance(data, dict) or not isinstance(data.get('ocr_text'), str):
+                raise Exception("無法合併 OCR 結果: 非預期的回應格式")
+            part_pages = list(self.converter._iter_pages(data))
+            pages.extend(part_pages)
+            num_pages += data.get('num_pages', len(part_pages))
+            num_successful += data.get('num_successful', data.get('num_pages', len(part_pages)))
+
+        merged = {key: value for key, value in parts[0].items() if key != 'data'}
+        merged['data'] = {
+            'ocr_text': PAGE_SPLIT.join(pages),
+            'pages': pages,
+            'num_pages': num_pages,
+            'num_successful': num_successful,
+        }
+        if selection is not None:
+            self._label_pages(merged, selection)
+        return merged
+
+    def _pdf_call(self, source: PdfInput, filename: str, selection: Optional[PageSelection],
+                  num_pages: Optional[int]) -> Callable[[], Dict[str, Any]]:
+        """
+        產生呼叫 API 的函式：整份文件直接上傳，部分頁面先擷取成新的 PDF
+
+        回應中有頁面辨識失敗時，只將失敗的頁面重新送出並填回原位置。
+        """
+        if selection is not None:
+            call_api = lambda: self._label_pages(self.client.process_pdf_from_bytes(
+                self._shrink(self._extract_selection(source, selection)),
+                filename, len(selection[0])
+            ), selection)
+        elif self.batcher is not None and num_pages and num_pages <= self.batch_doc_pages:
+            call_api = lambda: self._submit_batch(source, num_pages)
+        elif isinstance(source, bytes):
+            call_api = lambda: self.client.process_pdf_from_bytes(
+                self._shrink(source), filename, num_pages
+            )
+        elif self.optimize_uploads:
+            call_api = lambda: self.client.process_pdf_from_bytes(
+                self._shrink(self._read_file(source)), filename, num_pages
+            )
+        else:
+            call_api = lambda: self.client.process_pdf(source, num_pages)
+        return lambda: self._retry_failed_pages(call_api(), source, filename, selection)
+
+    def _submit_batch(self, source: PdfInput, num_pages: int) -> Dict[str, Any]:
+        """將小文件加入批次，與同一時間窗的其他文件一起送出"""
+        pdf_bytes = source if isinstance(source, bytes) else self._read_file(source)
+        ocr_result, batch_size = self.batcher.submit(self._shrink(pdf_bytes), num_pages)
+        tracing.annotate('batch_size', batch_size)
+        return ocr_result
+
+    def _send_batch(self, items: List[BatchItem]) -> List[Dict[str, Any]]:
+        """
+        將一批小文件串接成一份 PDF 送出，再依各文件的頁數拆分結果
+
+        Args:
+            items: (PDF 內容, 頁數) 的列表
+
+        Returns:
+            各文件的 OCR 結果（依 items 順序）
+        """
+        if len(items) == 1:
+            pdf_bytes, num_pages = items[0]
+            return [self.client.process_pdf_from_bytes(pdf_bytes, 'batch.pdf', num_pages)]
+
+        buffer = io.BytesIO()
+        try:
+            with tracing.stage('batch_merge'):
+                concat_pdfs([io.BytesIO(pdf_bytes) for pdf_bytes, _ in items], buffer)
+        except Exception as e:
+            logger.warning(f"無法串接批次中的 PDF，逐份送出: {str(e)}")
+            return [
+                self.client.process_pdf_from_bytes(pdf_bytes, 'batch.pdf', num_pages)
+                for pdf_bytes, num_pages in items
+            ]
+
+        counts = [num_pages for _, num_pages in items]
+        logger.info(f"批次送出 {len(items)} 份文件，共 {sum(counts)} 頁")
+        ocr_result = self.client.process_pdf_from_bytes(buffer.getvalue(), 'batch.pdf', sum(counts))
+        return self._split_pages(ocr_result, counts)
+
+    def _retry_failed_pages(self, ocr_result: Dict[str, Any], source: PdfInput, filename: str,
+                            selection: Optional[PageSelection]) -> Dict[str, Any]:
+        """
+        重新辨識回應中失敗的頁面
+
+        num_successful 小於 num_pages 時，依 data.pages 中空白的項目找出失敗的
+        頁面，擷取成較小的 PDF 重新送出，最多 OCR_PAGE_RETRIES 次；成功的頁面
+        填回原本的位置。重試失敗時保留原本的結果。
+
+        Args:
+            ocr_result: OCR 結果
+            source: PDF 檔案路徑或位元組資料
+            filename: 檔案名稱
+            selection: ocr_result 對應的頁面選擇，整份文件時為 None
+
+        Returns:
+            填補後的 OCR 結果
+        """
+        recovered = 0
+        for attempt in range(self.page_retries):
+            retry = self._failed_selection(ocr_result, selection)
+            if retry is None:
+                break
+            positions, failed = retry
+            logger.warning(f"第 {format_page_ranges(failed[0])} 頁辨識失敗，"
+                           f"重新送出（第 {attempt + 1} 次）: {filename}")
+            try:
+                retry_result = self.client.process_pdf_from_bytes(
+                    self._shrink(self._extract_selection(source, failed)),
+                    filename, len(failed[0])
+                )
+            except Exception as e:
+                logger.warning(f"失敗頁面重試失敗: {str(e)}")
+                break
+            recovered += self._splice_pages(ocr_result, positions, retry_result)
+        self._record_retries(ocr_result, recovered)
+        return ocr_result
+
+    async def _retry_failed_pages_async(self, ocr_result: Dict[str, Any],
+                                        extract: Callable[[PageSelection], Awaitable[bytes]],
+                                        filename: str, selection: Optional[PageSelection],
+                                        client: AsyncAlphaXivClient) -> Dict[str, Any]:
+        """_retry_failed_pages 的非同步版本，extract 將頁面擷取成 PDF"""
+        recovered = 0
+        for attempt in range(self.page_retries):
+            retry = self._failed_selection(ocr_result, selection)
+            if retry is None:
+                break
+            positions, failed = retry
+            logger.warning(f"第 {format_page_ranges(failed[0])} 頁辨識失敗，"
+                           f"重新送出（第 {attempt + 1} 次）: {filename}")
+            try:
+                retry_result = await client.process_pdf(
+                    io.BytesIO(await extract(failed)), filename, len(failed[0])
+                )
+            except Exception as e:
+                logger.warning(f"失敗頁面重試失敗: {str(e)}")
+                break
+            recovered += self._splice_pages(ocr_result, positions, retry_result)
+        self._record_retries(ocr_result, recovered)
+        return ocr_result
+
+    def _failed_selection(self, ocr_result: Dict[str, Any], selection: Optional[PageSelection]
+                          ) -> Optional[Tuple[List[int], PageSelection]]:
+        """
+        找出辨識失敗的頁面
+
+        Returns:
+            (失敗頁面在結果中的位置, 失敗頁面的原始頁碼選擇)；全部成功或
+            無法判斷哪些頁面失敗時為 None
+        """
+        data = ocr_result.get('data') if isinstance(ocr_result, dict) else None
+        if self._cacheable(ocr_result) or not isinstance(data, dict):
+            return None
+        pages = data.get('pages')
+        if not isinstance(pages, list) or len(pages) != data.get('num_pages'):
+            return None
+        positions = [
+            index for index, page in enumerate(pages)
+            if not isinstance(page, str) or not page.strip()
+        ]
+        if not positions:
+            return None
+        if selection is None:
+            return positions, ([index + 1 for index in positions], len(pages))
+        return positions, ([selection[0][index] for index in positions], selection[1])
+
+    def _splice_pages(self, ocr_result: Dict[str, Any], positions: List[int],
+                      retry_result: Dict[str, Any]) -> int:
+        """
+        將重試成功的頁面填回 OCR 結果並更新 ocr_text 與 num_successful
+
+        Returns:
+            填回的頁數
+        """
+        retry_data = retry_result.get('data') if isinstance(retry_result, dict) else None
+        if not isinstance(retry_data, dict) or not isinstance(retry_data.get('ocr_text'), str):
+            logger.warning("失敗頁面重試的回應格式不符，略過")
+            return 0
+        retry_pages = list(self.converter._iter_pages(retry_data))
+        if len(retry_pages) != len(positions):
+            logger.warning("失敗頁面重試的頁數不符，略過")
+            return 0
+
+        data = ocr_result['data']
+        pages = list(data['pages'])
+        recovered = 0
+        for index, page in zip(positions, retry_pages):
+            if page.strip():
+                pages[index] = page
+                recovered += 1
+        if recovered:
+            data['pages'] = pages
+            data['ocr_text'] = PAGE_SPLIT.join(
+                page if isinstance(page, str) else '' for page in pages
+            )
+            data['num_successful'] = min(data['num_successful'] + recovered, data['num_pages'])
+        return recovered
+
+    def _record_retries(self, ocr_result: Dict[str, Any], recovered: int) -> None:
+        """記錄重試填回與仍失敗的頁數"""
+        if recovered:
+            PAGE_RETRIES.inc('recovered', amount=recovered)
+            tracing.annotate('recovered_pages', recovered)
+        retry = self._failed_selection(ocr_result, None) if self.page_retries else None
+        if retry is not None:
+            PAGE_RETRIES.inc('failed', amount=len(retry[0]))
+
+    @staticmethod
+    def _slot(limiter: Optional[WorkLimiter], priority: bool = False):
+        return limiter.slot(priority=priority) if limiter is not None else nullcontext()
+
+    @staticmethod
+    def _extract_selection(source: Union[PdfSource, bytes], selection: PageSelection) -> bytes:
+        """將選取的頁面擷取為新的 PDF，只上傳這些頁面"""
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        buffer = io.BytesIO()
+        with tracing.stage('page_extract'):
+            extract_pages(source, selection[0], buffer)
+        return buffer.getvalue()
+
+    def _shrink(self, pdf_bytes: bytes) -> bytes:
+        """
+        上傳前的 PDF 瘦身（PDF_OPTIMIZE=true 時）
+
+        減少的位元組數與依 UPLOAD_BANDWIDTH_MBPS 估計節省的上傳時間累加在
+        耗時明細的 bytes_saved 與 upload_ms_saved；瘦身失敗或沒有變小時上傳
+        原始內容。
+
+        Args:
+            pdf_bytes: 要上傳的 PDF
+
+        Returns:
+            實際上傳的 PDF
+        """
+        if not self.optimize_uploads:
+            return pdf_bytes
+        buffer = io.BytesIO()
+        try:
+            with tracing.stage('pdf_optimize'):
+                optimize_pdf(io.BytesIO(pdf_bytes), buffer, target_dpi=self.optimize_dpi)
+        except Exception as e:
+            logger.warning(f"PDF 瘦身失敗，上傳原始檔案: {str(e)}")
+            return pdf_bytes
+
+        optimized = buffer.getvalue()
+        saved = len(pdf_bytes) - len(optimized)
+        tracing.increment('bytes_before_optimize', len(pdf_bytes))
+        if saved <= 0:
+            return pdf_bytes
+        logger.info(f"PDF 瘦身: {len(pdf_bytes)} -> {len(optimized)} bytes")
+        tracing.increment('bytes_saved', saved)
+        tracing.increment('upload_ms_saved', round(saved * 8 / (self.upload_mbps * 1000)))
+        UPLOAD_BYTES_SAVED.inc(amount=saved)
+        return optimized
+
+    @staticmethod
+    def _read_file(file_path: str) -> bytes:
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def _selection_key(self, content_key: str, selection: Optional[PageSelection]) -> str:
+        """
+        快取鍵：整份文件為內容雜湊，部分頁面再加上頁面範圍
+
+        啟用 PDF 瘦身時上傳的內容不同，OCR 結果也可能不同，
+        因此再加上瘦身設定，不與未瘦身或其他解析度的結果共用。
+        """
+        parts = []
+        if selection is not None:
+            parts.append(format_page_ranges(selection[0]))
+        if self.optimize_uploads:
+            parts.append(f"optimize={self.optimize_dpi or 0}")
+        if not parts:
+            return content_key
+        return hash_bytes(':'.join([content_key] + parts).encode())
+
+    @staticmethod
+    def _label_pages(ocr_result: Dict[str, Any], selection: PageSelection) -> Dict[str, Any]:
+        """
+        在 OCR 結果中記錄各頁的原始頁碼
+
+        上游只看到擷取後的子文件（頁碼從 1 開始），data.page_numbers 讓
+        Markdown、結構化輸出與全文檢索使用原始文件的頁碼。
+        """
+        data = ocr_result.get('data') if isinstance(ocr_result, dict) else None
+        if isinstance(data, dict):
+            data['page_numbers'] = list(selection[0])
+            data['source_num_pages'] = selection[1]
+        return ocr_result
+
+    def _write_outputs(self, ocr_result: Dict[str, Any], output_dir: Optional[str],
+                       input_name: str, started: float,
+                       output: Optional[_MarkdownOutput] = None
+                       ) -> Tuple[str, str, Dict[str, str]]:
+        """
+        轉換並寫入所有輸出檔案，更新全文檢索與吞吐量指標
+
+        Args:
+            ocr_result: OCR 結果
+            output_dir: 輸出目錄，如果未提供則使用 'outputs'
+            input_name: 原始檔案名稱
+            started: 開始處理的時間（perf_counter）
+            output: 分段管線已寫入本文的 Markdown 輸出，只需補上處理統計
+
+        Returns:
+            (輸出檔案路徑, Markdown 內容, 額外輸出檔案)
+        """
+        pipelined = output is not None and output.started
+        # OCR 結果只解析一次為 Document，Markdown 與其他格式都由它輸出；
+        # 分段管線已邊辨識邊寫入 Markdown，只在需要其他格式時才解析
+        document = None
+        if not pipelined or self.extra_formats:
+            with tracing.stage('markdown_conversion'):
+                document = Document.from_ocr_result(ocr_result, self.converter)
+
+        if pipelined:
+            output_file = output.output_file
+            output.finish(ocr_result)
+        else:
+            # 轉換為 Markdown 並逐頁寫入檔案
+            output_file = self._create_output_file(output_dir, input_name)
+            self._write_markdown(document, output_file)
+        # 轉換時只保留單頁的內容，完成後才讀回一份完整內容供回應使用
+        with open(output_file, encoding='utf-8', newline='') as f:
+            markdown_content = f.read()
+        extra_outputs = self._write_extra_outputs(document, output_file)
+        self._index_document(ocr_result, output_file, input_name)
+
+        self._record_throughput(ocr_result, time.perf_counter() - started)
+        return output_file, markdown_content, extra_outputs
+
+    def _markdown_output(self, output_dir: Optional[str], input_name: str) -> _MarkdownOutput:
+        """建立分段管線使用的 Markdown 輸出（第一段寫入時才建立檔案）"""
+        return _MarkdownOutput(
+            self.converter, functools.partial(self._create_output_file, output_dir, input_name)
+        )
+
+    def _create_output_file(self, output_dir: Optional[str], input_name: str) -> str:
+        """建立輸出目錄並佔用輸出檔案名稱；未提供輸出目錄時使用 'outputs'"""
+        if output_dir is None:
+            output_dir = 'outputs'
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        # 生成輸出檔案名稱
+        base_name = os.path.splitext(input_name)[0]
+        return self._reserve_output_file(output_dir, base_name)
+
+    def _reserve_output_file(self, output_dir: str, base_name: str) -> str:
+        """
+        以時間戳記產生輸出檔案名稱並先建立空檔佔用
+
+        同名檔案在同一秒內同時處理時加上序號，避免互相覆蓋。
+
+        Args:
+            output_dir: 輸出目錄
+            base_name: 不含副檔名的原始檔名
+
+        Returns:
+            輸出檔案路徑
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_file = os.path.join(output_dir, f"{base_name}_{timestamp}.md")
+        sequence = 1
+        while True:
+            try:
+                with open(output_file, 'x', encoding='utf-8'):
+                    return output_file
+            except FileExistsError:
+                sequence += 1
+                output_file = os.path.join(output_dir, f"{base_name}_{timestamp}_{sequence}.md")
+
+    def _fetch_ocr_result(self, compute_key: Callable[[], str],
+                          call_api: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        取得 OCR 結果，有快取時不呼叫 API
+
+        只快取所有頁面都辨識成功的結果，部分失敗的結果下次仍會重新處理。
+
+        Args:
+            compute_key: 計算檔案內容雜湊的函式
+            call_api: 呼叫 AlphaXiv API 的函式
+
+        Returns:
+            OCR 結果
+        """
+        if self.result_cache is None:
+            tracing.annotate('cache', 'disabled')
+            return call_api()
+
+        with tracing.stage('cache_lookup'):
+            key = compute_key()
+            cached = self.result_cache.get(key)
+        if cached is not None:
+            logger.info(f"使用快取的 OCR 結果: {key[:16]}")
+            tracing.annotate('cache', 'hit')
+            CACHE_LOOKUPS.inc('hit')
+            return cached
+
+        tracing.annotate('cache', 'miss')
+        CACHE_LOOKUPS.inc('miss')
+        ocr_result = call_api()
+
+        if self._cacheable(ocr_result):
+            with tracing.stage('cache_store'):
+                self.result_cache.put(key, ocr_result)
+        return ocr_result
+
+    async def _fetch_ocr_result_async(self, key: str,
+                                      call_api: Callable[[], Awaitable[Dict[str, Any]]]
+                                      ) -> Dict[str, Any]:
+        """_fetch_ocr_result 的非同步版本，快取讀寫在執行緒池中進行"""
+        if self.result_cache is None:
+            tracing.annotate('cache', 'disabled')
+            return await call_api()
+
+        cached = await run_sync(self._cache_lookup, key)
+        if cached is not None:
+            logger.info(f"使用快取的 OCR 結果: {key[:16]}")
+            tracing.annotate('cache', 'hit')
+            CACHE_LOOKUPS.inc('hit')
+            return cached
+
+        tracing.annotate('cache', 'miss')
+        CACHE_LOOKUPS.inc('miss')
+        ocr_result = await call_api()
+
+        if self._cacheable(ocr_result):
+            await run_sync(self._cache_store, key, ocr_result)
+        return ocr_result
+
+    def _cache_lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with tracing.stage('cache_lookup'):
+            return self.result_cache.get(key)
+
+    def _cache_store(self, key: str, ocr_result: Dict[str, Any]) -> None:
+        with tracing.stage('cache_store'):
+            self.result_cache.put(key, ocr_result)
+
+    @staticmethod
+    def _cacheable(ocr_result: Dict[str, Any]) -> bool:
+        """只快取所有頁面都辨識成功的結果"""
+        data = ocr_result.get('data') if isinstance(ocr_result, dict) else None
+        if not isinstance(data, dict):
+            return False
+        num_pages = data.get('num_pages')
+        num_successful = data.get('num_successful')
+        return num_successful is None or num_pages is None or num_successful >= num_pages
+
+    def _write_markdown(self, document: Document, output_file: str) -> None:
+        """
+        將文件串流轉換並寫入 Markdown 檔案
+
+        轉換結果逐段寫入檔案後即丟棄，記憶體用量取決於單頁大小。
+
+        Args:
+            document: 由 OCR 結果解析的文件
+            output_file: 輸出檔案路徑
+        """
+        convert_seconds = write_seconds = 0.0
+        STAGE_IN_FLIGHT.inc('markdown_conversion')
+        try:
+            with open(output_file, 'w', encoding='utf-8', newline='') as f:
+                # 轉換與寫入交錯進行，分別累計兩者的耗時
+                iterator = iter(document.iter_markdown(self.converter))
+                while True:
+                    start = time.perf_counter()
+                    chunk = next(iterator, None)
+                    convert_seconds += time.perf_counter() - start
+                    if chunk is None:
+                        break
+                    start = time.perf_counter()
+                    f.write(chunk)
+                    write_seconds += time.perf_counter() - start
+        finally:
+            STAGE_IN_FLIGHT.dec('markdown_conversion')
+        tracing.record_stage('markdown_conversion', convert_seconds)
+        tracing.record_stage('output_write', write_seconds)
+
+    def _write_extra_outputs(self, document: Optional[Document],
+                             output_file: str) -> Dict[str, str]:
+        """
+        依 OUTPUT_FORMATS 輸出純文字與 JSON
+
+        Args:
+            document: 由 OCR 結果解析的文件（與 Markdown 使用同一份）；
+                沒有額外格式時可為 None
+            output_file: Markdown 輸出檔案路徑，其他格式存在同一目錄
+
+        Returns:
+            {格式: 檔案名稱}
+        """
+        if not self.extra_formats:
+            return {}
+
+        base_path = os.path.splitext(output_file)[0]
+        outputs = {}
+        for fmt in self.extra_formats:
+            path = f"{base_path}.{fmt}"
+            content = document.to_json(indent=2) if fmt == 'json' else document.to_text()
+            with tracing.stage('output_write'):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            outputs[fmt] = os.path.basename(path)
+        return outputs
+
+    def _record_throughput(self, ocr_result: Dict[str, Any], seconds: float) -> None:
+        """記錄處理頁數與每秒頁數"""
+        data = (ocr_result or {}).get('data')
+        source = data if isinstance(data, dict) else (ocr_result or {})
+        num_pages = source.get('num_pages')
+        if not isinstance(num_pages, int) and isinstance(source.get('pages'), list):
+            num_pages = len(source['pages'])
+        if not isinstance(num_pages, int) or num_pages <= 0:
+            return
+        PAGES_PROCESSED.inc(amount=num_pages)
+        if seconds > 0:
+            PAGES_PER_SECOND.observe(num_pages / seconds)
+
+    def _index_document(self, ocr_result: Dict[str, Any], output_file: str,
+                        input_file: str) -> None:
+        """
+        以 data.pages 逐頁更新全文檢索索引
+
+        索引失敗不影響轉換結果，只記錄警告。
+
+        Args:
+            ocr_result: AlphaXiv API 返回的 OCR 結果
+            output_file: Markdown 輸出檔案路徑
+            input_file: 原始檔案名稱
+        """
+        if self.search_index is None:
+            return
+
+        data = (ocr_result or {}).get('data')
+        if not isinstance(data, dict):
+            data = ocr_result or {}
+        if not isinstance(data.get('pages'), list) and not isinstance(data.get('ocr_text'), str):
+            return
+
+        try:
+            self.search_index.index_document(
+                os.path.basename(output_file),
+                self.converter._iter_pages(data),
+                input_file=input_file,
+                page_numbers=data.get('page_numbers')
+            )
+        except Exception as e:
+            logger.warning(f"無法更新全文檢索索引: {str(e)}")
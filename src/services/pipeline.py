@@ -0,0 +1,272 @@
+"""
+以有界佇列串接的多階段處理
+各階段由自己的執行緒處理，前一項還在後面的階段時下一項已可進入前面的階段
+"""
+
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from utils import profiling
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge(
+    'ocr_pipeline_queue_depth', '管線各階段輸入佇列中等待的項目數', ('stage',)
+)
+PIPELINE_STAGE_WORKERS = REGISTRY.gauge(
+    'ocr_pipeline_stage_workers', '管線各階段執行中的工作執行緒數', ('stage',)
+)
+PIPELINE_STAGE_BUSY = REGISTRY.counter(
+    'ocr_pipeline_stage_busy_seconds_total',
+    '管線各階段處理項目的累計秒數（除以工作執行緒數的增加速率即為使用率）', ('stage',)
+)
+
+# 佇列結束標記
+_DONE = object()
+# 等待佇列時檢查是否已中止的間隔（秒）
+_POLL_SECONDS = 0.1
+
+
+class Stage:
+    """管線中的一個階段"""
+
+    def __init__(self, name: str, function: Callable[[Any], Any], workers: int = 1,
+                 ordered: bool = False):
+        """
+        初始化階段
+
+        Args:
+            name: 階段名稱（指標標籤）
+            function: 處理一個項目並回傳交給下一階段的項目
+            workers: 同時處理的執行緒數
+            ordered: 是否依輸入順序處理（只能有一個執行緒），先到的後續項目暫存等待
+        """
+        if ordered and workers != 1:
+            raise ValueError(f"依序處理的階段只能有一個執行緒: {name}")
+        self.name = name
+        self.function = function
+        self.workers = max(workers, 1)
+        self.ordered = ordered
+
+
+class _StageState:
+    """單次執行中一個階段的佇列與統計"""
+
+    def __init__(self, stage: Stage, queue_size: int):
+        self.stage = stage
+        self.queue: 'queue.Queue' = queue.Queue(queue_size)
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.finished = 0
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """
+    多階段管線
+
+    相鄰階段之間以容量為 queue_size 的佇列連接，前面的階段最多只會領先
+    後面的階段 queue_size 個項目，暫存的中間結果因此有上限。任一階段
+    發生例外時所有階段停止，run() 拋出第一個例外。
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: Optional[int] = None):
+        """
+        初始化管線
+
+        Args:
+            stages: 依處理順序排列的階段
+            queue_size: 每個佇列的容量；未提供時讀取 OCR_PIPELINE_QUEUE_SIZE，預設 2
+        """
+        if not stages:
+            raise ValueError("管線至少需要一個階段")
+        self.stages = list(stages)
+        self.queue_size = max(queue_size or int(os.getenv('OCR_PIPELINE_QUEUE_SIZE') or 2), 1)
+        self._states: List[_StageState] = []
+        self._results: Dict[int, Any] = {}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self._wall_seconds = 0.0
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """
+        處理所有項目
+
+        Args:
+            items: 輸入項目（可為產生器，依需要逐項取用）
+
+        Returns:
+            最後一個階段的輸出，依輸入順序排列
+
+        Raises:
+            Exception: 任一階段拋出的第一個例外
+        """
+        self._states = [_StageState(stage, self.queue_size) for stage in self.stages]
+        self._results = {}
+        self._stop = threading.Event()
+        self._error = None
+        started = time.perf_counter()
+        threads = []
+        for index, state in enumerate(self._states):
+            for number in range(state.stage.workers):
+                # 每個執行緒在呼叫端 context 的副本中執行，沿用請求的追蹤
+                context = contextvars.copy_context()
+                thread = threading.Thread(
+                    target=context.run, args=(self._sampled_work, index), daemon=True,
+                    name=f'pipeline-{state.stage.name}-{number}'
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            count = 0
+            for count, item in enumerate(items, 1):
+                if not self._put(0, (count - 1, item)):
+                    break
+            for _ in range(self._states[0].stage.workers):
+                self._put(0, _DONE)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+            self._wall_seconds = time.perf_counter() - started
+            self._drain()
+
+        if self._error is not None:
+            raise self._error
+        return [self._results[index] for index in range(count)]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        最近一次執行的各階段統計
+
+        Returns:
+            {階段名稱: {busy_seconds, utilization, max_queue}}；utilization 為
+            處理時間佔（總時間 × 執行緒數）的比例，最接近 1 的階段即為瓶頸
+        """
+        summary = {}
+        for state in self._states:
+            capacity = self._wall_seconds * state.stage.workers
+            summary[state.stage.name] = {
+                'busy_seconds': round(state.busy_seconds, 6),
+                'utilization': round(state.busy_seconds / capacity, 3) if capacity > 0 else 0.0,
+                'max_queue': state.max_depth,
+            }
+        return summary
+
+    def _sampled_work(self, index: int) -> None:
+        """執行階段的工作執行緒；請求正在剖析時一併取樣此執行緒"""
+        with profiling.sampled_thread():
+            self._work(index)
+
+    def _work(self, index: int) -> None:
+        state = self._states[index]
+        stage = state.stage
+        pending: Dict[int, Any] = {}
+        next_index = 0
+        entry = None
+        PIPELINE_STAGE_WORKERS.inc(stage.name)
+        try:
+            while True:
+                entry = self._get(index)
+                if entry is None:
+                    break
+                if entry is _DONE:
+                    if pending:
+                        raise RuntimeError(f"管線階段 {stage.name} 缺少第 {next_index} 項")
+                    break
+                if not stage.ordered:
+                    if not self._process(index, *entry):
+                        break
+                    continue
+                pending[entry[0]] = entry[1]
+                while next_index in pending:
+                    if not self._process(index, next_index, pending.pop(next_index)):
+                        return
+                    next_index += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            PIPELINE_STAGE_WORKERS.dec(stage.name)
+            if entry is _DONE:
+                self._finish(index)
+
+    def _process(self, index: int, position: int, item: Any) -> bool:
+        """處理一個項目並交給下一階段；已中止時回傳 False"""
+        state = self._states[index]
+        started = time.perf_counter()
+        try:
+            output = state.stage.function(item)
+        finally:
+            seconds = time.perf_counter() - started
+            PIPELINE_STAGE_BUSY.inc(state.stage.name, amount=seconds)
+            with state.lock:
+                state.busy_seconds += seconds
+        if index + 1 == len(self._states):
+            self._results[position] = output
+            return True
+        return self._put(index + 1, (position, output))
+
+    def _finish(self, index: int) -> None:
+        """階段的最後一個執行緒結束時通知下一階段"""
+        state = self._states[index]
+        with state.lock:
+            state.finished += 1
+            last = state.finished == state.stage.workers
+        if last and index + 1 < len(self._states):
+            for _ in range(self._states[index + 1].stage.workers):
+                self._put(index + 1, _DONE)
+
+    def _put(self, index: int, entry: Any) -> bool:
+        state = self._states[index]
+        while not self._stop.is_set():
+            try:
+                state.queue.put(entry, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            if entry is not _DONE:
+                PIPELINE_QUEUE_DEPTH.inc(state.stage.name)
+                depth = state.queue.qsize()
+                with state.lock:
+                    state.max_depth = max(state.max_depth, depth)
+            return True
+        return False
+
+    def _get(self, index: int) -> Any:
+        """取出下一個項目；已中止時回傳 None"""
+        state = self._states[index]
+        while not self._stop.is_set():
+            try:
+                entry = state.queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if entry is not _DONE:
+                PIPELINE_QUEUE_DEPTH.dec(state.stage.name)
+            return entry
+        return None
+
+    def _fail(self, error: BaseException) -> None:
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+                logger.debug(f"管線中止: {str(error)}")
+        self._stop.set()
+
+    def _drain(self) -> None:
+        """中止後清空佇列，讓佇列深度指標歸零"""
+        for state in self._states:
+            while True:
+                try:
+                    entry = state.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not _DONE:
+                    PIPELINE_QUEUE_DEPTH.dec(state.stage.name)
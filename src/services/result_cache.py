@@ -0,0 +1,184 @@
+"""
+OCR 結果快取
+以檔案內容的 SHA-256 作為鍵，將 AlphaXiv 回應存在磁碟上
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 快取格式變更時遞增
+CACHE_VERSION = 1
+
+_CHUNK_SIZE = 1024 * 1024
+
+# 預設的快取大小上限（1 GB）
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def hash_bytes(data: bytes) -> str:
+    """計算位元組資料的 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """分段讀取檔案並計算 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    以內容雜湊為鍵的 OCR 結果快取
+
+    每筆結果是一個 gzip 壓縮的 JSON 檔案，以暫存檔加 os.replace 原子寫入，
+    多個行程同時讀寫同一目錄也不會讀到寫到一半的檔案。
+
+    讀取命中時更新檔案的修改時間，寫入後總大小超過上限時
+    依修改時間由舊到新刪除，即以修改時間近似最近最少使用（LRU）淘汰。
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        """
+        初始化快取
+
+        Args:
+            directory: 快取目錄
+            max_bytes: 快取總大小上限（位元組），0 表示不限制；
+                未指定時讀取 RESULT_CACHE_MAX_BYTES（預設 1 GB）
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('RESULT_CACHE_MAX_BYTES') or DEFAULT_MAX_BYTES)
+        self.directory = directory
+        self.max_bytes = max(max_bytes, 0)
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"OCR 結果快取已初始化: {directory}（上限 {self.max_bytes} 位元組）")
+
+    def path(self, key: str) -> str:
+        """取得快取檔案路徑"""
+        return os.path.join(self.directory, f"v{CACHE_VERSION}", key[:2], f"{key}.json.gz")
+
+    def contains(self, key: str) -> bool:
+        """檢查是否有快取結果"""
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        讀取快取結果
+
+        Args:
+            key: 檔案內容的 SHA-256
+
+        Returns:
+            OCR 結果，沒有快取或快取損毀時返回 None
+        """
+        path = self.path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"OCR 結果快取損毀，忽略: {key} ({e})")
+            return None
+        self._touch(path)
+        return result
+
+    def put(self, key: str, ocr_result: Dict[str, Any]) -> None:
+        """
+        寫入快取結果
+
+        Args:
+            key: 檔案內容的 SHA-256
+            ocr_result: AlphaXiv API 返回的 OCR 結果
+        """
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(gzip.compress(
+                        json.dumps(ocr_result, ensure_ascii=False).encode('utf-8'),
+                        compresslevel=6
+                    ))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"無法寫入 OCR 結果快取: {e}")
+            return
+        if self.max_bytes:
+            self._evict(keep=path)
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        """更新修改時間，標記為最近使用"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """列出目前版本的快取檔案 (修改時間, 大小, 路徑)"""
+        entries = []
+        root = os.path.join(self.directory, f"v{CACHE_VERSION}")
+        try:
+            shards = list(os.scandir(root))
+        except FileNotFoundError:
+            return entries
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith('.json.gz'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        """
+        總大小超過上限時刪除最久未使用的結果
+
+        Args:
+            keep: 剛寫入的檔案，不會被刪除
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # 其他行程已刪除
+                pass
+            except OSError as e:
+                logger.warning(f"無法刪除 OCR 結果快取: {path} ({e})")
+                continue
+            total -= size
+            evicted += 1
+        logger.info(f"OCR 結果快取超過上限，已刪除 {evicted} 筆最久未使用的結果")
@@ -0,0 +1,271 @@
+"""
+全文檢索索引
+以 SQLite FTS5 逐頁索引已處理的文件，供 /search 端點查詢
+"""
+
+import html
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# snippet() 標記，轉義 HTML 之後再換成 <mark>
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+# trigram 分詞器無法以 MATCH 查詢少於三個字元的詞
+_TRIGRAM_MIN_CHARS = 3
+
+# 摘要長度：FTS5 以詞計（trigram 每個字元一個詞，上限 64），掃描模式以字元計
+SNIPPET_TOKENS = {'trigram': 64, 'unicode61': 24}
+SNIPPET_CHARS = 160
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 全文檢索索引
+
+    每份文件的每一頁是一筆索引資料，重新處理同一個輸出檔案時整份取代。
+    優先使用 trigram 分詞器（支援中文等不以空白分詞的文字），不支援時
+    改用 unicode61。
+
+    trigram 無法以 MATCH 查詢少於三個字元的詞（多數中文詞為兩個字）。
+    查詢同時有長詞時先以 MATCH 縮小範圍再比對短詞；只有短詞時改以
+    LIKE 逐頁掃描，且只掃描最近索引的 scan_max_pages 頁，超過時結果
+    標示為 partial。
+    """
+
+    def __init__(self, db_path: str, scan_max_pages: Optional[int] = None):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 資料庫路徑
+            scan_max_pages: 只有短詞的查詢最多掃描的頁數，0 表示不掃描；
+                未提供時讀取 SEARCH_SCAN_MAX_PAGES，預設 20000
+        """
+        self.db_path = db_path
+        if scan_max_pages is None:
+            scan_max_pages = int(os.getenv('SEARCH_SCAN_MAX_PAGES') or 20000)
+        # SQLite 的負數 LIMIT 表示不限制，因此下限為 0
+        self.scan_max_pages = max(scan_max_pages, 0)
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.tokenizer = self._create_schema()
+        logger.info(f"全文檢索索引已初始化: {db_path}（{self.tokenizer}）")
+
+    def _connect(self) -> sqlite3.Connection:
+        """取得目前執行緒的連線"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> str:
+        conn = self._connect()
+        with conn:
+            # 多個 worker 同時啟動時，以寫入鎖避免重複建立資料表
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' id INTEGER PRIMARY KEY,'
+                ' output_file TEXT UNIQUE NOT NULL,'
+                ' input_file TEXT,'
+                ' num_pages INTEGER,'
+                ' indexed_at TEXT)'
+            )
+            row = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'pages'"
+            ).fetchone()
+            if row:
+                return 'trigram' if 'trigram' in row[0] else 'unicode61'
+
+            for tokenizer in ('trigram', 'unicode61'):
+                try:
+                    conn.execute(
+                        'CREATE VIRTUAL TABLE pages USING fts5('
+                        f"text, document_id UNINDEXED, page UNINDEXED, tokenize='{tokenizer}')"
+                    )
+                    return tokenizer
+                except sqlite3.OperationalError:
+                    continue
+        raise RuntimeError('SQLite 不支援 FTS5，無法建立全文檢索索引')
+
+    def index_document(self, output_file: str, pages: Iterable[str],
+                       input_file: Optional[str] = None,
+                       page_numbers: Optional[Sequence[int]] = None) -> int:
+        """
+        索引（或重新索引）一份文件
+
+        Args:
+            output_file: 輸出檔案名稱，作為文件識別
+            pages: 各頁文字，頁碼從 1 開始
+            input_file: 原始檔案名稱
+            page_numbers: 各頁在原始文件中的頁碼（只處理部分頁面時）；
+                未提供時為 1, 2, 3...
+
+        Returns:
+            索引的頁數
+        """
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                'SELECT id FROM documents WHERE output_file = ?', (output_file,)
+            ).fetchone()
+            if row:
+                document_id = row[0]
+                conn.execute('DELETE FROM pages WHERE document_id = ?', (document_id,))
+            else:
+                document_id = conn.execute(
+                    'INSERT INTO documents (output_file) VALUES (?)', (output_file,)
+                ).lastrowid
+
+            numbers = page_numbers or itertools.count(1)
+            rows = [
+                (text, document_id, page)
+                for page, text in zip(numbers, pages)
+                if text and text.strip()
+            ]
+            conn.executemany(
+                'INSERT INTO pages (text, document_id, page) VALUES (?, ?, ?)', rows
+            )
+            num_pages = max((row[2] for row in rows), default=0)
+            conn.execute(
+                'UPDATE documents SET input_file = ?, num_pages = ?, indexed_at = ? '
+                'WHERE id = ?',
+                (input_file, num_pages, datetime.now().isoformat(), document_id)
+            )
+        logger.info(f"已索引 {output_file}（{len(rows)} 頁）")
+        return len(rows)
+
+    def remove_document(self, output_file: str) -> None:
+        """從索引移除文件"""
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                'SELECT id FROM documents WHERE output_file = ?', (output_file,)
+            ).fetchone()
+            if row:
+                conn.execute('DELETE FROM pages WHERE document_id = ?', (row[0],))
+                conn.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        查詢索引
+
+        查詢字串以空白分隔為多個詞，所有詞都必須出現在同一頁；結果依
+        BM25 相關度排序（只有短詞時依索引時間由新到舊）。
+
+        Args:
+            query: 查詢字串
+            limit: 最多回傳筆數
+            offset: 略過的筆數
+
+        Returns:
+            {'total': 符合頁數, 'results': [{output_file, input_file, page, snippet, score}],
+             'partial': 是否因掃描上限而只查詢了部分頁面, 'took_ms': 查詢耗時（毫秒）}
+        """
+        start = time.perf_counter()
+        terms = query.split()
+        if not terms:
+            return {'total': 0, 'results': [], 'partial': False, 'took_ms': 0.0}
+
+        if self.tokenizer == 'trigram':
+            short = [term for term in terms if len(term) < _TRIGRAM_MIN_CHARS]
+            indexed = [term for term in terms if len(term) >= _TRIGRAM_MIN_CHARS]
+        else:
+            short, indexed = [], terms
+        scan = bool(short)
+
+        conn = self._connect()
+        conditions = []
+        params: List[Any] = []
+        partial = False
+        if indexed:
+            conditions.append('pages MATCH ?')
+            params.append(' '.join('"' + term.replace('"', '""') + '"' for term in indexed))
+        else:
+            # 沒有可用 MATCH 的詞，只掃描最近索引的頁面
+            conditions.append(
+                'pages.rowid IN (SELECT rowid FROM pages ORDER BY rowid DESC LIMIT ?)'
+            )
+            params.append(self.scan_max_pages)
+            partial = conn.execute(
+                'SELECT 1 FROM pages ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+                (self.scan_max_pages,)
+            ).fetchone() is not None
+        for term in short:
+            conditions.append("pages.text LIKE ? ESCAPE '\\'")
+            params.append('%' + self._escape_like(term) + '%')
+        where = ' AND '.join(conditions)
+
+        if scan:
+            # 短詞無法由 snippet() 標示，摘要由 Python 擷取
+            columns = 'pages.text, ' + ('bm25(pages)' if indexed else '0.0')
+        else:
+            columns = (
+                f"snippet(pages, 0, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS[self.tokenizer]}), "
+                'bm25(pages)'
+            )
+
+        total = conn.execute(
+            f'SELECT count(*) FROM pages WHERE {where}', params
+        ).fetchone()[0]
+        rows = conn.execute(
+            f'SELECT d.output_file, d.input_file, pages.page, {columns} AS score '
+            'FROM pages JOIN documents d ON d.id = pages.document_id '
+            f'WHERE {where} ORDER BY score, d.indexed_at DESC, pages.page '
+            'LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+
+        results = []
+        for output_file, input_file, page, text, score in rows:
+            if scan:
+                text = self._scan_snippet(text, terms)
+            results.append({
+                'output_file': output_file,
+                'input_file': input_file,
+                'page': page,
+                'snippet': self._format_snippet(text),
+                'score': -score,
+            })
+        return {
+            'total': total,
+            'results': results,
+            'partial': partial,
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    @staticmethod
+    def _escape_like(term: str) -> str:
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def _scan_snippet(text: str, terms: List[str]) -> str:
+        """擷取第一個符合詞附近的文字並加上標記"""
+        position = max(text.find(terms[0]), 0)
+        begin = max(position - SNIPPET_CHARS // 2, 0)
+        excerpt = text[begin:begin + SNIPPET_CHARS]
+        for term in terms:
+            excerpt = excerpt.replace(term, f'{_MARK_START}{term}{_MARK_END}')
+        prefix = '…' if begin > 0 else ''
+        suffix = '…' if begin + SNIPPET_CHARS < len(text) else ''
+        return prefix + excerpt + suffix
+
+    @staticmethod
+    def _format_snippet(text: str) -> str:
+        """壓縮空白、轉義 HTML，並將標記換成 <mark>"""
+        text = html.escape(' '.join(text.split()))
+        return text.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
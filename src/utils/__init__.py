@@ -1,8 +1,23 @@
 """
 工具函數模組
+
+各工具在第一次存取時才匯入，匯入個別子模組（例如 utils.metrics）
+不會連帶載入 Markdown 轉換器等較重的依賴。
 """
 
-from .markdown_converter import MarkdownConverter
-from .file_validator import FileValidator
+import importlib
+
+_EXPORTS = {
+    'MarkdownConverter': '.markdown_converter',
+    'MarkdownStream': '.markdown_converter',
+    'ParallelMarkdownConverter': '.parallel_converter',
+    'FileValidator': '.file_validator',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = ['MarkdownConverter', 'FileValidator']
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
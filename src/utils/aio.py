@@ -0,0 +1,39 @@
+"""
+非同步工具
+在事件迴圈的執行緒池中執行同步程式碼
+"""
+
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable, TypeVar
+
+from . import profiling
+
+T = TypeVar('T')
+
+
+async def run_sync(func: Callable[..., T], *args: Any) -> T:
+    """
+    在執行緒池中執行同步函式並等待結果
+
+    會複製目前的 contextvars（例如進行中的追蹤），讓同步程式碼記錄的
+    處理階段仍歸屬於同一個請求；請求正在堆疊取樣時也一併取樣執行的執行緒。
+
+    Args:
+        func: 同步函式
+        *args: 函式參數
+
+    Returns:
+        函式的返回值
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        None, functools.partial(context.run, _sampled, func, *args)
+    )
+
+
+def _sampled(func: Callable[..., T], *args: Any) -> T:
+    with profiling.sampled_thread():
+        return func(*args)
@@ -12,7 +12,9 @@ logger = logging.getLogger(__name__)
 class FileValidator:
     """檔案驗證類別"""
 
-    ALLOWED_EXTENSIONS = {'pdf'}
+    # 圖片（含多頁 TIFF）在上傳前打包成 PDF
+    IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'tif', 'tiff'}
+    ALLOWED_EXTENSIONS = {'pdf'} | IMAGE_EXTENSIONS
     # 從環境變數讀取最大檔案大小，預設 100 MB
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024))
 
@@ -36,6 +38,21 @@ class FileValidator:
         logger.debug(f"檔案 {filename} 副檔名檢查: {is_allowed}")
         return is_allowed
 
+    @staticmethod
+    def is_image(filename: str) -> bool:
+        """
+        檢查檔案是否為支援的圖片格式
+
+        Args:
+            filename: 檔案名稱
+
+        Returns:
+            True 如果是圖片，否則 False
+        """
+        if '.' not in filename:
+            return False
+        return filename.rsplit('.', 1)[1].lower() in FileValidator.IMAGE_EXTENSIONS
+
     @staticmethod
     def validate_file_size(file_size: int) -> Tuple[bool, str]:
         """
@@ -74,7 +91,7 @@ class FileValidator:
 
         # 檢查副檔名
         if not FileValidator.allowed_file(filename):
-            return False, f"不支援的檔案格式，僅支援: {', '.join(FileValidator.ALLOWED_EXTENSIONS)}"
+            return False, f"不支援的檔案格式，僅支援: {', '.join(sorted(FileValidator.ALLOWED_EXTENSIONS))}"
 
         # 檢查檔案大小
         is_valid, error_msg = FileValidator.validate_file_size(file_size)
@@ -0,0 +1,150 @@
+"""
+HTML 預覽產生器
+在伺服器端將 Markdown 輸出預先轉為分段的 HTML，並快取於輸出檔案旁
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+import markdown
+
+logger = logging.getLogger(__name__)
+
+# 轉換規則變更時遞增，讓舊快取失效
+RENDERER_VERSION = 1
+
+# 每段 Markdown 的目標大小（字元），前端只掛載可見的段落
+SECTION_TARGET_CHARS = 8000
+
+_FENCE_RE = re.compile(r'^(```|~~~)')
+
+
+def split_sections(markdown_text: str, target_chars: int = SECTION_TARGET_CHARS) -> List[str]:
+    """
+    在程式碼區塊以外的空行處將 Markdown 切成大小相近的段落
+
+    Args:
+        markdown_text: Markdown 內容
+        target_chars: 每段的目標大小
+
+    Returns:
+        Markdown 段落列表
+    """
+    sections = []
+    current: List[str] = []
+    size = 0
+    in_fence = False
+    for line in markdown_text.splitlines(keepends=True):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        current.append(line)
+        size += len(line)
+        if size >= target_chars and not in_fence and not line.strip():
+            sections.append(''.join(current))
+            current = []
+            size = 0
+    if current:
+        sections.append(''.join(current))
+    return sections
+
+
+class HtmlPreviewRenderer:
+    """
+    Markdown 輸出的 HTML 預覽快取
+
+    第一次請求時才轉換，結果以 gzip 壓縮的 JSON 存在 .md 檔旁，檔名包含
+    內容雜湊與轉換器版本；內容或版本改變時自動重新產生。
+    """
+
+    def __init__(self, target_chars: int = SECTION_TARGET_CHARS):
+        """
+        初始化 HTML 預覽產生器
+
+        Args:
+            target_chars: 每段的目標大小
+        """
+        self.target_chars = target_chars
+
+    def render_sections(self, markdown_text: str) -> List[str]:
+        """
+        將 Markdown 轉為分段的 HTML
+
+        Args:
+            markdown_text: Markdown 內容
+
+        Returns:
+            HTML 段落列表
+        """
+        converter = markdown.Markdown(extensions=['tables', 'fenced_code'])
+        sections = []
+        for section in split_sections(markdown_text, self.target_chars):
+            sections.append(converter.reset().convert(section))
+        return sections
+
+    def cache_path(self, markdown_path: str, content_hash: str) -> str:
+        """取得快取檔案路徑"""
+        return f"{markdown_path}.{content_hash[:16]}.v{RENDERER_VERSION}.html.json.gz"
+
+    def get_preview(self, markdown_path: str) -> Tuple[bytes, str]:
+        """
+        取得預覽（必要時才轉換）
+
+        Args:
+            markdown_path: Markdown 檔案路徑
+
+        Returns:
+            (gzip 壓縮的 JSON, ETag)
+
+        Raises:
+            FileNotFoundError: 如果 Markdown 檔案不存在
+        """
+        with open(markdown_path, 'rb') as f:
+            raw = f.read()
+        content_hash = hashlib.sha256(raw).hexdigest()
+        etag = f"{content_hash[:16]}-v{RENDERER_VERSION}"
+        path = self.cache_path(markdown_path, content_hash)
+
+        try:
+            with open(path, 'rb') as f:
+                return f.read(), etag
+        except FileNotFoundError:
+            pass
+
+        sections = self.render_sections(raw.decode('utf-8'))
+        payload: Dict[str, Any] = {
+            'version': RENDERER_VERSION,
+            'hash': content_hash,
+            'sections': sections,
+        }
+        body = gzip.compress(
+            json.dumps(payload, ensure_ascii=False).encode('utf-8'), compresslevel=6
+        )
+        self._write_cache(markdown_path, path, body)
+        logger.info(f"HTML 預覽已產生: {path}（{len(sections)} 段）")
+        return body, etag
+
+    def _write_cache(self, markdown_path: str, path: str, body: bytes) -> None:
+        """以原子方式寫入快取，並移除同一檔案的舊快取"""
+        directory = os.path.dirname(path) or '.'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"無法寫入 HTML 預覽快取: {e}")
+            return
+
+        for stale in glob.glob(glob.escape(markdown_path) + '.*.html.json.gz'):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
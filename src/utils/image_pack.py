@@ -0,0 +1,57 @@
+"""
+圖片打包工具
+將多張圖片（含多頁 TIFF）打包成一份 PDF，以一次上游請求辨識
+"""
+
+from typing import BinaryIO, List, Sequence, Union
+
+# 圖片檔案路徑或檔案物件
+ImageSource = Union[str, BinaryIO]
+
+# PDF 可直接嵌入的色彩模式，其他模式（RGBA、P、16 位元灰階等）轉為 RGB
+PDF_MODES = ('1', 'L', 'RGB', 'CMYK')
+
+
+def pack_images(sources: Sequence[ImageSource], destination: BinaryIO,
+                resolution: float = 300.0) -> List[int]:
+    """
+    將圖片依序打包成 PDF，每個影格一頁
+
+    Args:
+        sources: 圖片檔案路徑或檔案物件
+        destination: 寫入 PDF 的檔案物件
+        resolution: 圖片的 DPI，決定 PDF 頁面的實體大小
+
+    Returns:
+        每張圖片佔用的頁數（依 sources 順序）
+
+    Raises:
+        RuntimeError: 未安裝 Pillow
+        ValueError: 沒有圖片或圖片無法解析
+    """
+    try:
+        from PIL import Image, ImageSequence, UnidentifiedImageError
+    except ImportError:
+        raise RuntimeError("處理圖片需要安裝 Pillow")
+
+    if not sources:
+        raise ValueError("沒有要打包的圖片")
+
+    frames = []
+    counts = []
+    for source in sources:
+        try:
+            with Image.open(source) as image:
+                count = 0
+                for frame in ImageSequence.Iterator(image):
+                    frames.append(frame.copy() if frame.mode in PDF_MODES
+                                  else frame.convert('RGB'))
+                    count += 1
+        except UnidentifiedImageError:
+            name = source if isinstance(source, str) else getattr(source, 'name', '')
+            raise ValueError(f"無法解析圖片: {name}")
+        counts.append(count)
+
+    frames[0].save(destination, 'PDF', save_all=True, append_images=frames[1:],
+                   resolution=resolution)
+    return counts
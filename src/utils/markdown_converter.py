@@ -5,10 +5,23 @@ Markdown 轉換器
 
 import logging
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO
+
+from .pdf_pages import format_page_ranges
 
 logger = logging.getLogger(__name__)
 
+# 分頁標記（連同前後的換行一起視為頁面邊界）
+PAGE_SPLIT_RE = re.compile(r'\n*<---\s*Page\s*Split\s*--->\n*', re.IGNORECASE)
+# 圖片說明標記
+FIGURE_RE = re.compile(r'<center>FIGURE[^<]+</center>')
+# 可轉為圖像區塊的圖片說明（FIGURE 後接空白）
+FIGURE_CAPTION_RE = re.compile(r'<center>(FIGURE [^<]+)</center>')
+# 其他置中標記
+CENTER_RE = re.compile(r'<center>([^<]+)</center>')
+# iter_markdown 的第一個片段（本文之前的標題）
+MARKDOWN_HEADER = "# OCR 處理結果\n\n## 提取的文字內容\n\n"
+
 
 class MarkdownConverter:
     """將 OCR 結果轉換為 Markdown 格式"""
@@ -169,23 +182,7 @@ class MarkdownConverter:
         pattern = r'<center>(FIGURE [^<]+)</center>'
 
         def replace_figure(match):
-            figure_text = match.group(1)
-            # 分離標題和說明
-            parts = figure_text.split('.', 1)
-            if len(parts) == 2:
-                title = parts[0].strip()
-                description = parts[1].strip()
-                return (
-                    f"\n\n---\n\n### 📊 {title}\n\n"
-                    f"**說明**: {description}\n\n"
-                    "> ⚠️ *注意: 此處為圖像位置。OCR 已提取圖像中的"
-                    "文字標註，但無法提供圖像的視覺結構描述。*\n\n---\n\n"
-                )
-            else:
-                return (
-                    f"\n\n---\n\n### 📊 {figure_text}\n\n"
-                    "> ⚠️ *注意: 此處為圖像位置。*\n\n---\n\n"
-                )
+            return self._format_figure(match.group(1))
 
         text = re.sub(pattern, replace_figure, text, flags=re.DOTALL)
 
@@ -198,6 +195,33 @@ class MarkdownConverter:
 
         return text
 
+    def _format_figure(self, figure_text: str) -> str:
+        """
+        將單一圖片說明轉為 Markdown 圖像區塊
+
+        Args:
+            figure_text: <center> 標記內以「FIGURE 」開頭的文字
+
+        Returns:
+            Markdown 區塊
+        """
+        # 分離標題和說明
+        parts = figure_text.split('.', 1)
+        if len(parts) == 2:
+            title = parts[0].strip()
+            description = parts[1].strip()
+            return (
+                f"\n\n---\n\n### 📊 {title}\n\n"
+                f"**說明**: {description}\n\n"
+                "> ⚠️ *注意: 此處為圖像位置。OCR 已提取圖像中的"
+                "文字標註，但無法提供圖像的視覺結構描述。*\n\n---\n\n"
+            )
+        else:
+            return (
+                f"\n\n---\n\n### 📊 {figure_text}\n\n"
+                "> ⚠️ *注意: 此處為圖像位置。*\n\n---\n\n"
+            )
+
     def convert_to_markdown(self, ocr_result: Dict[str, Any]) -> str:
         """
         將 OCR 結果轉換為 Markdown
@@ -233,30 +257,13 @@ class MarkdownConverter:
 
                 # 添加統計信息
                 if 'num_pages' in data:
-                    markdown_lines.append("\n---\n\n")
-                    markdown_lines.append("## 📊 處理統計\n\n")
-                    markdown_lines.append(f"- **總頁數**: {data['num_pages']}\n")
-                    if 'num_successful' in data:
-                        markdown_lines.append(
-                            f"- **成功處理**: {data['num_successful']}\n"
-                        )
-
                     # 統計圖像數量
                     figure_count = len(
                         re.findall(r'<center>FIGURE', data['ocr_text'])
                     )
-                    if figure_count > 0:
-                        markdown_lines.append(
-                            f"- **圖像數量**: {figure_count}\n"
-                        )
-                        tip = (
-                            "\n> 💡 **提示**: OCR 已提取圖像中的所有"
-                            "文字標註和說明，但無法描述圖像的視覺內容"
-                            "（如流程圖結構、關係圖等）。如需圖像內容"
-                            "理解，建議使用 Vision Language Model "
-                            "(如 GPT-4V)。\n"
-                        )
-                        markdown_lines.append(tip)
+                    markdown_lines.extend(
+                        self._statistics_lines(data, figure_count)
+                    )
 
             elif 'text' in data:
                 markdown_lines.append("## 提取的文字內容\n")
@@ -316,28 +323,191 @@ class MarkdownConverter:
             markdown_lines.append("\n```\n")
 
         # 添加元資料（如果有的話）
-        if 'metadata' in ocr_result:
-            markdown_lines.append("\n---\n")
-            markdown_lines.append("## 處理資訊\n")
-            metadata = ocr_result['metadata']
-            for key, value in metadata.items():
-                markdown_lines.append(f"- **{key}**: {value}\n")
+        markdown_lines.extend(self._metadata_lines(ocr_result))
 
         result = '\n'.join(markdown_lines)
         logger.debug(f"Markdown 轉換完成，長度: {len(result)} 字元")
 
         return result
 
-    def format_text_blocks(self, text_blocks: List[Dict[str, Any]]) -> str:
+    def _statistics_lines(self, data: Dict[str, Any], figure_count: int) -> List[str]:
+        """
+        產生「處理統計」區段的各行
+
+        Args:
+            data: AlphaXiv 回應中的 data 欄位
+            figure_count: 原始文字中的圖像數量
+
+        Returns:
+            Markdown 行列表
+        """
+        lines = [
+            "\n---\n\n",
+            "## 📊 處理統計\n\n",
+            f"- **總頁數**: {data['num_pages']}\n",
+        ]
+        if 'num_successful' in data:
+            lines.append(f"- **成功處理**: {data['num_successful']}\n")
+        if data.get('page_numbers'):
+            lines.append(
+                f"- **頁面範圍**: {format_page_ranges(data['page_numbers'])}"
+                f"（原始文件共 {data.get('source_num_pages', '?')} 頁）\n"
+            )
+
+        if figure_count > 0:
+            lines.append(f"- **圖像數量**: {figure_count}\n")
+            lines.append(
+                "\n> 💡 **提示**: OCR 已提取圖像中的所有"
+                "文字標註和說明，但無法描述圖像的視覺內容"
+                "（如流程圖結構、關係圖等）。如需圖像內容"
+                "理解，建議使用 Vision Language Model "
+                "(如 GPT-4V)。\n"
+            )
+
+        return lines
+
+    def _metadata_lines(self, ocr_result: Dict[str, Any]) -> List[str]:
+        """產生「處理資訊」區段的各行（沒有 metadata 時為空）"""
+        if 'metadata' not in ocr_result:
+            return []
+
+        lines = ["\n---\n", "## 處理資訊\n"]
+        for key, value in ocr_result['metadata'].items():
+            lines.append(f"- **{key}**: {value}\n")
+        return lines
+
+    def iter_markdown(self, ocr_result: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐頁串流轉換 OCR 結果，產生 Markdown 片段
+
+        對 AlphaXiv 格式（data.ocr_text）會逐頁讀取 data.pages，只保留
+        跨頁與跨圖片說明所需的段落合併狀態，因此記憶體用量取決於單頁
+        大小而非整份文件。對格式正確的輸入（每個 <center> 標記都在下一個
+        開始前結束，標記可跨頁），所有片段串接後與 convert_to_markdown
+        的結果完全相同；未結束或巢狀的 <center>FIGURE 標記會被整份處理
+        重組成新的標記，串流輸出此時可能不同。其他格式直接輸出
+        convert_to_markdown 的結果。
+
+        Args:
+            ocr_result: AlphaXiv API 返回的 OCR 結果
+
+        Yields:
+            Markdown 片段，可直接寫入檔案或 HTTP 回應
+        """
+        data = ocr_result.get('data') if ocr_result else None
+        if not isinstance(data, dict) or 'ocr_text' not in data:
+            yield self.convert_to_markdown(ocr_result)
+            return
+
+        yield from self.render_pages(self._iter_pages(data), ocr_result)
+
+    def render_pages(self, pages: Iterable[str], ocr_result: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐頁輸出 AlphaXiv 格式的 Markdown：標題、本文與處理統計
+
+        Args:
+            pages: 各頁文字，依序取用
+            ocr_result: 提供處理統計與元資料的 OCR 結果（只讀取 data 的
+                統計欄位與 metadata，不讀取文字）
+
+        Yields:
+            Markdown 片段
+        """
+        yield MARKDOWN_HEADER
+
+        stream = MarkdownStream(self)
+        for chunk in self._iter_body(pages, stream):
+            if chunk:
+                yield chunk
+
+        yield self.markdown_tail(ocr_result, stream.figure_count)
+
+    def markdown_tail(self, ocr_result: Dict[str, Any], figure_count: int) -> str:
+        """
+        產生本文之後的處理統計與元資料（iter_markdown 的最後一個片段）
+
+        Args:
+            ocr_result: AlphaXiv 格式的 OCR 結果
+            figure_count: 本文中的圖像數量（MarkdownStream.figure_count）
+
+        Returns:
+            Markdown 片段
+        """
+        data = ocr_result['data']
+        tail_lines = ["\n"]
+        if 'num_pages' in data:
+            tail_lines.extend(
+                self._statistics_lines(data, figure_count)
+            )
+        tail_lines.extend(self._metadata_lines(ocr_result))
+        return '\n' + '\n'.join(tail_lines)
+
+    def _iter_body(self, pages: Iterable[str], stream: 'MarkdownStream') -> Iterator[str]:
+        """
+        逐頁轉換本文
+
+        Args:
+            pages: 各頁文字
+            stream: 串流轉換器，結束時 figure_count 為圖像數量
+
+        Yields:
+            Markdown 片段
+        """
+        for page_text in pages:
+            yield stream.feed(page_text)
+        yield stream.close()
+
+    def write_markdown(self, ocr_result: Dict[str, Any], stream: TextIO) -> int:
+        """
+        將 OCR 結果以串流方式寫入文字串流
+
+        Args:
+            ocr_result: AlphaXiv API 返回的 OCR 結果
+            stream: 可寫入的文字串流（檔案、HTTP 回應等）
+
+        Returns:
+            寫入的字元數
+        """
+        written = 0
+        for chunk in self.iter_markdown(ocr_result):
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+    def _iter_pages(self, data: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐頁取出 OCR 文字
+
+        優先使用 data.pages；若沒有逐頁資料，則依分頁標記切分 ocr_text。
+        """
+        pages = data.get('pages')
+        if isinstance(pages, list) and pages and all(
+            isinstance(page, str) for page in pages
+        ):
+            yield from pages
+            return
+
+        text = data['ocr_text']
+        start = 0
+        for match in PAGE_SPLIT_RE.finditer(text):
+            yield text[start:match.start()]
+            start = match.end()
+        yield text[start:]
+
+    def format_text_blocks(self, text_blocks: Any) -> str:
         """
         格式化文字區塊
 
         Args:
-            text_blocks: 文字區塊列表
+            text_blocks: 文字區塊列表，或 models.document.Document
 
         Returns:
             格式化的 Markdown 字串
         """
+        # 結構化文件模型直接輸出，不需轉成字典
+        if hasattr(text_blocks, 'to_markdown'):
+            return text_blocks.to_markdown(self)
+
         markdown_lines = []
 
         for block in text_blocks:
@@ -394,3 +564,309 @@ class MarkdownConverter:
                 lines.append(f"| {row_text} |")
 
         return "\n".join(lines)
+
+
+def _open_figure_start(text: str) -> int:
+    """
+    找出文字結尾處可能被後續文字補完的圖片說明起點
+
+    圖片說明內除了開頭與結尾標記外不含「<」，因此只需檢查最後一個
+    （或在結尾標記不完整時，倒數第二個）「<」。
+
+    Returns:
+        起點索引，沒有未完成的圖片說明時回傳 -1
+    """
+    start = text.rfind('<')
+    if start == -1:
+        return -1
+
+    tail = text[start:]
+    if '<center>FIGURE'.startswith(tail) or tail.startswith('<center>FIGURE'):
+        return start
+
+    if '</center>'.startswith(tail):
+        opening = text.rfind('<', 0, start)
+        if opening != -1 and start - opening > len('<center>FIGURE') \
+                and text.startswith('<center>FIGURE', opening):
+            return opening
+
+    return -1
+
+
+def _open_center_start(text: str) -> int:
+    """
+    找出文字結尾處可能被後續文字補完的 <center> 標記起點
+
+    Returns:
+        起點索引，沒有未完成的標記時回傳 -1
+    """
+    start = text.rfind('<')
+    if start == -1:
+        return -1
+
+    cut = -1
+    tail = text[start:]
+    if '<center>'.startswith(tail) or tail.startswith('<center>'):
+        cut = start
+
+    if len(tail) < len('</center>') and '</center>'.startswith(tail):
+        opening = text.rfind('<', 0, start)
+        if opening != -1 and start - opening > len('<center>') \
+                and text.startswith('<center>', opening):
+            cut = opening
+
+    return cut
+
+
+class MarkdownStream:
+    """
+    逐頁的 Markdown 串流轉換器
+
+    依序餵入各頁文字；輸入格式正確時（<center> 標記不巢狀且都有結束
+    標記），輸出與 MarkdownConverter._enhance_figure_markup 處理整份文字
+    相同的結果。只保留跨頁所需的狀態：
+
+    - 頁尾換行（下一頁出現時會被分頁標記吃掉）
+    - 尚未完整的圖片說明或 <center> 標記
+    - 最後一個段落元素：文字的結尾空白與最後字元，或暫留的圖片說明
+    - 圖片說明之後、足以判斷是否合併的開頭文字（到第一個單字為止）
+    """
+
+    # 合併狀態
+    _TEXT = 'text'      # 最後元素為文字，保留結尾空白
+    _FIGURE = 'figure'  # 最後元素為暫留的圖片說明，後續文字直接輸出
+    _PROBE = 'probe'    # 剛遇到圖片說明，收集後文以判斷是否合併
+
+    # snapshot() 包含的狀態欄位
+    _STATE_FIELDS = (
+        '_started', '_page_newlines', '_scan', '_mode', '_hold_ws',
+        '_last_char', '_figure', '_prev_figure', '_probe', '_center'
+    )
+
+    def __init__(self, converter: Optional[MarkdownConverter] = None,
+                 continued: bool = False):
+        """
+        初始化串流轉換器
+
+        Args:
+            converter: 提供段落合併規則的轉換器
+            continued: 是否從文件中間開始（第一頁前已有其他頁面）
+        """
+        self.converter = converter or MarkdownConverter()
+        self.figure_count = 0
+
+        # 分頁
+        self._started = continued
+        self._page_newlines = ''
+        # 圖片說明切分
+        self._scan = ''
+        # 段落合併
+        self._mode = self._TEXT
+        self._hold_ws = ''
+        self._last_char = ''
+        self._figure = ''
+        self._prev_figure = ''
+        self._probe = ''
+        # 輸出（<center> 轉換在 _drain 時進行）
+        self._center = ''
+        self._out: List[str] = []
+
+    def feed(self, page_text: str) -> str:
+        """
+        餵入一頁文字
+
+        Args:
+            page_text: 單頁 OCR 文字（data.pages 的一個元素）
+
+        Returns:
+            已可確定的 Markdown 片段（可能為空字串）
+        """
+        self.figure_count += page_text.count('<center>FIGURE')
+
+        # 頁面內若仍含分頁標記，視為多頁處理
+        if '<---' in page_text:
+            pieces = PAGE_SPLIT_RE.split(page_text)
+        else:
+            pieces = [page_text]
+
+        for piece in pieces:
+            if self._started:
+                # 分頁標記連同前後換行一起替換為一個空白
+                text = ' ' + piece.lstrip('\n')
+            else:
+                text = piece
+                self._started = True
+
+            # 頁尾換行先保留，等確定後面沒有分頁標記再輸出
+            body = text.rstrip('\n')
+            self._page_newlines = text[len(body):]
+            self._scan_text(body)
+
+        return self._drain()
+
+    def close(self) -> str:
+        """
+        結束串流，輸出剩餘內容
+
+        Returns:
+            最後的 Markdown 片段
+        """
+        newlines, self._page_newlines = self._page_newlines, ''
+        self._scan_text(newlines)
+
+        scan, self._scan = self._scan, ''
+        self._on_text(scan)
+        self._finish()
+        return self._drain(final=True)
+
+    def snapshot(self) -> tuple:
+        """
+        取得目前的跨頁狀態
+
+        兩個串流的快照相同時，後續輸入會產生完全相同的輸出。
+        """
+        return tuple(getattr(self, name) for name in self._STATE_FIELDS)
+
+    def restore(self, state: tuple) -> None:
+        """還原 snapshot() 取得的跨頁狀態"""
+        for name, value in zip(self._STATE_FIELDS, state):
+            setattr(self, name, value)
+
+    def _drain(self, final: bool = False) -> str:
+        """對已確定的文字套用 <center> 轉換，未完成的標記留待下一頁"""
+        buffer = self._center + ''.join(self._out)
+        self._out = []
+
+        cut = -1 if final else _open_center_start(buffer)
+        if cut == -1:
+            self._center = ''
+        else:
+            self._center = buffer[cut:]
+            buffer = buffer[:cut]
+        return CENTER_RE.sub(r'\n\n**\1**\n\n', buffer)
+
+    # ---- 圖片說明切分 ----
+
+    def _scan_text(self, text: str) -> None:
+        """切出完整的圖片說明，未完成的部分留待下一頁"""
+        if not text:
+            return
+
+        buffer = self._scan + text
+        position = 0
+        for match in FIGURE_RE.finditer(buffer):
+            self._on_text(buffer[position:match.start()])
+            self._on_figure(match.group(0))
+            position = match.end()
+
+        rest = buffer[position:]
+        cut = _open_figure_start(rest)
+        if cut == -1:
+            self._scan = ''
+            self._on_text(rest)
+        else:
+            self._scan = rest[cut:]
+            self._on_text(rest[:cut])
+
+    # ---- 段落合併 ----
+
+    def _on_text(self, text: str) -> None:
+        if not text:
+            return
+
+        if self._mode == self._TEXT:
+            full = self._hold_ws + text
+            core = full.rstrip()
+            if core:
+                self._emit_text(core)
+                self._last_char = core[-1]
+            self._hold_ws = full[len(core):]
+        elif self._mode == self._FIGURE:
+            # 已合併的段落不會再變動，直接輸出
+            self._emit_text(text)
+        else:
+            self._probe += text
+            self._resolve(final=False)
+
+    def _on_figure(self, figure: str) -> None:
+        if self._mode == self._PROBE:
+            # 前一個圖片說明之後的文字已結束
+            self._resolve(final=True)
+
+        if self._mode == self._FIGURE:
+            self._prev_figure = self._figure
+        else:
+            self._prev_figure = ''
+        self._figure = figure
+        self._probe = ''
+        self._mode = self._PROBE
+
+    def _finish(self) -> None:
+        if self._mode == self._PROBE:
+            self._resolve(final=True)
+
+        if self._mode == self._TEXT:
+            hold_ws, self._hold_ws = self._hold_ws, ''
+            self._emit_text(hold_ws)
+        else:
+            self._emit_figure(self._figure)
+            self._figure = ''
+
+    def _resolve(self, final: bool) -> None:
+        """收集到足夠的後文時，決定圖片說明前後是否合併"""
+        following = self._probe.lstrip()
+        if not final:
+            if not following:
+                return
+            for char in following:
+                if char.isspace():
+                    break
+            else:
+                # 第一個單字尚未結束
+                return
+
+        prev_text = self._prev_figure or self._last_char
+        should_merge = self.converter._should_merge_paragraphs(
+            prev_text, self._probe
+        )
+
+        if should_merge:
+            # 前段去除結尾空白，與後文以一個空白相接，圖片說明移到段落後
+            if self._prev_figure:
+                self._emit_figure(self._prev_figure.rstrip())
+            self._emit_text(' ' + following)
+            self._hold_ws = ''
+            self._prev_figure = ''
+            self._probe = ''
+            self._mode = self._FIGURE
+            return
+
+        if self._prev_figure:
+            self._emit_figure(self._prev_figure)
+        else:
+            self._emit_text(self._hold_ws)
+        self._hold_ws = ''
+        self._prev_figure = ''
+
+        probe, self._probe = self._probe, ''
+        if probe:
+            self._emit_figure(self._figure)
+            self._figure = ''
+            self._last_char = ''
+            self._mode = self._TEXT
+            self._on_text(probe)
+        else:
+            # 圖片說明後沒有文字，它仍是最後一個元素
+            self._mode = self._FIGURE
+
+    # ---- 圖片說明與 <center> 轉換 ----
+
+    def _emit_figure(self, figure: str) -> None:
+        match = FIGURE_CAPTION_RE.fullmatch(figure)
+        if match:
+            figure = self.converter._format_figure(match.group(1))
+        self._emit_text(figure)
+
+    def _emit_text(self, text: str) -> None:
+        if text:
+            self._out.append(text)
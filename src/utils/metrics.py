@@ -0,0 +1,501 @@
+"""
+執行指標
+以 Prometheus 文字格式輸出計數器、量表與直方圖
+
+設定 METRICS_MULTIPROC_DIR 時（gunicorn.conf.py 會自動設定），各 worker 定期將
+自己的數值寫入該目錄，/metrics 合併所有 worker 的快照，不論由哪個 worker 回應。
+"""
+
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 預設的延遲直方圖區間（秒）
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+class _Shard:
+    """單一執行緒的指標數值，只由該執行緒寫入"""
+
+    __slots__ = ('values', 'thread')
+
+    def __init__(self):
+        self.values: Dict[Tuple[str, ...], object] = {}
+        self.thread = threading.current_thread()
+
+
+class _Metric:
+    """
+    指標基底類別
+
+    每個執行緒寫入自己的分片，更新時不需要取得鎖；只有執行緒第一次
+    使用時註冊分片，以及輸出時合併分片才需要鎖。已結束執行緒的分片
+    在輸出時併入累計值後丟棄，避免每個請求一個執行緒時分片無限增加。
+    """
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired: Dict[Tuple[str, ...], object] = {}
+
+    def _values(self) -> Dict[Tuple[str, ...], object]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard.values
+
+    def _key(self, labels: Sequence[object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def _merge(self, total, value):
+        """合併兩個分片的同一組標籤；預設為數值相加，直方圖逐區間相加"""
+        return _merge_sample(self.type_name, total, value)
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        """合併所有分片"""
+        with self._lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    for key, value in list(shard.values.items()):
+                        self._retired[key] = self._merge(self._retired.get(key), value)
+            self._shards = alive
+
+            merged = dict(self._retired)
+            for shard in alive:
+                for key, value in list(shard.values.items()):
+                    merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        # 多程序模式下 multiprocess_mode='all' 的量表在最後加上 worker 的 pid
+        pairs = list(zip(self.labelnames + ('pid',), key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+    def expose(self, samples: Optional[Dict[Tuple[str, ...], object]] = None) -> List[str]:
+        """
+        輸出 Prometheus 文字格式
+
+        Args:
+            samples: 要輸出的數值，未指定時為本程序的數值
+        """
+        if samples is None:
+            samples = self.collect()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, value in sorted(samples.items()):
+            lines.extend(self._sample_lines(key, value))
+        return lines
+
+    def _sample_lines(self, key, value) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {_format_number(value)}"]
+
+
+class Counter(_Metric):
+    """只會增加的計數器"""
+
+    type_name = 'counter'
+
+    def inc(self, *labels: object, amount: float = 1.0) -> None:
+        values = self._values()
+        key = self._key(labels)
+        values[key] = values.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    """
+    可增減的量表
+
+    各執行緒記錄增減量，輸出時加總，因此可以在不同執行緒中增加與減少。
+
+    多程序模式下 multiprocess_mode 決定如何合併各 worker 的數值：
+    'sum' 加總存活 worker 的數值（進行中的數量等），
+    'all' 以 pid 標籤分別輸出每個 worker 的數值（各 worker 自己的模型狀態等）。
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 multiprocess_mode: str = 'sum'):
+        if multiprocess_mode not in ('sum', 'all'):
+            raise ValueError(f"不支援的 multiprocess_mode: {multiprocess_mode}")
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+        self._function: Optional[Callable[[], Optional[float]]] = None
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """
+        改為在輸出時呼叫函式取得數值
+
+        沒有標籤的量表回傳單一數值；有標籤時回傳 {標籤值 tuple: 數值}。
+        數值為 None 時不輸出。
+        """
+        self._function = function
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        if self._function is not None:
+            value = self._function()
+            if self.labelnames:
+                return {
+                    self._key(labels): float(sample)
+                    for labels, sample in (value or {}).items() if sample is not None
+                }
+            return {} if value is None else {(): float(value)}
+        return super().collect()
+
+    def dec(self, *labels: object, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    @contextmanager
+    def track_inprogress(self, *labels: object) -> Iterator[None]:
+        """在區塊執行期間加一"""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class Histogram(_Metric):
+    """累積區間的直方圖"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: object) -> None:
+        values = self._values()
+        key = self._key(labels)
+        counts = values.get(key)
+        if counts is None:
+            # 各區間（含 +Inf）的非累積次數，最後一格為總和
+            counts = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: object) -> Iterator[None]:
+        """記錄區塊的執行時間"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _sample_lines(self, key, value) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_number(bound)
+            lines.append(
+                f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}"
+            )
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_number(value[-1])}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+def _merge_sample(type_name: str, total, value):
+    """合併同一組標籤的兩個數值：直方圖逐區間相加，其他數值相加"""
+    if type_name == 'histogram':
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+    return (total or 0.0) + value
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+# 已結束 worker 的計數器與直方圖累計值
+_ARCHIVE_FILE = 'archive.json'
+_WORKER_PREFIX = 'worker_'
+
+
+def _read_snapshot(path: str) -> Dict[str, Any]:
+    """讀取快照檔案，不存在或損毀時視為空白"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"無法讀取指標快照，忽略: {path} ({e})")
+        return {}
+
+
+def _write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    """以暫存檔加 os.replace 原子寫入快照"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def clear_multiprocess_dir(directory: str) -> None:
+    """
+    清除先前執行留下的快照（在 gunicorn master 啟動時呼叫）
+
+    Args:
+        directory: 多程序指標目錄
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.json') or name.endswith('.tmp'):
+            os.unlink(os.path.join(directory, name))
+
+
+def mark_process_dead(pid: int, directory: str) -> None:
+    """
+    將已結束 worker 的計數器與直方圖併入累計檔案，並刪除其快照
+
+    量表只反映存活的 worker，因此不保留。只由 gunicorn master 呼叫，
+    累計檔案不會同時被多個程序寫入。
+
+    Args:
+        pid: 已結束的 worker
+        directory: 多程序指標目錄
+    """
+    path = os.path.join(directory, f"{_WORKER_PREFIX}{pid}.json")
+    snapshot = _read_snapshot(path)
+    if snapshot:
+        archive_path = os.path.join(directory, _ARCHIVE_FILE)
+        archive = _read_snapshot(archive_path)
+        for name, data in snapshot.items():
+            if data['type'] == 'gauge':
+                continue
+            entry = archive.setdefault(name, {'type': data['type'], 'samples': []})
+            merged = {tuple(key): value for key, value in entry['samples']}
+            for key, value in data['samples']:
+                merged[tuple(key)] = _merge_sample(data['type'], merged.get(tuple(key)), value)
+            entry['samples'] = [[list(key), value] for key, value in merged.items()]
+        _write_snapshot(archive_path, archive)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class MetricsRegistry:
+    """指標登錄表"""
+
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        """
+        初始化登錄表
+
+        Args:
+            multiprocess_dir: 多程序指標目錄；指定時輸出合併所有 worker 的快照
+        """
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir = multiprocess_dir
+        self._writer: Optional[threading.Thread] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              multiprocess_mode: str = 'sum') -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, multiprocess_mode))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """本程序所有指標的數值（可序列化為 JSON）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                'type': metric.type_name,
+                'samples': [[list(key), value] for key, value in metric.collect().items()],
+            }
+            for metric in metrics
+        }
+
+    def write_snapshot(self) -> None:
+        """將本程序的數值寫入多程序指標目錄"""
+        if not self.multiprocess_dir:
+            return
+        path = os.path.join(self.multiprocess_dir, f"{_WORKER_PREFIX}{os.getpid()}.json")
+        try:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            _write_snapshot(path, self.snapshot())
+        except OSError as e:
+            logger.warning(f"無法寫入指標快照: {e}")
+
+    def start_writer(self, interval: Optional[float] = None) -> None:
+        """
+        在背景定期寫入快照（在 worker 啟動後呼叫）
+
+        其他 worker 回應 /metrics 時看到的數值最多落後 interval 秒。
+
+        Args:
+            interval: 寫入間隔秒數，未指定時讀取 METRICS_WRITE_INTERVAL（預設 5）
+        """
+        if not self.multiprocess_dir or self._writer is not None:
+            return
+        if interval is None:
+            interval = float(os.getenv('METRICS_WRITE_INTERVAL') or 5)
+
+        def run():
+            while True:
+                self.write_snapshot()
+                time.sleep(interval)
+
+        self._writer = threading.Thread(target=run, name='metrics-writer', daemon=True)
+        self._writer.start()
+
+    def _collect_all(self) -> Dict[str, Dict[Tuple[str, ...], object]]:
+        """合併所有 worker 的快照與已結束 worker 的累計值"""
+        self.write_snapshot()
+        merged: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        with self._lock:
+            metrics = dict(self._metrics)
+
+        for name in sorted(os.listdir(self.multiprocess_dir)):
+            if name == _ARCHIVE_FILE:
+                pid = None
+            elif name.startswith(_WORKER_PREFIX) and name.endswith('.json'):
+                pid = name[len(_WORKER_PREFIX):-len('.json')]
+            else:
+                continue
+            for metric_name, data in _read_snapshot(
+                os.path.join(self.multiprocess_dir, name)
+            ).items():
+                metric = metrics.get(metric_name)
+                if metric is None or metric.type_name != data['type']:
+                    continue
+                samples = merged.setdefault(metric_name, {})
+                for key, value in data['samples']:
+                    key = tuple(key)
+                    if getattr(metric, 'multiprocess_mode', 'sum') == 'all' and pid is not None:
+                        key += (pid,)
+                    samples[key] = metric._merge(samples.get(key), value)
+        return merged
+
+    def expose(self) -> str:
+        """輸出所有指標（多程序模式下為所有 worker 的合計）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        merged = self._collect_all() if self.multiprocess_dir else None
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose(None if merged is None else merged.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+# Prometheus 文字格式的 Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = MetricsRegistry(os.getenv('METRICS_MULTIPROC_DIR') or None)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'ocr_http_requests_total', 'HTTP 請求數', ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'ocr_http_request_duration_seconds', 'HTTP 請求處理時間', ('endpoint',)
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'ocr_http_requests_in_flight', '處理中的 HTTP 請求數'
+)
+HTTP_BYTES = REGISTRY.counter(
+    'ocr_http_bytes_total', 'HTTP 請求與回應的位元組數', ('direction',)
+)
+
+# 處理階段：upload_receive, disk_save, upstream_call, json_decode,
+# markdown_conversion, output_write
+STAGE_SECONDS = REGISTRY.histogram(
+    'ocr_stage_duration_seconds', '各處理階段的耗時', ('stage',)
+)
+STAGE_IN_FLIGHT = REGISTRY.gauge(
+    'ocr_stage_in_flight', '各處理階段進行中的數量', ('stage',)
+)
+
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    'ocr_upstream_responses_total', 'AlphaXiv API 回應數（依狀態碼）', ('status',)
+)
+UPSTREAM_BYTES = REGISTRY.counter(
+    'ocr_upstream_bytes_total', '與 AlphaXiv API 傳輸的位元組數', ('direction',)
+)
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    'ocr_result_cache_lookups_total', 'OCR 結果快取查詢數（hit 或 miss）', ('result',)
+)
+
+PAGES_PROCESSED = REGISTRY.counter(
+    'ocr_pages_processed_total', '已處理的頁數'
+)
+UPLOAD_BYTES_SAVED = REGISTRY.counter(
+    'ocr_upload_bytes_saved_total', '上傳前 PDF 瘦身減少的位元組數'
+)
+PAGE_RETRIES = REGISTRY.counter(
+    'ocr_page_retries_total', '重新送出的失敗頁數（recovered 或 failed）', ('result',)
+)
+PAGES_PER_SECOND = REGISTRY.histogram(
+    'ocr_document_pages_per_second', '每份文件的處理速度（頁/秒）',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0)
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """記錄處理階段的耗時與進行中數量"""
+    STAGE_IN_FLIGHT.inc(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
+        STAGE_IN_FLIGHT.dec(name)
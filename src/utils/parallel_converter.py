@@ -0,0 +1,178 @@
+"""
+平行 Markdown 轉換器
+將超大型 OCR 結果分段交由多個行程轉換
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .markdown_converter import MarkdownConverter, MarkdownStream
+
+logger = logging.getLogger(__name__)
+
+
+def _convert_segment(converter: MarkdownConverter, pages: List[str],
+                     continued: bool) -> Tuple[List[str], List[tuple], int]:
+    """
+    在子行程中轉換一段連續頁面
+
+    子行程不知道前一段結束時的狀態，因此從空白狀態開始轉換，並記錄
+    每頁之後的狀態快照，供主行程在段落接縫處比對。
+
+    Args:
+        converter: 提供段落合併規則的轉換器
+        pages: 此段的頁面文字
+        continued: 此段之前是否還有其他頁面
+
+    Returns:
+        (每頁的 Markdown 片段, 每頁之後的狀態快照, 圖像數量)
+    """
+    stream = MarkdownStream(converter, continued=continued)
+    chunks = []
+    states = []
+    for page_text in pages:
+        chunks.append(stream.feed(page_text))
+        states.append(stream.snapshot())
+    return chunks, states, stream.figure_count
+
+
+def _partition(pages: List[str], count: int) -> List[List[str]]:
+    """依字元數將頁面切成大致相等的連續區段"""
+    total = sum(len(page) for page in pages)
+    target = total / count
+    segments = []
+    current = []
+    size = 0
+    for page_text in pages:
+        current.append(page_text)
+        size += len(page_text)
+        if size >= target * (len(segments) + 1) and len(segments) < count - 1:
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+    return segments
+
+
+class ParallelMarkdownConverter(MarkdownConverter):
+    """
+    超過大小門檻時以多行程轉換的 Markdown 轉換器
+
+    各段由子行程從空白狀態轉換；主行程以真正的前段狀態重新轉換每段
+    開頭的頁面，直到狀態快照與子行程一致，之後直接採用子行程的輸出。
+    若始終無法一致，該段完全由主行程轉換，因此結果必定與逐頁轉換相同。
+    """
+
+    def __init__(self, min_parallel_chars: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        """
+        初始化平行轉換器
+
+        Args:
+            min_parallel_chars: 啟用平行轉換的最小文字量（字元），避免小文件
+                負擔行程池開銷；未提供時讀取 MARKDOWN_PARALLEL_MIN_CHARS
+            max_workers: 行程數；未提供時讀取 MARKDOWN_PARALLEL_WORKERS，
+                皆未設定則依 CPU 數量決定
+        """
+        if min_parallel_chars is None:
+            min_parallel_chars = int(
+                os.getenv('MARKDOWN_PARALLEL_MIN_CHARS', 2 * 1024 * 1024)
+            )
+        self.min_parallel_chars = min_parallel_chars
+        self.max_workers = (
+            max_workers
+            or int(os.getenv('MARKDOWN_PARALLEL_WORKERS', 0))
+            or min(os.cpu_count() or 1, 8)
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 傳給子行程時不包含行程池
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        """關閉行程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 在多執行緒的伺服器中 fork 並不安全，統一使用 spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"平行轉換行程池已建立，行程數: {self.max_workers}")
+            return self._executor
+
+    def _iter_body(self, pages: Iterable[str], stream: MarkdownStream) -> Iterator[str]:
+        pages = list(pages)
+        total_chars = sum(len(page) for page in pages)
+        if (self.max_workers < 2 or len(pages) < 2
+                or total_chars < self.min_parallel_chars):
+            yield from super()._iter_body(pages, stream)
+            return
+
+        segments = _partition(pages, min(self.max_workers * 2, len(pages)))
+        logger.info(
+            f"平行轉換 {len(pages)} 頁（{total_chars} 字元），分為 {len(segments)} 段"
+        )
+        yield from self._iter_segments(segments, stream)
+
+    def _iter_segments(self, segments: List[List[str]],
+                       stream: MarkdownStream) -> Iterator[str]:
+        """依序接合各段的轉換結果"""
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_convert_segment, self, segment, index > 0)
+                for index, segment in enumerate(segments)
+            ]
+        except Exception as e:
+            logger.warning(f"無法啟動平行轉換，改為逐頁轉換: {str(e)}")
+            futures = [None] * len(segments)
+
+        figure_count = 0
+        for index, (segment, future) in enumerate(zip(segments, futures)):
+            try:
+                if future is None:
+                    raise RuntimeError('行程池無法使用')
+                chunks, states, segment_figures = future.result()
+            except Exception as e:
+                logger.warning(f"第 {index + 1} 段平行轉換失敗，改由主行程轉換: {str(e)}")
+                for page_text in segment:
+                    yield stream.feed(page_text)
+                figure_count += stream.figure_count
+                stream.figure_count = 0
+                continue
+
+            figure_count += segment_figures
+            # 接縫修正：以真正的前段狀態重新轉換，直到與子行程狀態一致
+            synced = index == 0
+            for position, page_text in enumerate(segment):
+                if synced:
+                    yield chunks[position]
+                    continue
+                yield stream.feed(page_text)
+                synced = stream.snapshot() == states[position]
+            if synced:
+                stream.restore(states[-1])
+            stream.figure_count = 0
+
+        yield stream.close()
+        stream.figure_count = figure_count
@@ -0,0 +1,118 @@
+"""
+上傳前的 PDF 瘦身
+重寫 PDF 時去除 OCR 用不到的內容：縮圖、XMP 中繼資料、增量更新歷史、
+頁面未使用的圖片與重複的物件，並可將解析度過高的頁面圖片縮小
+"""
+
+import logging
+from typing import BinaryIO, Optional, Sequence
+
+from .pdf_pages import PdfSource
+
+logger = logging.getLogger(__name__)
+
+# 頁面上 OCR 用不到的項目：縮圖、XMP 中繼資料與編輯程式的私有資料
+_PAGE_EXTRAS = ('/Thumb', '/Metadata', '/PieceInfo')
+
+# 縮圖重新壓縮的 JPEG 品質
+JPEG_QUALITY = 85
+
+
+def optimize_pdf(source: PdfSource, destination: BinaryIO,
+                 pages: Optional[Sequence[int]] = None,
+                 target_dpi: Optional[int] = None) -> None:
+    """
+    重寫 PDF 並去除 OCR 用不到的內容
+
+    只複製頁面引用的物件，文件層級的中繼資料、書籤與增量更新歷史不會
+    寫入；內容相同的物件合併為一份，頁面資源中內容串流沒有使用的圖片
+    一併移除。
+
+    Args:
+        source: 原始 PDF 檔案路徑或檔案物件
+        destination: 寫入新 PDF 的檔案物件
+        pages: 只保留這些頁碼（從 1 開始），未提供時保留全部頁面
+        target_dpi: 頁面圖片解析度超過此值時縮小（需要 Pillow），未提供時不縮小
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        raise RuntimeError("PDF 瘦身需要安裝 pypdf")
+
+    reader = PdfReader(source)
+    writer = PdfWriter()
+    if pages is None:
+        pages = range(1, len(reader.pages) + 1)
+    for page in pages:
+        writer.add_page(reader.pages[page - 1])
+
+    for page in writer.pages:
+        _strip_page(page)
+        page.compress_content_streams()
+        if target_dpi:
+            _downsample_images(page, target_dpi)
+
+    # add_page 已複製的未使用圖片成為孤立物件，在此一併移除
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    writer.write(destination)
+
+
+def _strip_page(page) -> None:
+    """移除頁面的縮圖、中繼資料與內容串流未使用的圖片"""
+    from pypdf.generic import DictionaryObject, NameObject
+
+    for key in _PAGE_EXTRAS:
+        if key in page:
+            del page[NameObject(key)]
+
+    resources = page.get('/Resources')
+    resources = resources.get_object() if resources is not None else None
+    xobjects = resources.get('/XObject') if isinstance(resources, dict) else None
+    xobjects = xobjects.get_object() if xobjects is not None else None
+    if not isinstance(xobjects, dict) or not xobjects:
+        return
+
+    # 許多掃描器產生的 PDF 讓所有頁面共用同一份資源，每頁都帶著全部圖片；
+    # 只保留名稱出現在內容串流中的圖片（子字串比對，寧可多留不可誤刪）
+    contents = page.get_contents()
+    data = contents.get_data() if contents is not None else b''
+    used = {
+        name: value for name, value in dict.items(xobjects)
+        if name.encode('latin-1') in data
+    }
+    if len(used) == len(xobjects):
+        return
+    # 資源可能被其他頁面共用，以新的字典取代而不修改原本的物件
+    page_resources = DictionaryObject(dict.items(resources))
+    page_resources[NameObject('/XObject')] = DictionaryObject(used)
+    page[NameObject('/Resources')] = page_resources
+
+
+def _downsample_images(page, target_dpi: int) -> None:
+    """
+    將解析度超過 target_dpi 的頁面圖片縮小
+
+    以圖片寬度除以頁面寬度估計解析度；圖片實際顯示得比頁面小時估計值
+    偏低，只會少縮小、不會縮到低於目標解析度。無法解碼的圖片（例如
+    JBIG2）維持原樣。
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("縮小圖片需要安裝 Pillow，略過")
+        return
+
+    page_inches = float(page.mediabox.width) / 72
+    if page_inches <= 0:
+        return
+    for image_file in page.images:
+        try:
+            image = image_file.image
+            dpi = image.width / page_inches
+            if dpi <= target_dpi:
+                continue
+            scale = target_dpi / dpi
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image_file.replace(image.resize(size, Image.LANCZOS), quality=JPEG_QUALITY)
+        except Exception as e:
+            logger.debug(f"無法縮小圖片 {image_file.name}: {str(e)}")
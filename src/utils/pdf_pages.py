@@ -0,0 +1,141 @@
+"""
+PDF 頁面選擇
+解析 pages= 頁面範圍（例如 1-5,9,12-），並擷取指定頁面為新的 PDF
+"""
+
+import re
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union
+
+_RANGE_RE = re.compile(r'^(\d*)\s*(-?)\s*(\d*)$')
+
+PdfSource = Union[str, BinaryIO]
+
+
+def parse_page_spec(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    解析頁面範圍字串
+
+    支援單頁（9）、範圍（1-5）、到文件結尾（12-）與從第一頁開始（-3），
+    以逗號分隔，頁碼從 1 開始。
+
+    Args:
+        spec: 頁面範圍字串
+
+    Returns:
+        [(起始頁, 結束頁)]，結束頁為 None 表示到文件結尾
+
+    Raises:
+        ValueError: 格式錯誤
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE_RE.match(part)
+        if not match or not (match.group(1) or match.group(3)):
+            raise ValueError(f"無效的頁面範圍: {part}")
+        start_text, dash, end_text = match.groups()
+        start = int(start_text) if start_text else 1
+        if not dash:
+            end: Optional[int] = start
+        else:
+            end = int(end_text) if end_text else None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"無效的頁面範圍: {part}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError("頁面範圍不可為空白")
+    return ranges
+
+
+def select_pages(spec: str, num_pages: int) -> List[int]:
+    """
+    依頁面範圍取得實際的頁碼
+
+    Args:
+        spec: 頁面範圍字串
+        num_pages: 文件頁數
+
+    Returns:
+        排序且不重複的頁碼（從 1 開始）
+
+    Raises:
+        ValueError: 格式錯誤，或範圍超出文件頁數
+    """
+    pages = set()
+    for start, end in parse_page_spec(spec):
+        if start > num_pages:
+            raise ValueError(f"頁面範圍超出文件頁數（共 {num_pages} 頁）: {start}")
+        pages.update(range(start, min(end or num_pages, num_pages) + 1))
+    return sorted(pages)
+
+
+def format_page_ranges(pages: Sequence[int]) -> str:
+    """將頁碼列表轉為精簡的範圍字串，例如 [1, 2, 3, 9] -> '1-3,9'"""
+    parts = []
+    index = 0
+    while index < len(pages):
+        start = end = pages[index]
+        while index + 1 < len(pages) and pages[index + 1] == end + 1:
+            index += 1
+            end = pages[index]
+        parts.append(str(start) if start == end else f"{start}-{end}")
+        index += 1
+    return ','.join(parts)
+
+
+def _reader(source: PdfSource):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("選擇頁面需要安裝 pypdf")
+    return PdfReader(source)
+
+
+def count_pages(source: PdfSource) -> int:
+    """
+    取得 PDF 頁數
+
+    Args:
+        source: PDF 檔案路徑或檔案物件
+    """
+    return len(_reader(source).pages)
+
+
+def extract_pages(source: PdfSource, pages: Sequence[int], destination: BinaryIO) -> None:
+    """
+    將指定頁面寫成新的 PDF
+
+    只複製選取頁面引用的物件（內容串流、字型、圖片），未選取頁面的
+    圖片不會上傳。
+
+    Args:
+        source: 原始 PDF 檔案路徑或檔案物件
+        pages: 頁碼（從 1 開始）
+        destination: 寫入新 PDF 的檔案物件
+    """
+    from pypdf import PdfWriter
+
+    reader = _reader(source)
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page - 1])
+    writer.write(destination)
+
+
+def concat_pdfs(sources: Sequence[PdfSource], destination: BinaryIO) -> None:
+    """
+    依序串接多份 PDF
+
+    Args:
+        sources: PDF 檔案路徑或檔案物件
+        destination: 寫入新 PDF 的檔案物件
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for source in sources:
+        for page in _reader(source).pages:
+            writer.add_page(page)
+    writer.write(destination)
@@ -0,0 +1,243 @@
+"""
+請求剖析
+依需求以 cProfile 或堆疊取樣剖析單一請求，將結果寫入剖析目錄
+"""
+
+import cProfile
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sample')
+
+# 進行中的剖析（模式, 堆疊取樣器）；管線等以 contextvars 複製 context 的執行緒也看得到
+_active: ContextVar[Optional[Tuple[str, Optional['StackSampler']]]] = ContextVar(
+    'active_profile', default=None
+)
+
+
+class StackSampler:
+    """
+    堆疊取樣剖析器
+
+    背景執行緒每隔固定時間記錄目標執行緒的呼叫堆疊，輸出 flamegraph.pl、
+    speedscope 等工具可讀取的 folded stacks 格式。開銷只與取樣頻率有關，
+    不受被剖析程式碼的呼叫次數影響。
+
+    目標為呼叫 start() 的執行緒，以及以 add_thread() 加入的執行緒（例如分段
+    管線的各階段）；後者的堆疊以執行緒名稱為根，火焰圖中可分開檢視。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._targets: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._targets[threading.get_ident()] = ''
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def add_thread(self) -> None:
+        """開始取樣目前的執行緒"""
+        with self._lock:
+            self._targets[threading.get_ident()] = threading.current_thread().name
+
+    def remove_thread(self) -> None:
+        """停止取樣目前的執行緒"""
+        with self._lock:
+            self._targets.pop(threading.get_ident(), None)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for ident, label in targets:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    filename = os.path.basename(code.co_filename)
+                    stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    if label:
+                        stack.append(label)
+                    self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def active_mode() -> Optional[str]:
+    """目前 context 中進行中的剖析模式，沒有時為 None"""
+    active = _active.get()
+    return active[0] if active else None
+
+
+@contextmanager
+def sampled_thread() -> Iterator[None]:
+    """
+    讓目前執行緒加入進行中的堆疊取樣
+
+    用於在請求期間替請求工作的執行緒（管線各階段、執行緒池），執行緒須
+    在請求 context 的副本中執行；沒有進行中的堆疊取樣時不做任何事。
+    """
+    active = _active.get()
+    sampler = active[1] if active else None
+    if sampler is None:
+        yield
+        return
+    sampler.add_thread()
+    try:
+        yield
+    finally:
+        sampler.remove_thread()
+
+
+class RequestProfiler:
+    """
+    請求剖析設定
+
+    PROFILE_ENABLED=true 時依 PROFILE_SAMPLE_RATE 的比例剖析請求；
+    另外，設定 PROFILE_ADMIN_TOKEN 後，帶有相符 X-Profile 標頭的請求一律
+    剖析，方便管理員針對單一文件調查。同一時間只有一個 cProfile 剖析
+    （Python 的決定性剖析器無法同時啟用多個），忙碌時改用堆疊取樣。
+
+    cProfile 只記錄呼叫的執行緒；堆疊取樣另外涵蓋以 sampled_thread() 加入的
+    執行緒。請求結束後才完成的背景工作以 profile_mode() 另外剖析。
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('PROFILE_ENABLED', 'false').lower() == 'true'
+        self.directory = os.getenv('PROFILE_DIR') or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            'profiles'
+        )
+        self.sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', 0.01))
+        self.mode = os.getenv('PROFILE_MODE', 'sample')
+        if self.mode not in MODES:
+            self.mode = 'sample'
+        self.interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+        self.admin_token = os.getenv('PROFILE_ADMIN_TOKEN') or None
+        self._cprofile_lock = threading.Lock()
+
+    def select_mode(self, header: Optional[str] = None,
+                    requested_mode: Optional[str] = None) -> Optional[str]:
+        """
+        決定是否剖析此請求
+
+        Args:
+            header: X-Profile 標頭（管理員權杖）
+            requested_mode: X-Profile-Mode 標頭（cprofile 或 sample）
+
+        Returns:
+            剖析模式，不剖析時返回 None
+        """
+        if header and self.admin_token and hmac.compare_digest(header, self.admin_token):
+            return requested_mode if requested_mode in MODES else self.mode
+        if self.enabled and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    @contextmanager
+    def profile(self, name: str, header: Optional[str] = None,
+                requested_mode: Optional[str] = None) -> Iterator[Optional[str]]:
+        """
+        依設定與標頭決定是否剖析區塊並寫入檔案
+
+        Args:
+            name: 剖析名稱（例如 upload），用於檔名
+            header: X-Profile 標頭
+            requested_mode: X-Profile-Mode 標頭
+
+        Yields:
+            剖析檔案路徑，不剖析時為 None
+        """
+        with self.profile_mode(name, self.select_mode(header, requested_mode)) as path:
+            yield path
+
+    @contextmanager
+    def profile_mode(self, name: str, mode: Optional[str]) -> Iterator[Optional[str]]:
+        """
+        以指定模式剖析區塊並寫入檔案（例如延續請求剖析的背景工作）
+
+        Args:
+            name: 剖析名稱，用於檔名
+            mode: cprofile 或 sample；None 時不剖析
+
+        Yields:
+            剖析檔案路徑，不剖析時為 None
+        """
+        if mode == 'cprofile' and not self._cprofile_lock.acquire(blocking=False):
+            logger.info("已有進行中的 cProfile 剖析，改用堆疊取樣")
+            mode = 'sample'
+        if mode is None:
+            yield None
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        suffix = 'prof' if mode == 'cprofile' else 'folded'
+        path = os.path.join(self.directory, f"{stamp}_{name}.{suffix}")
+
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # 已有其他剖析工具（例如除錯器）啟用
+                self._cprofile_lock.release()
+                logger.warning(f"無法啟用 cProfile: {e}")
+                yield None
+                return
+            tracing.annotate('profile', os.path.basename(path))
+            token = _active.set((mode, None))
+            try:
+                yield path
+            finally:
+                _active.reset(token)
+                profiler.disable()
+                profiler.dump_stats(path)
+                self._cprofile_lock.release()
+        else:
+            sampler = StackSampler(self.interval)
+            sampler.start()
+            tracing.annotate('profile', os.path.basename(path))
+            token = _active.set((mode, sampler))
+            try:
+                yield path
+            finally:
+                _active.reset(token)
+                sampler.stop()
+                sampler.dump(path)
+
+        logger.info(
+            f"剖析結果已寫入: {path}（{mode}，{time.perf_counter() - started:.2f} 秒）"
+        )
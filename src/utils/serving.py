@@ -0,0 +1,106 @@
+"""
+正式環境服務設定
+依可用的 CPU 與記憶體決定 gunicorn 的 worker 數與每個 worker 的執行緒數
+"""
+
+import os
+from typing import Optional
+
+# 每個 worker 預估使用的記憶體（Flask、OCR 結果與 Markdown 轉換的暫存）
+DEFAULT_WORKER_MEMORY_MB = 256
+
+# 執行緒數除了 OCR 名額與排隊數之外，再保留給健康檢查、指標與下載
+SPARE_THREADS = 4
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """
+    可用的 CPU 數
+
+    考慮 CPU affinity 與 cgroup v2 的 cpu.max 配額（容器限制）。
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _read('/sys/fs/cgroup/cpu.max')
+    if quota:
+        limit, _, period = quota.partition(' ')
+        if limit != 'max' and period:
+            cpus = min(cpus, max(1, int(int(limit) / int(period))))
+    return max(cpus, 1)
+
+
+def available_memory() -> Optional[int]:
+    """
+    可用的記憶體（位元組），無法判斷時返回 None
+
+    取 /proc/meminfo 的 MemAvailable 與 cgroup v2 memory.max 中較小者。
+    """
+    candidates = []
+    meminfo = _read('/proc/meminfo')
+    if meminfo:
+        for line in meminfo.splitlines():
+            if line.startswith('MemAvailable:'):
+                candidates.append(int(line.split()[1]) * 1024)
+                break
+
+    limit = _read('/sys/fs/cgroup/memory.max')
+    if limit and limit != 'max':
+        usage = _read('/sys/fs/cgroup/memory.current')
+        candidates.append(int(limit) - int(usage or 0))
+
+    return min(candidates) if candidates else None
+
+
+def default_workers(cpus: Optional[int] = None, memory: Optional[int] = None,
+                    worker_memory_mb: Optional[int] = None) -> int:
+    """
+    預設 worker 數
+
+    OCR 請求大部分時間在等待上游，每個 worker 以執行緒處理並行請求，
+    因此 worker 數依 CPU 取 2 × CPU + 1，並以記憶體可容納的數量為上限。
+
+    Args:
+        cpus: CPU 數，未提供時自動偵測
+        memory: 可用記憶體（位元組），未提供時自動偵測
+        worker_memory_mb: 每個 worker 預估記憶體；未提供時讀取
+            WORKER_MEMORY_MB，預設 256
+
+    Returns:
+        worker 數
+    """
+    cpus = cpus or available_cpus()
+    if memory is None:
+        memory = available_memory()
+    worker_memory_mb = worker_memory_mb or int(
+        os.getenv('WORKER_MEMORY_MB') or DEFAULT_WORKER_MEMORY_MB
+    )
+
+    workers = 2 * cpus + 1
+    if memory is not None:
+        workers = min(workers, memory // (worker_memory_mb * 1024 * 1024))
+    return max(int(workers), 1)
+
+
+def default_threads() -> int:
+    """
+    預設每個 worker 的執行緒數
+
+    排隊中的 OCR 請求也佔用執行緒，因此為 MAX_CONCURRENT_OCR 加上
+    MAX_QUEUED_OCR，再保留幾個執行緒，讓 worker 忙碌時仍能回應健康檢查。
+    """
+    return (
+        int(os.getenv('MAX_CONCURRENT_OCR', 8))
+        + int(os.getenv('MAX_QUEUED_OCR', 32))
+        + SPARE_THREADS
+    )
@@ -0,0 +1,309 @@
+"""
+請求追蹤
+記錄每個請求各處理階段的耗時，並可輸出 OpenTelemetry (OTLP/JSON) 格式的 span
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'deepseek-ocr'
+
+_current: ContextVar[Optional['Trace']] = ContextVar('current_trace', default=None)
+# 目前的上層 span（追蹤, span）；各執行緒以 contextvars 複製的 context 各自保存，
+# 平行的階段不會互相成為上層
+_parent: ContextVar[Optional[tuple]] = ContextVar('current_span', default=None)
+
+
+class Span:
+    """單一處理階段"""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes')
+
+    def __init__(self, name: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+
+    @property
+    def seconds(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+
+class Trace:
+    """
+    一個請求的追蹤資料
+
+    以 begin() 取得目前的追蹤；巢狀呼叫（例如 /upload 內的
+    process_document）共用同一個追蹤，最外層 finish() 時才結束並輸出。
+    同一個追蹤可由多個執行緒同時記錄（例如分段管線的各階段）。
+    """
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, attributes=attributes)
+        self.spans: List[Span] = []
+        self.stages: Dict[str, float] = {}
+        self.attributes: Dict[str, Any] = {
+            'upstream_attempts': 0, 'bytes_sent': 0, 'bytes_received': 0
+        }
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._token = None
+
+    def _parent_id(self) -> str:
+        current = _parent.get()
+        if current is not None and current[0] is self:
+            return current[1].span_id
+        return self.root.span_id
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """記錄一個處理階段"""
+        span = Span(name, self._parent_id(), attributes)
+        token = _parent.set((self, span))
+        try:
+            yield span
+        finally:
+            span.end_ns = time.time_ns()
+            _parent.reset(token)
+            self._add(span, span.seconds)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """加入在其他地方量測的階段耗時（例如交錯進行的轉換與寫入）"""
+        span = Span(name, self._parent_id())
+        span.end_ns = span.start_ns
+        span.start_ns -= int(seconds * 1e9)
+        self._add(span, seconds)
+
+    def _add(self, span: Span, seconds: float) -> None:
+        with self._lock:
+            self.spans.append(span)
+            self.stages[span.name] = self.stages.get(span.name, 0.0) + seconds
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.attributes[key] = value
+
+    def increment(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def summary(self) -> Dict[str, Any]:
+        """輸出放入處理結果 metadata 的耗時明細"""
+        with self._lock:
+            return {
+                'trace_id': self.trace_id,
+                'total_seconds': round(self.root.seconds, 6),
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                **self.attributes
+            }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """轉為 OTLP/JSON 格式"""
+        spans = []
+        with self._lock:
+            recorded = [self.root] + self.spans
+            attributes = dict(self.attributes)
+        for span in recorded:
+            entry = {
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns or time.time_ns()),
+                'attributes': _otlp_attributes(
+                    dict(span.attributes, **attributes) if span is self.root
+                    else span.attributes
+                ),
+            }
+            if span.parent_id:
+                entry['parentSpanId'] = span.parent_id
+            spans.append(entry)
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': SERVICE_NAME})},
+                'scopeSpans': [{'scope': {'name': SERVICE_NAME}, 'spans': spans}]
+            }]
+        }
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        result.append({'key': key, 'value': typed})
+    return result
+
+
+class TraceExporter:
+    """
+    追蹤輸出器
+
+    TRACE_FILE：每個追蹤以一行 OTLP/JSON 附加到檔案
+    TRACE_ENDPOINT：以 OTLP/HTTP JSON 送到收集器（例如 http://localhost:4318/v1/traces），
+        由背景執行緒傳送，不延遲請求
+    TRACE_SLOW_SECONDS：只輸出總耗時超過此秒數的追蹤（預設 0，全部輸出）
+    """
+
+    def __init__(self, file_path: Optional[str] = None, endpoint: Optional[str] = None,
+                 slow_seconds: float = 0.0):
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        if endpoint:
+            self._queue = queue.Queue(maxsize=1000)
+            threading.Thread(target=self._send_loop, name='trace-exporter', daemon=True).start()
+
+    @classmethod
+    def from_env(cls) -> 'TraceExporter':
+        return cls(
+            file_path=os.getenv('TRACE_FILE') or None,
+            endpoint=os.getenv('TRACE_ENDPOINT') or None,
+            slow_seconds=float(os.getenv('TRACE_SLOW_SECONDS') or 0)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.endpoint)
+
+    def export(self, trace: Trace) -> None:
+        if not self.enabled or trace.root.seconds < self.slow_seconds:
+            return
+        payload = trace.to_otlp()
+
+        if self.file_path:
+            line = json.dumps(payload, ensure_ascii=False) + '\n'
+            try:
+                with self._lock:
+                    with open(self.file_path, 'a', encoding='utf-8') as f:
+                        f.write(line)
+            except OSError as e:
+                logger.warning(f"無法寫入追蹤檔案: {e}")
+
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(payload)
+            except queue.Full:
+                logger.warning("追蹤佇列已滿，捨棄追蹤資料")
+
+    def _send_loop(self) -> None:
+        import requests
+
+        while True:
+            payload = self._queue.get()
+            try:
+                requests.post(self.endpoint, json=payload, timeout=5)
+            except Exception as e:
+                logger.warning(f"無法送出追蹤資料: {e}")
+
+
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> TraceExporter:
+    """取得追蹤輸出器（第一次使用時才讀取環境變數）"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = TraceExporter.from_env()
+    return _exporter
+
+
+def current_trace() -> Optional[Trace]:
+    """取得目前的追蹤"""
+    return _current.get()
+
+
+def begin(name: str, **attributes: Any) -> Trace:
+    """
+    開始追蹤，若已有進行中的追蹤則沿用
+
+    每次 begin() 都必須對應一次 finish()。
+    """
+    trace = _current.get()
+    if trace is None:
+        trace = Trace(name, attributes)
+        trace._token = _current.set(trace)
+    else:
+        trace.root.attributes.update(attributes)
+    trace._depth += 1
+    return trace
+
+
+def finish(trace: Trace) -> Dict[str, Any]:
+    """
+    結束一層追蹤並回傳耗時明細；最外層結束時輸出 span
+
+    Returns:
+        耗時明細
+    """
+    trace._depth -= 1
+    if trace._depth == 0:
+        trace.root.end_ns = time.time_ns()
+        if trace._token is not None:
+            _current.reset(trace._token)
+            trace._token = None
+        get_exporter().export(trace)
+    return trace.summary()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """記錄處理階段的指標，並在有追蹤時加入 span"""
+    trace = _current.get()
+    with metrics.stage(name):
+        if trace is None:
+            yield
+        else:
+            with trace.span(name):
+                yield
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """記錄在其他地方量測的階段耗時"""
+    metrics.STAGE_SECONDS.observe(seconds, name)
+    trace = _current.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+def annotate(key: str, value: Any) -> None:
+    """設定目前追蹤的屬性"""
+    trace = _current.get()
+    if trace is not None:
+        trace.set_attribute(key, value)
+
+
+def increment(key: str, amount: int = 1) -> None:
+    """累加目前追蹤的數值屬性"""
+    trace = _current.get()
+    if trace is not None:
+        trace.increment(key, amount)
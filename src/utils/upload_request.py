@@ -0,0 +1,118 @@
+"""
+上傳請求的驗證與回應
+Flask 與 ASGI 的 /upload 共用，不依賴請求物件，只處理檔名、大小與表單欄位
+"""
+
+import os
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+from werkzeug.utils import secure_filename
+
+from .file_validator import FileValidator
+from .pdf_pages import parse_page_spec
+
+
+class UploadPlan:
+    """通過驗證的單一檔案上傳"""
+
+    __slots__ = ('filename', 'pages', 'preview_pages', 'is_image')
+
+    def __init__(self, filename: str, pages: Optional[str], preview_pages: int,
+                 is_image: bool):
+        """
+        Args:
+            filename: 存檔與輸出使用的安全檔名
+            pages: 頁面範圍（未指定時為 None）
+            preview_pages: 預覽模式先辨識的頁數（0 表示不使用預覽）
+            is_image: 是否為圖片
+        """
+        self.filename = filename
+        self.pages = pages
+        self.preview_pages = preview_pages
+        self.is_image = is_image
+
+
+def validate_upload_request(filename: Optional[str], size: int,
+                            fields: Mapping[str, str]) -> Union[Tuple[str, int], UploadPlan]:
+    """
+    驗證單一檔案的上傳請求
+
+    Args:
+        filename: 上傳的檔案名稱（沒有檔案時為 None）
+        size: 檔案大小（位元組）
+        fields: 表單欄位（pages、preview）
+
+    Returns:
+        驗證失敗時為 (錯誤訊息, 狀態碼)，否則為 UploadPlan
+    """
+    if not filename:
+        return '未選擇檔案', 400
+
+    is_valid, error_msg = FileValidator.validate_upload(filename, size)
+    if not is_valid:
+        return error_msg, 400
+
+    # 檢查頁面範圍格式（是否超出文件頁數在讀取 PDF 後才能判斷）
+    pages = (fields.get('pages') or '').strip() or None
+    is_image = FileValidator.is_image(filename)
+    if pages and is_image:
+        return '頁面選擇僅支援 PDF', 400
+    if pages:
+        try:
+            parse_page_spec(pages)
+        except ValueError as e:
+            return str(e), 400
+
+    # 預覽模式：先辨識前幾頁並立即回應，其餘頁面在背景處理（圖片直接處理）
+    preview_pages = 0
+    preview = (fields.get('preview') or '').strip()
+    if preview and not is_image:
+        preview_pages = int(preview) if preview.isdigit() else 0
+        if preview_pages < 1:
+            return f'無效的預覽頁數: {preview}', 400
+
+    return UploadPlan(secure_filename(filename), pages, preview_pages, is_image)
+
+
+def validate_image_batch(uploads: Sequence[Tuple[str, int]]) -> Optional[Tuple[str, int]]:
+    """
+    驗證一次上傳的多個檔案（僅支援圖片）
+
+    Args:
+        uploads: 各檔案的 (檔案名稱, 大小)
+
+    Returns:
+        驗證失敗時為 (錯誤訊息, 狀態碼)，否則為 None
+    """
+    for filename, size in uploads:
+        if not filename:
+            return '未選擇檔案', 400
+        if not FileValidator.is_image(filename):
+            return f'一次上傳多個檔案時僅支援圖片: {filename}', 400
+        is_valid, error_msg = FileValidator.validate_file_size(size)
+        if not is_valid:
+            return error_msg, 400
+    return None
+
+
+def upload_response(result: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    將 OCR 處理結果轉為 /upload 的回應內容與狀態碼
+
+    Args:
+        result: OCRService 的處理結果
+
+    Returns:
+        (回應內容, 狀態碼)
+    """
+    if result['success']:
+        return {
+            'success': True,
+            'markdown_content': result['markdown_content'],
+            'output_file': os.path.basename(result['output_file']),
+            'metadata': result['metadata']
+        }, 200
+    return {
+        'success': False,
+        'error': result.get('error', '處理失敗')
+    }, 500
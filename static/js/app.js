@@ -3,6 +3,20 @@
 // 全域變數
 let selectedFile = null;
 let outputFilename = null;
+let previewSections = [];
+let previewObserver = null;
+let hashWorker = null;
+let hashPromise = null;
+
+// 預覽模式：先辨識的頁數與輪詢背景工作的間隔
+const PREVIEW_PAGES = 1;
+const JOB_POLL_INTERVAL = 2000;
+
+// 在背景計算 SHA-256 的 Web Worker；伺服器已有結果時不必上傳
+const HASH_WORKER_URL = '/static/js/hash_worker.js';
+
+// 支援的檔案類型（圖片在伺服器端打包成 PDF）
+const SUPPORTED_TYPES = ['application/pdf', 'image/png', 'image/jpeg', 'image/tiff'];
 
 // DOM 元素
 const uploadBox = document.getElementById('uploadBox');
@@ -13,6 +27,7 @@ const fileName = document.getElementById('fileName');
 const fileSize = document.getElementById('fileSize');
 const changeFileBtn = document.getElementById('changeFileBtn');
 const processBtn = document.getElementById('processBtn');
+const pagesInput = document.getElementById('pagesInput');
 const progressSection = document.getElementById('progressSection');
 const progressText = document.getElementById('progressText');
 const resultSection = document.getElementById('resultSection');
@@ -24,6 +39,7 @@ const retryBtn = document.getElementById('retryBtn');
 const markdownPreview = document.getElementById('markdownPreview');
 const markdownRaw = document.getElementById('markdownRaw');
 const metadata = document.getElementById('metadata');
+const uploadProgressText = progressText.textContent;
 
 // 初始化
 document.addEventListener('DOMContentLoaded', () => {
@@ -98,10 +114,10 @@ function handleDrop(e) {
         const file = files[0];
 
         // 檢查檔案類型
-        if (file.type === 'application/pdf') {
+        if (SUPPORTED_TYPES.includes(file.type)) {
             setSelectedFile(file);
         } else {
-            showError('請上傳 PDF 檔案');
+            showError('請上傳 PDF、PNG、JPEG 或 TIFF 檔案');
         }
     }
 }
@@ -109,6 +125,8 @@ function handleDrop(e) {
 // 設定選中的檔案
 function setSelectedFile(file) {
     selectedFile = file;
+    // 選擇檔案後立即開始計算雜湊，與輸入頁面範圍的時間重疊
+    hashPromise = file.type === 'application/pdf' ? hashFile(file) : null;
 
     // 更新 UI
     fileName.textContent = file.name;
@@ -146,10 +164,25 @@ async function handleProcess() {
 
     // 顯示進度
     showProgress();
+    const pages = pagesInput.value.trim();
+
+    // 伺服器已處理過相同內容的 PDF 時直接取得結果，不上傳檔案
+    if (!pages && hashPromise) {
+        const cached = await lookupCachedResult(selectedFile);
+        if (cached) {
+            displayResult(cached);
+            return;
+        }
+    }
+    progressText.textContent = uploadProgressText;
 
     // 建立 FormData
     const formData = new FormData();
     formData.append('file', selectedFile);
+    if (pages) {
+        formData.append('pages', pages);
+    }
+    formData.append('preview', String(PREVIEW_PAGES));
 
     try {
         // 發送請求
@@ -158,7 +191,16 @@ async function handleProcess() {
             body: formData
         });
 
-        const result = await response.json();
+        let result = await response.json();
+
+        // 先顯示預覽，其餘頁面完成後再顯示完整結果
+        if (result.success && result.complete === false) {
+            // 預覽未及時完成時回應只有 job_id
+            if (result.markdown_content !== undefined) {
+                displayPreview(result);
+            }
+            result = await waitForJob(result.job_id);
+        }
 
         if (result.success) {
             // 顯示結果
@@ -173,15 +215,104 @@ async function handleProcess() {
     }
 }
 
+// 在 Web Worker 中分段計算檔案的 SHA-256；無法計算時結果為 null
+function hashFile(file) {
+    if (hashWorker) {
+        hashWorker.terminate();
+        hashWorker = null;
+    }
+    if (!window.Worker) {
+        return Promise.resolve(null);
+    }
+
+    return new Promise(resolve => {
+        const worker = new Worker(HASH_WORKER_URL);
+        hashWorker = worker;
+        const finish = (sha256) => {
+            worker.terminate();
+            if (hashWorker === worker) {
+                hashWorker = null;
+            }
+            resolve(sha256);
+        };
+        worker.onmessage = (event) => {
+            if (event.data.error) {
+                console.warn('Hash error:', event.data.error);
+            }
+            finish(event.data.sha256 || null);
+        };
+        worker.onerror = (event) => {
+            console.warn('Hash worker error:', event.message);
+            finish(null);
+        };
+        worker.postMessage({ file });
+    });
+}
+
+// 以雜湊查詢伺服器是否已有結果；沒有結果或查詢失敗時返回 null，改為上傳
+async function lookupCachedResult(file) {
+    progressText.textContent = '正在檢查是否已處理過相同檔案...';
+    try {
+        const sha256 = await hashPromise;
+        if (!sha256) {
+            return null;
+        }
+        const response = await fetch('/upload/cached', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ sha256, filename: file.name, size: file.size })
+        });
+        if (!response.ok) {
+            return null;
+        }
+        const result = await response.json();
+        return result.success ? result : null;
+    } catch (error) {
+        console.warn('Cache lookup error:', error);
+        return null;
+    }
+}
+
+// 顯示前幾頁的預覽（其餘頁面仍在處理中）
+function displayPreview(result) {
+    disconnectPreview();
+    markdownRaw.textContent = result.markdown_content;
+    markdownPreview.innerHTML = marked.parse(result.markdown_content);
+    metadata.innerHTML = '';
+    const eta = result.metadata.eta_seconds;
+    progressText.textContent = `已完成第 ${result.metadata.pages} 頁的預覽，其餘頁面處理中`
+        + (eta ? `（預計約 ${Math.ceil(eta)} 秒）...` : '...');
+    downloadBtn.disabled = true;
+    resultSection.style.display = 'block';
+}
+
+// 輪詢背景工作直到完成，返回與 /upload 相同格式的結果
+async function waitForJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+        const response = await fetch(`/jobs/${encodeURIComponent(jobId)}`);
+        const job = await response.json();
+        if (!job.success) {
+            return job;
+        }
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            return job.result || { success: false, error: job.error };
+        }
+    }
+}
+
 // 顯示結果
 function displayResult(result) {
     outputFilename = result.output_file;
+    downloadBtn.disabled = false;
 
     // 渲染 Markdown
     if (result.markdown_content) {
-        // 使用 marked.js 轉換 Markdown 為 HTML
-        markdownPreview.innerHTML = marked.parse(result.markdown_content);
         markdownRaw.textContent = result.markdown_content;
+        loadPreview(result.output_file, result.markdown_content);
     }
 
     // 顯示元資料
@@ -212,6 +343,77 @@ function displayResult(result) {
     resultSection.style.display = 'block';
 }
 
+// 載入伺服器端預先轉換的 HTML 預覽
+async function loadPreview(filename, markdownContent) {
+    markdownPreview.innerHTML = '';
+
+    try {
+        const response = await fetch(`/preview/${encodeURIComponent(filename)}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const preview = await response.json();
+        renderVirtualPreview(preview.sections);
+    } catch (error) {
+        // 伺服器預覽失敗時改在瀏覽器轉換
+        console.error('Preview error:', error);
+        markdownPreview.innerHTML = marked.parse(markdownContent);
+    }
+}
+
+// 虛擬化預覽：只掛載可見範圍附近的段落
+function renderVirtualPreview(sections) {
+    disconnectPreview();
+    previewSections = sections;
+
+    previewObserver = new IntersectionObserver(handlePreviewIntersection, {
+        root: markdownPreview,
+        rootMargin: '800px 0px'
+    });
+
+    const fragment = document.createDocumentFragment();
+    sections.forEach((html, index) => {
+        const section = document.createElement('div');
+        section.className = 'preview-section';
+        section.dataset.index = index;
+        // 掛載前依 HTML 長度估計高度，讓捲軸長度接近實際內容
+        section.style.minHeight = `${Math.max(40, Math.round(html.length / 4))}px`;
+        fragment.appendChild(section);
+    });
+    markdownPreview.appendChild(fragment);
+
+    markdownPreview.querySelectorAll('.preview-section').forEach(section => {
+        previewObserver.observe(section);
+    });
+}
+
+function handlePreviewIntersection(entries) {
+    entries.forEach(entry => {
+        const section = entry.target;
+
+        if (entry.isIntersecting) {
+            if (!section.dataset.mounted) {
+                section.innerHTML = previewSections[section.dataset.index];
+                section.dataset.mounted = '1';
+                section.style.minHeight = '';
+            }
+        } else if (section.dataset.mounted && section.offsetHeight > 0) {
+            // 離開可見範圍時保留實際高度並卸載內容
+            section.style.minHeight = `${section.offsetHeight}px`;
+            section.innerHTML = '';
+            delete section.dataset.mounted;
+        }
+    });
+}
+
+function disconnectPreview() {
+    if (previewObserver) {
+        previewObserver.disconnect();
+        previewObserver = null;
+    }
+    previewSections = [];
+}
+
 // 下載檔案
 function handleDownload() {
     if (outputFilename) {
@@ -271,8 +473,16 @@ function hideError() {
 // 重置應用程式
 function resetApp() {
     selectedFile = null;
+    hashPromise = null;
+    if (hashWorker) {
+        hashWorker.terminate();
+        hashWorker = null;
+    }
     outputFilename = null;
     fileInput.value = '';
+    pagesInput.value = '';
+    disconnectPreview();
+    markdownPreview.innerHTML = '';
 
     uploadBox.style.display = 'block';
     fileSelected.style.display = 'none';
@@ -0,0 +1,146 @@
+// 在背景執行緒計算檔案的 SHA-256，供上傳前查詢伺服器是否已有 OCR 結果
+
+// 分段讀取的大小
+const SLICE_BYTES = 4 * 1024 * 1024;
+// 不超過此大小時一次讀入並交給 Web Crypto（原生實作較快）
+const ONESHOT_BYTES = 32 * 1024 * 1024;
+
+self.onmessage = async (event) => {
+    try {
+        self.postMessage({ sha256: await hashFile(event.data.file) });
+    } catch (error) {
+        self.postMessage({ error: String(error) });
+    }
+};
+
+async function hashFile(file) {
+    // Web Crypto 只接受完整的資料，且僅在安全來源（HTTPS 或 localhost）可用；
+    // 大檔案改為分段讀取並逐段計算，記憶體只保留一段
+    if (self.crypto && self.crypto.subtle && file.size <= ONESHOT_BYTES) {
+        const digest = await self.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return toHex(new Uint8Array(digest));
+    }
+
+    const hash = new Sha256();
+    for (let offset = 0; offset < file.size; offset += SLICE_BYTES) {
+        const slice = await file.slice(offset, offset + SLICE_BYTES).arrayBuffer();
+        hash.update(new Uint8Array(slice));
+    }
+    return toHex(hash.digest());
+}
+
+function toHex(bytes) {
+    return Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// SHA-256 的輪常數
+const K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+// 可逐段輸入的 SHA-256（FIPS 180-4）
+class Sha256 {
+    constructor() {
+        this.state = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+            0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ]);
+        this.block = new Uint8Array(64);
+        this.blockLength = 0;
+        this.length = 0;
+        this.words = new Uint32Array(64);
+    }
+
+    update(data) {
+        let offset = 0;
+        this.length += data.length;
+
+        // 先補滿上一段留下的不完整區塊
+        if (this.blockLength > 0) {
+            const take = Math.min(64 - this.blockLength, data.length);
+            this.block.set(data.subarray(0, take), this.blockLength);
+            this.blockLength += take;
+            offset = take;
+            if (this.blockLength < 64) {
+                return;
+            }
+            this.compress(this.block, 0);
+            this.blockLength = 0;
+        }
+
+        for (; offset + 64 <= data.length; offset += 64) {
+            this.compress(data, offset);
+        }
+        if (offset < data.length) {
+            this.block.set(data.subarray(offset));
+            this.blockLength = data.length - offset;
+        }
+    }
+
+    digest() {
+        // 補上 0x80、零與 64 位元的訊息長度（位元）
+        const length = this.length;
+        const padLength = (this.blockLength < 56 ? 56 : 120) - this.blockLength;
+        const padding = new Uint8Array(padLength + 8);
+        padding[0] = 0x80;
+        const view = new DataView(padding.buffer);
+        view.setUint32(padLength, Math.floor(length / 0x20000000));
+        view.setUint32(padLength + 4, (length * 8) >>> 0);
+        this.update(padding);
+
+        const output = new Uint8Array(32);
+        const outputView = new DataView(output.buffer);
+        this.state.forEach((word, index) => outputView.setUint32(index * 4, word));
+        return output;
+    }
+
+    compress(data, offset) {
+        const w = this.words;
+        for (let i = 0; i < 16; i++) {
+            const j = offset + i * 4;
+            w[i] = (data[j] << 24) | (data[j + 1] << 16) | (data[j + 2] << 8) | data[j + 3];
+        }
+        for (let i = 16; i < 64; i++) {
+            const x = w[i - 15];
+            const y = w[i - 2];
+            const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+            const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+            w[i] = (w[i - 16] + s0 + w[i - 7] + s1) | 0;
+        }
+
+        const state = this.state;
+        let a = state[0], b = state[1], c = state[2], d = state[3];
+        let e = state[4], f = state[5], g = state[6], h = state[7];
+        for (let i = 0; i < 64; i++) {
+            const s1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const ch = (e & f) ^ (~e & g);
+            const t1 = (h + s1 + ch + K[i] + w[i]) | 0;
+            const s0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const maj = (a & b) ^ (a & c) ^ (b & c);
+            const t2 = (s0 + maj) | 0;
+            h = g;
+            g = f;
+            f = e;
+            e = (d + t1) | 0;
+            d = c;
+            c = b;
+            b = a;
+            a = (t1 + t2) | 0;
+        }
+        state[0] += a;
+        state[1] += b;
+        state[2] += c;
+        state[3] += d;
+        state[4] += e;
+        state[5] += f;
+        state[6] += g;
+        state[7] += h;
+    }
+}
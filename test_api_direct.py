@@ -8,7 +8,11 @@ import os
 def test_alphaxiv_api():
     """直接測試 AlphaXiv API"""
 
-    api_url = "https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference"
+    # 可用 ALPHAXIV_API_URL 指向 benchmarks/mock_alphaxiv.py 等離線伺服器
+    api_url = os.getenv(
+        'ALPHAXIV_API_URL',
+        "https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference"
+    )
     test_pdf = "adrenal cortex.pdf"
 
     if not os.path.exists(test_pdf):
@@ -9,7 +9,11 @@ import json
 def test_pages_detail():
     """檢查每頁的詳細內容"""
 
-    api_url = "https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference"
+    # 可用 ALPHAXIV_API_URL 指向 benchmarks/mock_alphaxiv.py 等離線伺服器
+    api_url = os.getenv(
+        'ALPHAXIV_API_URL',
+        "https://api.alphaxiv.org/models/v1/deepseek/deepseek-ocr/inference"
+    )
     test_pdf = "adrenal cortex.pdf"
 
     if not os.path.exists(test_pdf):
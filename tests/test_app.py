@@ -0,0 +1,59 @@
+"""
+應用程式工廠測試
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from app import create_app
+
+
+class TestCreateApp(unittest.TestCase):
+    """測試 create_app 與延遲建立的服務"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': None,
+        })
+        self.services = self.app.extensions['ocr_services']
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_config_override_creates_directories(self):
+        self.assertTrue(os.path.isdir(self.app.config['UPLOAD_FOLDER']))
+        self.assertTrue(os.path.isdir(self.app.config['OUTPUT_FOLDER']))
+
+    def test_services_are_built_lazily(self):
+        """測試存活檢查不建立服務，服務只建立一次"""
+        response = self.app.test_client().get('/health/live')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.services._instances, {})
+
+        response = self.app.test_client().get('/search?q=abc')
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(self.services.search_index, self.services.search_index)
+        self.assertNotIn('ocr_service', self.services._instances)
+        self.assertIsNone(self.services.result_cache)
+
+    def test_apps_do_not_share_services(self):
+        other = create_app({
+            'UPLOAD_FOLDER': self.app.config['UPLOAD_FOLDER'],
+            'OUTPUT_FOLDER': self.app.config['OUTPUT_FOLDER'],
+        })
+        self.assertIsNot(other.extensions['ocr_services'], self.services)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+"""
+ASGI 路徑測試
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# 添加 src 目錄與專案根目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from asgi import UploadedFile, create_asgi_app, receive_multipart
+from benchmarks.mock_alphaxiv import INFERENCE_PATH, MockAlphaXivServer
+from services.result_cache import ResultCache, hash_bytes
+from utils.aio import run_sync
+
+BOUNDARY = b'test-boundary'
+PDF_BYTES = b'%PDF-1.4\n' + b'1 0 obj << /Type /Page >> endobj\n' * 2000
+
+
+def multipart_body(filename='paper.pdf', content=PDF_BYTES, fields=None, files=None):
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(
+            b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="'
+            + name.encode() + b'"\r\n\r\n' + value.encode() + b'\r\n'
+        )
+    for name, data in files or [(filename, content)]:
+        parts.append(
+            b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="file"; filename="'
+            + name.encode() + b'"\r\nContent-Type: application/octet-stream\r\n\r\n'
+            + data + b'\r\n'
+        )
+    return b''.join(parts) + b'--' + BOUNDARY + b'--\r\n'
+
+
+def chunked_receive(body, size=1000):
+    """依序回傳 http.request 訊息，模擬分段到達的請求內容"""
+    chunks = [body[i:i + size] for i in range(0, len(body), size)] or [b'']
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b''
+        return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+    return receive
+
+
+class TestReceiveMultipart(unittest.TestCase):
+    """測試串流解析 multipart 內容"""
+
+    def test_streams_file_and_fields(self):
+        body = multipart_body(fields={'note': '摘要'})
+        fields, files = asyncio.run(receive_multipart(chunked_receive(body, 333), BOUNDARY))
+        upload, = files['file']
+        try:
+            self.assertEqual(fields, {'note': '摘要'})
+            self.assertEqual(upload.filename, 'paper.pdf')
+            self.assertEqual(upload.size, len(PDF_BYTES))
+            self.assertEqual(upload.sha256, hash_bytes(PDF_BYTES))
+            self.assertEqual(upload.file.read(), PDF_BYTES)
+        finally:
+            upload.close()
+
+    def test_repeated_file_parts_kept(self):
+        body = multipart_body(files=[('a.png', b'first'), ('b.png', b'second')])
+        _, files = asyncio.run(receive_multipart(chunked_receive(body, 7), BOUNDARY))
+        try:
+            self.assertEqual([upload.filename for upload in files['file']], ['a.png', 'b.png'])
+            self.assertEqual([upload.file.read() for upload in files['file']],
+                             [b'first', b'second'])
+        finally:
+            for upload in files['file']:
+                upload.close()
+
+
+class TestAsgiApp(unittest.TestCase):
+    """測試非同步上傳與下載端點"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.app = create_asgi_app({
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': cache_dir,
+            'MAX_CONTENT_LENGTH': 1024 * 1024,
+        })
+        # 預先放入快取結果，上傳時不需要呼叫上游
+        ResultCache(cache_dir).put(
+            hash_bytes(PDF_BYTES), MockAlphaXivServer().synthetic_result(3)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def request(self, method, path, body=b'', headers=()):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers)}
+        asyncio.run(self.app(scope, chunked_receive(body), send))
+        payload = b''.join(m.get('body', b'') for m in messages[1:])
+        return messages[0]['status'], dict(messages[0]['headers']), payload
+
+    def upload(self, body):
+        return self.request('POST', '/upload', body, [
+            (b'content-type', b'multipart/form-data; boundary=' + BOUNDARY),
+            (b'content-length', str(len(body)).encode()),
+        ])
+
+    def test_upload_and_download(self):
+        status, _, payload = self.upload(multipart_body())
+        result = json.loads(payload)
+        self.assertEqual(status, 200)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['metadata']['timings']['cache'], 'hit')
+        self.assertIn('queue_wait', result['metadata']['timings']['stages'])
+
+        status, headers, content = self.request('GET', '/download/' + result['output_file'])
+        self.assertEqual(status, 200)
+        self.assertEqual(content.decode('utf-8'), result['markdown_content'])
+        self.assertIn(b'attachment', headers[b'content-disposition'])
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir, 'uploads')), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('httpx'), '需要 httpx')
+    def test_upload_awaits_upstream(self):
+        """測試快取未命中時以非同步客戶端呼叫上游"""
+        from werkzeug.serving import make_server
+
+        server = make_server('127.0.0.1', 0, MockAlphaXivServer().app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.app.services.ocr_service.client.api_url = \
+                f'http://127.0.0.1:{server.port}{INFERENCE_PATH}'
+            status, _, payload = self.upload(multipart_body(content=PDF_BYTES + b'%miss'))
+        finally:
+            server.shutdown()
+        result = json.loads(payload)
+        self.assertEqual(status, 200)
+        self.assertEqual(result['metadata']['timings']['cache'], 'miss')
+        self.assertEqual(result['metadata']['timings']['upstream_attempts'], 1)
+
+    def test_multiple_images_processed_as_batch(self):
+        received = []
+        closed = []
+
+        def process_images(images, output_dir):
+            received.extend((name, source.read()) for name, source in images)
+            results = []
+            for name, _ in images:
+                path = os.path.join(output_dir, f'{name}.md')
+                results.append({'success': True, 'markdown_content': name,
+                                'output_file': path, 'metadata': {}})
+            return results
+
+        original_close = UploadedFile.close
+
+        def close(upload):
+            closed.append(upload.filename)
+            original_close(upload)
+
+        body = multipart_body(files=[('a.png', b'first'), ('b.png', b'second')])
+        with mock.patch.object(self.app.services.ocr_service, 'process_images', process_images), \
+                mock.patch('asgi.UploadedFile.close', close):
+            status, _, payload = self.upload(body)
+
+        result = json.loads(payload)
+        self.assertEqual(status, 200)
+        self.assertEqual(received, [('a.png', b'first'), ('b.png', b'second')])
+        self.assertEqual([item['output_file'] for item in result['results']],
+                         ['a.png.md', 'b.png.md'])
+        self.assertEqual(sorted(closed), ['a.png', 'b.png'])
+
+        status, _, payload = self.upload(
+            multipart_body(files=[('a.png', b'first'), ('paper.pdf', PDF_BYTES)])
+        )
+        self.assertEqual(status, 400)
+        self.assertIn('paper.pdf', json.loads(payload)['error'])
+
+    def test_preview_runs_as_background_job(self):
+        services = self.app.services
+        received = []
+
+        def process_document_preview(upload_path, output_dir, pages, preview_pages,
+                                     on_preview, limiter):
+            with open(upload_path, 'rb') as f:
+                received.append(f.read())
+            with limiter.slot(priority=True):
+                self.assertEqual(services.work_limiter.in_flight, 1)
+                on_preview({'markdown_content': '預覽', 'metadata': {'pages': '1'}})
+            with limiter.slot():
+                return {'success': True, 'markdown_content': '完整',
+                        'output_file': os.path.join(output_dir, 'paper.md'), 'metadata': {}}
+
+        body = multipart_body(fields={'preview': '1'})
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            # 背景工作在事件迴圈上取得名額，等工作完成後才結束事件迴圈
+            await self.app({'type': 'http', 'method': 'POST', 'path': '/upload', 'headers': [
+                (b'content-type', b'multipart/form-data; boundary=' + BOUNDARY),
+            ]}, chunked_receive(body), send)
+            await run_sync(services.jobs.shutdown)
+
+        with mock.patch.object(services.ocr_service, 'process_document_preview',
+                               process_document_preview):
+            asyncio.run(scenario())
+        status = messages[0]['status']
+        result = json.loads(b''.join(m.get('body', b'') for m in messages[1:]))
+
+        self.assertEqual(status, 202)
+        self.assertEqual(result['markdown_content'], '預覽')
+        self.assertEqual(received, [PDF_BYTES])
+        self.assertEqual(services.jobs.get(result['job_id'])['result']['markdown_content'],
+                         '完整')
+        self.assertEqual(services.work_limiter.in_flight, 0)
+
+        status, _, _ = self.upload(multipart_body(fields={'preview': 'abc'}))
+        self.assertEqual(status, 400)
+
+    def test_rejects_invalid_uploads(self):
+        status, _, payload = self.upload(multipart_body(filename='notes.txt'))
+        self.assertEqual(status, 400)
+        self.assertFalse(json.loads(payload)['success'])
+
+        status, _, _ = self.upload(multipart_body(content=b'x' * (2 * 1024 * 1024)))
+        self.assertEqual(status, 413)
+
+        status, _, _ = self.request('GET', '/download/missing.md')
+        self.assertEqual(status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+小文件批次送出測試
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from models.document import PAGE_SPLIT
+from services.batcher import MicroBatcher
+from services.ocr_service import OCRService
+
+
+def run_concurrently(function, arguments):
+    """同時以多個執行緒呼叫 function，依序回傳結果"""
+    results = [None] * len(arguments)
+
+    def run(index, argument):
+        results[index] = function(*argument)
+
+    threads = [threading.Thread(target=run, args=(index, argument))
+               for index, argument in enumerate(arguments)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """測試時間窗與頁數上限"""
+
+    def setUp(self):
+        self.batches = []
+
+    def send(self, items):
+        self.batches.append([payload for payload, _ in items])
+        return [{'payload': payload} for payload, _ in items]
+
+    def test_documents_in_window_share_one_request(self):
+        batcher = MicroBatcher(self.send, window=0.2, max_pages=100)
+        results = run_concurrently(batcher.submit, [(b'a', 1), (b'b', 2), (b'c', 1)])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(sorted(self.batches[0]), [b'a', b'b', b'c'])
+        self.assertEqual([result[0]['payload'] for result in results], [b'a', b'b', b'c'])
+        self.assertTrue(all(result[1] == 3 for result in results))
+
+    def test_page_budget_splits_batches(self):
+        batcher = MicroBatcher(self.send, window=0.2, max_pages=4)
+        run_concurrently(batcher.submit, [(b'a', 2), (b'b', 2), (b'c', 2)])
+        self.assertEqual(sorted(len(batch) for batch in self.batches), [1, 2])
+
+    def test_wait_bounded_by_window(self):
+        batcher = MicroBatcher(self.send, window=0.05, max_pages=100)
+        started = time.monotonic()
+        result, size = batcher.submit(b'a', 1)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(size, 1)
+
+    def test_failure_reaches_every_caller(self):
+        def fail(items):
+            raise Exception('上游錯誤')
+
+        batcher = MicroBatcher(fail, window=0.1, max_pages=100)
+        errors = []
+
+        def submit(payload):
+            try:
+                batcher.submit(payload, 1)
+            except Exception as e:
+                errors.append(str(e))
+
+        run_concurrently(submit, [(b'a',), (b'b',)])
+        self.assertEqual(errors, ['上游錯誤', '上游錯誤'])
+
+    def test_interrupted_leader_releases_followers(self):
+        def interrupted(items):
+            raise KeyboardInterrupt()
+
+        batcher = MicroBatcher(interrupted, window=5, max_pages=2)
+        errors = []
+
+        def follower():
+            # 等目前的執行緒開啟批次後才加入
+            while batcher._open is None:
+                time.sleep(0.001)
+            try:
+                batcher.submit(b'b', 1)
+            except Exception as e:
+                errors.append(str(e))
+
+        thread = threading.Thread(target=follower)
+        thread.start()
+        with self.assertRaises(KeyboardInterrupt):
+            # 第二份文件加入後達到頁數上限，批次立即送出
+            batcher.submit(b'a', 1)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors, ['批次送出中斷'])
+
+
+def fake_count(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return len(json.load(f))
+    source.seek(0)
+    return len(json.load(source))
+
+
+def fake_concat(sources, destination):
+    labels = []
+    for source in sources:
+        labels.extend(json.load(source))
+    destination.write(json.dumps(labels).encode())
+
+
+class TestBatchedDocuments(unittest.TestCase):
+    """測試小文件合併送出後各自取得自己的輸出"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.calls = []
+        patches = [
+            mock.patch('services.ocr_service.count_pages', fake_count),
+            mock.patch('services.ocr_service.concat_pdfs', fake_concat),
+            mock.patch.dict(os.environ, {'OCR_BATCH_WINDOW_MS': '200'}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.service = OCRService()
+        self.service.client.process_pdf_from_bytes = self.upstream
+        self.service.client.process_pdf = self.upload_file
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def upstream(self, file_bytes, filename, num_pages=None):
+        labels = json.loads(file_bytes)
+        self.calls.append(labels)
+        texts = [f'{label} 的內容。' for label in labels]
+        return {'data': {
+            'ocr_text': PAGE_SPLIT.join(texts),
+            'pages': texts,
+            'num_pages': len(texts),
+            'num_successful': len(texts),
+        }}
+
+    def upload_file(self, file_path, num_pages=None):
+        with open(file_path, 'rb') as f:
+            return self.upstream(f.read(), os.path.basename(file_path), num_pages)
+
+    def write_document(self, name, labels):
+        path = os.path.join(self.temp_dir, f'{name}.pdf')
+        with open(path, 'w') as f:
+            json.dump(labels, f)
+        return path
+
+    def test_demultiplexed_by_page_offsets(self):
+        documents = [
+            self.write_document('a', ['甲一', '甲二']),
+            self.write_document('b', ['乙一']),
+            self.write_document('c', ['丙一', '丙二', '丙三']),
+        ]
+        output_dir = os.path.join(self.temp_dir, 'out')
+        results = run_concurrently(self.service.process_document,
+                                   [(path, output_dir) for path in documents])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(self.calls[0]), 6)
+
+        a, b, c = (result['markdown_content'] for result in results)
+        self.assertIn('甲二 的內容', a)
+        self.assertNotIn('乙一', a)
+        self.assertIn('乙一 的內容', b)
+        self.assertNotIn('丙一', b)
+        self.assertIn('丙三 的內容', c)
+        self.assertTrue(all(r['metadata']['timings']['batch_size'] == 3 for r in results))
+
+    def test_large_documents_not_batched(self):
+        path = self.write_document('big', [f'頁{page}' for page in range(5)])
+        result = self.service.process_document(path, self.temp_dir)
+        self.assertTrue(result['success'])
+        self.assertNotIn('batch_size', result['metadata']['timings'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+效能測試工具的測試
+"""
+
+import hashlib
+import io
+import json
+import tempfile
+import unittest
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import CorpusGenerator, PAGE_SPLIT, make_pdf
+from benchmarks.bench_converter import compare, run, scaling_exponent
+from benchmarks.bench_startup import compare as compare_startup, probe
+from benchmarks.loadtest import compare as compare_load, parse_mix, percentile
+from benchmarks.mock_alphaxiv import INFERENCE_PATH, MockAlphaXivServer, count_pdf_pages
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    """測試合成語料產生器"""
+
+    def test_seeded_output_is_deterministic(self):
+        """測試相同種子產生相同語料"""
+        self.assertEqual(CorpusGenerator(seed=7).pages(10), CorpusGenerator(seed=7).pages(10))
+        self.assertNotEqual(CorpusGenerator(seed=7).pages(10), CorpusGenerator(seed=8).pages(10))
+
+    def test_alphaxiv_shape(self):
+        """測試產生的結果符合 AlphaXiv 格式"""
+        data = CorpusGenerator().ocr_result(20)['data']
+
+        self.assertEqual(data['num_pages'], 20)
+        self.assertEqual(len(data['pages']), 20)
+        self.assertEqual(data['ocr_text'], PAGE_SPLIT.join(data['pages']))
+        self.assertIn('<center>FIGURE', data['ocr_text'])
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    """測試基準值比較"""
+
+    def test_run_and_compare(self):
+        """測試小規模執行並與自己比較"""
+        result = run([10], repeat=1, seed=0)
+        self.assertIn('convert_to_markdown', result['cases'])
+        self.assertEqual(compare(result, result, 0.25), [])
+
+    def test_detects_regression(self):
+        """測試偵測退步"""
+        baseline = {'cases': {'convert': {'100': {'seconds': 0.1, 'peak_bytes': 1000}}}}
+        current = {'cases': {'convert': {'100': {'seconds': 0.2, 'peak_bytes': 1000}}}}
+        regressions = compare(current, baseline, 0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('seconds', regressions[0])
+
+    def test_scaling_exponent(self):
+        """測試線性擴展的指數約為 1"""
+        self.assertAlmostEqual(scaling_exponent([(10, 0.01), (100, 0.1), (1000, 1.0)]), 1.0)
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    """測試啟動時間量測"""
+
+    def test_probe_and_compare(self):
+        """測試在新程序中量測各階段，並只回報超過雜訊門檻的退步"""
+        sample = probe()
+        self.assertGreater(sample['import_app'], 0)
+        self.assertAlmostEqual(
+            sample['worker_ready'],
+            sum(sample[stage] for stage in ('import_app', 'create_app', 'first_request', 'warm_up')),
+            places=3
+        )
+
+        baseline = {'stages': {'import_app': {'seconds': 0.1}, 'create_app': {'seconds': 0.001}}}
+        current = {'stages': {'import_app': {'seconds': 0.2}, 'create_app': {'seconds': 0.005}}}
+        regressions = compare_startup(current, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('import_app', regressions[0])
+
+
+
+PDF_3_PAGES = b'%PDF-1.4\n1 0 obj << /Type /Pages /Count 3 >> endobj\n' + \
+    b''.join(b'%d 0 obj << /Type /Page >> endobj\n' % i for i in range(2, 5))
+
+
+class TestMockAlphaXivServer(unittest.TestCase):
+    """測試模擬 AlphaXiv 伺服器"""
+
+    def _post(self, server, pdf_bytes=PDF_3_PAGES):
+        client = server.app.test_client()
+        return client.post(INFERENCE_PATH, data={'file': (io.BytesIO(pdf_bytes), 'a.pdf')},
+                           content_type='multipart/form-data')
+
+    def test_response_format(self):
+        """測試回應格式與依 PDF 計算的頁數"""
+        self.assertEqual(count_pdf_pages(PDF_3_PAGES), 3)
+        response = self._post(MockAlphaXivServer())
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()['data']
+        self.assertEqual(data['num_pages'], 3)
+        self.assertEqual(data['num_successful'], 3)
+        self.assertEqual(data['ocr_text'], PAGE_SPLIT.join(data['pages']))
+
+    def test_errors_and_page_failures(self):
+        """測試模擬錯誤與單頁失敗"""
+        response = self._post(MockAlphaXivServer(error_rate=1.0, error_statuses=(503,)))
+        self.assertEqual(response.status_code, 503)
+
+        data = self._post(MockAlphaXivServer(page_failure_rate=1.0, pages='5')).get_json()['data']
+        self.assertEqual((data['num_pages'], data['num_successful']), (5, 0))
+
+    def test_replay(self):
+        """測試依檔案內容雜湊重播錄製的回應"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            digest = hashlib.sha256(PDF_3_PAGES).hexdigest()
+            with open(os.path.join(tmpdir, f'{digest}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'status': 200, 'body': '{"data": {"ocr_text": "recorded"}}'}, f)
+
+            server = MockAlphaXivServer(replay_dir=tmpdir, replay_fallback=False)
+            self.assertEqual(self._post(server).get_json()['data']['ocr_text'], 'recorded')
+            self.assertEqual(self._post(server, b'%PDF-other').status_code, 404)
+            self.assertEqual(server.stats['replayed'], 1)
+
+class TestLoadTest(unittest.TestCase):
+    """測試負載測試工具"""
+
+    def test_make_pdf(self):
+        """測試產生的 PDF 頁數與大小"""
+        pdf = make_pdf(7, target_bytes=20000)
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertEqual(count_pdf_pages(pdf), 7)
+        self.assertGreaterEqual(len(pdf), 19900)
+        self.assertEqual(pdf, make_pdf(7, target_bytes=20000))
+
+    def test_statistics_and_compare(self):
+        """測試百分位數與結果比較"""
+        self.assertEqual(parse_mix('1:0.5,20:0.5'), [(1, 0.5), (20, 0.5)])
+        self.assertEqual(percentile(list(range(101)), 0.95), 95)
+
+        def result(p99, rps):
+            return {'summary': {'latency': {'p50': 1.0, 'p95': 2.0, 'p99': p99},
+                                'throughput_rps': rps, 'error_rate': 0.0}}
+
+        self.assertEqual(compare_load(result(3.0, 10), result(3.0, 10), 0.2), [])
+        regressions = compare_load(result(5.0, 5), result(3.0, 10), 0.2)
+        self.assertEqual(len(regressions), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
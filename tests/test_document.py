@@ -0,0 +1,106 @@
+"""
+結構化文件模型測試
+"""
+
+import json
+import unittest
+import sys
+import os
+
+# 添加父目錄與 src 目錄到路徑（模型使用與應用程式相同的匯入方式）
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from benchmarks.corpus import CorpusGenerator
+from models.document import Document, PAGE_SPLIT
+from utils.markdown_converter import MarkdownConverter
+
+
+OCR_TEXT = PAGE_SPLIT.join([
+    '# Title\n\nIntro and the<center>FIGURE 1 Cap. Desc</center>diverse text.\n\n| a | b |\n| - | - |',
+    'Second page ends.\n\n## 2.1 Methods\nmethod text'
+])
+
+
+class TestDocument(unittest.TestCase):
+    """測試文件模型"""
+
+    def setUp(self):
+        self.document = Document.from_ocr_result({
+            'data': {'ocr_text': OCR_TEXT, 'num_pages': 2, 'num_successful': 2}
+        })
+
+    def test_blocks_reference_shared_buffer(self):
+        """測試區塊以位置指向共用緩衝區"""
+        types = [block.type for block in self.document]
+        self.assertEqual(types, [
+            'heading', 'paragraph', 'paragraph', 'figure', 'table',
+            'page_break', 'paragraph', 'heading', 'paragraph'
+        ])
+        figure = self.document[3]
+        self.assertEqual(figure.text, 'FIGURE 1 Cap. Desc')
+        self.assertEqual(OCR_TEXT[figure.start:figure.end], figure.text)
+        self.assertTrue(self.document[2].joined)
+        self.assertEqual(self.document[-1].page, 2)
+
+    def test_to_markdown(self):
+        """測試 Markdown 輸出與直接轉換 OCR 結果相同"""
+        ocr_result = {'data': {'ocr_text': OCR_TEXT, 'num_pages': 2, 'num_successful': 2},
+                      'metadata': {'model': 'deepseek-ocr'}}
+        converter = MarkdownConverter()
+        document = Document.from_ocr_result(ocr_result, converter)
+        markdown = document.to_markdown(converter)
+
+        self.assertEqual(markdown, converter.convert_to_markdown(ocr_result))
+        self.assertIn('Intro and the diverse text.', markdown)
+        self.assertIn('## 2.1 Methods', markdown)
+        self.assertEqual(converter.format_text_blocks(document), markdown)
+
+    def test_markdown_matches_converter_on_corpus(self):
+        """測試合成語料上兩種轉換方式的輸出逐字相同"""
+        converter = MarkdownConverter()
+        for seed in range(3):
+            ocr_result = CorpusGenerator(seed=seed).ocr_result(40)
+            with self.subTest(seed=seed):
+                document = Document.from_ocr_result(ocr_result, converter)
+                self.assertEqual(document.to_markdown(converter).encode('utf-8'),
+                                 converter.convert_to_markdown(ocr_result).encode('utf-8'))
+
+    def test_other_formats_markdown(self):
+        """測試非 AlphaXiv 格式的 Markdown 交給 convert_to_markdown"""
+        ocr_result = {'pages': [{'text': '第一頁內容'}]}
+        converter = MarkdownConverter()
+        self.assertEqual(Document.from_ocr_result(ocr_result).to_markdown(converter),
+                         converter.convert_to_markdown(ocr_result))
+
+    def test_to_text(self):
+        """測試純文字輸出"""
+        text = self.document.to_text()
+
+        self.assertIn('Intro and the diverse text.', text)
+        self.assertIn('\f', text)
+        self.assertNotIn('<center>', text)
+
+    def test_to_json(self):
+        """測試 JSON 輸出"""
+        data = json.loads(self.document.to_json())
+
+        self.assertEqual(data['num_pages'], 2)
+        self.assertEqual(data['blocks'][0], {'type': 'heading', 'page': 1, 'level': 1, 'text': 'Title'})
+        self.assertEqual(data['blocks'][4], {'type': 'page_break', 'page': 2})
+
+    def test_page_join(self):
+        """測試跨頁段落依合併規則接續"""
+        document = Document.from_ocr_result({
+            'data': {'pages': ['A sentence that', 'continues here.']}
+        })
+        self.assertEqual([block.type for block in document], ['paragraph', 'paragraph', 'page_break'])
+        self.assertEqual(document.to_dict()['blocks'][0]['text'], 'A sentence that continues here.')
+
+    def test_compact_records(self):
+        """測試區塊記錄比字典列表精簡"""
+        self.assertLess(self.document.nbytes(), 40 * len(self.document))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+"""
+多端點負載平衡測試
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.alphaxiv_client import AlphaXivClient
+from api.endpoint_pool import EndpointPool
+from utils.metrics import REGISTRY
+
+URLS = ['http://a/inference', 'http://b/inference', 'http://c/inference']
+
+
+def fail(pool, url, times):
+    """對指定端點送出並記錄失敗的請求"""
+    endpoint = next(e for e in pool.endpoints if e.url == url)
+    for _ in range(times):
+        endpoint.outstanding += 1
+        pool.release(endpoint, 1.0, failed=True)
+    return endpoint
+
+
+class TestSelection(unittest.TestCase):
+    """測試選擇策略"""
+
+    def test_p2c_prefers_faster_endpoint(self):
+        pool = EndpointPool(URLS[:2], strategy='p2c', alpha=1.0)
+        fast, slow = pool.endpoints
+        for endpoint, seconds in ((fast, 2.0), (slow, 9.0)):
+            endpoint.outstanding += 1
+            pool.release(endpoint, seconds, failed=False, expected=2.0)
+
+        chosen = [pool.acquire() for _ in range(5)]
+        # 慢 4.5 倍的端點在快的端點累積 4 個進行中請求後才會被選中
+        self.assertEqual(chosen, [fast] * 4 + [slow])
+
+    def test_least_outstanding_spreads_requests(self):
+        pool = EndpointPool(URLS, strategy='least_outstanding')
+        chosen = {pool.acquire().url for _ in range(3)}
+        self.assertEqual(chosen, set(URLS))
+        self.assertTrue(all(e.outstanding == 1 for e in pool.endpoints))
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            EndpointPool(URLS, strategy='round_robin')
+
+
+class TestEjection(unittest.TestCase):
+    """測試連續失敗的端點移出與探測"""
+
+    def test_ejected_after_consecutive_failures(self):
+        pool = EndpointPool(URLS[:2], eject_failures=3, eject_seconds=60)
+        bad = fail(pool, URLS[0], 2)
+        self.assertIsNone(bad.ejected_until)
+        fail(pool, URLS[0], 1)
+        self.assertIsNotNone(bad.ejected_until)
+        self.assertTrue(all(pool.acquire().url == URLS[1] for _ in range(10)))
+
+    def test_probe_readmits_or_backs_off(self):
+        pool = EndpointPool(URLS[:2], eject_failures=1, eject_seconds=0.01)
+        bad = fail(pool, URLS[0], 1)
+        first = bad.ejected_until
+        time.sleep(0.02)
+
+        probe = pool.acquire()
+        self.assertIs(probe, bad)
+        # 探測期間不放行第二個探測
+        self.assertEqual(pool.acquire().url, URLS[1])
+        pool.release(probe, 1.0, failed=True)
+        self.assertGreater(bad.ejected_until - first, 0.015)
+        self.assertEqual(bad.ejections, 2)
+
+        time.sleep(0.03)
+        probe = pool.acquire()
+        self.assertIs(probe, bad)
+        pool.release(probe, 1.0, failed=False)
+        self.assertIsNone(bad.ejected_until)
+        self.assertEqual(bad.failures, 0)
+
+    def test_last_endpoint_never_ejected(self):
+        pool = EndpointPool(URLS[:2], eject_failures=1, eject_seconds=60)
+        fail(pool, URLS[0], 1)
+        last = fail(pool, URLS[1], 5)
+        self.assertIsNone(last.ejected_until)
+        self.assertIs(pool.acquire(), last)
+
+    def test_acquire_other_skips_tried_and_ejected(self):
+        pool = EndpointPool(URLS, eject_failures=1, eject_seconds=60)
+        fail(pool, URLS[2], 1)
+        tried = pool.endpoints[0]
+        self.assertIs(pool.acquire_other(tried), pool.endpoints[1])
+        self.assertEqual(pool.endpoints[1].outstanding, 1)
+        single = EndpointPool(URLS[:1])
+        self.assertIsNone(single.acquire_other(single.endpoints[0]))
+
+    def test_cancel_releases_without_counting(self):
+        pool = EndpointPool(URLS[:1])
+        endpoint = pool.acquire()
+        pool.cancel(endpoint)
+        self.assertEqual(endpoint.outstanding, 0)
+        self.assertEqual(endpoint.failures, 0)
+        self.assertIsNone(endpoint.latency)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_labelled_gauges_exposed(self):
+        pool = EndpointPool(['http://metrics/inference'])
+        pool.acquire()
+        text = REGISTRY.expose()
+        self.assertIn('ocr_upstream_endpoint_outstanding{endpoint="http://metrics/inference"} 1',
+                      text)
+        self.assertIn('ocr_upstream_endpoint_ejected{endpoint="http://metrics/inference"} 0',
+                      text)
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.content = b'{}'
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code}')
+
+    def json(self):
+        return {'data': {'ocr_text': '', 'pages': [], 'num_pages': 0, 'num_successful': 0}}
+
+
+class TestClientRouting(unittest.TestCase):
+    """測試客戶端依 ALPHAXIV_API_URLS 分配請求"""
+
+    def setUp(self):
+        patch = mock.patch.dict(os.environ, {
+            'ALPHAXIV_API_URLS': ' , '.join(URLS[:2]),
+            'UPSTREAM_BALANCER': 'least_outstanding',
+        })
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_urls_from_environment(self):
+        client = AlphaXivClient()
+        self.assertEqual(client.endpoints.urls, URLS[:2])
+        self.assertEqual(client.api_url, URLS[0])
+        self.assertEqual(AlphaXivClient(api_url=URLS[2]).endpoints.urls, [URLS[2]])
+
+    def test_failures_steer_to_healthy_endpoint(self):
+        client = AlphaXivClient()
+        client.endpoints.eject_failures = 1
+        posted = []
+
+        def post(url, files, timeout):
+            posted.append(url)
+            return FakeResponse(503 if url == URLS[0] else 200)
+
+        def send():
+            try:
+                client.process_pdf_from_bytes(b'%PDF', 'a.pdf', num_pages=1)
+            except Exception:
+                pass
+
+        with mock.patch('api.alphaxiv_client.requests.post', post):
+            while URLS[0] not in posted:
+                send()
+            posted.clear()
+            for _ in range(5):
+                send()
+
+        self.assertEqual(posted, [URLS[1]] * 5)
+        self.assertTrue(all(e.outstanding == 0 for e in client.endpoints.endpoints))
+
+    def test_retried_on_other_endpoint(self):
+        client = AlphaXivClient()
+        client.endpoints.eject_failures = 100
+        posted = []
+
+        def post(url, files, timeout):
+            posted.append(url)
+            if url == URLS[0]:
+                if len(posted) % 2:
+                    raise requests.ConnectionError('連線被拒')
+                return FakeResponse(502)
+            return FakeResponse(200)
+
+        with mock.patch('api.alphaxiv_client.requests.post', post):
+            for _ in range(10):
+                client.process_pdf_from_bytes(b'%PDF', 'a.pdf', num_pages=1)
+
+        # 失敗的請求都改由另一個端點重試成功，斷路器不計入失敗
+        self.assertIn(URLS[0], posted)
+        self.assertEqual(posted.count(URLS[1]), 10)
+        self.assertEqual(client.breaker.snapshot()['consecutive_failures'], 0)
+        self.assertTrue(all(e.outstanding == 0 for e in client.endpoints.endpoints))
+
+    def test_single_endpoint_not_retried(self):
+        client = AlphaXivClient(api_url=URLS[2])
+        posted = []
+
+        def post(url, files, timeout):
+            posted.append(url)
+            return FakeResponse(503)
+
+        with mock.patch('api.alphaxiv_client.requests.post', post):
+            with self.assertRaises(Exception):
+                client.process_pdf_from_bytes(b'%PDF', 'a.pdf', num_pages=1)
+        self.assertEqual(posted, [URLS[2]])
+        self.assertEqual(client.breaker.snapshot()['consecutive_failures'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
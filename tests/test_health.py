@@ -0,0 +1,205 @@
+"""
+健康檢查測試
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.alphaxiv_client import AlphaXivClient
+from api.upstream_health import CircuitBreaker, CircuitOpenError, UpstreamStats
+from services.health import QueueFullError, ReadinessCheck, WorkLimiter
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """測試斷路器"""
+
+    def test_opens_after_threshold_and_probes_once(self):
+        """測試連續失敗後開啟，冷卻後只放行一個探測請求"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.05)
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, 'half_open')
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record(True)
+        self.assertEqual(breaker.state, 'closed')
+        breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        """測試探測失敗時再次開啟"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        breaker.record(False)
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+
+
+class TestUpstreamStats(unittest.TestCase):
+    """測試上游延遲與錯誤率統計"""
+
+    def test_ewma(self):
+        stats = UpstreamStats(alpha=0.5)
+        stats.record(2.0, failed=False)
+        stats.record(4.0, failed=True)
+        snapshot = stats.snapshot()
+        self.assertAlmostEqual(snapshot['ewma_latency_seconds'], 3.0)
+        self.assertAlmostEqual(snapshot['ewma_error_rate'], 0.5)
+        self.assertEqual(snapshot['samples'], 2)
+        self.assertIsNone(snapshot['ewma_slowness'])
+
+    def test_slowness_relative_to_prediction(self):
+        stats = UpstreamStats(alpha=0.5)
+        stats.record(200.0, failed=False, expected=100.0)
+        stats.record(10.0, failed=False, expected=10.0)
+        self.assertAlmostEqual(stats.snapshot()['ewma_slowness'], 1.5)
+
+
+class TestWorkLimiter(unittest.TestCase):
+    """測試 OCR 工作數限制"""
+
+    def test_rejects_when_queue_full(self):
+        limiter = WorkLimiter(max_in_flight=1, max_queued=0, queue_timeout=1)
+        with limiter.slot():
+            self.assertTrue(limiter.saturated)
+            with self.assertRaises(QueueFullError):
+                with limiter.slot():
+                    pass
+        self.assertEqual(limiter.snapshot()['in_flight'], 0)
+
+    def test_queued_work_waits_for_slot(self):
+        """測試排隊的工作在名額釋放後執行，逾時則拒絕"""
+        limiter = WorkLimiter(max_in_flight=1, max_queued=1, queue_timeout=5)
+        release = threading.Event()
+        acquired = []
+
+        def hold():
+            with limiter.slot():
+                release.wait()
+
+        def wait_for_slot():
+            with limiter.slot():
+                acquired.append(True)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        while limiter.snapshot()['in_flight'] == 0:
+            time.sleep(0.001)
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        while limiter.snapshot()['queued'] == 0:
+            time.sleep(0.001)
+        self.assertEqual(acquired, [])
+
+        release.set()
+        holder.join()
+        waiter.join()
+        self.assertEqual(acquired, [True])
+
+        limiter.queue_timeout = 0.05
+        errors = []
+
+        def time_out():
+            try:
+                with limiter.slot():
+                    pass
+            except QueueFullError as e:
+                errors.append(e)
+
+        with limiter.slot():
+            thread = threading.Thread(target=time_out)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(limiter.snapshot()['queued'], 0)
+
+    def test_priority_slot_served_first(self):
+        """測試高優先順序的名額先於較早排隊的一般名額"""
+        limiter = WorkLimiter(max_in_flight=1, max_queued=2, queue_timeout=5)
+        order = []
+
+        def wait_for_slot(name, priority):
+            with limiter.slot(priority=priority):
+                order.append(name)
+
+        with limiter.slot():
+            normal = threading.Thread(target=wait_for_slot, args=('normal', False))
+            normal.start()
+            while limiter.snapshot()['queued'] < 1:
+                time.sleep(0.001)
+            preview = threading.Thread(target=wait_for_slot, args=('preview', True))
+            preview.start()
+            while limiter.snapshot()['queued'] < 2:
+                time.sleep(0.001)
+        normal.join()
+        preview.join()
+        self.assertEqual(order, ['preview', 'normal'])
+
+
+class TestReadinessCheck(unittest.TestCase):
+    """測試就緒檢查"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = AlphaXivClient(api_url='http://127.0.0.1:1/inference')
+        self.client.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        self.limiter = WorkLimiter(max_in_flight=1, max_queued=0)
+        self.check = ReadinessCheck(self.limiter, self.client, [self.temp_dir])
+        self.check.min_free_bytes = 0
+
+    def tearDown(self):
+        os.rmdir(self.temp_dir)
+
+    def test_ready_by_default(self):
+        ready, details = self.check.check()
+        self.assertTrue(ready)
+        self.assertEqual(details['reasons'], [])
+        self.assertIn(self.temp_dir, details['disk_free_bytes'])
+
+    def test_not_ready_when_saturated_or_circuit_open(self):
+        with self.limiter.slot():
+            ready, details = self.check.check()
+        self.assertFalse(ready)
+        self.assertEqual(len(details['reasons']), 1)
+
+        self.client.breaker.record(False)
+        ready, details = self.check.check()
+        self.assertFalse(ready)
+        self.assertEqual(details['circuit']['state'], 'open')
+
+    def test_large_documents_not_reported_slow(self):
+        # 頁數多的文件延遲本來就長，依預測值判斷
+        for _ in range(5):
+            self.client.upstream.record(300.0, False, self.client.latency.predict(100))
+        ready, _ = self.check.check()
+        self.assertTrue(ready)
+
+        for _ in range(5):
+            self.client.upstream.record(60.0, False, self.client.latency.predict(1))
+        ready, details = self.check.check()
+        self.assertFalse(ready)
+        self.assertIn('上游延遲過高', details['reasons'][0])
+
+    def test_not_ready_when_disk_low(self):
+        self.check.min_free_bytes = 1 << 62
+        ready, _ = self.check.check()
+        self.assertFalse(ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
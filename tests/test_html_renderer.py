@@ -0,0 +1,65 @@
+"""
+HTML 預覽產生器測試
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.html_renderer import HtmlPreviewRenderer, RENDERER_VERSION, split_sections
+
+
+class TestHtmlPreviewRenderer(unittest.TestCase):
+    """測試 HTML 預覽產生器"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.md_path = os.path.join(self.tmpdir, 'doc.md')
+        self.renderer = HtmlPreviewRenderer(target_chars=50)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, content):
+        with open(self.md_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_split_sections_keeps_code_fences(self):
+        """測試不會在程式碼區塊中切段"""
+        text = 'intro\n\n```\n' + 'code\n\n' * 20 + '```\n\nafter\n'
+        sections = split_sections(text, target_chars=10)
+        self.assertEqual(''.join(sections), text)
+        self.assertTrue(any('```\n' in s and s.count('```') == 2 for s in sections))
+
+    def test_preview_is_cached_by_content(self):
+        """測試預覽快取依內容雜湊與版本命名，內容變更時移除舊快取"""
+        self._write('# Title\n\n' + 'paragraph text\n\n' * 10)
+        body, etag = self.renderer.get_preview(self.md_path)
+        payload = json.loads(gzip.decompress(body))
+        self.assertEqual(payload['version'], RENDERER_VERSION)
+        self.assertGreater(len(payload['sections']), 1)
+        self.assertIn('<h1>Title</h1>', payload['sections'][0])
+
+        caches = [name for name in os.listdir(self.tmpdir) if name.endswith('.html.json.gz')]
+        self.assertEqual(len(caches), 1)
+        self.assertIn(f'.v{RENDERER_VERSION}.', caches[0])
+
+        # 第二次讀取直接使用快取
+        self.assertEqual(self.renderer.get_preview(self.md_path), (body, etag))
+
+        self._write('changed\n')
+        _, new_etag = self.renderer.get_preview(self.md_path)
+        self.assertNotEqual(new_etag, etag)
+        caches = [name for name in os.listdir(self.tmpdir) if name.endswith('.html.json.gz')]
+        self.assertEqual(len(caches), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+圖片打包與批次辨識測試
+"""
+
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from app import create_app
+from models.document import PAGE_SPLIT
+from services.ocr_service import OCRService
+from services.result_cache import ResultCache
+
+HAS_PIL = importlib.util.find_spec('PIL') is not None
+HAS_PYPDF = importlib.util.find_spec('pypdf') is not None
+
+# 測試圖片的內容為頁數，例如 b'3' 代表三頁的 TIFF
+IMAGES = [('a.png', b'1'), ('b.tiff', b'3'), ('c.jpg', b'1')]
+
+
+def fake_pack(sources, destination, resolution=300.0):
+    """以每張圖片的內容作為頁數，打包結果為各頁標籤的 JSON"""
+    counts = []
+    labels = []
+    for index, source in enumerate(sources):
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                count = int(f.read())
+        else:
+            source.seek(0)
+            count = int(source.read())
+        counts.append(count)
+        labels.extend(f'{index}-{frame}' for frame in range(count))
+    destination.write(json.dumps(labels).encode())
+    return counts
+
+
+class FakeUpstream:
+    """每頁的文字為打包時的標籤"""
+
+    def __init__(self):
+        self.calls = []
+
+    def process_pdf_from_bytes(self, file_bytes, filename, num_pages=None):
+        labels = json.loads(file_bytes)
+        self.calls.append((labels, num_pages))
+        texts = [f'標籤 {label} 的內容。' for label in labels]
+        return {'data': {
+            'ocr_text': PAGE_SPLIT.join(texts),
+            'pages': texts,
+            'num_pages': len(texts),
+            'num_successful': len(texts),
+        }}
+
+
+class ImageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.upstream = FakeUpstream()
+        patch = mock.patch('services.ocr_service.pack_images', fake_pack)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_service(self, cache=False):
+        service = OCRService(
+            result_cache=ResultCache(os.path.join(self.temp_dir, 'cache')) if cache else None
+        )
+        service.client.process_pdf_from_bytes = self.upstream.process_pdf_from_bytes
+        return service
+
+    def write_images(self):
+        images = []
+        for name, content in IMAGES:
+            path = os.path.join(self.temp_dir, name)
+            with open(path, 'wb') as f:
+                f.write(content)
+            images.append((name, path))
+        return images
+
+
+class TestProcessImages(ImageTestCase):
+    """測試多張圖片以一次呼叫辨識並依圖片拆分"""
+
+    def test_one_call_split_per_image(self):
+        results = self.make_service().process_images(
+            self.write_images(), os.path.join(self.temp_dir, 'out')
+        )
+        self.assertEqual(len(self.upstream.calls), 1)
+        self.assertEqual(self.upstream.calls[0][1], 5)
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual([r['metadata']['num_pages'] for r in results], [1, 3, 1])
+        self.assertEqual([r['metadata']['input_file'] for r in results],
+                         ['a.png', 'b.tiff', 'c.jpg'])
+        self.assertIn('標籤 1-2 的內容', results[1]['markdown_content'])
+        self.assertNotIn('標籤 0-0', results[1]['markdown_content'])
+        self.assertNotIn('標籤 1-0', results[2]['markdown_content'])
+        self.assertEqual(len({r['output_file'] for r in results}), 3)
+        self.assertTrue(os.path.basename(results[1]['output_file']).startswith('b_'))
+
+    def test_cached_batch(self):
+        service = self.make_service(cache=True)
+        service.process_images(self.write_images(), self.temp_dir)
+        results = service.process_images(self.write_images(), self.temp_dir)
+        self.assertEqual(len(self.upstream.calls), 1)
+        self.assertEqual(results[0]['metadata']['timings']['cache'], 'hit')
+
+    def test_single_image_document(self):
+        path = self.write_images()[1][1]
+        result = self.make_service().process_document(path, self.temp_dir)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['metadata']['num_pages'], 3)
+
+    def test_page_count_mismatch_fails_all(self):
+        service = self.make_service()
+        service.client.process_pdf_from_bytes = lambda *args, **kwargs: {'data': {
+            'ocr_text': 'x', 'pages': ['x'], 'num_pages': 1, 'num_successful': 1,
+        }}
+        results = service.process_images(self.write_images(), self.temp_dir)
+        self.assertEqual(len(results), 3)
+        self.assertFalse(any(result['success'] for result in results))
+
+
+class TestImageUpload(ImageTestCase):
+    """測試 /upload 接受圖片與多張圖片"""
+
+    def setUp(self):
+        super().setUp()
+        self.app = create_app({
+            'TESTING': True,
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': None,
+        })
+        services = self.app.extensions['ocr_services']
+        services._instances['ocr_service'] = self.make_service()
+        self.client = self.app.test_client()
+
+    def test_batch_upload(self):
+        response = self.client.post('/upload', data={
+            'file': [(io.BytesIO(content), name) for name, content in IMAGES],
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertTrue(body['success'])
+        self.assertEqual(len(body['results']), 3)
+        self.assertEqual(len(self.upstream.calls), 1)
+        self.assertFalse(os.listdir(os.path.join(self.temp_dir, 'uploads')))
+
+    def test_batch_rejects_pdf(self):
+        response = self.client.post('/upload', data={
+            'file': [(io.BytesIO(b'1'), 'a.png'), (io.BytesIO(b'%PDF'), 'b.pdf')],
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_image(self):
+        response = self.client.post('/upload', data={
+            'file': (io.BytesIO(b'3'), 'scan.tif'), 'preview': '1',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('標籤 0-2 的內容', response.get_json()['markdown_content'])
+
+        response = self.client.post('/upload', data={
+            'file': (io.BytesIO(b'3'), 'scan.tif'), 'pages': '1-2',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(HAS_PIL and HAS_PYPDF, '需要 Pillow 與 pypdf')
+class TestPackImages(unittest.TestCase):
+    """測試以 Pillow 打包多頁 TIFF 與不同色彩模式的圖片"""
+
+    def test_page_counts(self):
+        from PIL import Image
+        from pypdf import PdfReader
+        from utils.image_pack import pack_images
+
+        tiff = io.BytesIO()
+        frames = [Image.new('L', (100, 100), color) for color in (0, 128, 255)]
+        frames[0].save(tiff, 'TIFF', save_all=True, append_images=frames[1:])
+        png = io.BytesIO()
+        Image.new('RGBA', (50, 80)).save(png, 'PNG')
+
+        pdf = io.BytesIO()
+        counts = pack_images([png, tiff], pdf)
+        self.assertEqual(counts, [1, 3])
+        self.assertEqual(len(PdfReader(io.BytesIO(pdf.getvalue())).pages), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
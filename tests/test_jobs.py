@@ -0,0 +1,238 @@
+"""
+預覽模式與背景工作測試
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from app import create_app
+from models.document import PAGE_SPLIT
+from services.jobs import DONE, RUNNING, JobStore
+from services.ocr_service import OCRService
+from services.result_cache import ResultCache
+
+NUM_PAGES = 6
+
+
+def page_text(page):
+    return f"第 {page} 頁的內容。\n\n## 小節 {page}\n\n段落 {page}"
+
+
+def ocr_response(pages):
+    texts = [page_text(page) for page in pages]
+    return {'data': {
+        'ocr_text': PAGE_SPLIT.join(texts),
+        'pages': texts,
+        'num_pages': len(texts),
+        'num_successful': len(texts),
+    }}
+
+
+class FakeUpstream:
+    """記錄每次送出的頁面；擷取的子文件內容為頁碼的 JSON"""
+
+    def __init__(self):
+        self.calls = []
+
+    def process_pdf(self, file_path, num_pages=None):
+        self.calls.append(list(range(1, NUM_PAGES + 1)))
+        return ocr_response(self.calls[-1])
+
+    def process_pdf_from_bytes(self, file_bytes, filename, num_pages=None):
+        self.calls.append(json.loads(file_bytes))
+        return ocr_response(self.calls[-1])
+
+
+def fake_extract(source, pages, destination):
+    destination.write(json.dumps(list(pages)).encode())
+
+
+class PreviewTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 preview')
+        self.upstream = FakeUpstream()
+        # 測試環境未必安裝 pypdf，頁數與擷取以假的實作代替
+        patches = [
+            mock.patch('services.ocr_service.count_pages', lambda source: NUM_PAGES),
+            mock.patch('services.ocr_service.extract_pages', fake_extract),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_service(self, cache=True):
+        service = OCRService(
+            result_cache=ResultCache(os.path.join(self.temp_dir, 'cache')) if cache else None
+        )
+        service.client.process_pdf = self.upstream.process_pdf
+        service.client.process_pdf_from_bytes = self.upstream.process_pdf_from_bytes
+        return service
+
+
+class TestProcessDocumentPreview(PreviewTestCase):
+    """測試先預覽再合併的處理流程"""
+
+    def test_matches_one_shot_output(self):
+        previews = []
+        result = self.make_service(cache=False).process_document_preview(
+            self.pdf_path, os.path.join(self.temp_dir, 'preview'),
+            preview_pages=2, on_preview=previews.append
+        )
+        one_shot = self.make_service(cache=False).process_document(
+            self.pdf_path, os.path.join(self.temp_dir, 'one_shot')
+        )
+        self.assertTrue(result['success'])
+        self.assertEqual(result['markdown_content'], one_shot['markdown_content'])
+        self.assertEqual(result['metadata']['preview_pages'], '1-2')
+        self.assertEqual(self.upstream.calls[:2], [[1, 2], [3, 4, 5, 6]])
+
+        self.assertEqual(len(previews), 1)
+        self.assertIn('第 2 頁的內容', previews[0]['markdown_content'])
+        self.assertNotIn('第 3 頁的內容', previews[0]['markdown_content'])
+
+    def test_cached_pages_not_sent_again(self):
+        service = self.make_service()
+        service.process_document_preview(self.pdf_path, self.temp_dir, preview_pages=1)
+        self.assertEqual(len(self.upstream.calls), 2)
+
+        # 合併結果已快取：一次處理與預覽模式都不再呼叫上游，也不產生預覽
+        previews = []
+        service.process_document_preview(self.pdf_path, self.temp_dir, preview_pages=1,
+                                         on_preview=previews.append)
+        result = service.process_document(self.pdf_path, self.temp_dir)
+        self.assertEqual(len(self.upstream.calls), 2)
+        self.assertEqual(previews, [])
+        self.assertEqual(result['metadata']['timings']['cache'], 'hit')
+
+    def test_page_selection(self):
+        result = self.make_service(cache=False).process_document_preview(
+            self.pdf_path, self.temp_dir, pages='2-4,6', preview_pages=1
+        )
+        self.assertEqual(self.upstream.calls, [[2], [3, 4, 6]])
+        self.assertEqual(result['metadata']['pages'], '2-4,6')
+        self.assertIn('頁面範圍**: 2-4,6（原始文件共 6 頁）', result['markdown_content'])
+
+    def test_short_document_processed_once(self):
+        self.make_service(cache=False).process_document_preview(
+            self.pdf_path, self.temp_dir, preview_pages=NUM_PAGES
+        )
+        self.assertEqual(len(self.upstream.calls), 1)
+
+
+class TestPreviewUpload(PreviewTestCase):
+    """測試預覽模式的上傳與工作查詢端點"""
+
+    def setUp(self):
+        super().setUp()
+        self.app = create_app({
+            'TESTING': True,
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': None,
+            'JOB_FOLDER': os.path.join(self.temp_dir, 'jobs'),
+        })
+        services = self.app.extensions['ocr_services']
+        services._instances['ocr_service'] = self.make_service(cache=False)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        # 等背景工作寫完狀態檔後才刪除暫存目錄
+        self.app.extensions['ocr_services'].shutdown()
+        super().tearDown()
+
+    def upload(self, preview):
+        return self.client.post('/upload', data={
+            'file': (io.BytesIO(b'%PDF-1.4 preview'), 'paper.pdf'),
+            'preview': preview,
+        })
+
+    def test_preview_then_poll(self):
+        response = self.upload('1')
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        self.assertFalse(body['complete'])
+        self.assertIn('第 1 頁的內容', body['markdown_content'])
+
+        for _ in range(100):
+            job = self.client.get(f"/jobs/{body['job_id']}").get_json()
+            if job['status'] != RUNNING:
+                break
+            time.sleep(0.02)
+        self.assertEqual(job['status'], DONE)
+        self.assertIn('第 6 頁的內容', job['result']['markdown_content'])
+        self.assertTrue(job['result']['output_file'].endswith('.md'))
+
+    def test_slow_preview_returns_job_id(self):
+        services = self.app.extensions['ocr_services']
+        services.work_limiter.queue_timeout = 0
+        release = threading.Event()
+        upstream = services.ocr_service.client.process_pdf_from_bytes
+
+        def blocked(file_bytes, filename, num_pages=None):
+            release.wait(5)
+            return upstream(file_bytes, filename, num_pages)
+
+        services.ocr_service.client.process_pdf_from_bytes = blocked
+        with mock.patch.object(services.ocr_service.client.latency, 'timeout',
+                               lambda pages: 0.05):
+            response = self.upload('1')
+        release.set()
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        self.assertFalse(body['complete'])
+        self.assertNotIn('markdown_content', body)
+
+        for _ in range(100):
+            job = self.client.get(f"/jobs/{body['job_id']}").get_json()
+            if job['status'] != RUNNING:
+                break
+            time.sleep(0.02)
+        self.assertEqual(job['status'], DONE)
+
+    def test_invalid_preview(self):
+        self.assertEqual(self.upload('0').status_code, 400)
+        self.assertEqual(self.upload('abc').status_code, 400)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/jobs/' + '0' * 32).status_code, 404)
+        self.assertEqual(self.client.get('/jobs/..%2Fsecret').status_code, 404)
+
+
+class TestJobStore(unittest.TestCase):
+    """測試工作狀態檔"""
+
+    def test_create_update_prune(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = JobStore(tmpdir)
+            job_id = store.create(input_file='a.pdf')
+            self.assertEqual(store.get(job_id)['status'], RUNNING)
+            store.update(job_id, status=DONE, result={'success': True})
+            self.assertEqual(store.get(job_id)['result'], {'success': True})
+
+            store.retention = 0
+            os.utime(os.path.join(tmpdir, f'{job_id}.json'), (0, 0))
+            self.assertEqual(store.prune(), 1)
+            self.assertIsNone(store.get(job_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
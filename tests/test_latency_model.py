@@ -0,0 +1,182 @@
+"""
+延遲模型與分段處理測試
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.latency_model import LatencyModel
+from models.document import PAGE_SPLIT
+from services.ocr_service import OCRService
+from services.result_cache import ResultCache
+from utils.metrics import REGISTRY
+
+NUM_PAGES = 12
+
+
+class TestLatencyModel(unittest.TestCase):
+    """測試延遲擬合、逾時與分段大小"""
+
+    def test_fit_recovers_overhead_and_per_page(self):
+        model = LatencyModel(overhead=10, per_page=3, decay=0.99)
+        rng = random.Random(0)
+        for _ in range(300):
+            pages = rng.randint(1, 40)
+            model.observe(pages, 4 + 0.5 * pages + rng.gauss(0, 0.2))
+        self.assertAlmostEqual(model.overhead, 4, delta=0.5)
+        self.assertAlmostEqual(model.per_page, 0.5, delta=0.05)
+        self.assertLess(model.snapshot()['residual_seconds'], 0.5)
+
+    def test_prior_slope_when_page_counts_identical(self):
+        model = LatencyModel(overhead=10, per_page=3, decay=1.0)
+        for _ in range(20):
+            model.observe(5, 20.0)
+        self.assertAlmostEqual(model.predict(5), 20.0)
+        self.assertAlmostEqual(model.per_page, 3.0)
+
+    def test_timeout_bounds(self):
+        model = LatencyModel(overhead=1, per_page=0.1)
+        model.min_timeout, model.max_timeout = 30, 600
+        self.assertEqual(model.timeout(1), 30)
+        self.assertEqual(model.timeout(100000), 600)
+        self.assertEqual(model.timeout(None), 600)
+        model.timeout_factor = 3
+        self.assertAlmostEqual(model.timeout(200), 63)
+
+    def test_chunk_size(self):
+        model = LatencyModel(overhead=10, per_page=1)
+        self.assertEqual(model.chunk_size(40, 1), 40)
+        # 平行度越高，分段越小，預估時間也越短
+        four = model.chunk_size(40, 4)
+        self.assertEqual(four, 10)
+        self.assertLess(model.chunk_size(40, 8), four)
+        self.assertLess(model.eta(40, 4), model.eta(40, 1))
+        # 固定成本遠大於每頁成本時只分成一輪平行請求
+        self.assertEqual(LatencyModel(overhead=100, per_page=0.01).chunk_size(40, 8), 5)
+
+    def test_gauges_exposed(self):
+        model = LatencyModel(overhead=7, per_page=2)
+        model.observe(3, 13.0)
+        text = REGISTRY.expose()
+        self.assertIn('ocr_upstream_latency_per_page_seconds', text)
+        self.assertIn('ocr_upstream_latency_observations 1', text)
+
+
+def page_text(page):
+    return f"第 {page} 頁的內容。\n\n段落 {page}"
+
+
+def ocr_response(pages):
+    texts = [page_text(page) for page in pages]
+    return {'data': {
+        'ocr_text': PAGE_SPLIT.join(texts),
+        'pages': texts,
+        'num_pages': len(texts),
+        'num_successful': len(texts),
+    }}
+
+
+class FakeUpstream:
+    """記錄每次送出的頁面與頁數；擷取的子文件內容為頁碼的 JSON"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def process_pdf(self, file_path, num_pages=None):
+        with self.lock:
+            self.calls.append((list(range(1, NUM_PAGES + 1)), num_pages))
+        return ocr_response(range(1, NUM_PAGES + 1))
+
+    def process_pdf_from_bytes(self, file_bytes, filename, num_pages=None):
+        pages = json.loads(file_bytes)
+        with self.lock:
+            self.calls.append((pages, num_pages))
+        return ocr_response(pages)
+
+
+def fake_extract(source, pages, destination):
+    destination.write(json.dumps(list(pages)).encode())
+
+
+class TestChunkedProcessing(unittest.TestCase):
+    """測試依延遲模型分段同時送出"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 chunks')
+        self.upstream = FakeUpstream()
+        # 測試環境未必安裝 pypdf，頁數與擷取以假的實作代替
+        patches = [
+            mock.patch('services.ocr_service.count_pages', lambda source: NUM_PAGES),
+            mock.patch('services.ocr_service.extract_pages', fake_extract),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_service(self, parallelism, cache=False):
+        service = OCRService(
+            result_cache=ResultCache(os.path.join(self.temp_dir, 'cache')) if cache else None
+        )
+        service.chunk_parallelism = parallelism
+        service.client.latency = LatencyModel(overhead=2, per_page=1)
+        service.client.process_pdf = self.upstream.process_pdf
+        service.client.process_pdf_from_bytes = self.upstream.process_pdf_from_bytes
+        return service
+
+    def test_chunked_matches_one_shot(self):
+        one_shot = self.make_service(1).process_document(
+            self.pdf_path, os.path.join(self.temp_dir, 'one_shot')
+        )
+        self.assertEqual(self.upstream.calls, [(list(range(1, NUM_PAGES + 1)), NUM_PAGES)])
+
+        self.upstream.calls.clear()
+        result = self.make_service(4).process_document(
+            self.pdf_path, os.path.join(self.temp_dir, 'chunked')
+        )
+        self.assertTrue(result['success'])
+        self.assertEqual(result['markdown_content'], one_shot['markdown_content'])
+        self.assertGreater(result['metadata']['timings']['chunks'], 1)
+        self.assertGreater(result['metadata']['timings']['eta_seconds'], 0)
+        sent = sorted(page for pages, _ in self.upstream.calls for page in pages)
+        self.assertEqual(sent, list(range(1, NUM_PAGES + 1)))
+        # 每段以實際頁數設定逾時
+        self.assertTrue(all(num_pages == len(pages) for pages, num_pages in self.upstream.calls))
+
+    def test_merged_result_cached(self):
+        service = self.make_service(4, cache=True)
+        service.process_document(self.pdf_path, self.temp_dir)
+        sent = len(self.upstream.calls)
+        result = service.process_document(self.pdf_path, self.temp_dir)
+        self.assertEqual(len(self.upstream.calls), sent)
+        self.assertEqual(result['metadata']['timings']['cache'], 'hit')
+
+    def test_page_selection_chunked(self):
+        result = self.make_service(4).process_document(
+            self.pdf_path, self.temp_dir, pages='3-10'
+        )
+        self.assertEqual(result['metadata']['pages'], '3-10')
+        sent = sorted(page for pages, _ in self.upstream.calls for page in pages)
+        self.assertEqual(sent, list(range(3, 11)))
+        self.assertIn('第 10 頁的內容', result['markdown_content'])
+        self.assertNotIn('第 11 頁的內容', result['markdown_content'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+執行指標測試
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.metrics import MetricsRegistry, clear_multiprocess_dir, mark_process_dead
+
+
+class TestMetrics(unittest.TestCase):
+    """測試指標登錄表"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_merges_thread_shards(self):
+        """測試各執行緒的分片在輸出時加總，已結束的執行緒也保留數值"""
+        counter = self.registry.counter('test_total', '測試', ('kind',))
+
+        def work():
+            for _ in range(1000):
+                counter.inc('a')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('b', amount=2)
+
+        self.assertEqual(counter.collect(), {('a',): 8000.0, ('b',): 2.0})
+        self.assertEqual(len(counter._shards), 1)
+        self.assertIn('test_total{kind="a"} 8000', self.registry.expose())
+
+    def test_gauge_across_threads(self):
+        """測試量表可以在不同執行緒中增減"""
+        gauge = self.registry.gauge('test_in_flight', '測試')
+        gauge.inc()
+        thread = threading.Thread(target=gauge.dec)
+        thread.start()
+        thread.join()
+        self.assertEqual(gauge.collect(), {(): 0.0})
+
+    def test_histogram_exposition(self):
+        """測試直方圖輸出累積區間、總和與次數"""
+        histogram = self.registry.histogram('test_seconds', '測試', ('stage',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'x')
+        lines = self.registry.expose().splitlines()
+        self.assertIn('test_seconds_bucket{stage="x",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{stage="x",le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{stage="x",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{stage="x"} 3.65', lines)
+        self.assertIn('test_seconds_count{stage="x"} 4', lines)
+
+
+
+class TestMultiprocessMetrics(unittest.TestCase):
+    """測試多個 worker 的指標合併"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.registry = MetricsRegistry(self.directory)
+        self.requests = self.registry.counter('test_requests_total', '測試', ('status',))
+        self.in_flight = self.registry.gauge('test_in_flight', '測試')
+        self.state = self.registry.gauge('test_state', '測試', multiprocess_mode='all')
+        self.seconds = self.registry.histogram('test_seconds', '測試', buckets=(1.0,))
+
+    def run_worker(self, requests):
+        """在 fork 出的程序中記錄指標並寫入快照，返回其 pid"""
+        def work():
+            for _ in range(requests):
+                self.requests.inc('200')
+                self.seconds.observe(0.5)
+            self.in_flight.inc()
+            self.state.inc(amount=requests)
+            self.registry.write_snapshot()
+
+        process = multiprocessing.get_context('fork').Process(target=work)
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        return process.pid
+
+    def test_any_worker_exposes_all_workers(self):
+        first = self.run_worker(3)
+        second = self.run_worker(4)
+        self.requests.inc('200')
+        self.in_flight.inc()
+
+        lines = self.registry.expose().splitlines()
+        self.assertIn('test_requests_total{status="200"} 8', lines)
+        self.assertIn('test_in_flight 3', lines)
+        self.assertIn('test_seconds_count 7', lines)
+        self.assertIn(f'test_state{{pid="{first}"}} 3', lines)
+        self.assertIn(f'test_state{{pid="{second}"}} 4', lines)
+
+    def test_dead_worker_keeps_counters_only(self):
+        pid = self.run_worker(3)
+        mark_process_dead(pid, self.directory)
+        second = self.run_worker(2)
+        mark_process_dead(second, self.directory)
+
+        lines = self.registry.expose().splitlines()
+        self.assertIn('test_requests_total{status="200"} 5', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 5', lines)
+        # 量表只計入存活的 worker
+        self.assertNotIn('test_in_flight 1', lines)
+        self.assertFalse([line for line in lines if line.startswith('test_state{')])
+
+    def test_clear_removes_previous_run(self):
+        self.run_worker(3)
+        clear_multiprocess_dir(self.directory)
+        self.requests.inc('200')
+        self.assertIn('test_requests_total{status="200"} 1', self.registry.expose().splitlines())
+
+    def test_single_process_without_directory(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', '測試')
+        counter.inc()
+        registry.write_snapshot()
+        self.assertIn('test_total 1', registry.expose())
+
+
+if __name__ == '__main__':
+    unittest.main()
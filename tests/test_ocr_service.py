@@ -2,6 +2,8 @@
 OCR 服務測試
 """
 
+import io
+import random
 import unittest
 import sys
 import os
@@ -10,7 +12,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.utils.file_validator import FileValidator
-from src.utils.markdown_converter import MarkdownConverter
+from src.utils.markdown_converter import MarkdownConverter, MarkdownStream
 
 
 class TestFileValidator(unittest.TestCase):
@@ -24,9 +26,16 @@ class TestFileValidator(unittest.TestCase):
     def test_disallowed_file(self):
         """測試不允許的檔案類型"""
         self.assertFalse(FileValidator.allowed_file('test.txt'))
-        self.assertFalse(FileValidator.allowed_file('image.jpg'))
+        self.assertFalse(FileValidator.allowed_file('image.gif'))
         self.assertFalse(FileValidator.allowed_file('noextension'))
 
+    def test_allowed_image(self):
+        """測試允許的圖片檔案"""
+        for name in ('scan.png', 'photo.JPG', 'photo.jpeg', 'pages.tif', 'pages.TIFF'):
+            self.assertTrue(FileValidator.allowed_file(name))
+            self.assertTrue(FileValidator.is_image(name))
+        self.assertFalse(FileValidator.is_image('test.pdf'))
+
     def test_file_size_validation(self):
         """測試檔案大小驗證"""
         # 正常大小
@@ -105,5 +114,96 @@ class TestMarkdownConverter(unittest.TestCase):
         self.assertIn('language', markdown)
 
 
+class TestMarkdownStream(unittest.TestCase):
+    """測試逐頁串流轉換"""
+
+    PAGE_SPLIT = '\n\n<--- Page Split --->\n\n'
+
+    def setUp(self):
+        self.converter = MarkdownConverter()
+
+    def _result(self, pages):
+        return {
+            'data': {
+                'ocr_text': self.PAGE_SPLIT.join(pages),
+                'pages': pages,
+                'num_pages': len(pages),
+                'num_successful': len(pages)
+            }
+        }
+
+    def assertSameAsSerial(self, pages):
+        ocr_result = self._result(pages)
+        expected = self.converter.convert_to_markdown(ocr_result)
+        self.assertEqual(''.join(self.converter.iter_markdown(ocr_result)), expected)
+
+    def test_figure_split_across_pages(self):
+        """測試跨頁的圖片說明與段落合併"""
+        self.assertSameAsSerial([
+            'Text before the<center>FIGURE 1 A',
+            ' caption. More.</center>\n',
+            '\ntext after continues.\n'
+        ])
+
+    def test_consecutive_figures(self):
+        """測試連續圖片說明"""
+        self.assertSameAsSerial([
+            'Sentence ends.<center>FIGURE 1 One.</center>',
+            '<center>FIGURE 2 Two.</center>and then more',
+            '<center>Title</center> New sentence.'
+        ])
+
+    def test_center_tag_across_pages(self):
+        """測試跨頁的 <center> 標記"""
+        self.assertSameAsSerial(['前文<cen', 'ter>標題</center>後文'])
+
+    def test_random_page_splits(self):
+        """測試格式正確的文字在任意位置分頁時與整份轉換相同"""
+        pieces = [
+            '<center>FIGURE 1. A caption</center>', '<center>FIGURE 2</center>',
+            '<center>Title</center>', 'word ', 'and ', 'End. ', 'Done!', '\n', '\n\n',
+            'lower ', 'FIGURE 3. x '
+        ]
+        generator = random.Random(26)
+        for _ in range(300):
+            text = ''.join(generator.choice(pieces) for _ in range(generator.randint(1, 14)))
+            cuts = sorted(generator.sample(range(len(text) + 1), generator.randint(0, 4)))
+            pages = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+            with self.subTest(pages=pages):
+                self.assertSameAsSerial(pages)
+
+    def test_falls_back_to_ocr_text(self):
+        """測試沒有 pages 時依分頁標記切分 ocr_text"""
+        ocr_result = self._result(['第一頁。', '<center>FIGURE 1 圖.</center>第二頁'])
+        expected = self.converter.convert_to_markdown(ocr_result)
+        del ocr_result['data']['pages']
+        self.assertEqual(''.join(self.converter.iter_markdown(ocr_result)), expected)
+
+    def test_other_formats(self):
+        """測試非 AlphaXiv 格式直接使用 convert_to_markdown"""
+        ocr_result = {'pages': [{'text': '第一頁內容'}]}
+        self.assertEqual(
+            ''.join(self.converter.iter_markdown(ocr_result)),
+            self.converter.convert_to_markdown(ocr_result)
+        )
+
+    def test_feed_holds_only_open_state(self):
+        """測試每頁輸出已確定的內容"""
+        stream = MarkdownStream(self.converter)
+        chunk = stream.feed('First page ends.\n')
+        self.assertEqual(chunk, 'First page ends.')
+        self.assertEqual(stream.feed('Second page.'), ' Second page.')
+        self.assertEqual(stream.close(), '')
+
+    def test_write_markdown(self):
+        """測試寫入文字串流"""
+        ocr_result = self._result(['內容'])
+        output = io.StringIO()
+        written = self.converter.write_markdown(ocr_result, output)
+
+        self.assertEqual(output.getvalue(), self.converter.convert_to_markdown(ocr_result))
+        self.assertEqual(written, len(output.getvalue()))
+
+
 if __name__ == '__main__':
     unittest.main()
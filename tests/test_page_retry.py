@@ -0,0 +1,127 @@
+"""
+失敗頁面重試測試
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from models.document import PAGE_SPLIT
+from services.ocr_service import OCRService
+from services.result_cache import ResultCache
+
+NUM_PAGES = 6
+
+
+def page_text(page):
+    return f"第 {page} 頁的內容。"
+
+
+class FlakyUpstream:
+    """
+    指定的頁面前幾次送出時辨識失敗（回傳空白頁）
+
+    擷取的子文件內容為頁碼的 JSON，整份文件為第 1 到 NUM_PAGES 頁。
+    """
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.calls = []
+
+    def respond(self, pages):
+        self.calls.append(pages)
+        texts = []
+        for page in pages:
+            if self.failures.get(page, 0) > 0:
+                self.failures[page] -= 1
+                texts.append('')
+            else:
+                texts.append(page_text(page))
+        return {'data': {
+            'ocr_text': PAGE_SPLIT.join(texts),
+            'pages': texts,
+            'num_pages': len(texts),
+            'num_successful': sum(1 for text in texts if text),
+        }}
+
+    def process_pdf(self, file_path, num_pages=None):
+        return self.respond(list(range(1, NUM_PAGES + 1)))
+
+    def process_pdf_from_bytes(self, file_bytes, filename, num_pages=None):
+        return self.respond(json.loads(file_bytes))
+
+
+def fake_extract(source, pages, destination):
+    destination.write(json.dumps(list(pages)).encode())
+
+
+class TestFailedPageRetry(unittest.TestCase):
+    """測試只重新送出失敗的頁面並填回原位置"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 retry')
+        # 測試環境未必安裝 pypdf，頁數與擷取以假的實作代替
+        patches = [
+            mock.patch('services.ocr_service.count_pages', lambda source: NUM_PAGES),
+            mock.patch('services.ocr_service.extract_pages', fake_extract),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_service(self, upstream, cache=False):
+        service = OCRService(
+            result_cache=ResultCache(os.path.join(self.temp_dir, 'cache')) if cache else None
+        )
+        service.page_retries = 2
+        service.client.process_pdf = upstream.process_pdf
+        service.client.process_pdf_from_bytes = upstream.process_pdf_from_bytes
+        return service
+
+    def test_failed_pages_resubmitted_and_spliced(self):
+        upstream = FlakyUpstream({2: 1, 5: 2})
+        result = self.make_service(upstream, cache=True).process_document(
+            self.pdf_path, self.temp_dir
+        )
+        self.assertTrue(result['success'])
+        self.assertEqual(upstream.calls, [[1, 2, 3, 4, 5, 6], [2, 5], [5]])
+        self.assertEqual(result['metadata']['timings']['recovered_pages'], 2)
+        content = result['markdown_content']
+        self.assertLess(content.index('第 1 頁'), content.index('第 2 頁'))
+        self.assertLess(content.index('第 4 頁'), content.index('第 5 頁'))
+        self.assertLess(content.index('第 5 頁'), content.index('第 6 頁'))
+        self.assertIn('成功處理**: 6', content)
+        # 補齊後的結果可以快取
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, 'cache'))), 1)
+
+    def test_retries_bounded(self):
+        upstream = FlakyUpstream({3: 10})
+        result = self.make_service(upstream).process_document(self.pdf_path, self.temp_dir)
+        self.assertTrue(result['success'])
+        self.assertEqual(upstream.calls, [[1, 2, 3, 4, 5, 6], [3], [3]])
+        self.assertIn('成功處理**: 5', result['markdown_content'])
+
+    def test_selected_pages_keep_original_numbers(self):
+        upstream = FlakyUpstream({4: 1})
+        result = self.make_service(upstream).process_document(
+            self.pdf_path, self.temp_dir, pages='3-5'
+        )
+        self.assertEqual(upstream.calls, [[3, 4, 5], [4]])
+        self.assertIn('第 4 頁的內容', result['markdown_content'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+平行 Markdown 轉換測試
+"""
+
+import unittest
+import sys
+import os
+from unittest import mock
+
+# 添加父目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.markdown_converter import MarkdownConverter
+from src.utils.parallel_converter import ParallelMarkdownConverter, _partition
+
+
+PAGE_SPLIT = '\n\n<--- Page Split --->\n\n'
+
+
+def make_result(pages):
+    return {
+        'data': {
+            'ocr_text': PAGE_SPLIT.join(pages),
+            'pages': pages,
+            'num_pages': len(pages),
+            'num_successful': len(pages)
+        }
+    }
+
+
+# 刻意讓段落與圖片說明跨越各段接縫
+PAGES = [
+    'Intro text ends.\n',
+    'Body of the<center>FIGURE 1 First. Caption</center>',
+    'paragraph continues<center>FIGURE 2 Second. Caption</center>',
+    '<center>FIGURE 3 Third.',
+    ' Caption</center>which goes on.',
+    'New paragraph.<center>Table</center>',
+    '最後一頁。'
+] * 3
+
+
+class NoPoolConverter(ParallelMarkdownConverter):
+    """無法建立行程池時應逐頁轉換"""
+
+    def _get_executor(self):
+        raise OSError('no processes')
+
+
+class TestParallelMarkdownConverter(unittest.TestCase):
+    """測試平行轉換"""
+
+    def test_matches_serial(self):
+        """測試平行轉換與逐頁轉換結果相同"""
+        converter = ParallelMarkdownConverter(min_parallel_chars=0, max_workers=2)
+        try:
+            ocr_result = make_result(PAGES)
+            self.assertEqual(
+                ''.join(converter.iter_markdown(ocr_result)),
+                MarkdownConverter().convert_to_markdown(ocr_result)
+            )
+        finally:
+            converter.shutdown()
+
+    def test_fallback_without_pool(self):
+        """測試行程池無法使用時的結果"""
+        ocr_result = make_result(PAGES)
+        self.assertEqual(
+            ''.join(NoPoolConverter(min_parallel_chars=0, max_workers=2).iter_markdown(ocr_result)),
+            MarkdownConverter().convert_to_markdown(ocr_result)
+        )
+
+    def test_below_threshold_is_serial(self):
+        """測試小文件不啟動行程池"""
+        converter = NoPoolConverter(max_workers=2)
+        ''.join(converter.iter_markdown(make_result(PAGES)))
+        self.assertIsNone(converter._executor)
+
+    def test_settings_read_at_construction(self):
+        """測試建立時才讀取環境變數（.env 在匯入模組之後才載入）"""
+        with mock.patch.dict(os.environ, {'MARKDOWN_PARALLEL_MIN_CHARS': '123',
+                                          'MARKDOWN_PARALLEL_WORKERS': '3'}):
+            converter = ParallelMarkdownConverter()
+        self.assertEqual((converter.min_parallel_chars, converter.max_workers), (123, 3))
+        self.assertEqual(ParallelMarkdownConverter(0, 5).min_parallel_chars, 0)
+
+    def test_partition(self):
+        """測試依字元數切分頁面"""
+        segments = _partition(['a' * 10] * 10, 3)
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(sum(segments, []), ['a' * 10] * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+上傳前 PDF 瘦身測試
+"""
+
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from models.document import PAGE_SPLIT
+from services.ocr_service import OCRService
+
+HAS_PYPDF = importlib.util.find_spec('pypdf') is not None
+
+
+def ocr_response(num_pages=2):
+    texts = [f"第 {page} 頁的內容。" for page in range(1, num_pages + 1)]
+    return {'data': {
+        'ocr_text': PAGE_SPLIT.join(texts),
+        'pages': texts,
+        'num_pages': num_pages,
+        'num_successful': num_pages,
+    }}
+
+
+def bloated_pdf() -> bytes:
+    """兩頁共用一份資源，含未使用的大型 XObject 與縮圖"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    unused = DecodedStreamObject()
+    unused.set_data(os.urandom(50000))
+    unused.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): DictionaryObject(),
+    })
+    unused_ref = writer._add_object(unused)
+    resources = writer._add_object(DictionaryObject({
+        NameObject('/XObject'): DictionaryObject({NameObject('/Unused'): unused_ref})
+    }))
+    for _ in range(2):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject('/Resources')] = resources
+        page[NameObject('/Thumb')] = unused_ref
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@unittest.skipUnless(HAS_PYPDF, '需要 pypdf')
+class TestOptimizePdf(unittest.TestCase):
+    """測試去除縮圖與未使用的資源"""
+
+    def test_strips_unused_objects(self):
+        from pypdf import PdfReader
+        from utils.pdf_optimize import optimize_pdf
+
+        original = bloated_pdf()
+        buffer = io.BytesIO()
+        optimize_pdf(io.BytesIO(original), buffer)
+        self.assertLess(len(buffer.getvalue()), len(original) // 10)
+
+        reader = PdfReader(io.BytesIO(buffer.getvalue()))
+        self.assertEqual(len(reader.pages), 2)
+        self.assertNotIn('/Thumb', reader.pages[0])
+
+
+class TestUploadOptimization(unittest.TestCase):
+    """測試 OCRService 上傳瘦身後的 PDF 並回報節省的位元組"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 ' + b'x' * 1000)
+        self.sent = []
+        self.service = OCRService()
+        self.service.optimize_uploads = True
+        self.service.client.process_pdf_from_bytes = self.fake_upload
+        # 頁數由假的實作提供，不依賴 pypdf
+        patch = mock.patch('services.ocr_service.count_pages', lambda source: 2)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def fake_upload(self, file_bytes, filename, num_pages=None):
+        self.sent.append(file_bytes)
+        return ocr_response()
+
+    def test_uploads_smaller_pdf(self):
+        def shrink(source, destination, pages=None, target_dpi=None):
+            destination.write(b'%PDF-1.4 small')
+
+        with mock.patch('services.ocr_service.optimize_pdf', shrink):
+            result = self.service.process_document(self.pdf_path, self.temp_dir)
+        self.assertTrue(result['success'])
+        self.assertEqual(self.sent, [b'%PDF-1.4 small'])
+        timings = result['metadata']['timings']
+        self.assertEqual(timings['bytes_before_optimize'], 1009)
+        self.assertEqual(timings['bytes_saved'], 1009 - len(b'%PDF-1.4 small'))
+        self.assertIn('upload_ms_saved', timings)
+
+    def test_falls_back_to_original(self):
+        def broken(source, destination, pages=None, target_dpi=None):
+            raise ValueError('無法解析')
+
+        with mock.patch('services.ocr_service.optimize_pdf', broken):
+            result = self.service.process_document(self.pdf_path, self.temp_dir)
+        self.assertTrue(result['success'])
+        self.assertEqual(len(self.sent[0]), 1009)
+        self.assertNotIn('bytes_saved', result['metadata']['timings'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+頁面選擇測試
+"""
+
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加 src 目錄與專案根目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models.document import Document
+from services.search_index import SearchIndex
+from utils.markdown_converter import MarkdownConverter
+from utils.pdf_pages import format_page_ranges, parse_page_spec, select_pages
+
+HAS_PYPDF = importlib.util.find_spec('pypdf') is not None
+
+
+def make_pdf(num_pages):
+    """以 pypdf 產生指定頁數的空白 PDF"""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(num_pages):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class TestPageSpec(unittest.TestCase):
+    """測試頁面範圍解析"""
+
+    def test_parse(self):
+        self.assertEqual(parse_page_spec('1-5, 9,12-'), [(1, 5), (9, 9), (12, None)])
+        self.assertEqual(parse_page_spec('-3'), [(1, 3)])
+
+    def test_invalid(self):
+        for spec in ('', ' , ', 'a', '0', '5-2', '1-2-3', '-', '3,x'):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_page_spec(spec)
+
+    def test_select(self):
+        self.assertEqual(select_pages('1-3,9,12-', 14), [1, 2, 3, 9, 12, 13, 14])
+        # 重疊範圍合併，超過文件結尾的範圍截斷
+        self.assertEqual(select_pages('2-4,3-8', 5), [2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            select_pages('7', 5)
+
+    def test_format(self):
+        self.assertEqual(format_page_ranges([1, 2, 3, 9, 12, 13]), '1-3,9,12-13')
+        self.assertEqual(format_page_ranges([]), '')
+
+
+class TestOriginalPageNumbers(unittest.TestCase):
+    """測試輸出保留原始頁碼"""
+
+    def setUp(self):
+        self.ocr_result = {'data': {
+            'ocr_text': '第九頁。\n\n<--- Page Split --->\n\n# 第十二頁',
+            'pages': ['第九頁。', '# 第十二頁'],
+            'num_pages': 2,
+            'num_successful': 2,
+            'page_numbers': [9, 12],
+            'source_num_pages': 20,
+        }}
+
+    def test_markdown_statistics(self):
+        markdown = ''.join(MarkdownConverter().iter_markdown(self.ocr_result))
+        self.assertIn('- **頁面範圍**: 9,12（原始文件共 20 頁）', markdown)
+
+    def test_document_blocks(self):
+        blocks = Document.from_ocr_result(self.ocr_result).to_dict()['blocks']
+        self.assertEqual(
+            [(block['type'], block['page']) for block in blocks],
+            [('paragraph', 9), ('page_break', 12), ('heading', 12)]
+        )
+
+    def test_search_index(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            index = SearchIndex(os.path.join(temp_dir, 'index.db'))
+            index.index_document('a.md', self.ocr_result['data']['pages'],
+                                 page_numbers=[9, 12])
+            results = index.search('第十二頁')
+            self.assertEqual(results['results'][0]['page'], 12)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestUploadPages(unittest.TestCase):
+    """測試上傳端點的 pages 參數"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': None,
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_invalid_spec_rejected_before_processing(self):
+        response = self.app.test_client().post('/upload', data={
+            'file': (io.BytesIO(b'%PDF-1.4'), 'paper.pdf'),
+            'pages': '5-2',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('無效的頁面範圍', response.get_json()['error'])
+        self.assertNotIn('ocr_service', self.app.extensions['ocr_services']._instances)
+
+    @unittest.skipUnless(HAS_PYPDF, '需要 pypdf')
+    def test_only_selected_pages_uploaded(self):
+        from werkzeug.serving import make_server
+        from benchmarks.mock_alphaxiv import INFERENCE_PATH, MockAlphaXivServer
+
+        server = make_server('127.0.0.1', 0, MockAlphaXivServer().app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            services = self.app.extensions['ocr_services']
+            services.ocr_service.client.api_url = \
+                f'http://127.0.0.1:{server.port}{INFERENCE_PATH}'
+            response = self.app.test_client().post('/upload', data={
+                'file': (io.BytesIO(make_pdf(10)), 'paper.pdf'),
+                'pages': '2-3,9-',
+            })
+        finally:
+            server.shutdown()
+        result = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result['metadata']['pages'], '2-3,9-10')
+        self.assertIn('（原始文件共 10 頁）', result['markdown_content'])
+
+
+@unittest.skipUnless(HAS_PYPDF, '需要 pypdf')
+class TestExtractPages(unittest.TestCase):
+    """測試擷取頁面"""
+
+    def test_extract(self):
+        from utils.pdf_pages import count_pages, extract_pages
+
+        source = io.BytesIO(make_pdf(6))
+        self.assertEqual(count_pages(source), 6)
+        destination = io.BytesIO()
+        extract_pages(source, [2, 5], destination)
+        destination.seek(0)
+        self.assertEqual(count_pages(destination), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+"""
+分段管線測試
+"""
+
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from api.latency_model import LatencyModel
+from models.document import PAGE_SPLIT, Document
+from services.ocr_service import OCRService
+from services.pipeline import PIPELINE_QUEUE_DEPTH, Pipeline, Stage
+
+NUM_PAGES = 12
+
+
+class TestPipeline(unittest.TestCase):
+    """測試有界佇列管線"""
+
+    def test_results_in_input_order(self):
+        seen = []
+
+        def slow_first(item):
+            # 第一項最慢，依序處理的階段仍須先處理它
+            time.sleep(0.05 if item == 0 else 0)
+            return item * 10
+
+        pipeline = Pipeline([
+            Stage('work', slow_first, workers=4),
+            Stage('collect', lambda item: seen.append(item) or item, ordered=True),
+        ])
+        self.assertEqual(pipeline.run(range(6)), [0, 10, 20, 30, 40, 50])
+        self.assertEqual(seen, [0, 10, 20, 30, 40, 50])
+        self.assertEqual(set(pipeline.summary()), {'work', 'collect'})
+
+    def test_queues_bound_read_ahead(self):
+        produced = []
+        release = threading.Event()
+
+        def source():
+            for item in range(20):
+                produced.append(item)
+                yield item
+
+        def blocked(item):
+            release.wait(5)
+            return item
+
+        pipeline = Pipeline([Stage('first', lambda item: item), Stage('last', blocked)],
+                            queue_size=2)
+        thread = threading.Thread(target=pipeline.run, args=(source(),))
+        thread.start()
+        time.sleep(0.2)
+        # 最後一個階段處理 1 項，兩個佇列各 2 項，第一個階段與輸入各 1 項
+        self.assertLessEqual(len(produced), 7)
+        release.set()
+        thread.join()
+        self.assertEqual(len(produced), 20)
+
+    def test_failure_stops_all_stages(self):
+        def fail_on_three(item):
+            if item == 3:
+                raise ValueError('第 3 項失敗')
+            return item
+
+        pipeline = Pipeline([Stage('first', fail_on_three), Stage('second', lambda item: item)])
+        with self.assertRaises(ValueError):
+            pipeline.run(range(100))
+        self.assertEqual(PIPELINE_QUEUE_DEPTH.collect().get(('first',), 0), 0)
+        self.assertEqual(PIPELINE_QUEUE_DEPTH.collect().get(('second',), 0), 0)
+
+    def test_ordered_stage_single_worker(self):
+        with self.assertRaises(ValueError):
+            Stage('write', lambda item: item, workers=2, ordered=True)
+
+
+def page_text(page):
+    return f"第 {page} 頁的內容。\n\n段落 {page}"
+
+
+def fake_extract(source, pages, destination):
+    destination.write(json.dumps(list(pages)).encode())
+
+
+class FakeResponse:
+
+    def __init__(self, payload):
+        self.status_code = 200
+        self.content = json.dumps(payload).encode()
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class TestPipelinedDocument(unittest.TestCase):
+    """測試分段文件邊辨識邊寫入輸出"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, 'out')
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 pipeline')
+        patches = [
+            mock.patch('services.ocr_service.count_pages', lambda source: NUM_PAGES),
+            mock.patch('services.ocr_service.extract_pages', fake_extract),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.service = OCRService()
+        self.service.chunk_parallelism = 2
+        self.service.client.latency = LatencyModel(overhead=2, per_page=1)
+        self.service.client.process_pdf_from_bytes = self.upstream
+        self.first_chunk_written = None
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def upstream(self, file_bytes, filename, num_pages=None):
+        pages = json.loads(file_bytes)
+        if NUM_PAGES in pages:
+            # 最後一段等到前面的段已寫入輸出檔案才回應
+            self.first_chunk_written = self.wait_for_output('第 1 頁的內容')
+        texts = [page_text(page) for page in pages]
+        return {'data': {
+            'ocr_text': PAGE_SPLIT.join(texts),
+            'pages': texts,
+            'num_pages': len(texts),
+            'num_successful': len(texts),
+        }}
+
+    def wait_for_output(self, text, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for path in glob.glob(os.path.join(self.output_dir, '*.md')):
+                with open(path, encoding='utf-8') as f:
+                    if text in f.read():
+                        return True
+            time.sleep(0.01)
+        return False
+
+    def test_earlier_chunks_written_while_later_at_api(self):
+        result = self.service.process_document(self.pdf_path, self.output_dir)
+        self.assertTrue(result['success'])
+        self.assertTrue(self.first_chunk_written)
+
+        with open(result['output_file'], encoding='utf-8') as f:
+            self.assertEqual(f.read(), result['markdown_content'])
+        self.assertIn('**總頁數**: 12', result['markdown_content'])
+
+        timings = result['metadata']['timings']
+        self.assertEqual(set(timings['pipeline']),
+                         {'split', 'upload', 'decode', 'convert', 'write'})
+        self.assertIn('markdown_conversion', timings['stages'])
+
+    def test_chunk_upstream_calls_recorded_in_trace(self):
+        # 經由實際的客戶端送出，確認管線執行緒沿用請求的追蹤
+        del self.service.client.process_pdf_from_bytes
+
+        def post(url, files, timeout):
+            return FakeResponse(self.upstream(files['file'][1], files['file'][0]))
+
+        with mock.patch('api.alphaxiv_client.requests.post', post):
+            result = self.service.process_document(self.pdf_path, self.output_dir)
+        self.assertTrue(result['success'])
+
+        timings = result['metadata']['timings']
+        chunks = self.service._plan_chunks(None, NUM_PAGES)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(timings['upstream_attempts'], len(chunks))
+        self.assertGreater(timings['bytes_sent'], 0)
+        self.assertIn('upstream_call', timings['stages'])
+        self.assertIn('json_decode', timings['stages'])
+
+    def test_content_read_back_from_output(self):
+        # 不分段時轉換片段只寫入檔案，回應內容由完成的檔案讀回
+        self.service.chunk_parallelism = 1
+        chunks = ['# 標題\r\n', '第一段\n', '第二段\r']
+        patch = mock.patch.object(Document, 'iter_markdown',
+                                  lambda document, converter=None: iter(chunks))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.service.client.process_pdf = lambda path, num_pages=None: self.upstream(
+            json.dumps([1, 2]).encode(), 'paper.pdf'
+        )
+        result = self.service.process_document(self.pdf_path, self.output_dir)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['markdown_content'], ''.join(chunks))
+        with open(result['output_file'], encoding='utf-8', newline='') as f:
+            self.assertEqual(f.read(), ''.join(chunks))
+
+    def test_failed_chunk_removes_partial_output(self):
+        def upstream(file_bytes, filename, num_pages=None):
+            if NUM_PAGES in json.loads(file_bytes):
+                self.wait_for_output('第 1 頁的內容')
+                raise Exception('上游錯誤')
+            return self.upstream(file_bytes, filename, num_pages)
+
+        self.service.client.process_pdf_from_bytes = upstream
+        result = self.service.process_document(self.pdf_path, self.output_dir)
+        self.assertFalse(result['success'])
+        self.assertEqual(glob.glob(os.path.join(self.output_dir, '*.md')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
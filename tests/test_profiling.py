@@ -0,0 +1,87 @@
+"""
+請求剖析測試
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.pipeline import Pipeline, Stage
+from utils import profiling
+from utils.profiling import RequestProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """測試請求剖析"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        env = {
+            'PROFILE_ENABLED': 'false',
+            'PROFILE_DIR': self.tmpdir.name,
+            'PROFILE_ADMIN_TOKEN': 'secret',
+            'PROFILE_SAMPLE_INTERVAL': '0.001',
+        }
+        with mock.patch.dict(os.environ, env):
+            self.profiler = RequestProfiler()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_disabled_without_token(self):
+        """測試未啟用且沒有正確權杖時不剖析"""
+        self.assertIsNone(self.profiler.select_mode())
+        self.assertIsNone(self.profiler.select_mode('wrong'))
+        with self.profiler.profile('upload', 'wrong') as path:
+            self.assertIsNone(path)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_sampling_writes_folded_stacks(self):
+        """測試堆疊取樣輸出 folded stacks"""
+        with self.profiler.profile('upload', 'secret', 'sample') as path:
+            busy(0.05)
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any('busy (test_profiling.py' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+    def test_sampling_covers_pipeline_threads(self):
+        """測試堆疊取樣涵蓋管線各階段的執行緒"""
+        def work(item):
+            busy(0.02)
+            return item
+
+        with self.profiler.profile('upload', 'secret', 'sample') as path:
+            self.assertEqual(profiling.active_mode(), 'sample')
+            Pipeline([Stage('work', work, workers=2)]).run(range(4))
+        self.assertIsNone(profiling.active_mode())
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any(line.startswith('pipeline-work-') and 'busy (test_profiling.py' in line
+                            for line in lines))
+
+    def test_cprofile_writes_stats(self):
+        """測試 cProfile 輸出可由 pstats 讀取的檔案"""
+        with self.profiler.profile('upload', 'secret', 'cprofile') as path:
+            busy(0.01)
+        self.assertTrue(path.endswith('.prof'))
+        stats = pstats.Stats(path)
+        self.assertTrue(any(func[2] == 'busy' for func in stats.stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+OCR 結果快取測試
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from app import create_app
+from models.document import PAGE_SPLIT
+from services.ocr_service import OCRService
+from services.result_cache import DEFAULT_MAX_BYTES, ResultCache, hash_bytes, hash_file
+
+
+class TestResultCache(unittest.TestCase):
+    """測試 OCR 結果快取"""
+
+    def test_round_trip(self):
+        """測試以內容雜湊寫入與讀取結果"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pdf_path = os.path.join(tmpdir, 'a.pdf')
+            with open(pdf_path, 'wb') as f:
+                f.write(b'%PDF-1.4 content')
+            key = hash_file(pdf_path)
+            self.assertEqual(key, hash_bytes(b'%PDF-1.4 content'))
+
+            cache = ResultCache(os.path.join(tmpdir, 'cache'))
+            self.assertIsNone(cache.get(key))
+            result = {'data': {'ocr_text': '中文', 'pages': ['中文'], 'num_pages': 1}}
+            cache.put(key, result)
+            self.assertTrue(cache.contains(key))
+            self.assertEqual(cache.get(key), result)
+
+            # 損毀的快取視為沒有快取
+            with open(cache.path(key), 'wb') as f:
+                f.write(b'broken')
+            self.assertIsNone(cache.get(key))
+
+    def test_evicts_least_recently_used(self):
+        """測試超過大小上限時刪除最久未使用的結果"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(os.path.join(tmpdir, 'cache'), max_bytes=0)
+            result = {'data': {'ocr_text': os.urandom(512).hex()}}
+            keys = [hash_bytes(str(i).encode()) for i in range(3)]
+            for age, key in enumerate(keys):
+                cache.put(key, result)
+                os.utime(cache.path(key), (1000 + age, 1000 + age))
+            size = os.path.getsize(cache.path(keys[0]))
+
+            # 讀取最舊的結果使其成為最近使用
+            self.assertEqual(cache.get(keys[0]), result)
+            cache.max_bytes = size * 3
+            cache.put(hash_bytes(b'new'), result)
+
+            self.assertTrue(cache.contains(hash_bytes(b'new')))
+            self.assertTrue(cache.contains(keys[0]))
+            self.assertFalse(cache.contains(keys[1]))
+            self.assertTrue(cache.contains(keys[2]))
+
+    def test_keeps_new_entry_larger_than_limit(self):
+        """測試剛寫入的結果即使超過上限也保留"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResultCache(os.path.join(tmpdir, 'cache'), max_bytes=1)
+            cache.put('aa', {'data': {}})
+            cache.put('bb', {'data': {}})
+            self.assertFalse(cache.contains('aa'))
+            self.assertTrue(cache.contains('bb'))
+
+    def test_max_bytes_from_env(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with mock.patch.dict(os.environ, {'RESULT_CACHE_MAX_BYTES': '2048'}):
+                self.assertEqual(ResultCache(tmpdir).max_bytes, 2048)
+            with mock.patch.dict(os.environ, {'RESULT_CACHE_MAX_BYTES': ''}):
+                self.assertEqual(ResultCache(tmpdir).max_bytes, DEFAULT_MAX_BYTES)
+
+
+class TestOptimizeCacheKey(unittest.TestCase):
+    """測試 PDF 瘦身設定納入快取鍵"""
+
+    def test_key_depends_on_optimize_settings(self):
+        service = OCRService()
+        service.optimize_uploads = False
+        key = hash_bytes(b'%PDF-1.4')
+        self.assertEqual(service._selection_key(key, None), key)
+        selection = ([1, 2], 5)
+        plain = service._selection_key(key, selection)
+
+        service.optimize_uploads = True
+        service.optimize_dpi = 150
+        optimized = service._selection_key(key, None)
+        self.assertNotEqual(optimized, key)
+        self.assertNotIn(service._selection_key(key, selection), (plain, optimized))
+
+        service.optimize_dpi = 300
+        self.assertNotEqual(service._selection_key(key, None), optimized)
+
+
+class TestCachedUpload(unittest.TestCase):
+    """測試以用戶端計算的雜湊取得已處理的結果，不上傳檔案"""
+
+    PDF = b'%PDF-1.4 cached upload'
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(self.temp_dir, 'outputs'),
+            'SEARCH_INDEX_PATH': os.path.join(self.temp_dir, 'index.db'),
+            'RESULT_CACHE_DIR': os.path.join(self.temp_dir, 'cache'),
+        })
+        self.calls = 0
+        service = self.app.extensions['ocr_services'].ocr_service
+        service.client.process_pdf = self.upstream
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def upstream(self, file_path, num_pages=None):
+        self.calls += 1
+        texts = ['第一頁。', '第二頁。']
+        return {'data': {
+            'ocr_text': PAGE_SPLIT.join(texts),
+            'pages': texts,
+            'num_pages': 2,
+            'num_successful': 2,
+        }}
+
+    def lookup(self, sha256, filename='paper.pdf', size=len(PDF)):
+        return self.client.post('/upload/cached', json={
+            'sha256': sha256, 'filename': filename, 'size': size,
+        })
+
+    def test_hit_after_upload(self):
+        self.assertEqual(self.lookup(hash_bytes(self.PDF)).status_code, 404)
+
+        uploaded = self.client.post('/upload', data={'file': (io.BytesIO(self.PDF), 'paper.pdf')})
+        self.assertEqual(uploaded.status_code, 200)
+
+        response = self.lookup(hash_bytes(self.PDF), filename='renamed.pdf')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(body['markdown_content'], uploaded.get_json()['markdown_content'])
+        self.assertTrue(body['output_file'].startswith('renamed_'))
+        self.assertTrue(body['metadata']['timings']['upload_skipped'])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.temp_dir, 'outputs', body['output_file'])
+        ))
+
+    def test_miss_after_optimize_settings_change(self):
+        uploaded = self.client.post('/upload', data={'file': (io.BytesIO(self.PDF), 'paper.pdf')})
+        self.assertEqual(uploaded.status_code, 200)
+
+        # 瘦身後上傳的內容不同，不使用未瘦身時的結果
+        service = self.app.extensions['ocr_services'].ocr_service
+        service.optimize_uploads = True
+        self.assertEqual(self.lookup(hash_bytes(self.PDF)).status_code, 404)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.lookup('../' * 21 + 'x').status_code, 400)
+        self.assertEqual(self.lookup(hash_bytes(self.PDF), size=None).status_code, 400)
+        self.assertEqual(self.lookup(hash_bytes(self.PDF), filename='a.exe').status_code, 400)
+        self.assertEqual(self.lookup(hash_bytes(self.PDF), filename='a.png').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
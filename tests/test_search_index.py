@@ -0,0 +1,101 @@
+"""
+全文檢索索引測試
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.search_index import SearchIndex
+
+
+class TestSearchIndex(unittest.TestCase):
+    """測試全文檢索索引"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.tmpdir, 'index.db'))
+        self.index.index_document('a.md', [
+            'Adrenal cortex produces cortisol.',
+            'Plasma levels of <b>cortisol</b> were measured.\n\n腎上腺皮質分泌類固醇激素',
+        ], input_file='a.pdf')
+        self.index.index_document('b.md', ['Glucose metabolism only.'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_search_returns_pages_and_snippets(self):
+        """測試結果包含頁碼與轉義後的摘要"""
+        result = self.index.search('cortisol measured')
+        self.assertEqual(result['total'], 1)
+        hit = result['results'][0]
+        self.assertEqual((hit['output_file'], hit['input_file'], hit['page']), ('a.md', 'a.pdf', 2))
+        self.assertIn('<mark>', hit['snippet'])
+        self.assertIn('&lt;/b&gt;', hit['snippet'])
+
+    def test_cjk_and_short_terms(self):
+        """測試中文與短詞查詢"""
+        self.assertEqual(self.index.search('類固醇')['results'][0]['page'], 2)
+        hit = self.index.search('皮質')['results'][0]
+        self.assertEqual(hit['page'], 2)
+        self.assertIn('<mark>皮質</mark>', hit['snippet'])
+
+    def test_short_terms_with_long_terms(self):
+        """測試短詞與長詞混合時以長詞縮小範圍"""
+        result = self.index.search('皮質 cortisol')
+        self.assertEqual([hit['page'] for hit in result['results']], [2])
+        self.assertFalse(result['partial'])
+        self.assertIn('<mark>皮質</mark>', result['results'][0]['snippet'])
+
+    def test_short_term_scan_capped(self):
+        """測試只有短詞時只掃描最近索引的頁面"""
+        index = SearchIndex(os.path.join(self.tmpdir, 'index.db'), scan_max_pages=1)
+        result = index.search('皮質')
+        # 最近索引的一頁是 b.md，a.md 第 2 頁不在掃描範圍內
+        self.assertEqual((result['total'], result['partial']), (0, True))
+        index.index_document('c.md', ['腎上腺皮質'])
+        result = index.search('皮質')
+        self.assertEqual((result['total'], result['partial']), (1, True))
+        self.assertEqual(result['results'][0]['output_file'], 'c.md')
+        self.assertFalse(index.search('cortisol')['partial'])
+
+    def test_scan_cap_boundaries(self):
+        """測試掃描上限為 0、等於頁數與未指定時的 partial 旗標"""
+        path = os.path.join(self.tmpdir, 'index.db')
+        result = SearchIndex(path, scan_max_pages=0).search('皮質')
+        self.assertEqual((result['total'], result['partial']), (0, True))
+
+        # 共索引 3 頁，上限恰好涵蓋全部頁面時不是部分結果
+        result = SearchIndex(path, scan_max_pages=3).search('皮質')
+        self.assertEqual((result['total'], result['partial']), (1, False))
+
+        with mock.patch.dict(os.environ, {'SEARCH_SCAN_MAX_PAGES': '2'}):
+            index = SearchIndex(path)
+        self.assertEqual(index.scan_max_pages, 2)
+        self.assertTrue(index.search('皮質')['partial'])
+
+    def test_num_pages_is_highest_page(self):
+        """測試頁數記錄為最大頁碼，與頁碼順序無關"""
+        self.index.index_document('c.md', ['第九頁', '第三頁'], page_numbers=[9, 3])
+        conn = sqlite3.connect(self.index.db_path)
+        self.addCleanup(conn.close)
+        row = conn.execute("SELECT num_pages FROM documents WHERE output_file = 'c.md'").fetchone()
+        self.assertEqual(row[0], 9)
+
+    def test_reindex_replaces_document(self):
+        """測試重新索引同一份文件時取代舊資料"""
+        self.assertEqual(self.index.search('cortisol')['total'], 2)
+        self.index.index_document('a.md', ['Nothing relevant here.'])
+        self.assertEqual(self.index.search('cortisol')['total'], 0)
+        self.assertEqual(self.index.search('"quoted')['total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
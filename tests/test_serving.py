@@ -0,0 +1,38 @@
+"""
+正式環境服務設定測試
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils import serving
+
+
+class TestServing(unittest.TestCase):
+    """測試 worker 與執行緒數"""
+
+    def test_workers_from_cpus(self):
+        self.assertEqual(serving.default_workers(cpus=4, memory=64 << 30, worker_memory_mb=256), 9)
+
+    def test_workers_limited_by_memory(self):
+        """測試記憶體不足時減少 worker，但至少保留一個"""
+        self.assertEqual(serving.default_workers(cpus=8, memory=1 << 30, worker_memory_mb=256), 4)
+        self.assertEqual(serving.default_workers(cpus=8, memory=1 << 20, worker_memory_mb=256), 1)
+
+    def test_threads_cover_ocr_slots_and_queue(self):
+        with mock.patch.dict(os.environ, {'MAX_CONCURRENT_OCR': '4', 'MAX_QUEUED_OCR': '10'}):
+            self.assertEqual(serving.default_threads(), 4 + 10 + serving.SPARE_THREADS)
+
+    def test_detection(self):
+        self.assertGreaterEqual(serving.available_cpus(), 1)
+        memory = serving.available_memory()
+        self.assertTrue(memory is None or memory > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+請求追蹤測試
+"""
+
+import contextvars
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils import tracing
+
+
+class TestTracing(unittest.TestCase):
+    """測試請求追蹤"""
+
+    def test_nested_begin_shares_trace(self):
+        """測試巢狀 begin() 共用追蹤，最外層 finish() 才結束"""
+        outer = tracing.begin('upload')
+        with tracing.stage('upload_receive'):
+            pass
+        inner = tracing.begin('process_document', input_file='a.pdf')
+        self.assertIs(inner, outer)
+        tracing.increment('upstream_attempts')
+        tracing.annotate('cache', 'miss')
+        tracing.record_stage('markdown_conversion', 0.25)
+
+        summary = tracing.finish(inner)
+        self.assertIs(tracing.current_trace(), outer)
+        self.assertEqual(summary['upstream_attempts'], 1)
+        self.assertEqual(summary['cache'], 'miss')
+        self.assertEqual(summary['stages']['markdown_conversion'], 0.25)
+        self.assertIn('upload_receive', summary['stages'])
+
+        tracing.finish(outer)
+        self.assertIsNone(tracing.current_trace())
+
+    def test_parallel_threads_keep_own_parents(self):
+        """測試多個執行緒同時記錄時各自的 span 上層正確"""
+        trace = tracing.begin('upload')
+        both_open = threading.Barrier(2)
+
+        def chunk(name):
+            with tracing.stage(name):
+                both_open.wait(5)
+                with tracing.stage(f'{name}_call'):
+                    tracing.increment('upstream_attempts')
+
+        with tracing.stage('upstream_chunks'):
+            threads = [
+                threading.Thread(target=contextvars.copy_context().run, args=(chunk, name))
+                for name in ('chunk_a', 'chunk_b')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        summary = tracing.finish(trace)
+
+        by_name = {span.name: span for span in trace.spans}
+        self.assertEqual(summary['upstream_attempts'], 2)
+        for name in ('chunk_a', 'chunk_b'):
+            self.assertEqual(by_name[name].parent_id, by_name['upstream_chunks'].span_id)
+            self.assertEqual(by_name[f'{name}_call'].parent_id, by_name[name].span_id)
+
+    def test_stage_without_trace(self):
+        """測試沒有追蹤時 stage() 仍可使用"""
+        with tracing.stage('disk_save'):
+            pass
+        tracing.annotate('cache', 'hit')
+        self.assertIsNone(tracing.current_trace())
+
+    def test_export_to_file(self):
+        """測試以 OTLP/JSON 輸出到檔案，並略過快速的請求"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'traces.jsonl')
+            exporter = tracing.TraceExporter(file_path=path)
+
+            trace = tracing.Trace('upload')
+            with trace.span('upstream_call'):
+                with trace.span('json_decode'):
+                    pass
+            exporter.export(trace)
+            tracing.TraceExporter(file_path=path, slow_seconds=60).export(trace)
+
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), 1)
+            spans = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+            by_name = {span['name']: span for span in spans}
+            self.assertEqual(by_name['upstream_call']['parentSpanId'], by_name['upload']['spanId'])
+            self.assertEqual(by_name['json_decode']['parentSpanId'],
+                             by_name['upstream_call']['spanId'])
+            self.assertEqual({span['traceId'] for span in spans}, {trace.trace_id})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+上傳請求驗證測試
+"""
+
+import os
+import sys
+import unittest
+
+# 添加 src 目錄到路徑
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.upload_request import (UploadPlan, upload_response, validate_image_batch,
+                                  validate_upload_request)
+
+
+class TestValidateUploadRequest(unittest.TestCase):
+    """測試 Flask 與 ASGI 共用的上傳驗證"""
+
+    def test_plan(self):
+        plan = validate_upload_request('../論文 final.pdf', 100, {'pages': ' 1-3 ', 'preview': '2'})
+        self.assertIsInstance(plan, UploadPlan)
+        self.assertEqual(plan.filename, 'final.pdf')
+        self.assertEqual(plan.pages, '1-3')
+        self.assertEqual(plan.preview_pages, 2)
+        self.assertFalse(plan.is_image)
+
+        plan = validate_upload_request('scan.png', 100, {'preview': '2'})
+        self.assertTrue(plan.is_image)
+        self.assertIsNone(plan.pages)
+        # 圖片不使用預覽模式
+        self.assertEqual(plan.preview_pages, 0)
+
+    def test_errors(self):
+        self.assertEqual(validate_upload_request(None, 0, {}), ('未選擇檔案', 400))
+        self.assertEqual(validate_upload_request('', 0, {}), ('未選擇檔案', 400))
+        self.assertEqual(validate_upload_request('a.exe', 100, {})[1], 400)
+        self.assertEqual(validate_upload_request('a.png', 100, {'pages': '1'}),
+                         ('頁面選擇僅支援 PDF', 400))
+        self.assertEqual(validate_upload_request('a.pdf', 100, {'pages': 'x'}),
+                         ('無效的頁面範圍: x', 400))
+        self.assertEqual(validate_upload_request('a.pdf', 100, {'preview': '0'}),
+                         ('無效的預覽頁數: 0', 400))
+
+    def test_image_batch(self):
+        self.assertIsNone(validate_image_batch([('a.png', 10), ('b.jpg', 10)]))
+        self.assertEqual(validate_image_batch([('a.png', 10), ('', 0)]), ('未選擇檔案', 400))
+        self.assertEqual(validate_image_batch([('a.png', 10), ('b.pdf', 10)]),
+                         ('一次上傳多個檔案時僅支援圖片: b.pdf', 400))
+
+    def test_upload_response(self):
+        body, status = upload_response({
+            'success': True, 'markdown_content': '# 標題',
+            'output_file': '/outputs/a.md', 'metadata': {'pages': 1}
+        })
+        self.assertEqual(status, 200)
+        self.assertEqual(body['output_file'], 'a.md')
+        self.assertEqual(upload_response({'success': False}),
+                         ({'success': False, 'error': '處理失敗'}, 500))
+
+
+if __name__ == '__main__':
+    unittest.main()